@@ -0,0 +1,242 @@
+#!/usr/bin/env python3
+"""
+Avatar Clip Library for OWLmarketing
+
+Content-addressed store of generated avatar clips. A clip is keyed by a hash of
+everything that determines its pixels (model, prompt, negative prompt, seed,
+resolution, frames, fps, steps, guidance), so asking for the same clip again
+costs a file copy instead of a diffusion run.
+
+Usage:
+    library = get_clip_library("/app/output/clip_library")
+    results = library.generate(generator, prompts, output_paths)
+"""
+
+import os
+import json
+import random
+import shutil
+import hashlib
+import logging
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger("clip_library")
+
+# How seeds are chosen for prompts without an explicit seed:
+#   reuse - derived from the prompt, so repeats hit the library
+#   vary  - drawn at random, so every call produces (and stores) a fresh clip
+SEED_MODES = ("reuse", "vary")
+
+# Shared libraries, keyed by resolved directory
+_LIBRARIES: Dict[str, "ClipLibrary"] = {}
+_LIBRARIES_LOCK = threading.Lock()
+
+
+class ClipLibrary:
+    """Local library of encoded clips plus their generation metadata."""
+
+    def __init__(self, library_dir: str, seed_mode: str = "reuse"):
+        """
+        Args:
+            library_dir: Directory clips and metadata are stored in
+            seed_mode: "reuse" or "vary" (see SEED_MODES)
+        """
+        if seed_mode not in SEED_MODES:
+            raise ValueError(f"seed_mode must be one of {SEED_MODES}")
+        self.library_dir = Path(library_dir)
+        self.library_dir.mkdir(parents=True, exist_ok=True)
+        self.seed_mode = seed_mode
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def clip_key(params: Dict[str, Any]) -> str:
+        """Hash of the generation parameters."""
+        canonical = json.dumps(params, sort_keys=True, separators=(",", ":"))
+        return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+    def _paths(self, key: str):
+        shard = self.library_dir / key[:2]
+        return shard / f"{key}.mp4", shard / f"{key}.json"
+
+    def resolve_seed(self, prompt: str, negative_prompt: str, seed: Optional[int] = None) -> int:
+        """Seed for a prompt: the explicit one, else by seed_mode."""
+        if seed is not None:
+            return int(seed)
+        if self.seed_mode == "vary":
+            return random.randrange(2 ** 31)
+        digest = hashlib.sha256(f"{prompt}\0{negative_prompt}".encode("utf-8")).hexdigest()
+        return int(digest[:8], 16) % (2 ** 31)
+
+    def generation_params(self, generator, prompt: str, negative_prompt: str, seed: int,
+                          duration: int, fps: int) -> Dict[str, Any]:
+        """Everything that determines a generated clip, for a WanVideoGenerator-style generator."""
+        return {
+            "model": type(generator).__name__ + ":" + str(generator.model_dir),
+            "prompt": prompt,
+            "negative_prompt": negative_prompt,
+            "seed": seed,
+            "width": generator.width,
+            "height": generator.height,
+            "frames": duration * fps,
+            "fps": fps,
+            "steps": generator.effective_sample_steps(duration),
+            "guidance": generator.guide_scale,
+        }
+
+    def _mezzanine_path(self, key: str, mezzanine_path: str) -> Path:
+        """Stored mezzanine of a clip, one per container extension (i.e. per mezzanine format)."""
+        return self.library_dir / key[:2] / f"{key}.mezzanine{os.path.splitext(mezzanine_path)[1]}"
+
+    def lookup(self, params: Dict[str, Any], output_path: str,
+               mezzanine_path: Optional[str] = None) -> Optional[str]:
+        """
+        Copy the stored clip for params to output_path; None on a miss.
+
+        With mezzanine_path, the stored mezzanine is copied there too, and a clip
+        stored without one counts as a miss so it is generated (and stored) again.
+        """
+        key = self.clip_key(params)
+        clip_path, _ = self._paths(key)
+        if not clip_path.exists():
+            return None
+        stored_mezzanine = self._mezzanine_path(key, mezzanine_path) if mezzanine_path else None
+        if stored_mezzanine is not None and not stored_mezzanine.exists():
+            logger.info(f"Library clip {key[:12]} has no {stored_mezzanine.suffix} mezzanine; regenerating it")
+            return None
+        try:
+            os.makedirs(os.path.dirname(os.path.abspath(output_path)), exist_ok=True)
+            shutil.copyfile(clip_path, output_path)
+            if stored_mezzanine is not None:
+                os.makedirs(os.path.dirname(os.path.abspath(mezzanine_path)), exist_ok=True)
+                shutil.copyfile(stored_mezzanine, mezzanine_path)
+            return output_path
+        except Exception as e:
+            logger.warning(f"Could not copy library clip {clip_path}: {e}")
+            return None
+
+    def store(self, params: Dict[str, Any], video_path: str,
+              mezzanine_path: Optional[str] = None) -> Optional[Path]:
+        """Add a generated clip, its mezzanine (if any) and its metadata to the library."""
+        key = self.clip_key(params)
+        clip_path, meta_path = self._paths(key)
+        try:
+            clip_path.parent.mkdir(parents=True, exist_ok=True)
+            # Copy-then-rename so a concurrent lookup never copies a partial clip. The mezzanine
+            # goes first: lookup only checks for it once the clip exists.
+            if mezzanine_path and os.path.exists(mezzanine_path):
+                stored_mezzanine = self._mezzanine_path(key, mezzanine_path)
+                tmp_path = stored_mezzanine.with_suffix(f".{os.getpid()}.tmp")
+                shutil.copyfile(mezzanine_path, tmp_path)
+                os.replace(tmp_path, stored_mezzanine)
+            mezzanines = sorted(p.name for p in clip_path.parent.glob(f"{key}.mezzanine.*")
+                                if p.suffix != ".tmp")
+            tmp_path = clip_path.with_suffix(f".{os.getpid()}.tmp")
+            shutil.copyfile(video_path, tmp_path)
+            os.replace(tmp_path, clip_path)
+            with open(meta_path, "w") as f:
+                json.dump({
+                    "params": params,
+                    "created": datetime.now().isoformat(),
+                    "size_bytes": clip_path.stat().st_size,
+                    "mezzanines": mezzanines
+                }, f, indent=2)
+            return clip_path
+        except Exception as e:
+            logger.warning(f"Could not add {video_path} to the clip library: {e}")
+            return None
+
+    def generate(self, generator, prompts: List[str], output_paths: List[str],
+                 negative_prompt: str = "", seeds: Optional[List[Optional[int]]] = None,
+                 duration: int = 5, fps: int = 24) -> List[Dict[str, Any]]:
+        """
+        Lookup-or-generate: copy library clips for known parameters and generate the rest
+        in one batched call, adding new clips to the library.
+
+        Args:
+            generator: WanVideoGenerator (or PlaceholderVideoGenerator)
+            prompts: Text prompts, one per clip
+            output_paths: Output path for each prompt
+            negative_prompt: Text to avoid in every clip
+            seeds: Explicit seed per prompt (None entries use seed_mode)
+            duration: Clip duration in seconds
+            fps: Frames per second
+
+        Returns:
+            One result per prompt, in order, as WanVideoGenerator.generate_videos, plus "cached"
+        """
+        seeds = list(seeds) if seeds is not None else [None] * len(prompts)
+        seeds = [self.resolve_seed(p, negative_prompt, s) for p, s in zip(prompts, seeds)]
+        params = [self.generation_params(generator, p, negative_prompt, s, duration, fps)
+                  for p, s in zip(prompts, seeds)]
+
+        # Mezzanine copies are served from the library too when the generator writes them
+        mezzanine_paths = [generator.mezzanine_path_for(o) for o in output_paths]
+
+        results = [None] * len(prompts)
+        missing = []
+        for i, (prompt, output_path, seed) in enumerate(zip(prompts, output_paths, seeds)):
+            video_path = self.lookup(params[i], output_path, mezzanine_paths[i])
+            if video_path:
+                results[i] = {"prompt": prompt, "output_path": output_path, "seed": seed,
+                              "video_path": video_path, "mezzanine_path": mezzanine_paths[i],
+                              "error": None, "cached": True}
+            else:
+                missing.append(i)
+
+        with self._lock:
+            self.hits += len(prompts) - len(missing)
+            self.misses += len(missing)
+
+        if missing:
+            generated = generator.generate_videos(
+                [prompts[i] for i in missing],
+                [output_paths[i] for i in missing],
+                negative_prompt=negative_prompt,
+                seeds=[seeds[i] for i in missing],
+                duration=duration,
+                fps=fps
+            )
+            for i, result in zip(missing, generated):
+                result["cached"] = False
+                if result["video_path"]:
+                    self.store(params[i], result["video_path"], result.get("mezzanine_path"))
+                results[i] = result
+
+        logger.info(f"Clip library: {len(prompts) - len(missing)} hit(s), {len(missing)} miss(es) "
+                    f"this call; {self.stats()}")
+        return results
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss counters for this process."""
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / total, 3) if total else 0.0
+            }
+
+
+def get_clip_library(library_dir: Optional[str] = None, seed_mode: str = "reuse") -> ClipLibrary:
+    """
+    Process-wide clip library for a directory.
+
+    Args:
+        library_dir: Library directory; defaults to CLIP_LIBRARY_DIR or data/clip_library
+        seed_mode: "reuse" or "vary"; applied to the shared library on every call
+    """
+    library_dir = library_dir or os.environ.get("CLIP_LIBRARY_DIR") or os.path.join("data", "clip_library")
+    key = str(Path(library_dir).resolve())
+    with _LIBRARIES_LOCK:
+        if key not in _LIBRARIES:
+            _LIBRARIES[key] = ClipLibrary(library_dir, seed_mode=seed_mode)
+        library = _LIBRARIES[key]
+        if seed_mode not in SEED_MODES:
+            raise ValueError(f"seed_mode must be one of {SEED_MODES}")
+        library.seed_mode = seed_mode
+        return library
@@ -26,6 +26,16 @@ else
     echo "Wan 2.1 model already exists at $MODEL_DIR"
 fi
 
+# Provision the local MoveNet pose model if not already present (TFLite, run by tflite-runtime)
+POSE_MODEL_DIR="${POSE_MODEL_DIR:-/app/models/pose}"
+if [ -f "/app/scripts/download_pose_model.py" ] && [ -z "$(ls -A $POSE_MODEL_DIR 2>/dev/null)" ]; then
+    echo "Downloading MoveNet pose model to $POSE_MODEL_DIR..."
+    POSE_MODEL_DIR=$POSE_MODEL_DIR python3 /app/scripts/download_pose_model.py --format tflite \
+        || echo "Pose model download failed; pose detection will fall back to TF Hub"
+else
+    echo "Pose model store at $POSE_MODEL_DIR already provisioned or no provisioning script found"
+fi
+
 # Set up avatar-specific output directories
 mkdir -p /app/output/videos/by_avatar
 mkdir -p /app/output/raw
@@ -33,7 +43,10 @@ mkdir -p /app/output/processed
 
 # Configure CUDA for optimal performance on L4 GPU
 echo "Detecting and configuring environment for optimal GPU performance..."
-export CUDA_VISIBLE_DEVICES=0
+# Single-GPU default; run_generation.py sets each worker's device when given --devices
+if [ -z "$CUDA_VISIBLE_DEVICES" ] && [ "$(nvidia-smi -L | wc -l)" -le 1 ]; then
+    export CUDA_VISIBLE_DEVICES=0
+fi
 
 # Auto-detect GPU type
 GPU_TYPE="T4"
@@ -64,7 +77,29 @@ fi
 if [ -f "/app/run_generation.py" ]; then
     echo "Starting video generation with Wan 2.1 model on $GPU_TYPE GPU..."
     # Pass GPU-specific parameters to the generation script
-    python3 /app/run_generation.py --model_dir $MODEL_DIR --gpu-type $GPU_TYPE --resolution $RESOLUTION --max-batch $BATCH_SIZE_OVERRIDE
+    # Continue an interrupted run (preemption, OOM, driver reset) instead of starting over
+    # A manifest marked complete belongs to a finished run, which is never resumed
+    RESUME_FLAG=""
+    RUN_MANIFEST="/app/output/run_manifest.json"
+    if [ -f "$RUN_MANIFEST" ] && [ "${RESUME_RUN:-1}" = "1" ]; then
+        RUN_STATUS=$(python3 -c "import json, sys; print(json.load(open(sys.argv[1])).get('status', 'running'))" "$RUN_MANIFEST" 2>/dev/null || echo "unreadable")
+        if [ "$RUN_STATUS" = "complete" ]; then
+            echo "Previous run is complete, starting a new run"
+        elif [ "$RUN_STATUS" = "unreadable" ]; then
+            echo "Could not read $RUN_MANIFEST, starting a new run"
+        else
+            echo "Found an unfinished run manifest, resuming the previous run (set RESUME_RUN=0 to start over)"
+            RESUME_FLAG="--resume"
+        fi
+    fi
+    # One generation worker per GPU on multi-GPU hosts
+    DEVICES_FLAG=""
+    GPU_COUNT=$(nvidia-smi -L | wc -l)
+    if [ "$GPU_COUNT" -gt 1 ]; then
+        echo "Found $GPU_COUNT GPUs, running one generation worker per GPU"
+        DEVICES_FLAG="--devices $(seq -s, 0 $((GPU_COUNT - 1)))"
+    fi
+    python3 /app/run_generation.py --model_dir $MODEL_DIR --gpu-type $GPU_TYPE --resolution $RESOLUTION --max-batch $BATCH_SIZE_OVERRIDE $RESUME_FLAG $DEVICES_FLAG
 elif [ $# -gt 0 ]; then
     # Execute the command if provided
     echo "Executing command: $@"
@@ -0,0 +1,337 @@
+#!/usr/bin/env python3
+"""
+Model Registry for OWLmarketing
+
+Process-wide home of the loaded models (Stable Diffusion, Wan 2.1, DETR, MoveNet).
+Components ask for a model by id instead of loading their own copy, so two
+components that need the same weights share one instance. Models are reference
+counted; a model nobody holds stays warm until memory runs short, then the least
+recently used ones are evicted to keep RAM and VRAM within their budgets.
+
+Budgets come from MODEL_REGISTRY_RAM_GB and MODEL_REGISTRY_VRAM_GB (unset means no
+limit) or configure(). Load and evict events go to the log and to listeners, and
+stats() reports the resident models and their memory.
+
+Callers that use the same id must load equivalent models: whoever asks first loads it.
+
+Usage:
+    registry = get_model_registry()
+    pipe = registry.acquire("stable-diffusion:model:cuda", load_pipeline, device="cuda")
+    try:
+        ...
+    finally:
+        registry.release("stable-diffusion:model:cuda")
+"""
+
+import gc
+import os
+import sys
+import time
+import logging
+import threading
+import weakref
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional
+
+logger = logging.getLogger("model_registry")
+
+# Shared registry, created on first use
+_REGISTRY: Optional["ModelRegistry"] = None
+_REGISTRY_LOCK = threading.Lock()
+
+
+def _is_gpu_device(device: Optional[str]) -> bool:
+    return bool(device) and str(device).split(":")[0] in ("cuda", "mps")
+
+
+def _tier(device: Optional[str]) -> str:
+    """Memory budget a device's models count against."""
+    return "vram" if _is_gpu_device(device) else "ram"
+
+
+def estimate_model_bytes(model: Any) -> int:
+    """
+    Bytes held by a model's parameters and buffers.
+
+    Understands torch modules, diffusers pipelines (their components), tuples of
+    those and objects wrapping either as .model, .pipe or .pipeline. Returns 0 if
+    the size is unknown.
+    """
+    torch = sys.modules.get("torch")
+    if torch is None or model is None:
+        return 0
+    try:
+        if isinstance(model, (tuple, list)):
+            # e.g. (processor, model) pairs
+            return sum(estimate_model_bytes(part) for part in model)
+        if isinstance(model, torch.nn.Module):
+            tensors = list(model.parameters()) + list(model.buffers())
+            return sum(t.numel() * t.element_size() for t in tensors)
+        components = getattr(model, "components", None)
+        if isinstance(components, dict):
+            return sum(estimate_model_bytes(c) for c in components.values()
+                       if isinstance(c, torch.nn.Module))
+        for attribute in ("model", "pipe", "pipeline"):
+            inner = getattr(model, attribute, None)
+            if inner is not None and inner is not model:
+                return estimate_model_bytes(inner)
+    except Exception as e:
+        logger.debug(f"Could not estimate model size: {e}")
+    return 0
+
+
+def _resident_bytes(device: Optional[str]) -> int:
+    """Memory currently in use on a device (GPU allocator or process RSS), 0 if unknown."""
+    try:
+        if _is_gpu_device(device):
+            torch = sys.modules.get("torch")
+            if torch is not None and torch.cuda.is_available():
+                return torch.cuda.memory_allocated()
+            return 0
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except Exception:
+        return 0
+
+
+class _Entry:
+    """A resident model."""
+
+    def __init__(self, model_id: str, model: Any, device: Optional[str], size_bytes: int,
+                 unload: Optional[Callable[[Any], None]], load_seconds: float):
+        self.model_id = model_id
+        self.model = model
+        self.device = device
+        self.size_bytes = size_bytes
+        self.unload = unload
+        self.load_seconds = load_seconds
+        self.refs = 0
+        self.hits = 0
+        self.last_used = time.time()
+
+    @property
+    def tier(self) -> str:
+        return _tier(self.device)
+
+
+class ModelRegistry:
+    """Reference-counted, memory-budgeted LRU of loaded models, keyed by model id."""
+
+    def __init__(self, ram_budget_gb: Optional[float] = None, vram_budget_gb: Optional[float] = None):
+        """
+        Args:
+            ram_budget_gb: Memory models on the CPU may use; no limit if None
+            vram_budget_gb: GPU memory models may use; no limit if None
+        """
+        self.budgets = {"ram": None, "vram": None}
+        self.configure(ram_budget_gb, vram_budget_gb)
+        self._entries: "OrderedDict[str, _Entry]" = OrderedDict()
+        self._lock = threading.RLock()
+        # One lock per model id, so a slow load does not block other models
+        self._load_locks: Dict[str, threading.Lock] = {}
+        self._listeners: List[Callable[[Dict[str, Any]], None]] = []
+        self.loads = 0
+        self.evictions = 0
+
+    def configure(self, ram_budget_gb: Optional[float] = None, vram_budget_gb: Optional[float] = None) -> None:
+        """Set the memory budgets; None keeps a tier unlimited."""
+        self.budgets = {
+            "ram": int(ram_budget_gb * 1024 ** 3) if ram_budget_gb else None,
+            "vram": int(vram_budget_gb * 1024 ** 3) if vram_budget_gb else None
+        }
+
+    def add_listener(self, listener: Callable[[Dict[str, Any]], None]) -> None:
+        """Call listener(event) for every load and eviction."""
+        self._listeners.append(listener)
+
+    def _notify(self, event: Dict[str, Any]) -> None:
+        for listener in list(self._listeners):
+            try:
+                listener(event)
+            except Exception as e:
+                logger.error(f"Error in model registry listener: {e}")
+
+    def acquire(self, model_id: str, loader: Callable[[], Any], device: Optional[str] = None,
+                unload: Optional[Callable[[Any], None]] = None, size_bytes: Optional[int] = None,
+                owner: Any = None) -> Any:
+        """
+        Shared instance of a model, loaded on first use. Every acquire needs a matching
+        release (or an owner whose garbage collection releases it).
+
+        Args:
+            model_id: Id of the model and its configuration; equal ids must mean equal models
+            loader: Loads the model; may raise
+            device: Device the model lives on ("cuda", "cpu", ...); decides the memory budget
+            unload: Frees the model when it is evicted (e.g. a generator's cleanup)
+            size_bytes: Memory the model takes; estimated from its tensors if None
+            owner: Object holding the model; the reference is released when it is collected
+
+        Returns:
+            The model
+        """
+        with self._lock:
+            entry = self._entries.get(model_id)
+            if entry is None:
+                load_lock = self._load_locks.setdefault(model_id, threading.Lock())
+            else:
+                self._use(entry, owner)
+                return entry.model
+
+        with load_lock:
+            # Another thread may have finished loading it while we waited
+            with self._lock:
+                entry = self._entries.get(model_id)
+                if entry is not None:
+                    self._use(entry, owner)
+                    return entry.model
+
+            if size_bytes:
+                # Make room before loading when the size is known up front
+                self._evict_for(_tier(device), size_bytes)
+
+            logger.info(f"Loading model {model_id} on {device or 'cpu'}")
+            before = _resident_bytes(device)
+            start = time.time()
+            model = loader()
+            load_seconds = time.time() - start
+            if not size_bytes:
+                size_bytes = estimate_model_bytes(model) or max(0, _resident_bytes(device) - before)
+
+            entry = _Entry(model_id, model, device, size_bytes, unload, load_seconds)
+            with self._lock:
+                self._entries[model_id] = entry
+                self._use(entry, owner, hit=False)
+                self.loads += 1
+            logger.info(f"Loaded model {model_id} in {load_seconds:.1f}s ({size_bytes / 1024 ** 2:.0f} MB {entry.tier})")
+            self._notify({"type": "load", "model_id": model_id, "device": device,
+                          "bytes": size_bytes, "seconds": load_seconds})
+            self._evict_for(entry.tier, 0)
+            return model
+
+    def _use(self, entry: _Entry, owner: Any, hit: bool = True) -> None:
+        """Take a reference on an entry (registry lock held)."""
+        entry.refs += 1
+        entry.last_used = time.time()
+        if hit:
+            entry.hits += 1
+        self._entries.move_to_end(entry.model_id)
+        if owner is not None:
+            weakref.finalize(owner, self.release, entry.model_id)
+
+    def get(self, model_id: str) -> Optional[Any]:
+        """A resident model without taking a reference, or None."""
+        with self._lock:
+            entry = self._entries.get(model_id)
+            return entry.model if entry is not None else None
+
+    def release(self, model_id: str) -> None:
+        """Drop a reference; the model stays warm until it has to be evicted."""
+        with self._lock:
+            entry = self._entries.get(model_id)
+            if entry is None or entry.refs == 0:
+                logger.debug(f"Release of model {model_id} without a reference")
+                return
+            entry.refs -= 1
+            unreferenced = entry.refs == 0
+        if unreferenced:
+            self._evict_for(entry.tier, 0)
+
+    def resident_bytes(self, tier: Optional[str] = None) -> int:
+        """Memory of the resident models, in one tier ("ram" or "vram") or in total."""
+        with self._lock:
+            return sum(e.size_bytes for e in self._entries.values() if tier is None or e.tier == tier)
+
+    def _evict_for(self, tier: str, incoming_bytes: int) -> None:
+        """Evict unreferenced models, least recently used first, until the tier fits its budget."""
+        budget = self.budgets.get(tier)
+        if budget is None:
+            return
+        while True:
+            with self._lock:
+                used = self.resident_bytes(tier)
+                if used + incoming_bytes <= budget:
+                    return
+                victim = next((e for e in self._entries.values() if e.tier == tier and e.refs == 0), None)
+                if victim is None:
+                    logger.warning(f"Models use {(used + incoming_bytes) / 1024 ** 3:.1f} GB {tier}, over the "
+                                   f"{budget / 1024 ** 3:.1f} GB budget, and all of them are in use")
+                    return
+                del self._entries[victim.model_id]
+                self.evictions += 1
+            self._unload(victim, reason=f"{tier} budget")
+
+    def evict(self, model_id: str, force: bool = False) -> bool:
+        """
+        Unload a model now.
+
+        Args:
+            model_id: Model to unload
+            force: Unload even if it is still referenced
+
+        Returns:
+            True if the model was unloaded
+        """
+        with self._lock:
+            entry = self._entries.get(model_id)
+            if entry is None or (entry.refs and not force):
+                return False
+            del self._entries[model_id]
+            self.evictions += 1
+        self._unload(entry, reason="requested")
+        return True
+
+    def clear(self) -> None:
+        """Unload every model; call when the process is done."""
+        with self._lock:
+            entries = list(self._entries.values())
+            self._entries.clear()
+        for entry in entries:
+            self._unload(entry, reason="shutdown")
+
+    def _unload(self, entry: _Entry, reason: str) -> None:
+        logger.info(f"Evicting model {entry.model_id} ({entry.size_bytes / 1024 ** 2:.0f} MB {entry.tier}, {reason})")
+        try:
+            if entry.unload is not None:
+                entry.unload(entry.model)
+        except Exception as e:
+            logger.error(f"Error unloading model {entry.model_id}: {e}")
+        entry.model = None
+        gc.collect()
+        torch = sys.modules.get("torch")
+        if entry.tier == "vram" and torch is not None:
+            try:
+                if torch.cuda.is_available():
+                    torch.cuda.empty_cache()
+            except Exception as e:
+                logger.debug(f"Could not empty the CUDA cache: {e}")
+        self._notify({"type": "evict", "model_id": entry.model_id, "device": entry.device,
+                      "bytes": entry.size_bytes, "reason": reason})
+
+    def stats(self) -> Dict[str, Any]:
+        """Resident models (least recently used first), memory per tier, loads and evictions."""
+        with self._lock:
+            return {
+                "models": [{"model_id": e.model_id, "device": e.device, "bytes": e.size_bytes, "refs": e.refs,
+                            "hits": e.hits, "load_seconds": round(e.load_seconds, 2), "last_used": e.last_used}
+                           for e in self._entries.values()],
+                "ram_bytes": self.resident_bytes("ram"),
+                "vram_bytes": self.resident_bytes("vram"),
+                "budgets": dict(self.budgets),
+                "loads": self.loads,
+                "evictions": self.evictions
+            }
+
+
+def get_model_registry() -> ModelRegistry:
+    """Process-wide registry; budgets from MODEL_REGISTRY_RAM_GB / MODEL_REGISTRY_VRAM_GB."""
+    global _REGISTRY
+    with _REGISTRY_LOCK:
+        if _REGISTRY is None:
+            def budget(name):
+                try:
+                    return float(os.environ[name]) if os.environ.get(name) else None
+                except ValueError:
+                    logger.warning(f"Ignoring invalid {name}={os.environ[name]}")
+                    return None
+            _REGISTRY = ModelRegistry(budget("MODEL_REGISTRY_RAM_GB"), budget("MODEL_REGISTRY_VRAM_GB"))
+        return _REGISTRY
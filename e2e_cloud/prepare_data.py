@@ -230,7 +230,9 @@ def copy_project_files(output_dir):
         
         # Copy E2E Cloud specific files
         e2e_cloud_dir = os.path.join(project_root, "e2e_cloud")
-        e2e_files = ["Dockerfile", "entrypoint.sh", "run_generation.py", "wan_t2v_generator.py"]
+        e2e_files = ["Dockerfile", "entrypoint.sh", "run_generation.py", "wan_t2v_generator.py", "prompt_embedding_cache.py",
+                     "clip_library.py", "staged_executor.py", "run_manifest.py",
+                     "sharded_launcher.py", "model_registry.py"]
         
         for file_name in e2e_files:
             src_file = os.path.join(e2e_cloud_dir, file_name)
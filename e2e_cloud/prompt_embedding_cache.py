@@ -0,0 +1,202 @@
+#!/usr/bin/env python3
+"""
+Prompt Embedding Cache for OWLmarketing
+
+Text-encoder outputs for the prompts and negative prompts we generate from. Avatar
+prompts come from a small fixed set, so after the first video of a run the text
+encoder (T5 for Wan 2.1, CLIP for Stable Diffusion) never has to run again for them.
+
+Embeddings are keyed by model id, text and dtype, held in memory and optionally
+persisted to disk (set PROMPT_EMBEDDING_CACHE_DIR or pass cache_dir).
+"""
+
+import os
+import hashlib
+import inspect
+import logging
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional
+
+# torch is imported where it is used, like the generators that use this cache
+
+logger = logging.getLogger("prompt_embedding_cache")
+
+# Shared caches, keyed by resolved disk directory (None for memory-only)
+_CACHES: Dict[Optional[str], "PromptEmbeddingCache"] = {}
+_CACHES_LOCK = threading.Lock()
+
+
+class PromptEmbeddingCache:
+    """In-memory LRU of prompt embeddings with an optional on-disk tier."""
+
+    def __init__(self, cache_dir: Optional[str] = None, max_entries: int = 64):
+        """
+        Args:
+            cache_dir: Directory embeddings are persisted to; memory-only if None
+            max_entries: Embeddings kept in memory (a T5 embedding is a few MB)
+        """
+        self.cache_dir = Path(cache_dir) if cache_dir else None
+        if self.cache_dir:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(model_id: str, text: str, dtype: Any) -> str:
+        """Cache key for a text encoded by a model at a dtype."""
+        digest = hashlib.sha256(f"{model_id}\0{dtype}\0{text}".encode("utf-8")).hexdigest()
+        return digest[:32]
+
+    def _disk_path(self, key: str) -> Optional[Path]:
+        return self.cache_dir / f"{key}.pt" if self.cache_dir else None
+
+    def get(self, model_id: str, text: str, dtype: Any, device: Optional[str] = None) -> Optional[Any]:
+        """
+        Cached embedding, from memory or disk, or None.
+
+        Args:
+            model_id: Model directory or hub id the embedding was produced with
+            text: Prompt text
+            dtype: Embedding dtype
+            device: Device a disk entry is loaded onto
+        """
+        key = self.key(model_id, text, dtype)
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key]
+
+        path = self._disk_path(key)
+        if path is not None and path.exists():
+            try:
+                import torch
+                embedding = torch.load(path, map_location=device or "cpu")
+                self._remember(key, embedding)
+                with self._lock:
+                    self.disk_hits += 1
+                return embedding
+            except Exception as e:
+                logger.warning(f"Could not load cached prompt embedding {path}: {e}")
+        return None
+
+    def put(self, model_id: str, text: str, dtype: Any, embedding: Any) -> None:
+        """Store an embedding in memory and, if configured, on disk."""
+        key = self.key(model_id, text, dtype)
+        self._remember(key, embedding)
+
+        path = self._disk_path(key)
+        if path is not None and not path.exists():
+            try:
+                import torch
+                # Write-then-rename so a concurrent reader never sees a partial file
+                tmp_path = path.with_suffix(f".{os.getpid()}.tmp")
+                torch.save(embedding.detach().cpu(), tmp_path)
+                os.replace(tmp_path, path)
+            except Exception as e:
+                logger.warning(f"Could not persist prompt embedding to {path}: {e}")
+
+    def _remember(self, key: str, embedding: Any) -> None:
+        with self._lock:
+            self._entries[key] = embedding
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def get_or_encode(self, model_id: str, text: str, dtype: Any,
+                      encode: Callable[[str], Any], device: Optional[str] = None) -> Any:
+        """
+        Cached embedding of text, encoding and storing it on a miss.
+
+        Args:
+            model_id: Model directory or hub id
+            text: Prompt text
+            dtype: Embedding dtype
+            encode: Function producing the embedding of one text
+            device: Device a disk entry is loaded onto
+        """
+        embedding = self.get(model_id, text, dtype, device=device)
+        if embedding is not None:
+            return embedding
+        with self._lock:
+            self.misses += 1
+        embedding = encode(text)
+        self.put(model_id, text, dtype, embedding)
+        return embedding
+
+    def stats(self) -> Dict[str, int]:
+        """Hit and miss counters."""
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "entries": len(self._entries)
+            }
+
+
+def get_prompt_embedding_cache(cache_dir: Optional[str] = None) -> PromptEmbeddingCache:
+    """
+    Process-wide prompt embedding cache.
+
+    Args:
+        cache_dir: Disk tier directory; defaults to PROMPT_EMBEDDING_CACHE_DIR, memory-only if unset
+    """
+    cache_dir = cache_dir or os.environ.get("PROMPT_EMBEDDING_CACHE_DIR") or None
+    key = str(Path(cache_dir).resolve()) if cache_dir else None
+    with _CACHES_LOCK:
+        if key not in _CACHES:
+            _CACHES[key] = PromptEmbeddingCache(cache_dir)
+        return _CACHES[key]
+
+
+def pipeline_text_encoder(pipeline: Any, device: Optional[str] = None) -> Optional[Callable[[str], Any]]:
+    """
+    Function encoding one text with a diffusers pipeline's own encode_prompt.
+
+    Classifier-free guidance is handled by the pipeline call (prompt_embeds plus
+    negative_prompt_embeds), so texts are encoded without it.
+
+    Args:
+        pipeline: diffusers pipeline (Wan, Stable Diffusion)
+        device: Device to encode on; the pipeline's execution device if None
+
+    Returns:
+        Encoder function, or None if the pipeline cannot take precomputed embeddings
+    """
+    encode_prompt = getattr(pipeline, "encode_prompt", None)
+    if encode_prompt is None:
+        return None
+    try:
+        call_params = inspect.signature(pipeline.__call__).parameters
+        encode_params = inspect.signature(encode_prompt).parameters
+    except (TypeError, ValueError):
+        return None
+    if "prompt_embeds" not in call_params or "negative_prompt_embeds" not in call_params:
+        return None
+    if "pooled_prompt_embeds" in call_params:
+        # SDXL-style pipelines also need pooled embeddings; leave their text encoding alone
+        return None
+
+    if device is None:
+        device = getattr(pipeline, "_execution_device", None) or getattr(pipeline, "device", None)
+    candidate_kwargs = {
+        "device": device,
+        "num_images_per_prompt": 1,
+        "num_videos_per_prompt": 1,
+        "do_classifier_free_guidance": False,
+    }
+    kwargs = {name: value for name, value in candidate_kwargs.items() if name in encode_params}
+
+    def encode(text: str) -> Any:
+        import torch
+        with torch.inference_mode():
+            return encode_prompt(prompt=text, **kwargs)[0]
+
+    return encode
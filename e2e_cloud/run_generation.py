@@ -6,8 +6,11 @@ This script is designed to run on E2E Cloud with NVIDIA GPUs (T4 or L4) to gener
 avatar videos and UI demonstrations for the Optimal AI calorie tracking app.
 It uses Wan 2.1 T2V-14B model for high-quality video generation.
 
+The Wan 2.1 weights are loaded once per process and reused for every script in the run.
+With --workers or --devices, avatars are spread over several processes (one per GPU).
+
 Usage:
-    python run_generation.py [--config CONFIG_FILE] [--output-dir OUTPUT_DIR] [--model_dir MODEL_DIR] [--gpu-type L4|T4] [--resolution 480p|720p]
+    python run_generation.py [--config CONFIG_FILE] [--output-dir OUTPUT_DIR] [--model_dir MODEL_DIR] [--gpu-type L4|T4] [--resolution 480p|720p] [--placeholder-avatars] [--devices 0,1]
 """
 
 import os
@@ -16,6 +19,7 @@ import json
 import logging
 import argparse
 import time
+import functools
 from pathlib import Path
 import shutil
 import random
@@ -34,7 +38,12 @@ logger = logging.getLogger('e2e_generation')
 
 # Import the Wan 2.1 generator
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
-from wan_t2v_generator import WanVideoGenerator
+from wan_t2v_generator import MEZZANINE_FORMATS, WanVideoGenerator, get_wan_generator, shutdown_wan_generators
+from clip_library import SEED_MODES, get_clip_library
+from staged_executor import StagedExecutor
+from run_manifest import MANIFEST_NAME, open_run_manifest
+from sharded_launcher import ShardedLauncher, assign_shards, parse_devices
+from model_registry import get_model_registry
 
 def setup_environment():
     """Setup the environment and verify GPU availability."""
@@ -77,7 +86,8 @@ def load_scripts(script_dir):
         logger.error(f"Script directory {script_dir} not found")
         return scripts
     
-    for file in os.listdir(script_dir):
+    # Sorted, so a resumed run assigns the same script ids
+    for file in sorted(os.listdir(script_dir)):
         if file.endswith('.json'):
             try:
                 with open(os.path.join(script_dir, file), 'r') as f:
@@ -136,8 +146,15 @@ def create_avatar_prompt(script):
     
     return final_prompt
 
-def generate_avatar_video_with_wan(script, output_dir, model_dir, resolution="720p", gpu_type="L4"):
-    """Generate avatar video using Wan 2.1 model."""
+def generate_avatar_video_with_wan(script, output_dir, generator, clip_library=None, clip_id=None):
+    """
+    Generate avatar video using the run's warm Wan 2.1 generator (see get_wan_generator).
+    
+    With a clip library, a clip generated before with the same parameters is copied
+    from the library instead of being generated again. clip_id makes the output file
+    unique per script, so the next clip of the same avatar cannot overwrite one that
+    is still being composed.
+    """
     try:
         # Create avatar-specific output directory
         avatar_name = script.get("avatar", "emma")
@@ -145,34 +162,46 @@ def generate_avatar_video_with_wan(script, output_dir, model_dir, resolution="72
         os.makedirs(avatar_output_dir, exist_ok=True)
         
         # Create output path
-        output_path = os.path.join(avatar_output_dir, f"{avatar_name}_video.mp4")
+        suffix = f"_{clip_id}" if clip_id else ""
+        output_path = os.path.join(avatar_output_dir, f"{avatar_name}_video{suffix}.mp4")
         
         # Create a prompt for the avatar video
         prompt = create_avatar_prompt(script)
         logger.info(f"Generated prompt for {avatar_name}: {prompt}")
         
-        # Initialize Wan generator with proper GPU settings
-        generator = WanVideoGenerator(
-            model_dir=model_dir,
-            resolution=resolution,
-            optimize_for_gpu=True,
-            gpu_type=gpu_type
-        )
-        
         # Generate the video
-        video_path = generator.generate_video(
-            prompt=prompt,
-            output_path=output_path,
-            duration=5,  # 5 seconds is a good length for avatar videos
-            fps=24
-        )
+        if clip_library is not None:
+            result = clip_library.generate(
+                generator,
+                [prompt],
+                [output_path],
+                duration=5,  # 5 seconds is a good length for avatar videos
+                fps=24
+            )[0]
+            video_path = result["video_path"]
+            mezzanine_path = result["mezzanine_path"]
+            if result["cached"]:
+                logger.info(f"Reused library clip for {avatar_name} (seed {result['seed']})")
+        else:
+            result = generator.generate_videos(
+                [prompt],
+                [output_path],
+                duration=5,  # 5 seconds is a good length for avatar videos
+                fps=24
+            )[0]
+            video_path = result["video_path"]
+            mezzanine_path = result["mezzanine_path"]
         
-        # Clean up resources
-        generator.cleanup()
+        # Keep the model loaded for the next script; only clear caches under memory pressure
+        generator.release_memory()
         
         if video_path and os.path.exists(video_path):
             logger.info(f"Generated avatar video: {video_path}")
-            return {"avatar": avatar_name, "avatar_video": video_path}
+            avatar_result = {"avatar": avatar_name, "avatar_video": video_path}
+            if mezzanine_path:
+                logger.info(f"Avatar mezzanine: {mezzanine_path}")
+                avatar_result["avatar_mezzanine"] = mezzanine_path
+            return avatar_result
         else:
             logger.error(f"Failed to generate avatar video for {avatar_name}")
             return None
@@ -183,8 +212,35 @@ def generate_avatar_video_with_wan(script, output_dir, model_dir, resolution="72
         logger.error(traceback.format_exc())
         return None
 
-def run_video_generation(script, output_dir, project_root, model_dir, batch_id, resolution="720p", gpu_type="L4"):
-    """Run video generation for a single script."""
+def produce_avatar_clip(script, output_dir, generator, batch_id, clip_library=None):
+    """GPU stage: the avatar clip for a script, or None if it could not be generated."""
+    # Extract avatar information
+    avatar_name = script.get("avatar", "emma")
+    
+    # Generate avatar video using Wan 2.1
+    logger.info(f"Generating avatar video for {avatar_name}")
+    avatar_result = generate_avatar_video_with_wan(
+        script, 
+        output_dir, 
+        generator,
+        clip_library=clip_library,
+        clip_id=batch_id
+    )
+    
+    if not avatar_result or not os.path.exists(avatar_result.get("avatar_video", "")):
+        logger.error(f"Failed to generate avatar for {avatar_name}")
+        return None
+    return avatar_result
+
+def run_video_generation(script, output_dir, project_root, generator, batch_id, clip_library=None):
+    """Run video generation for a single script with the run's warm Wan 2.1 generator, stage by stage."""
+    avatar_result = produce_avatar_clip(script, output_dir, generator, batch_id, clip_library=clip_library)
+    if avatar_result is None:
+        return None
+    return compose_video(script, avatar_result, output_dir, project_root, batch_id)
+
+def compose_video(script, avatar_result, output_dir, project_root, batch_id):
+    """CPU stage: UI demo, hook extraction, composition and hook text for a generated avatar clip."""
     try:
         # Add project root to path if not already added
         add_to_python_path(project_root)
@@ -196,20 +252,6 @@ def run_video_generation(script, output_dir, project_root, model_dir, batch_id,
         # Extract avatar information
         avatar_name = script.get("avatar", "emma")
         
-        # Generate avatar video using Wan 2.1
-        logger.info(f"Generating avatar video for {avatar_name}")
-        avatar_result = generate_avatar_video_with_wan(
-            script, 
-            output_dir, 
-            model_dir,
-            resolution=resolution,
-            gpu_type=gpu_type
-        )
-        
-        if not avatar_result or not os.path.exists(avatar_result.get("avatar_video", "")):
-            logger.error(f"Failed to generate avatar for {avatar_name}")
-            return None
-        
         # Extract food item from script
         food_item = {
             "name": script.get("food_item", "avocado toast"),
@@ -332,6 +374,106 @@ def group_scripts_by_avatar(scripts):
     
     return avatar_groups
 
+def generate_shard(args, work, gpu_type, resolution, max_batch, batch_id, record):
+    """
+    Generate and compose work items on this process's warm Wan 2.1 generator.
+    
+    record(item_id, stage, artifacts, error) is called for every completed or failed stage.
+    Returns False if the model could not be loaded.
+    """
+    # Load the Wan 2.1 weights once; every script in the shard reuses this generator
+    avatar_generator = get_wan_generator(
+        args.model_dir,
+        resolution=resolution,
+        gpu_type=gpu_type,
+        optimize_for_gpu=True,
+        placeholder=args.placeholder_avatars,
+        mezzanine_format=args.mezzanine
+    )
+    if avatar_generator is None:
+        return False
+    
+    # Library of previously generated avatar clips
+    clip_library = None
+    if not args.no_clip_library:
+        clip_library = get_clip_library(
+            args.clip_library or os.environ.get("CLIP_LIBRARY_DIR") or os.path.join(args.output_dir, "clip_library"),
+            seed_mode=args.seed_mode
+        )
+        logger.info(f"Using avatar clip library {clip_library.library_dir} (seed mode: {args.seed_mode})")
+    
+    def produce(entry):
+        # GPU stage: one avatar clip at a time on the warm generator
+        avatar, script_id, total, script, avatar_video = entry
+        item_id = f"{avatar}_{script_id}"
+        logger.info(f"Processing script {script_id}/{total} for {avatar}")
+        if avatar_video:
+            logger.info(f"Reusing avatar clip of an earlier attempt: {avatar_video}")
+            return {"avatar_video": avatar_video}
+        avatar_result = produce_avatar_clip(
+            script,
+            args.output_dir,
+            avatar_generator,
+            f"{batch_id}_{script_id}",
+            clip_library=clip_library
+        )
+        if avatar_result is None:
+            record(item_id, "avatar", error="avatar generation failed")
+        else:
+            record(item_id, "avatar", {key: avatar_result[key] for key in ("avatar_video", "avatar_mezzanine")
+                                       if key in avatar_result})
+        # Clear GPU memory after every max_batch clips only under memory pressure; the model
+        # stays loaded and no fixed cooling delay is needed
+        if script_id % max_batch == 0 or script_id == total:
+            if avatar_generator.release_memory():
+                logger.info("Cleared GPU cache between batches")
+            logger.info(f"Completed batch for {avatar}")
+        if avatar_result is None:
+            logger.error(f"Failed to generate video {script_id} for {avatar}")
+        return avatar_result
+    
+    def consume(entry, avatar_result):
+        # CPU stage: UI demo, segments and ffmpeg composition, while the GPU generates the next clip
+        avatar, script_id, total, script, _ = entry
+        item_id = f"{avatar}_{script_id}"
+        video_result = compose_video(script, avatar_result, args.output_dir, args.project_root, f"{batch_id}_{script_id}")
+        if video_result:
+            record(item_id, "video", {"video": video_result})
+            logger.info(f"Successfully generated video {script_id} for {avatar}")
+        else:
+            record(item_id, "video", error="composition failed")
+            logger.error(f"Failed to generate video {script_id} for {avatar}")
+        return video_result
+    
+    try:
+        executor = StagedExecutor(
+            produce,
+            consume,
+            queue_size=args.prefetch_clips,
+            workers=args.compose_workers,
+            name="generation"
+        )
+        executor.run(work)
+    finally:
+        # Unload the model once, at the end of the shard
+        logger.info(f"Wan 2.1 weights loaded {avatar_generator.load_count} time(s) for {len(work)} scripts")
+        if clip_library is not None:
+            logger.info(f"Avatar clip library: {clip_library.stats()}")
+        logger.info(f"Resident models: {get_model_registry().stats()}")
+        shutdown_wan_generators()
+    return True
+
+def generation_worker(args, gpu_type, resolution, max_batch, batch_id, shard_index, device, work, emit):
+    """ShardedLauncher worker: generate_shard in a worker process, stages reported to the launcher."""
+    logger.info(f"Generation worker {shard_index} on device {device}: {len(work)} scripts "
+                f"for {sorted(set(item[0] for item in work))}")
+    
+    def record(item_id, stage, artifacts=None, error=None):
+        emit({"type": "stage", "item": item_id, "stage": stage, "artifacts": artifacts, "error": error})
+    
+    if not generate_shard(args, work, gpu_type, resolution, max_batch, batch_id, record):
+        raise RuntimeError("Could not load the Wan 2.1 model")
+
 def main():
     parser = argparse.ArgumentParser(description="E2E Cloud Video Generation for OWLmarketing")
     parser.add_argument("--config", default="/workspace/config.json", help="Path to configuration file")
@@ -343,6 +485,25 @@ def main():
     parser.add_argument("--process-all", action="store_true", help="Process all scripts even if some fail")
     parser.add_argument("--gpu-type", choices=["L4", "T4"], default=None, help="GPU type to optimize for (L4 or T4)")
     parser.add_argument("--resolution", choices=["480p", "720p"], default=None, help="Video resolution to generate")
+    parser.add_argument("--placeholder-avatars", action="store_true",
+                        help="Write placeholder avatar clips instead of loading Wan 2.1 (runs and tests without a GPU)")
+    parser.add_argument("--clip-library", default=None,
+                        help="Avatar clip library directory (default: $CLIP_LIBRARY_DIR or OUTPUT_DIR/clip_library)")
+    parser.add_argument("--no-clip-library", action="store_true", help="Always generate avatar clips, never reuse them")
+    parser.add_argument("--compose-workers", type=int, default=2,
+                        help="CPU workers composing videos while the GPU generates the next avatar clips")
+    parser.add_argument("--prefetch-clips", type=int, default=2,
+                        help="Avatar clips generated ahead of composition before the GPU stage waits")
+    parser.add_argument("--seed-mode", choices=SEED_MODES, default="reuse",
+                        help="reuse: repeat prompts reuse library clips; vary: new seed (and clip) every time")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="Worker processes, each with its own generator; scripts of one avatar stay on one worker")
+    parser.add_argument("--devices", default=None,
+                        help="Comma-separated CUDA devices, one worker each (e.g. 0,1,2,3; repeat an id for replicas)")
+    parser.add_argument("--mezzanine", choices=list(MEZZANINE_FORMATS), default=None,
+                        help="Also keep a lossless (ffv1) or near-lossless (prores) copy of every avatar clip")
+    parser.add_argument("--resume", action="store_true",
+                        help="Continue the run recorded in OUTPUT_DIR/run_manifest.json, skipping completed stages")
     
     args = parser.parse_args()
     
@@ -356,7 +517,7 @@ def main():
     
     # Setup environment and check for GPU
     gpu_available, detected_gpu_type = setup_environment()
-    if not gpu_available:
+    if not gpu_available and not args.placeholder_avatars:
         logger.warning("No GPU detected. Generation will be extremely slow or may fail.")
         if not args.process_all:
             logger.error("Aborting due to lack of GPU. Use --process-all to force processing.")
@@ -404,57 +565,96 @@ def main():
     max_batch = min(args.max_batch or default_max_batch, len(scripts))
     logger.info(f"Using batch size of {max_batch} for processing on {gpu_type} GPU")
     
+    # Durable record of completed stages, so an interrupted run can be resumed
+    manifest = open_run_manifest(
+        os.path.join(args.output_dir, MANIFEST_NAME),
+        resume=args.resume,
+        settings={
+            "batch_id": int(time.time()) % 10000,  # Use timestamp as batch ID
+            "gpu_type": gpu_type,
+            "resolution": resolution,
+            "script_dir": args.script_dir
+        }
+    )
+    
     # Process each script in organized batches
     successful_videos = []
-    batch_id = int(time.time()) % 10000  # Use timestamp as batch ID
+    batch_id = manifest.settings["batch_id"]
     
-    # Process each avatar group
+    # Work items per avatar: (avatar, script_id, scripts for avatar, script, avatar clip of an
+    # earlier attempt or None); scripts already composed in an earlier attempt of this run are skipped
+    work_by_avatar = {}
+    # Items of this invocation's scripts; a resumed manifest may also hold items of scripts since removed
+    run_items = []
     for avatar, avatar_scripts in avatar_groups.items():
-        logger.info(f"Processing {len(avatar_scripts)} scripts for avatar {avatar}")
-        
-        # Process scripts in appropriate batch sizes for the GPU
-        for i in range(0, len(avatar_scripts), max_batch):
-            batch = avatar_scripts[i:i+max_batch]
-            logger.info(f"Processing batch of {len(batch)} videos for {avatar}")
-            
-            for j, script in enumerate(batch):
-                script_id = i + j + 1
-                logger.info(f"Processing script {script_id}/{len(avatar_scripts)} for {avatar}")
-                
-                # Generate video with appropriate GPU settings
-                video_result = run_video_generation(
-                    script, 
-                    args.output_dir, 
-                    args.project_root, 
-                    args.model_dir,
-                    f"{batch_id}_{script_id}",
-                    resolution=resolution,
-                    gpu_type=gpu_type
-                )
-                
-                if video_result:
-                    successful_videos.append(video_result)
-                    logger.info(f"Successfully generated video {script_id} for {avatar}")
-                else:
-                    logger.error(f"Failed to generate video {script_id} for {avatar}")
-            
-            # Clear GPU memory between batches
-            try:
-                import torch
-                if torch.cuda.is_available():
-                    torch.cuda.empty_cache()
-                    logger.info("Cleared GPU cache between batches")
-            except:
-                pass
-            
-            # Shorter delay for L4 which has better thermal management
-            cooling_delay = 3 if gpu_type == "L4" else 5
-            logger.info(f"Completed batch for {avatar}. Pausing briefly before next batch...")
-            time.sleep(cooling_delay)
+        logger.info(f"Queued {len(avatar_scripts)} scripts for avatar {avatar}")
+        for i, script in enumerate(avatar_scripts):
+            item_id = f"{avatar}_{i + 1}"
+            manifest.record_script(item_id, script)
+            run_items.append(item_id)
+            if manifest.completed_stage(item_id, "video"):
+                continue
+            done = manifest.completed_stage(item_id, "avatar")
+            work_by_avatar.setdefault(avatar, []).append(
+                (avatar, i + 1, len(avatar_scripts), script, done["avatar_video"] if done else None))
+    pending = sum(len(items) for items in work_by_avatar.values())
+    logger.info(f"{len(scripts) - pending} scripts already completed, {pending} to generate")
+    
+    def record(item_id, stage, artifacts=None, error=None):
+        if artifacts:
+            manifest.complete_stage(item_id, stage, artifacts)
+        else:
+            manifest.fail_stage(item_id, stage, error or "failed")
+    
+    def on_worker_event(index, event):
+        if event.get("type") == "stage":
+            record(event["item"], event["stage"], event["artifacts"], event["error"])
+    
+    devices = parse_devices(args.devices, args.workers)
+    try:
+        if not pending:
+            logger.info("Nothing left to generate")
+        elif len(devices) > 1:
+            # One process (and warm generator) per device; each avatar stays on one worker
+            shards = assign_shards(work_by_avatar, len(devices))
+            launcher = ShardedLauncher(
+                functools.partial(generation_worker, args, gpu_type, resolution, max_batch, batch_id),
+                devices,
+                name="generation"
+            )
+            report = launcher.run(shards, on_event=on_worker_event)
+            if all(shard["error"] for shard in report["shards"].values()):
+                logger.error("Every generation worker failed")
+                return 1
+        else:
+            work = [item for items in work_by_avatar.values() for item in items]
+            if not generate_shard(args, work, gpu_type, resolution, max_batch, batch_id, record):
+                logger.error("Could not load the Wan 2.1 model. Use --placeholder-avatars to run without it.")
+                return 1
+    finally:
+        logger.info(f"Run manifest {manifest.path}: {manifest.stats()}")
+    
+    # Videos of this invocation's scripts, including those completed before a resume
+    for item_id in run_items:
+        video = manifest.completed_stage(item_id, "video", verify=False)
+        if video:
+            avatar = manifest.completed_stage(item_id, "avatar", verify=False) or {}
+            successful_videos.append({
+                "avatar": manifest.data["items"][item_id]["script"].get("avatar", "emma"),
+                "script_id": item_id,
+                "video_path": video["video"],
+                "avatar_video_path": avatar.get("avatar_video")
+            })
     
     # Summarize results
     logger.info(f"Video generation complete. Generated {len(successful_videos)}/{len(scripts)} videos successfully.")
     
+    # Only a run that produced every video is complete; otherwise the next start resumes it
+    if len(successful_videos) == len(run_items):
+        manifest.finish()
+    else:
+        logger.info(f"{len(run_items) - len(successful_videos)} videos missing, run left resumable: {manifest.path}")
+    
     # Create a summary file with the organization by avatar
     summary = {"videos_by_avatar": {}}
     
@@ -464,9 +664,8 @@ def main():
             summary["videos_by_avatar"][avatar] = []
         
         summary["videos_by_avatar"][avatar].append({
+            "script_id": result["script_id"],
             "video_path": result["video_path"],
-            "main_path": result["main_path"],
-            "app_demo_path": result["app_demo_path"],
             "avatar_video_path": result["avatar_video_path"]
         })
     
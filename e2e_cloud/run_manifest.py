@@ -0,0 +1,252 @@
+#!/usr/bin/env python3
+"""
+Run Manifest for OWLmarketing
+
+Durable record of a batch generation run: the scripts being produced and, per
+script, which stages (avatar generation, composition) have completed and the
+artifacts they wrote, with checksums. The manifest is rewritten atomically after
+every change, so a run that is killed at video 37 of 60 can be resumed: completed
+stages whose artifacts still verify are skipped, everything else runs again. A run
+that produced every video is marked complete and is never resumed.
+
+Usage:
+    manifest = open_run_manifest(os.path.join(output_dir, MANIFEST_NAME), resume=True)
+    done = manifest.completed_stage("emma_1", "avatar")
+    if done is None:
+        ...
+        manifest.complete_stage("emma_1", "avatar", {"avatar_video": path})
+    manifest.finish()
+"""
+
+import os
+import json
+import glob
+import hashlib
+import logging
+import threading
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger("run_manifest")
+
+# File name of the manifest inside a run's output directory
+MANIFEST_NAME = "run_manifest.json"
+
+
+def file_checksum(path: str, chunk_size: int = 1 << 20) -> str:
+    """sha256 of a file, read in chunks."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def script_checksum(script: Dict[str, Any]) -> str:
+    """sha256 of a script's canonical JSON."""
+    canonical = json.dumps(script, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+class RunManifest:
+    """Per-script stage completion and artifact checksums for one run, persisted as JSON."""
+
+    def __init__(self, path: str, data: Optional[Dict[str, Any]] = None):
+        """
+        Args:
+            path: Manifest file
+            data: Loaded manifest contents; a new run if None
+        """
+        self.path = os.path.abspath(path)
+        now = datetime.now().isoformat()
+        self.data = data or {
+            "run_id": datetime.now().strftime("%Y%m%d_%H%M%S"),
+            "created": now,
+            "updated": now,
+            "resumed": 0,
+            "status": "running",  # "complete" once every video of the run was produced
+            "settings": {},
+            "items": {}
+        }
+        self._lock = threading.RLock()
+
+    @classmethod
+    def load(cls, path: str) -> "RunManifest":
+        """Manifest from an existing file."""
+        with open(path, "r") as f:
+            return cls(path, json.load(f))
+
+    @property
+    def settings(self) -> Dict[str, Any]:
+        """Run-wide settings (batch id, resolution, ...) kept for the resumed run."""
+        return self.data["settings"]
+
+    @property
+    def is_complete(self) -> bool:
+        """Whether the run finished; manifests written before run statuses existed count as unfinished."""
+        return self.data.get("status") == "complete"
+
+    def finish(self) -> None:
+        """Mark the run complete, so it is not resumed."""
+        with self._lock:
+            self.data["status"] = "complete"
+            self.data["finished"] = datetime.now().isoformat()
+            self.save()
+        logger.info(f"Run {self.data['run_id']} complete: {self.stats()}")
+
+    def save(self) -> None:
+        """Write the manifest; write-then-rename, so a crash never leaves a partial file."""
+        with self._lock:
+            self.data["updated"] = datetime.now().isoformat()
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            tmp_path = f"{self.path}.{os.getpid()}.tmp"
+            with open(tmp_path, "w") as f:
+                json.dump(self.data, f, indent=2, default=str)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.path)
+
+    def record_script(self, item_id: str, script: Dict[str, Any]) -> None:
+        """
+        Register a script under item_id. A different script under a known id drops that
+        item's completed stages, since its artifacts belong to the old script.
+        """
+        checksum = script_checksum(script)
+        with self._lock:
+            item = self.data["items"].get(item_id)
+            if item is not None and item.get("script_sha256") != checksum:
+                logger.warning(f"Script for {item_id} changed since the last run; regenerating it")
+                item = None
+            if item is None:
+                self.data["items"][item_id] = {
+                    # A copy: the pipeline may update the script while the manifest is saved
+                    "script": json.loads(json.dumps(script, default=str)),
+                    "script_sha256": checksum,
+                    "stages": {}
+                }
+            self.save()
+
+    def scripts(self) -> List[Dict[str, Any]]:
+        """Recorded scripts, in the order they were recorded."""
+        with self._lock:
+            return [item["script"] for item in self.data["items"].values()]
+
+    def completed_stage(self, item_id: str, stage: str, verify: bool = True) -> Optional[Dict[str, str]]:
+        """
+        Artifacts of a completed stage, or None if the stage has to run (again).
+
+        Args:
+            item_id: Script id
+            stage: Stage name
+            verify: Check every artifact still exists with its recorded size and checksum
+
+        Returns:
+            Artifact name -> path
+        """
+        with self._lock:
+            record = self.data["items"].get(item_id, {}).get("stages", {}).get(stage)
+            if not record or record.get("status") != "done":
+                return None
+            artifacts = dict(record.get("artifacts", {}))
+
+        for name, artifact in (artifacts.items() if verify else ()):
+            path = artifact["path"]
+            try:
+                if (not os.path.exists(path) or os.path.getsize(path) != artifact["size"]
+                        or file_checksum(path) != artifact["sha256"]):
+                    logger.warning(f"Artifact {name} of {item_id}/{stage} is missing or changed: {path}")
+                    return None
+            except Exception as e:
+                logger.warning(f"Could not verify artifact {path}: {e}")
+                return None
+
+        if verify:
+            logger.info(f"Resuming: {item_id}/{stage} already completed")
+        return {name: artifact["path"] for name, artifact in artifacts.items()}
+
+    def complete_stage(self, item_id: str, stage: str, artifacts: Dict[str, str]) -> None:
+        """
+        Mark a stage completed with the artifacts it wrote.
+
+        Args:
+            item_id: Script id
+            stage: Stage name
+            artifacts: Artifact name -> path; each file is checksummed
+        """
+        # Checksum outside the lock, composition workers finish concurrently
+        records = {}
+        for name, path in artifacts.items():
+            path = os.path.abspath(path)
+            records[name] = {"path": path, "size": os.path.getsize(path), "sha256": file_checksum(path)}
+
+        with self._lock:
+            item = self.data["items"].setdefault(item_id, {"stages": {}})
+            item["stages"][stage] = {
+                "status": "done",
+                "artifacts": records,
+                "completed": datetime.now().isoformat()
+            }
+            self.save()
+
+    def fail_stage(self, item_id: str, stage: str, error: str) -> None:
+        """Record a failed stage; it runs again on resume."""
+        with self._lock:
+            item = self.data["items"].setdefault(item_id, {"stages": {}})
+            item["stages"][stage] = {
+                "status": "failed",
+                "error": str(error),
+                "completed": datetime.now().isoformat()
+            }
+            self.save()
+
+    def stats(self) -> Dict[str, Any]:
+        """Items, and completed and failed stages by name."""
+        with self._lock:
+            stats = {"items": len(self.data["items"]), "done": {}, "failed": {}}
+            for item in self.data["items"].values():
+                for stage, record in item.get("stages", {}).items():
+                    bucket = stats["done"] if record.get("status") == "done" else stats["failed"]
+                    bucket[stage] = bucket.get(stage, 0) + 1
+            return stats
+
+
+def open_run_manifest(path: str, resume: bool = False,
+                      settings: Optional[Dict[str, Any]] = None) -> RunManifest:
+    """
+    Manifest for a run: the existing one when resuming an unfinished run, otherwise a new one.
+
+    Args:
+        path: Manifest file
+        resume: Continue the run recorded at path, if there is one and it is not complete
+        settings: Run-wide settings for a new run; a resumed run keeps its own
+    """
+    if resume and os.path.exists(path):
+        try:
+            manifest = RunManifest.load(path)
+            if manifest.is_complete:
+                logger.info(f"Run {manifest.data['run_id']} in {path} is complete, starting a new run")
+            else:
+                manifest.data["resumed"] = manifest.data.get("resumed", 0) + 1
+                manifest.data["status"] = "running"
+                manifest.save()
+                logger.info(f"Resuming run {manifest.data['run_id']} from {path}: {manifest.stats()}")
+                return manifest
+        except Exception as e:
+            logger.error(f"Could not load run manifest {path}, starting a new run: {e}")
+    elif resume:
+        logger.warning(f"No run manifest at {path}, starting a new run")
+    elif os.path.exists(path):
+        logger.info(f"Replacing run manifest {path} (use --resume to continue it)")
+
+    manifest = RunManifest(path)
+    manifest.settings.update(settings or {})
+    manifest.save()
+    return manifest
+
+
+def latest_run_dir(runs_root: str) -> Optional[str]:
+    """Most recently updated run directory under runs_root that has a manifest."""
+    manifests = glob.glob(os.path.join(runs_root, "*", MANIFEST_NAME))
+    if not manifests:
+        return None
+    return os.path.dirname(max(manifests, key=os.path.getmtime))
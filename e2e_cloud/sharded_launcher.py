@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+"""
+Sharded Launcher for OWLmarketing
+
+Spreads a generation run over several worker processes, one per GPU (or per
+memory slot for model replicas on a large host). Work is assigned in groups
+(all scripts of one avatar go to the same worker) so each worker's warm
+generator, prompt embedding cache and clip library keep being reused. Workers
+report results and failures as events to the launching process, which collects
+them in one place (for example into the run manifest).
+
+Usage:
+    shards = assign_shards({avatar: scripts for each avatar}, num_workers=2)
+    launcher = ShardedLauncher(worker, devices=["0", "1"])
+    report = launcher.run(shards, on_event=record)
+
+    def worker(shard_index, device, items, emit):
+        for item in items:
+            ...
+            emit({"type": "result", "item": item_id, ...})
+"""
+
+import os
+import queue
+import logging
+import traceback
+import multiprocessing
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+logger = logging.getLogger("sharded_launcher")
+
+# Sent by a worker process after its last event
+_SHARD_DONE = "shard_done"
+
+
+def assign_shards(groups: Dict[str, Sequence[Any]], num_workers: int) -> List[List[Any]]:
+    """
+    Assign whole groups to workers, largest group first to the least loaded worker.
+
+    Args:
+        groups: Group key (avatar) -> work items
+        num_workers: Number of workers
+
+    Returns:
+        Work items per worker; a group's items are never split across workers
+    """
+    shards: List[List[Any]] = [[] for _ in range(max(1, num_workers))]
+    for key in sorted(groups, key=lambda k: (-len(groups[k]), k)):
+        lightest = min(range(len(shards)), key=lambda i: len(shards[i]))
+        shards[lightest].extend(groups[key])
+    return shards
+
+
+def parse_devices(devices: Optional[str], num_workers: int) -> List[Optional[str]]:
+    """
+    Device per worker.
+
+    Args:
+        devices: Comma-separated CUDA device ids ("0,1,2,3"); one worker per entry, and an id
+            may repeat to run several replicas on one large GPU
+        num_workers: Workers when devices is not given; they share the visible devices
+
+    Returns:
+        CUDA_VISIBLE_DEVICES value per worker (None leaves the environment as it is)
+    """
+    if devices:
+        return [d.strip() for d in devices.split(",") if d.strip()]
+    return [None] * max(1, num_workers)
+
+
+def _shard_main(worker: Callable, shard_index: int, device: Optional[str], items: List[Any], events) -> None:
+    """Entry point of a worker process."""
+    if device is not None:
+        # Before the worker touches CUDA, so the process only sees its own GPU
+        os.environ["CUDA_VISIBLE_DEVICES"] = device
+
+    def emit(event: Dict[str, Any]) -> None:
+        events.put((shard_index, event))
+
+    try:
+        worker(shard_index, device, items, emit)
+    except Exception as e:
+        emit({"type": "shard_error", "error": str(e), "traceback": traceback.format_exc()})
+    finally:
+        events.put((shard_index, {"type": _SHARD_DONE}))
+
+
+class ShardedLauncher:
+    """Runs one worker process per shard and collects their events centrally."""
+
+    def __init__(self, worker: Callable[[int, Optional[str], List[Any], Callable], None],
+                 devices: Sequence[Optional[str]], start_method: str = "spawn", name: str = "shard"):
+        """
+        Args:
+            worker: Module-level function worker(shard_index, device, items, emit), run in each process
+            devices: CUDA_VISIBLE_DEVICES value (or None) per worker
+            start_method: multiprocessing start method; spawn, since CUDA cannot be used after fork
+            name: Prefix for process names and log lines
+        """
+        if not devices:
+            raise ValueError("at least one worker device is required")
+        self.worker = worker
+        self.devices = list(devices)
+        self.context = multiprocessing.get_context(start_method)
+        self.name = name
+
+    def run(self, shards: List[List[Any]],
+            on_event: Optional[Callable[[int, Dict[str, Any]], None]] = None) -> Dict[str, Any]:
+        """
+        Run every non-empty shard in its own process and wait for all of them.
+
+        Args:
+            shards: Work items per worker (see assign_shards); at most one per device
+            on_event: Called in this process for every event a worker emits, in arrival order
+
+        Returns:
+            {"events": [(shard_index, event), ...], "shards": {shard_index: {"items", "exitcode", "error"}}}
+        """
+        if len(shards) > len(self.devices):
+            raise ValueError(f"{len(shards)} shards for {len(self.devices)} workers")
+
+        events = self.context.Queue()
+        processes = {}
+        for index, (device, items) in enumerate(zip(self.devices, shards)):
+            if not items:
+                continue
+            process = self.context.Process(
+                target=_shard_main,
+                args=(self.worker, index, device, items, events),
+                name=f"{self.name}-{index}",
+                daemon=False
+            )
+            process.start()
+            processes[index] = process
+            logger.info(f"[{self.name}] worker {index} (pid {process.pid}, device {device}): {len(items)} items")
+
+        report = {"events": [], "shards": {index: {"items": len(shards[index]), "exitcode": None, "error": None}
+                                           for index in processes}}
+
+        def handle(index, event):
+            if event.get("type") == "shard_error":
+                logger.error(f"[{self.name}] worker {index} failed: {event.get('error')}")
+                report["shards"][index]["error"] = event.get("error")
+            report["events"].append((index, event))
+            if on_event is not None:
+                try:
+                    on_event(index, event)
+                except Exception as e:
+                    logger.error(f"[{self.name}] error handling event from worker {index}: {e}")
+
+        pending = set(processes)
+        while pending:
+            try:
+                index, event = events.get(timeout=1.0)
+            except queue.Empty:
+                # A worker killed by the OS (OOM killer, driver reset) never sends its done event
+                for index in list(pending):
+                    process = processes[index]
+                    if not process.is_alive():
+                        process.join()
+                        if process.exitcode != 0:
+                            logger.error(f"[{self.name}] worker {index} died with exit code {process.exitcode}")
+                            report["shards"][index]["error"] = f"worker exited with code {process.exitcode}"
+                            pending.discard(index)
+                continue
+
+            if event.get("type") == _SHARD_DONE:
+                pending.discard(index)
+            else:
+                handle(index, event)
+
+        # Events a dead worker sent before it died
+        while True:
+            try:
+                index, event = events.get(timeout=0.1)
+            except queue.Empty:
+                break
+            if event.get("type") != _SHARD_DONE:
+                handle(index, event)
+
+        for index, process in processes.items():
+            process.join()
+            report["shards"][index]["exitcode"] = process.exitcode
+        logger.info(f"[{self.name}] workers finished: {report['shards']}")
+        return report
@@ -6,24 +6,165 @@ This module integrates the Wan 2.1 Text-to-Video model with the OWLmarketing pip
 providing high-quality video generation with optimized performance for L4 GPUs.
 """
 
+import gc
 import os
 import shutil
 import sys
-import torch
 import logging
 import numpy as np
-from PIL import Image
 from typing import Optional, List, Dict, Any, Tuple
 import time
 import tempfile
 from pathlib import Path
 import cv2
 import subprocess
-from tqdm import tqdm
+
+try:
+    from e2e_cloud.prompt_embedding_cache import get_prompt_embedding_cache, pipeline_text_encoder
+    from e2e_cloud.model_registry import get_model_registry
+except ImportError:
+    # Deployed layout: this file sits next to prompt_embedding_cache.py without the package
+    from prompt_embedding_cache import get_prompt_embedding_cache, pipeline_text_encoder
+    from model_registry import get_model_registry
+
+# torch is imported where it is used, so the placeholder generator (and anything that
+# only imports this module) works on hosts without the CUDA stack
 
 # Configure logging
 logger = logging.getLogger("wan_generator")
 
+# Warm generators shared by every caller in the process, keyed by model and settings;
+# they live in the model registry under ids with this prefix
+_GENERATOR_ID_PREFIX = "wan-t2v:"
+
+
+def write_placeholder_video(output_path: str, width: int, height: int, fps: int = 24,
+                            duration: int = 5, image: Optional[np.ndarray] = None) -> Optional[str]:
+    """
+    Write a still video: the given BGR image (resized to width x height) or black frames.
+
+    This is the fallback used when Wan 2.1 generation is unavailable, and the output of
+    PlaceholderVideoGenerator.
+
+    Returns:
+        Path to the video if it was written, None otherwise
+    """
+    try:
+        os.makedirs(os.path.dirname(os.path.abspath(output_path)), exist_ok=True)
+        if image is None:
+            frame = np.zeros((height, width, 3), dtype=np.uint8)
+        elif image.shape[1] != width or image.shape[0] != height:
+            frame = cv2.resize(image, (width, height), interpolation=cv2.INTER_AREA)
+        else:
+            frame = image
+
+        fourcc = cv2.VideoWriter_fourcc(*'mp4v')
+        video = cv2.VideoWriter(output_path, fourcc, fps, (width, height))
+        for _ in range(fps * duration):
+            video.write(frame)
+        video.release()
+        return output_path if os.path.exists(output_path) else None
+    except Exception as e:
+        logger.error(f"Error writing placeholder video {output_path}: {e}")
+        return None
+
+
+# Intermediate outputs for downstream editing: container extension and ffmpeg codec arguments
+MEZZANINE_FORMATS = {
+    "ffv1": (".mkv", ["-c:v", "ffv1", "-level", "3", "-pix_fmt", "gbrp"]),  # lossless RGB
+    "prores": (".mov", ["-c:v", "prores_ks", "-profile:v", "3", "-pix_fmt", "yuv422p10le"]),  # near-lossless
+}
+
+
+def frames_to_rgb24(video_frames) -> np.ndarray:
+    """
+    Convert a video's frames to one contiguous [frames, height, width, 3] uint8 RGB array.
+    
+    Accepts a torch tensor or ndarray (float in 0-1 or uint8, channels-last or
+    channels-first) or a list of PIL images/arrays. The conversion runs over the
+    whole frame batch at once.
+    """
+    if hasattr(video_frames, "detach"):
+        # torch tensor
+        video_frames = video_frames.detach().float().cpu().numpy()
+    elif isinstance(video_frames, (list, tuple)):
+        video_frames = np.stack([np.asarray(frame) for frame in video_frames])
+    frames = np.asarray(video_frames)
+    
+    if frames.ndim != 4:
+        raise ValueError(f"Expected 4-D video frames, got shape {frames.shape}")
+    if frames.shape[-1] not in (1, 3, 4) and frames.shape[1] in (1, 3, 4):
+        frames = frames.transpose(0, 2, 3, 1)
+    if frames.shape[-1] == 1:
+        frames = np.repeat(frames, 3, axis=-1)
+    elif frames.shape[-1] == 4:
+        frames = frames[..., :3]
+    
+    if frames.dtype != np.uint8:
+        # Normalize and convert to uint8 in one pass over the batch
+        if frames.max() <= 1.0:
+            frames = np.clip(frames, 0.0, 1.0) * 255.0
+        frames = np.clip(frames + 0.5, 0, 255).astype(np.uint8)
+    return np.ascontiguousarray(frames)
+
+
+def encode_rgb_frames(frames: np.ndarray, output_path: str, fps: int, crf: int = 18,
+                      mezzanine_path: Optional[str] = None, mezzanine_format: str = "ffv1") -> Optional[str]:
+    """
+    Stream raw RGB frames into ffmpeg's stdin and encode an H.264 MP4, without
+    writing intermediate images to disk.
+    
+    Args:
+        frames: [frames, height, width, 3] uint8 RGB (see frames_to_rgb24)
+        output_path: MP4 to write
+        fps: Frames per second
+        crf: H.264 constant rate factor
+        mezzanine_path: Also write a lossless/near-lossless copy here, from the same pass
+        mezzanine_format: Key of MEZZANINE_FORMATS
+        
+    Returns:
+        output_path if the MP4 was written, None otherwise
+    """
+    num_frames, height, width = frames.shape[:3]
+    os.makedirs(os.path.dirname(os.path.abspath(output_path)), exist_ok=True)
+    ffmpeg_cmd = [
+        "ffmpeg", "-y", "-loglevel", "error",
+        "-f", "rawvideo",
+        "-pix_fmt", "rgb24",
+        "-s", f"{width}x{height}",
+        "-framerate", str(fps),
+        "-i", "-",
+        "-map", "0:v",
+        "-c:v", "libx264",
+        "-profile:v", "high",
+        "-crf", str(crf),  # Use CRF 18 for high quality
+        "-pix_fmt", "yuv420p",
+        output_path
+    ]
+    if mezzanine_path:
+        os.makedirs(os.path.dirname(os.path.abspath(mezzanine_path)), exist_ok=True)
+        ffmpeg_cmd += ["-map", "0:v"] + MEZZANINE_FORMATS[mezzanine_format][1] + [mezzanine_path]
+    
+    process = subprocess.Popen(ffmpeg_cmd, stdin=subprocess.PIPE, stderr=subprocess.PIPE)
+    try:
+        for frame in frames:
+            process.stdin.write(memoryview(frame).cast("B"))
+        process.stdin.close()
+    except BrokenPipeError:
+        # ffmpeg exited early; its stderr below says why
+        pass
+    stderr = process.stderr.read().decode(errors="replace").strip()
+    process.wait()
+    
+    if process.returncode != 0:
+        logger.error(f"FFmpeg failed encoding {num_frames} frames to {output_path}: {stderr}")
+        return None
+    if not os.path.exists(output_path):
+        logger.error("FFmpeg did not generate the output file")
+        return None
+    return output_path
+
+
 class WanVideoGenerator:
     """Wrapper for the Wan 2.1 Text-to-Video model."""
     
@@ -34,7 +175,12 @@ class WanVideoGenerator:
         use_fp16: bool = True,
         resolution: str = "720p",  # Default to 720p for L4
         optimize_for_gpu: bool = True,
-        gpu_type: str = "L4"  # Default to L4 optimization
+        gpu_type: str = "L4",  # Default to L4 optimization
+        memory_pressure_threshold: float = 0.85,
+        max_batch: int = 4,
+        batch_item_memory_gb: float = 6.0,
+        embedding_cache_dir: Optional[str] = None,
+        mezzanine_format: Optional[str] = None
     ):
         """
         Initialize the Wan 2.1 Text-to-Video generator.
@@ -46,7 +192,14 @@ class WanVideoGenerator:
             resolution: Video resolution to generate (480p, 720p, or 1080p)
             optimize_for_gpu: Whether to optimize settings for GPU
             gpu_type: Type of GPU (L4 or T4)
+            memory_pressure_threshold: Reserved GPU memory fraction above which release_memory() clears caches
+            max_batch: Upper bound on prompts denoised in one pipeline call
+            batch_item_memory_gb: Estimated GPU memory per batched video at 720p and 81 frames
+            embedding_cache_dir: Directory prompt embeddings are persisted to (PROMPT_EMBEDDING_CACHE_DIR if None)
+            mezzanine_format: Also write a lossless ("ffv1") or near-lossless ("prores") copy of every video
         """
+        if mezzanine_format is not None and mezzanine_format not in MEZZANINE_FORMATS:
+            raise ValueError(f"mezzanine_format must be one of {list(MEZZANINE_FORMATS)}")
         self.model_dir = model_dir
         self.device = device
         self.use_fp16 = use_fp16
@@ -55,6 +208,16 @@ class WanVideoGenerator:
         self.gpu_type = gpu_type
         self.model = None
         self.initialized = False
+        self.memory_pressure_threshold = memory_pressure_threshold
+        self.max_batch = max_batch
+        self.batch_item_memory_gb = batch_item_memory_gb
+        
+        # Prompt and negative-prompt embeddings, shared across generators in the process
+        self.embedding_cache = get_prompt_embedding_cache(embedding_cache_dir)
+        self.mezzanine_format = mezzanine_format
+        
+        # Number of times weights were loaded; stays at 1 for a warm, reused generator
+        self.load_count = 0
         
         # Initialize session_dir for temporary files
         self.session_dir = tempfile.mkdtemp(prefix="wan_generator_")
@@ -97,7 +260,9 @@ class WanVideoGenerator:
         """Initialize the Wan 2.1 model."""
         try:
             import sys
+            import torch
             sys.path.append(self.model_dir)
+            load_start = time.time()
             
             # Import needed modules from the model
             from diffusers import DiffusionPipeline, DPMSolverMultistepScheduler
@@ -185,7 +350,9 @@ class WanVideoGenerator:
                             logger.info("Enabled dynamic attention slicing for L4 GPU")
             
             self.initialized = True
-            logger.info(f"Wan 2.1 T2V model initialized successfully with {self.gpu_type} settings")
+            self.load_count += 1
+            logger.info(f"Wan 2.1 T2V model initialized successfully with {self.gpu_type} settings "
+                        f"in {time.time() - load_start:.1f} seconds")
             return True
             
         except Exception as e:
@@ -195,6 +362,84 @@ class WanVideoGenerator:
             self.initialized = False
             return False
     
+    def memory_pressure(self) -> float:
+        """Fraction of GPU memory currently reserved by this process (0.0 on CPU)."""
+        try:
+            import torch
+            if not torch.cuda.is_available():
+                return 0.0
+            total = torch.cuda.get_device_properties(0).total_memory
+            return torch.cuda.memory_reserved() / total if total else 0.0
+        except Exception as e:
+            logger.debug(f"Could not read GPU memory usage: {e}")
+            return 0.0
+    
+    def release_memory(self, force: bool = False) -> bool:
+        """
+        Free cached allocator blocks and Python garbage while keeping the model loaded.
+        
+        Only acts when memory pressure is above memory_pressure_threshold, unless force is set.
+        
+        Args:
+            force: Clear caches regardless of memory pressure
+            
+        Returns:
+            True if caches were cleared
+        """
+        pressure = self.memory_pressure()
+        if not force and pressure < self.memory_pressure_threshold:
+            return False
+        
+        try:
+            gc.collect()
+            import torch
+            if torch.cuda.is_available():
+                torch.cuda.empty_cache()
+            logger.info(f"Cleared caches at {pressure * 100:.0f}% GPU memory reserved "
+                        f"(now {self.memory_pressure() * 100:.0f}%)")
+            return True
+        except Exception as e:
+            logger.warning(f"Could not clear GPU caches: {e}")
+            return False
+    
+    def max_batch_size(self, num_frames: int) -> int:
+        """
+        Largest number of videos to denoise in one pipeline call, from free GPU memory.
+        
+        Each video in a batch needs roughly batch_item_memory_gb at 720p and 81 frames,
+        scaled by pixel and frame count. CPU-offloaded (T4) setups stream weights through
+        the GPU and run one video at a time.
+        
+        Args:
+            num_frames: Frames per video
+            
+        Returns:
+            Batch size between 1 and max_batch
+        """
+        if self.max_batch <= 1 or (self.optimize_for_gpu and self.gpu_type == "T4"):
+            return 1
+        try:
+            import torch
+            if not torch.cuda.is_available():
+                return 1
+            free_bytes, _ = torch.cuda.mem_get_info()
+        except Exception as e:
+            logger.debug(f"Could not read free GPU memory: {e}")
+            return 1
+        
+        scale = (self.width * self.height) / (1280 * 720) * (num_frames / 81)
+        per_item_gb = self.batch_item_memory_gb * scale
+        # Keep 10% headroom for the VAE decode and allocator fragmentation
+        fits = int((free_bytes / (1024 ** 3)) * 0.9 // per_item_gb) if per_item_gb > 0 else 1
+        return max(1, min(self.max_batch, fits))
+    
+    def effective_sample_steps(self, duration: int) -> int:
+        """Denoising steps used for a video of this duration."""
+        # For shorter videos, we can use more steps on L4 for higher quality
+        if self.gpu_type == "L4" and duration <= 5:
+            return 40  # Higher quality for short videos on L4
+        return self.sample_steps
+    
     def generate_video(
         self, 
         prompt: str, 
@@ -203,6 +448,7 @@ class WanVideoGenerator:
         duration: int = 5,
         fps: int = 24,
         use_prompt_extend: bool = False,
+        seed: Optional[int] = None,
     ) -> Optional[str]:
         """
         Generate a video using the Wan 2.1 T2V model.
@@ -214,112 +460,249 @@ class WanVideoGenerator:
             duration: Duration of the video in seconds
             fps: Frames per second
             use_prompt_extend: Whether to use prompt extension for better quality
+            seed: Random seed for reproducible output
             
         Returns:
             Path to the generated video if successful, None otherwise
         """
+        results = self.generate_videos(
+            [prompt], [output_path],
+            negative_prompt=negative_prompt,
+            seeds=[seed],
+            duration=duration,
+            fps=fps,
+            use_prompt_extend=use_prompt_extend
+        )
+        return results[0]["video_path"]
+    
+    def generate_videos(
+        self,
+        prompts: List[str],
+        output_paths: List[str],
+        negative_prompt: str = "",
+        seeds: Optional[List[Optional[int]]] = None,
+        duration: int = 5,
+        fps: int = 24,
+        use_prompt_extend: bool = False,
+        max_batch_size: Optional[int] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        Generate one video per prompt, denoising several prompts in each pipeline call.
+        
+        All videos share resolution, frame count and step count, so they batch into a
+        single denoising loop. Batches are split to max_batch_size (derived from free GPU
+        memory if not given) and halved again if a batch runs out of memory.
+        
+        Args:
+            prompts: Text prompts, one per video
+            output_paths: Output path for each prompt
+            negative_prompt: Text to avoid in every video
+            seeds: Random seed per prompt (None entries are unseeded)
+            duration: Duration of each video in seconds
+            fps: Frames per second
+            use_prompt_extend: Whether to use prompt extension for better quality
+            max_batch_size: Maximum prompts per pipeline call
+            
+        Returns:
+            One result per prompt, in order: {"prompt", "output_path", "seed", "video_path",
+            "mezzanine_path", "error"}, where video_path is None and error is set for a failed item
+        """
+        if len(prompts) != len(output_paths):
+            raise ValueError("prompts and output_paths must have the same length")
+        seeds = list(seeds) if seeds is not None else [None] * len(prompts)
+        if len(seeds) != len(prompts):
+            raise ValueError("seeds must have one entry per prompt")
+        
+        results = [
+            {"prompt": p, "output_path": o, "seed": s, "video_path": None, "mezzanine_path": None, "error": None}
+            for p, o, s in zip(prompts, output_paths, seeds)
+        ]
+        if not results:
+            return results
+        
         if not self.initialized:
             if not self.initialize():
                 logger.error("Failed to initialize Wan 2.1 model")
-                return None
+                for result in results:
+                    result["error"] = "Failed to initialize Wan 2.1 model"
+                return results
+        
+        # Calculate frames based on duration and fps
+        num_frames = duration * fps
+        batch_size = max_batch_size or self.max_batch_size(num_frames)
+        logger.info(f"Generating {len(prompts)} video(s) in batches of up to {batch_size}")
+        
+        pending = [results[i:i + batch_size] for i in range(0, len(results), batch_size)]
+        while pending:
+            batch = pending.pop(0)
+            error = self._generate_batch(batch, negative_prompt, duration, fps)
+            if error == "oom" and len(batch) > 1:
+                # Split the batch and retry both halves before moving on
+                half = len(batch) // 2
+                logger.warning(f"Out of GPU memory with a batch of {len(batch)}, retrying in batches of {half}")
+                self.release_memory(force=True)
+                pending[:0] = [batch[:half], batch[half:]]
+            elif error:
+                for result in batch:
+                    result["error"] = result["error"] or error
+        
+        failed = sum(1 for r in results if r["video_path"] is None)
+        if failed:
+            logger.error(f"{failed}/{len(results)} video(s) failed")
+        return results
+    
+    def _prompt_embeddings(self, prompts: List[str], negative_prompt: str) -> Optional[Tuple[Any, Any]]:
+        """
+        Prompt and negative-prompt embeddings for a batch, from the embedding cache.
+        
+        Texts already seen (by this or any generator on the same model and dtype) skip
+        the T5 text encoder.
+        
+        Returns:
+            (prompt_embeds, negative_prompt_embeds) batched along dim 0, or None to let
+            the pipeline encode the text itself
+        """
+        encode = pipeline_text_encoder(self.model)
+        if encode is None:
+            return None
+        try:
+            import torch
+            dtype = getattr(self.model, "dtype", None)
+            device = getattr(self.model, "_execution_device", None)
+            embeddings = [
+                self.embedding_cache.get_or_encode(self.model_dir, prompt, dtype, encode, device=device)
+                for prompt in prompts
+            ]
+            negative = self.embedding_cache.get_or_encode(self.model_dir, negative_prompt, dtype, encode, device=device)
+            logger.info(f"Prompt embedding cache: {self.embedding_cache.stats()}")
+            return torch.cat(embeddings), torch.cat([negative] * len(prompts))
+        except Exception as e:
+            logger.warning(f"Could not use cached prompt embeddings, encoding in the pipeline: {e}")
+            return None
+    
+    def _generate_batch(self, batch: List[Dict[str, Any]], negative_prompt: str,
+                        duration: int, fps: int) -> Optional[str]:
+        """
+        Run one batched pipeline call and save its videos into the batch results.
         
+        Returns:
+            None on success, "oom" if the batch ran out of GPU memory, otherwise an error message
+        """
         try:
-            logger.info(f"Generating video for prompt: {prompt}")
+            import torch
+            prompts = [r["prompt"] for r in batch]
+            for prompt in prompts:
+                logger.info(f"Generating video for prompt: {prompt}")
             
             # Calculate frames based on duration and fps
             num_frames = duration * fps
             
             # Prepare settings based on GPU type
-            sample_steps = self.sample_steps
+            sample_steps = self.effective_sample_steps(duration)
             guide_scale = self.guide_scale
             
-            # For shorter videos, we can use more steps on L4 for higher quality
-            if self.gpu_type == "L4" and duration <= 5:
-                sample_steps = 40  # Higher quality for short videos on L4
-            
             # Start the generation
-            logger.info(f"Starting Wan 2.1 video generation with {num_frames} frames at {self.width}x{self.height}")
+            logger.info(f"Starting Wan 2.1 video generation of {len(batch)} video(s) with "
+                        f"{num_frames} frames at {self.width}x{self.height}")
             logger.info(f"Using {sample_steps} sample steps and guidance scale {guide_scale}")
             
             # Ensure output directory exists
-            os.makedirs(os.path.dirname(output_path), exist_ok=True)
+            for result in batch:
+                os.makedirs(os.path.dirname(os.path.abspath(result["output_path"])), exist_ok=True)
             
             # Generate video with the model
             start_time = time.time()
             
-            # Set seed for reproducibility if needed
-            # torch.manual_seed(42)
+            # Set seed for reproducibility if needed: one generator per prompt so each video
+            # is reproducible regardless of which batch it lands in
+            generator = None
+            if any(r["seed"] is not None for r in batch):
+                generator = []
+                for result in batch:
+                    item_generator = torch.Generator(device="cpu")
+                    if result["seed"] is not None:
+                        item_generator.manual_seed(result["seed"])
+                    else:
+                        item_generator.seed()
+                    generator.append(item_generator)
+            
+            # Feed cached text embeddings when the pipeline accepts them
+            text_inputs = {"prompt": prompts, "negative_prompt": [negative_prompt] * len(batch)}
+            embeddings = self._prompt_embeddings(prompts, negative_prompt)
+            if embeddings is not None:
+                text_inputs = {"prompt_embeds": embeddings[0], "negative_prompt_embeds": embeddings[1]}
             
             with torch.inference_mode():
                 # Call the model's generation method
                 output = self.model(
-                    prompt=prompt,
-                    negative_prompt=negative_prompt,
+                    **text_inputs,
                     width=self.width,
                     height=self.height,
                     num_frames=num_frames,
                     num_inference_steps=sample_steps,
                     guidance_scale=guide_scale,
+                    generator=generator,
                 )
-                
-                # Process and save the video
-                video_frames = output.frames[0]
-                
-                # Save as MP4
-                if video_frames is not None:
-                    try:
-                        # Convert to numpy array if not already
-                        if isinstance(video_frames, torch.Tensor):
-                            video_frames = video_frames.cpu().numpy()
-                        
-                        # Normalize and convert to uint8 if needed
-                        if video_frames.max() <= 1.0:
-                            video_frames = (video_frames * 255).astype(np.uint8)
-                        
-                        # Create temporary directory for frames
-                        temp_frame_dir = os.path.join(self.session_dir, "frames")
-                        os.makedirs(temp_frame_dir, exist_ok=True)
-                        
-                        # Save individual frames
-                        frame_paths = []
-                        for i, frame in enumerate(video_frames):
-                            frame_path = os.path.join(temp_frame_dir, f"frame_{i:04d}.png")
-                            Image.fromarray(frame).save(frame_path)
-                            frame_paths.append(frame_path)
-                        
-                        # Use ffmpeg to create video with the correct FPS
-                        ffmpeg_cmd = [
-                            "ffmpeg", "-y",
-                            "-framerate", str(fps),
-                            "-i", os.path.join(temp_frame_dir, "frame_%04d.png"),
-                            "-c:v", "libx264",
-                            "-profile:v", "high",
-                            "-crf", "18",  # Use CRF 18 for high quality
-                            "-pix_fmt", "yuv420p",
-                            output_path
-                        ]
-                        
-                        # Run ffmpeg
-                        subprocess.run(ffmpeg_cmd, check=True, capture_output=True)
-                        
-                        if os.path.exists(output_path):
-                            elapsed = time.time() - start_time
-                            logger.info(f"Video generated successfully in {elapsed:.2f} seconds: {output_path}")
-                            return output_path
-                        else:
-                            logger.error("FFmpeg did not generate the output file")
-                    except Exception as e:
-                        logger.error(f"Error saving video frames: {e}")
-                else:
-                    logger.error("No video frames were generated")
             
+            elapsed = time.time() - start_time
+            logger.info(f"Denoised {len(batch)} video(s) in {elapsed:.2f} seconds")
+            
+            # Process and save the videos, one output entry per prompt
+            for index, result in enumerate(batch):
+                video_frames = output.frames[index] if index < len(output.frames) else None
+                if video_frames is None:
+                    logger.error(f"No video frames were generated for prompt: {result['prompt']}")
+                    result["error"] = "No video frames were generated"
+                    continue
+                video_path, mezzanine_path = self._save_video_frames(video_frames, result["output_path"], fps)
+                result["mezzanine_path"] = mezzanine_path
+                if video_path:
+                    logger.info(f"Video generated successfully in {time.time() - start_time:.2f} seconds: {video_path}")
+                    result["video_path"] = video_path
+                else:
+                    result["error"] = "Could not encode video frames"
             return None
         
         except Exception as e:
+            if "out of memory" in str(e).lower():
+                return "oom"
             logger.error(f"Error generating video: {e}")
             import traceback
             logger.error(traceback.format_exc())
+            return str(e)
+    
+    def mezzanine_path_for(self, output_path: str) -> Optional[str]:
+        """Where the mezzanine copy of output_path goes, or None if mezzanines are off."""
+        if not self.mezzanine_format:
             return None
+        extension = MEZZANINE_FORMATS[self.mezzanine_format][0]
+        return f"{os.path.splitext(output_path)[0]}.mezzanine{extension}"
+    
+    def _save_video_frames(self, video_frames, output_path: str, fps: int) -> Tuple[Optional[str], Optional[str]]:
+        """
+        Encode one video's frames to an H.264 MP4 (and the mezzanine, if enabled).
+        
+        Frames go straight from memory into ffmpeg's stdin as raw RGB; nothing is
+        written to disk but the outputs.
+        
+        Returns:
+            (video path, mezzanine path), each None if not written
+        """
+        # Save as MP4
+        try:
+            frames = frames_to_rgb24(video_frames)
+            mezzanine_path = self.mezzanine_path_for(output_path)
+            video_path = encode_rgb_frames(
+                frames, output_path, fps,
+                mezzanine_path=mezzanine_path,
+                mezzanine_format=self.mezzanine_format or "ffv1"
+            )
+            if video_path and mezzanine_path and os.path.exists(mezzanine_path):
+                return video_path, mezzanine_path
+            return video_path, None
+        except Exception as e:
+            logger.error(f"Error saving video frames: {e}")
+        return None, None
     
     def cleanup(self):
         """Clean up temporary resources."""
@@ -332,6 +715,7 @@ class WanVideoGenerator:
                 self.model = None
                 
                 # Clear CUDA cache
+                import torch
                 if torch.cuda.is_available():
                     torch.cuda.empty_cache()
             
@@ -346,6 +730,110 @@ class WanVideoGenerator:
             logger.error(f"Error during cleanup: {e}")
 
 
+class PlaceholderVideoGenerator(WanVideoGenerator):
+    """
+    Stand-in for WanVideoGenerator that loads no model and writes still placeholder
+    videos (see write_placeholder_video). Used for runs and tests without a GPU.
+    """
+    
+    def initialize(self) -> bool:
+        """Nothing to load; mark the generator ready."""
+        if not self.initialized:
+            self.initialized = True
+            self.load_count += 1
+            logger.info("Using placeholder video generator (no Wan 2.1 model loaded)")
+        return True
+    
+    def memory_pressure(self) -> float:
+        return 0.0
+    
+    def release_memory(self, force: bool = False) -> bool:
+        """No GPU caches to clear; collect Python garbage when forced."""
+        if force:
+            gc.collect()
+        return force
+    
+    def _generate_batch(self, batch: List[Dict[str, Any]], negative_prompt: str,
+                        duration: int, fps: int) -> Optional[str]:
+        """Write one black placeholder video per batch item with the requested resolution, duration and fps."""
+        for result in batch:
+            logger.info(f"Writing placeholder video for prompt: {result['prompt']}")
+            result["video_path"] = write_placeholder_video(
+                result["output_path"], self.width, self.height, fps=fps, duration=duration)
+            if result["video_path"] is None:
+                result["error"] = "Could not write placeholder video"
+        return None
+
+
+def get_wan_generator(
+    model_dir: Optional[str],
+    resolution: str = "720p",
+    gpu_type: str = "L4",
+    device: str = "cuda",
+    use_fp16: bool = True,
+    optimize_for_gpu: bool = True,
+    placeholder: bool = False,
+    mezzanine_format: Optional[str] = None
+) -> Optional[WanVideoGenerator]:
+    """
+    Return the process-wide warm generator for a model and settings, loading the weights
+    on first use. Every later call with the same arguments reuses the loaded model.
+    
+    Args:
+        model_dir: Path to the Wan 2.1 T2V model directory
+        resolution: Video resolution to generate
+        gpu_type: Type of GPU (L4 or T4)
+        device: Device to use for generation
+        use_fp16: Whether to use FP16 precision
+        optimize_for_gpu: Whether to optimize settings for GPU
+        placeholder: Return a PlaceholderVideoGenerator instead of loading Wan 2.1
+        mezzanine_format: Also write a mezzanine copy of every video (key of MEZZANINE_FORMATS)
+        
+    Returns:
+        Initialized generator, or None if the model could not be loaded
+    """
+    key = (
+        str(Path(model_dir).resolve()) if model_dir else None,
+        resolution, gpu_type, device, use_fp16, optimize_for_gpu, placeholder, mezzanine_format
+    )
+    model_id = _GENERATOR_ID_PREFIX + ":".join(str(part) for part in key)
+    
+    def load():
+        generator_class = PlaceholderVideoGenerator if placeholder else WanVideoGenerator
+        generator = generator_class(
+            model_dir=model_dir,
+            device=device,
+            use_fp16=use_fp16,
+            resolution=resolution,
+            optimize_for_gpu=optimize_for_gpu,
+            gpu_type=gpu_type,
+            mezzanine_format=mezzanine_format
+        )
+        if not generator.initialize():
+            generator.cleanup()
+            raise RuntimeError("generator initialization failed")
+        return generator
+    
+    # Held until shutdown_wan_generators: callers keep the generator for the whole run
+    try:
+        return get_model_registry().acquire(
+            model_id, load,
+            device="cpu" if placeholder else device,
+            unload=lambda generator: generator.cleanup()
+        )
+    except Exception as e:
+        logger.error(f"Could not load Wan 2.1 model from {model_dir}: {e}")
+        return None
+
+
+def shutdown_wan_generators():
+    """Unload every shared generator; call once when the process is done generating."""
+    registry = get_model_registry()
+    for model in registry.stats()["models"]:
+        if model["model_id"].startswith(_GENERATOR_ID_PREFIX):
+            registry.evict(model["model_id"], force=True)
+
+
 # Simple command-line interface
 if __name__ == "__main__":
     import argparse
@@ -359,6 +847,8 @@ if __name__ == "__main__":
     parser.add_argument("--duration", type=int, default=5, help="Video duration in seconds")
     parser.add_argument("--fps", type=int, default=24, help="Frames per second")
     parser.add_argument("--gpu-type", default="L4", choices=["L4", "T4"], help="GPU type to optimize for")
+    parser.add_argument("--mezzanine", default=None, choices=list(MEZZANINE_FORMATS),
+                        help="Also write a lossless (ffv1) or near-lossless (prores) copy next to the MP4")
     
     args = parser.parse_args()
     
@@ -369,7 +859,8 @@ if __name__ == "__main__":
     generator = WanVideoGenerator(
         model_dir=args.model_dir,
         resolution=args.resolution,
-        gpu_type=args.gpu_type
+        gpu_type=args.gpu_type,
+        mezzanine_format=args.mezzanine
     )
     
     # Generate video
@@ -295,7 +295,7 @@ class InstagramHandler:
                 logger.error(f"Instagram posting failed: {e}")
                 return False, {"error": str(e)}
     
-    def _login_to_instagram(self, page: Page, username: str, password: str, two_factor: bool = False) -> bool:
+    def _login_to_instagram(self, page: "Page", username: str, password: str, two_factor: bool = False) -> bool:
         """
         Log in to Instagram.
         
@@ -316,7 +316,7 @@ class TikTokHandler:
                 logger.error(f"TikTok posting failed: {e}")
                 return False, {"error": str(e)}
     
-    def _login_to_tiktok(self, page: Page, username: str, password: str) -> bool:
+    def _login_to_tiktok(self, page: "Page", username: str, password: str) -> bool:
         """
         Log in to TikTok.
         
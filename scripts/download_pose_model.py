@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""
+Pose Model Provisioning Script
+
+Downloads a MoveNet single-pose model into the local pose model store that
+video_editing.pose_runtime loads from (POSE_MODEL_DIR, default
+video_generation/models/pose), so pose detection runs on a local CPU runtime
+without importing TensorFlow Hub or downloading the model at analysis time.
+
+The .tflite model is downloaded from TF Hub; the default .onnx format converts it
+with tf2onnx and runs on onnxruntime. Use --format tflite on hosts with
+tflite-runtime (or full TensorFlow) instead.
+
+Usage:
+    python scripts/download_pose_model.py
+    python scripts/download_pose_model.py --variant thunder --format tflite
+    POSE_MODEL_DIR=/app/models/pose python scripts/download_pose_model.py
+"""
+
+import os
+import sys
+import logging
+import argparse
+import tempfile
+from pathlib import Path
+from typing import Callable, Optional
+
+# Add parent directory to path to import modules
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.append(project_root)
+
+from video_editing.pose_runtime import pose_model_dir
+
+logger = logging.getLogger('download_pose_model')
+
+# TF Hub TFLite exports of MoveNet single-pose (uint8 input, [1, 1, 17, 3] output)
+MOVENET_TFLITE_URLS = {
+    "lightning": "https://tfhub.dev/google/lite-model/movenet/singlepose/lightning/tflite/float16/4?lite-format=tflite",
+    "thunder": "https://tfhub.dev/google/lite-model/movenet/singlepose/thunder/tflite/float16/4?lite-format=tflite",
+}
+
+MODEL_FORMATS = ("onnx", "tflite")
+
+
+def model_file_name(variant: str, model_format: str) -> str:
+    """File name pose_runtime.find_local_movenet looks up for a variant and format."""
+    return f"movenet_singlepose_{variant}.{model_format}"
+
+
+def download_file(url: str, path: Path) -> None:
+    """Download url to path."""
+    import requests
+
+    logger.info(f"Downloading {url}")
+    with requests.get(url, stream=True, timeout=60) as response:
+        response.raise_for_status()
+        with open(path, "wb") as f:
+            for chunk in response.iter_content(chunk_size=1 << 20):
+                f.write(chunk)
+
+
+def convert_tflite_to_onnx(tflite_path: Path, onnx_path: Path) -> None:
+    """Convert a TFLite model to ONNX with tf2onnx."""
+    import tf2onnx
+
+    logger.info(f"Converting {tflite_path.name} to ONNX")
+    tf2onnx.convert.from_tflite(str(tflite_path), opset=13, output_path=str(onnx_path))
+
+
+def provision_pose_model(variant: str = "lightning", model_format: str = "onnx",
+                         model_dir: Optional[str] = None, force: bool = False,
+                         download: Callable[[str, Path], None] = download_file,
+                         convert: Callable[[Path, Path], None] = convert_tflite_to_onnx) -> Path:
+    """
+    Put a MoveNet model into the local pose model store.
+
+    Args:
+        variant (str): "lightning" (faster) or "thunder" (more accurate)
+        model_format (str): "onnx" or "tflite"
+        model_dir (str, optional): Model store; defaults to POSE_MODEL_DIR or video_generation/models/pose
+        force (bool): Replace a model that is already there
+        download (callable): Downloads a URL to a path
+        convert (callable): Converts a .tflite path to an .onnx path
+
+    Returns:
+        Path: The model file
+    """
+    if variant not in MOVENET_TFLITE_URLS:
+        raise ValueError(f"variant must be one of {sorted(MOVENET_TFLITE_URLS)}")
+    if model_format not in MODEL_FORMATS:
+        raise ValueError(f"model_format must be one of {MODEL_FORMATS}")
+
+    target_dir = Path(model_dir) if model_dir else pose_model_dir()
+    target = target_dir / model_file_name(variant, model_format)
+    if target.exists() and not force:
+        logger.info(f"Pose model already provisioned at {target}")
+        return target
+    target_dir.mkdir(parents=True, exist_ok=True)
+
+    # Build in a temporary directory next to the store and rename into place,
+    # so a failed download or conversion never leaves a partial model behind
+    with tempfile.TemporaryDirectory(dir=target_dir) as tmp_dir:
+        tflite_path = Path(tmp_dir) / model_file_name(variant, "tflite")
+        download(MOVENET_TFLITE_URLS[variant], tflite_path)
+        if model_format == "onnx":
+            built = Path(tmp_dir) / target.name
+            convert(tflite_path, built)
+        else:
+            built = tflite_path
+        os.replace(built, target)
+
+    logger.info(f"Pose model provisioned at {target} ({target.stat().st_size / 1e6:.1f} MB)")
+    return target
+
+
+def main():
+    # Configure logging
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    )
+
+    parser = argparse.ArgumentParser(description="Download a MoveNet pose model into the local pose model store")
+    parser.add_argument("--variant", choices=sorted(MOVENET_TFLITE_URLS), default="lightning",
+                        help="MoveNet variant (default: lightning)")
+    parser.add_argument("--format", dest="model_format", choices=MODEL_FORMATS, default="onnx",
+                        help="Model format: onnx runs on onnxruntime, tflite on tflite-runtime or TensorFlow (default: onnx)")
+    parser.add_argument("--model-dir", default=None,
+                        help="Model store (default: $POSE_MODEL_DIR or video_generation/models/pose)")
+    parser.add_argument("--force", action="store_true", help="Replace an existing model")
+    args = parser.parse_args()
+
+    try:
+        provision_pose_model(args.variant, args.model_format, args.model_dir, args.force)
+    except Exception as e:
+        logger.error(f"Could not provision the pose model: {e}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -22,6 +22,7 @@ import random
 from datetime import datetime
 from pathlib import Path
 import traceback
+from concurrent.futures import ThreadPoolExecutor
 
 # Add project root to path
 project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
@@ -31,6 +32,8 @@ sys.path.append(project_root)
 from video_generation.app_ui_manager import get_ui_manager
 from video_generation.wan_avatar_generator import generate_avatar_set
 from video_generation.generate_video import VideoGenerator
+from e2e_cloud.staged_executor import StagedExecutor
+from e2e_cloud.run_manifest import MANIFEST_NAME, latest_run_dir, open_run_manifest
 from scheduling.post_scheduler import schedule_posts
 from video_editing.hooks_templates import HOOK_TEMPLATES
 from video_generation.avatar_config import AVATAR_CONFIGS, VIDEO_SETTINGS
@@ -108,6 +111,9 @@ class ContentPipeline:
         self.generated_scripts = []
         self.generated_videos = []
         
+        # Stage completion record of the current run (see run_full_pipeline)
+        self.manifest = None
+        
         logger.info(f"Initialized ContentPipeline with output directory: {self.output_dir}")
         logger.info(f"Using Wan 2.1 T2V model for avatar generation with GPU type: {self.gpu_type}")
     
@@ -165,83 +171,102 @@ class ContentPipeline:
             
             return default_config
     
-    def run_full_pipeline(self, avatar_name=None, script_count=None, video_count=None, schedule=True, use_trending_music=True):
-        """Run the complete content pipeline using templates."""
+    def run_full_pipeline(self, avatar_name=None, script_count=None, video_count=None, schedule=True, use_trending_music=True,
+                          resume=False):
+        """
+        Run the complete content pipeline using templates.
+        
+        With resume, the run recorded in this output directory's manifest is continued:
+        its scripts are reused and stages whose artifacts still verify are skipped.
+        """
         try:
             logger.info("Starting content pipeline")
             
+            # Durable record of scripts and completed stages, so an interrupted run can be resumed
+            self.manifest = open_run_manifest(
+                os.path.join(self.output_dir, MANIFEST_NAME),
+                resume=resume,
+                settings={"avatar_name": avatar_name, "gpu_type": self.gpu_type}
+            )
+            
             # Validate that UI assets are available or can be generated
             if not self.ui_manager.assets_validated:
                 logger.warning("UI assets not fully validated. Using dynamic generation.")
             
-            # 1. Generate scripts from templates
-            if script_count is None:
-                script_count = self.config["script_generation"]["script_count"]
-            
-            # Select avatar
-            if avatar_name and avatar_name in AVATAR_CONFIGS:
-                avatar_config = AVATAR_CONFIGS[avatar_name]
-                avatars = [avatar_name]
+            # 1. Generate scripts from templates (a resumed run keeps its scripts)
+            scripts = self.manifest.scripts() if resume else []
+            if scripts:
+                logger.info(f"Resuming run {self.manifest.data['run_id']} with its {len(scripts)} scripts")
+                self.generated_scripts = [os.path.join(self.scripts_dir, f"script_{i+1}.json") for i in range(len(scripts))]
             else:
-                # Choose random avatars
-                avatars = list(AVATAR_CONFIGS.keys())
-                random.shuffle(avatars)
-                avatars = avatars[:script_count]
+                if script_count is None:
+                    script_count = self.config["script_generation"]["script_count"]
+            
+                # Select avatar
+                if avatar_name and avatar_name in AVATAR_CONFIGS:
+                    avatar_config = AVATAR_CONFIGS[avatar_name]
+                    avatars = [avatar_name]
+                else:
+                    # Choose random avatars
+                    avatars = list(AVATAR_CONFIGS.keys())
+                    random.shuffle(avatars)
+                    avatars = avatars[:script_count]
                 
-            logger.info(f"Using avatars: {avatars}")
-            logger.info(f"Generating {script_count} scripts from templates")
-            
-            # Generate scripts from templates
-            scripts = []
-            for i in range(script_count):
-                avatar = avatars[i % len(avatars)]
-                avatar_config = AVATAR_CONFIGS[avatar]
+                logger.info(f"Using avatars: {avatars}")
+                logger.info(f"Generating {script_count} scripts from templates")
+            
+                # Generate scripts from templates
+                scripts = []
+                for i in range(script_count):
+                    avatar = avatars[i % len(avatars)]
+                    avatar_config = AVATAR_CONFIGS[avatar]
                 
-                # Select a random food item
-                food_item = random.choice(self.config.get("food_items", [{"name": "avocado toast", "calories": 350}]))
+                    # Select a random food item
+                    food_item = random.choice(self.config.get("food_items", [{"name": "avocado toast", "calories": 350}]))
                 
-                # Select a random hook template
-                hook = random.choice(HOOK_TEMPLATES)
+                    # Select a random hook template
+                    hook = random.choice(HOOK_TEMPLATES)
                 
-                # Get trending music from TikTok Commercial Music Library for this avatar
-                try:
-                    if use_trending_music:
-                        trending_music = get_trending_music_for_avatar(avatar)
-                        logger.info(f"Selected TikTok commercial music for {avatar}: {trending_music}")
-                    else:
+                    # Get trending music from TikTok Commercial Music Library for this avatar
+                    try:
+                        if use_trending_music:
+                            trending_music = get_trending_music_for_avatar(avatar)
+                            logger.info(f"Selected TikTok commercial music for {avatar}: {trending_music}")
+                        else:
+                            trending_music = os.path.join(self.music_dir, "background.mp3")
+                            logger.info(f"Using default background music for {avatar}")
+                    except Exception as e:
+                        logger.warning(f"Error getting trending music: {e}. Using default music.")
                         trending_music = os.path.join(self.music_dir, "background.mp3")
-                        logger.info(f"Using default background music for {avatar}")
-                except Exception as e:
-                    logger.warning(f"Error getting trending music: {e}. Using default music.")
-                    trending_music = os.path.join(self.music_dir, "background.mp3")
                 
-                # Create script - Set concise durations
-                script = {
-                    "avatar": avatar,
-                    "hook": hook,
-                    "feature": "realtime_tracking",  # Always use realtime tracking
-                    "food_item": food_item["name"],
-                    "calories": food_item["calories"],
-                    "protein": food_item.get("protein", 0),
-                    "carbs": food_item.get("carbs", 0),
-                    "fat": food_item.get("fat", 0),
-                    "duration": {
-                        "total": random.randint(10, 13),  # Total video duration
-                        "hook": random.randint(4, 5),     # Hook segment duration
-                        "demo": random.randint(5, 7)      # Demo segment duration
-                    },
-                    "variation": random.choice(list(avatar_config["variations"].keys())),
-                    "music": trending_music
-                }
+                    # Create script - Set concise durations
+                    script = {
+                        "avatar": avatar,
+                        "hook": hook,
+                        "feature": "realtime_tracking",  # Always use realtime tracking
+                        "food_item": food_item["name"],
+                        "calories": food_item["calories"],
+                        "protein": food_item.get("protein", 0),
+                        "carbs": food_item.get("carbs", 0),
+                        "fat": food_item.get("fat", 0),
+                        "duration": {
+                            "total": random.randint(10, 13),  # Total video duration
+                            "hook": random.randint(4, 5),     # Hook segment duration
+                            "demo": random.randint(5, 7)      # Demo segment duration
+                        },
+                        "variation": random.choice(list(avatar_config["variations"].keys())),
+                        "music": trending_music
+                    }
                 
-                scripts.append(script)
+                    scripts.append(script)
                 
-                # Save script
-                script_file = os.path.join(self.scripts_dir, f"script_{i+1}.json")
-                with open(script_file, 'w') as f:
-                    json.dump(script, f, indent=2)
+                    # Save script
+                    script_file = os.path.join(self.scripts_dir, f"script_{i+1}.json")
+                    with open(script_file, 'w') as f:
+                        json.dump(script, f, indent=2)
+                    self.manifest.record_script(f"script_{i+1}", script)
                 
-                self.generated_scripts.append(script_file)
+                    self.generated_scripts.append(script_file)
             
             logger.info(f"Generated {len(scripts)} scripts")
             
@@ -254,118 +279,34 @@ class ContentPipeline:
             
             logger.info(f"Generating {len(selected_scripts)} videos")
             
+            # Avatar generation (GPU) runs ahead of UI demo rendering and composition (CPU),
+            # which run on a worker pool; videos are tracked in script order
+            executor = StagedExecutor(
+                self._generate_script_avatar,
+                self._compose_script_video,
+                queue_size=2,
+                workers=2,
+                name="content_pipeline"
+            )
+            videos = [None] * len(selected_scripts)
+            pending = []
             for i, script in enumerate(selected_scripts):
-                try:
-                    avatar_name = script["avatar"]
-                    
-                    # Generate avatar using Wan 2.1 T2V
-                    logger.info(f"Generating avatar video using Wan 2.1 T2V for {avatar_name}")
-                    avatar_result = generate_avatar_set(
-                        avatar_name,
-                        style=script["variation"],
-                        output_dir=os.path.join(self.output_dir, "avatars", avatar_name),
-                        model_dir=self.wan_model_dir,
-                        resolution=self.config["video_generation"]["wan_settings"].get("resolution", "720p"),
-                        gpu_type=self.gpu_type
-                    )
-                    
-                    if "error" in avatar_result:
-                        logger.error(f"Error generating avatar: {avatar_result['error']}")
-                        continue
-                    
-                    # Extract food item from script
-                    food_item = {
-                        "name": script["food_item"],
-                        "calories": script["calories"],
-                        "protein": script["protein"],
-                        "carbs": script["carbs"],
-                        "fat": script["fat"]
-                    }
-                    
-                    # Generate UI demo specifically for real-time tracking
-                    logger.info(f"Generating UI demo for real-time tracking of {food_item['name']}")
-                    ui_demo_path = os.path.join(
-                        self.output_dir, 
-                        "ui_demos", 
-                        f"{avatar_name}_{food_item['name'].replace(' ', '_').lower()}_demo.mp4"
-                    )
-                    os.makedirs(os.path.dirname(ui_demo_path), exist_ok=True)
-                    
-                    # Create concise UI demo (5-7 seconds)
-                    ui_demo = self.ui_manager.create_feature_demo(
-                        feature="realtime_tracking",
-                        output_path=ui_demo_path,
-                        food_item=food_item,
-                        duration=script["duration"]["demo"]  # Use the specific demo duration from script
-                    )
-                    
-                    if not ui_demo or not os.path.exists(ui_demo):
-                        logger.error(f"Failed to generate UI demo for {avatar_name}")
-                        continue
-                    
-                    # Split the avatar video to extract the hook segment
-                    hook_duration = script["duration"]["hook"]
-                    avatar_video = avatar_result["avatar_video"]
-                    hook_segment_path = os.path.join(
-                        self.output_dir, 
-                        "segments", 
-                        f"{avatar_name}_hook.mp4"
-                    )
-                    os.makedirs(os.path.dirname(hook_segment_path), exist_ok=True)
-                    
-                    # Extract the hook segment
-                    logger.info(f"Extracting hook segment for {avatar_name} ({hook_duration}s)")
-                    hook_segment = self.video_generator.extract_segment(
-                        avatar_video,
-                        hook_segment_path,
-                        duration=hook_duration
-                    )
-                    
-                    if not hook_segment or not os.path.exists(hook_segment):
-                        logger.error(f"Failed to extract hook segment for {avatar_name}")
-                        continue
-                    
-                    # Combine hook and demo segments
-                    final_video_path = os.path.join(
-                        self.videos_dir, 
-                        f"{avatar_name}_{script['food_item'].replace(' ', '_').lower()}.mp4"
-                    )
-                    
-                    logger.info(f"Combining hook and demo for {avatar_name}")
-                    final_video = self.video_generator.combine_segments(
-                        [hook_segment, ui_demo],
-                        final_video_path,
-                        transition="fade"
-                    )
-                    
-                    if not final_video or not os.path.exists(final_video):
-                        logger.error(f"Failed to create final video for {avatar_name}")
-                        continue
-                    
-                    # Add hook text overlay
-                    logger.info(f"Adding hook text overlay for {avatar_name}")
-                    hook_text = script["hook"]
-                    final_video_with_text = self.video_generator.add_text_overlay(
-                        final_video,
-                        final_video_path,
-                        text=hook_text,
-                        position="bottom",
-                        start_time=1.0,
-                        duration=hook_duration - 1.5
-                    )
-                    
-                    # Track the generated video
-                    self.generated_videos.append({
-                        "path": final_video_with_text,
-                        "avatar": avatar_name,
-                        "script": script
-                    })
-                    
-                    logger.info(f"Successfully generated video for {avatar_name}: {final_video_with_text}")
-                    
-                except Exception as e:
-                    logger.error(f"Error generating video for {avatar_name}: {e}")
-                    logger.error(traceback.format_exc())
+                done = self.manifest.completed_stage(f"script_{i+1}", "video")
+                if done:
+                    videos[i] = {"path": done["video"], "avatar": script["avatar"], "script": script}
+                else:
+                    pending.append((i, script))
+            logger.info(f"{len(selected_scripts) - len(pending)} videos already completed, {len(pending)} to generate")
+            
+            for index, ((i, script), video) in enumerate(zip(pending, executor.run(pending))):
+                if video is None:
+                    self.manifest.fail_stage(f"script_{i+1}", "video", executor.errors.get(index, "see log"))
+                videos[i] = video
+            self.generated_videos.extend(video for video in videos if video)
+            logger.info(f"Run manifest {self.manifest.path}: {self.manifest.stats()}")
+            # A run with every video produced is complete; otherwise --resume continues it
+            if all(videos):
+                self.manifest.finish()
             
             logger.info(f"Generated {len(self.generated_videos)} videos")
             
@@ -383,6 +324,156 @@ class ContentPipeline:
             logger.error(traceback.format_exc())
             return {"error": str(e)}
 
+    def _generate_script_avatar(self, entry):
+        """
+        GPU stage of run_pipeline: the avatar clip for a script.
+        
+        Args:
+            entry (tuple): (script index, script)
+            
+        Returns:
+            dict: generate_avatar_set result, or None on failure
+        """
+        i, script = entry
+        avatar_name = script["avatar"]
+        
+        done = self.manifest.completed_stage(f"script_{i+1}", "avatar")
+        if done:
+            return {"avatar_video": done["avatar_video"]}
+        
+        # Generate avatar using Wan 2.1 T2V; one directory per script, so the next clip of the
+        # same avatar cannot overwrite one that is still being composed
+        logger.info(f"Generating avatar video using Wan 2.1 T2V for {avatar_name}")
+        avatar_result = generate_avatar_set(
+            avatar_name,
+            style=script["variation"],
+            output_dir=os.path.join(self.output_dir, "avatars", avatar_name, f"script_{i+1}"),
+            model_dir=self.wan_model_dir,
+            resolution=self.config["video_generation"]["wan_settings"].get("resolution", "720p"),
+            gpu_type=self.gpu_type
+        )
+        
+        if "error" in avatar_result:
+            logger.error(f"Error generating avatar: {avatar_result['error']}")
+            self.manifest.fail_stage(f"script_{i+1}", "avatar", avatar_result["error"])
+            return None
+        self.manifest.complete_stage(f"script_{i+1}", "avatar", {"avatar_video": avatar_result["avatar_video"]})
+        return avatar_result
+    
+    def _compose_script_video(self, entry, avatar_result):
+        """
+        CPU stage of run_pipeline: UI demo, hook extraction, composition and hook text.
+        
+        Args:
+            entry (tuple): (script index, script)
+            avatar_result (dict): Output of _generate_script_avatar
+            
+        Returns:
+            dict: Generated video record, or None on failure
+        """
+        i, script = entry
+        avatar_name = script["avatar"]
+        try:
+            # Extract food item from script
+            food_item = {
+                "name": script["food_item"],
+                "calories": script["calories"],
+                "protein": script["protein"],
+                "carbs": script["carbs"],
+                "fat": script["fat"]
+            }
+            
+            # Generate UI demo specifically for real-time tracking
+            logger.info(f"Generating UI demo for real-time tracking of {food_item['name']}")
+            ui_demo_path = os.path.join(
+                self.output_dir, 
+                "ui_demos", 
+                f"{avatar_name}_{food_item['name'].replace(' ', '_').lower()}_{i+1}_demo.mp4"
+            )
+            os.makedirs(os.path.dirname(ui_demo_path), exist_ok=True)
+            
+            # Create concise UI demo (5-7 seconds)
+            ui_demo = self.ui_manager.create_feature_demo(
+                feature="realtime_tracking",
+                output_path=ui_demo_path,
+                food_item=food_item,
+                duration=script["duration"]["demo"]  # Use the specific demo duration from script
+            )
+            
+            if not ui_demo or not os.path.exists(ui_demo):
+                logger.error(f"Failed to generate UI demo for {avatar_name}")
+                return None
+            
+            # Split the avatar video to extract the hook segment
+            hook_duration = script["duration"]["hook"]
+            avatar_video = avatar_result["avatar_video"]
+            hook_segment_path = os.path.join(
+                self.output_dir, 
+                "segments", 
+                f"{avatar_name}_hook_{i+1}.mp4"
+            )
+            os.makedirs(os.path.dirname(hook_segment_path), exist_ok=True)
+            
+            # Extract the hook segment
+            logger.info(f"Extracting hook segment for {avatar_name} ({hook_duration}s)")
+            hook_segment = self.video_generator.extract_segment(
+                avatar_video,
+                hook_segment_path,
+                duration=hook_duration
+            )
+            
+            if not hook_segment or not os.path.exists(hook_segment):
+                logger.error(f"Failed to extract hook segment for {avatar_name}")
+                return None
+            
+            # Combine hook and demo segments
+            final_video_path = os.path.join(
+                self.videos_dir, 
+                f"{avatar_name}_{script['food_item'].replace(' ', '_').lower()}_{i+1}.mp4"
+            )
+            
+            logger.info(f"Combining hook and demo for {avatar_name}")
+            final_video = self.video_generator.combine_segments(
+                [hook_segment, ui_demo],
+                final_video_path,
+                transition="fade"
+            )
+            
+            if not final_video or not os.path.exists(final_video):
+                logger.error(f"Failed to create final video for {avatar_name}")
+                return None
+            
+            # Add hook text overlay
+            logger.info(f"Adding hook text overlay for {avatar_name}")
+            hook_text = script["hook"]
+            final_video_with_text = self.video_generator.add_text_overlay(
+                final_video,
+                final_video_path,
+                text=hook_text,
+                position="bottom",
+                start_time=1.0,
+                duration=hook_duration - 1.5
+            )
+            
+            logger.info(f"Successfully generated video for {avatar_name}: {final_video_with_text}")
+            self.manifest.complete_stage(f"script_{i+1}", "video", {
+                "video": final_video_with_text,
+                "ui_demo": ui_demo,
+                "hook_segment": hook_segment
+            })
+            
+            # Track the generated video
+            return {
+                "path": final_video_with_text,
+                "avatar": avatar_name,
+                "script": script
+            }
+            
+        except Exception as e:
+            logger.error(f"Error generating video for {avatar_name}: {e}")
+            logger.error(traceback.format_exc())
+            return None
+
     def generate_single_video(self, script, avatar_name=None):
         """Generate a single video from a script using Wan 2.1 T2V."""
         try:
@@ -414,21 +505,6 @@ class ContentPipeline:
                 }
                 logger.info(f"Converted duration to new format: {script['duration']}")
             
-            # Generate avatar using Wan 2.1 T2V
-            logger.info(f"Generating avatar video using Wan 2.1 T2V for {avatar}")
-            avatar_result = generate_avatar_set(
-                avatar,
-                style=script["variation"],
-                output_dir=os.path.join(self.output_dir, "avatars", avatar),
-                model_dir=self.wan_model_dir,
-                resolution=self.config["video_generation"]["wan_settings"].get("resolution", "720p"),
-                gpu_type=self.gpu_type
-            )
-            
-            if "error" in avatar_result:
-                logger.error(f"Error generating avatar: {avatar_result['error']}")
-                return None
-            
             # Extract food item from script
             food_item = {
                 "name": script.get("food_item", "avocado toast"),
@@ -448,13 +524,34 @@ class ContentPipeline:
             )
             os.makedirs(os.path.dirname(ui_demo_path), exist_ok=True)
             
-            # Create UI demo with specific duration from script
-            ui_demo = self.ui_manager.create_feature_demo(
+            # Create UI demo with specific duration from script; it only needs the CPU,
+            # so it renders while the GPU generates the avatar
+            demo_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="ui_demo")
+            ui_demo_future = demo_pool.submit(
+                self.ui_manager.create_feature_demo,
                 feature="realtime_tracking",
                 output_path=ui_demo_path,
                 food_item=food_item,
                 duration=script["duration"]["demo"]
             )
+            demo_pool.shutdown(wait=False)
+            
+            # Generate avatar using Wan 2.1 T2V
+            logger.info(f"Generating avatar video using Wan 2.1 T2V for {avatar}")
+            avatar_result = generate_avatar_set(
+                avatar,
+                style=script["variation"],
+                output_dir=os.path.join(self.output_dir, "avatars", avatar),
+                model_dir=self.wan_model_dir,
+                resolution=self.config["video_generation"]["wan_settings"].get("resolution", "720p"),
+                gpu_type=self.gpu_type
+            )
+            
+            ui_demo = ui_demo_future.result()
+            
+            if "error" in avatar_result:
+                logger.error(f"Error generating avatar: {avatar_result['error']}")
+                return None
             
             if not ui_demo or not os.path.exists(ui_demo):
                 logger.error(f"Failed to generate UI demo for {avatar}")
@@ -576,6 +673,10 @@ def main():
     parser.add_argument('--archive', action='store_true',
                         help='Create a ZIP archive of generated videos')
     
+    # Resume options
+    parser.add_argument('--resume', nargs='?', const='latest', default=None, metavar='RUN_DIR',
+                        help='Continue an interrupted run: RUN_DIR, --output-dir, or the latest run under output/')
+    
     # Parse arguments
     args = parser.parse_args()
     
@@ -584,9 +685,20 @@ def main():
         os.environ["RAPIDAPI_KEY"] = args.rapidapi_key
         logger.info(f"Set RAPIDAPI_KEY environment variable with provided key")
     
+    # Pick the run to resume
+    output_dir = args.output_dir
+    if args.resume:
+        if args.resume != 'latest':
+            output_dir = args.resume
+        elif output_dir is None:
+            output_dir = latest_run_dir(os.path.join(project_root, "output"))
+            if output_dir is None:
+                logger.warning("No previous run found to resume, starting a new run")
+        logger.info(f"Resuming run in {output_dir}")
+    
     # Initialize pipeline
     pipeline = ContentPipeline(
-        output_dir=args.output_dir,
+        output_dir=output_dir,
         config_file=args.config,
         gpu_type=args.gpu_type,
         rapidapi_key=args.rapidapi_key
@@ -598,7 +710,8 @@ def main():
         script_count=args.script_count,
         video_count=args.video_count,
         schedule=args.schedule,
-        use_trending_music=args.use_trending_music
+        use_trending_music=args.use_trending_music,
+        resume=bool(args.resume)
     )
     
     # Archive videos if requested
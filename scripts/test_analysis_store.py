@@ -0,0 +1,212 @@
+#!/usr/bin/env python3
+import os
+import sys
+import json
+import logging
+import sqlite3
+import tempfile
+import contextlib
+from pathlib import Path
+
+# Add parent directory to path for imports
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(PROJECT_ROOT)
+
+from video_editing.analysis_store import AnalysisStore
+from video_editing.video_analyzer import VideoAnalyzer
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='[%(asctime)s] %(levelname)s: %(message)s'
+)
+
+
+def committed_keys(db_path, namespace):
+    """Keys another connection sees, i.e. the committed records."""
+    conn = sqlite3.connect(db_path)
+    try:
+        return sorted(row[0] for row in conn.execute("SELECT key FROM analysis WHERE namespace = ?", (namespace,)))
+    finally:
+        conn.close()
+
+
+@contextlib.contextmanager
+def working_directory(path):
+    """Run in path, so the analyzer's default data/ files land there instead of in the repo."""
+    cwd = os.getcwd()
+    os.chdir(path)
+    try:
+        yield
+    finally:
+        os.chdir(cwd)
+
+
+def test_insert_and_lookup():
+    """Records are read back by key, by namespace and by fingerprint; upserts replace them."""
+    logging.info("Starting analysis store lookup test...")
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        with AnalysisStore(os.path.join(tmp_dir, "analysis.db")) as store:
+            store.upsert('video_records', 'a.mp4', {'duration': 1.0}, fingerprint="stat:1:1", settings="grab")
+            store.upsert('video_records', 'b.mp4', {'duration': 2.0}, fingerprint="stat:2:2", settings="grab")
+
+            assert store.get('video_records', 'a.mp4') == {'duration': 1.0}
+            assert store.get('video_records', 'missing.mp4') is None
+            assert store.get_all('video_records') == {'a.mp4': {'duration': 1.0}, 'b.mp4': {'duration': 2.0}}
+            assert store.find_by_fingerprint('video_records', "stat:2:2") == {'duration': 2.0}, \
+                "A record must be found by its fingerprint (e.g. a renamed file)"
+            assert store.find_by_fingerprint('video_records', "stat:9:9") is None
+
+            # An upsert replaces the record and its fingerprint
+            store.upsert('video_records', 'a.mp4', {'duration': 3.0}, fingerprint="stat:1:2", settings="grab")
+            assert store.count('video_records') == 2
+            assert store.get('video_records', 'a.mp4') == {'duration': 3.0}
+            assert store.find_by_fingerprint('video_records', "stat:1:1") is None, "The old fingerprint must be gone"
+            assert store.find_by_fingerprint('video_records', "stat:1:2") == {'duration': 3.0}
+
+            store.delete('video_records', ['b.mp4'])
+            assert store.keys('video_records') == ['a.mp4']
+    logging.info("Analysis store lookup test passed")
+    return True
+
+
+def test_namespace_isolation():
+    """The same key in two namespaces holds two records; namespace views only see their own."""
+    logging.info("Starting analysis store namespace test...")
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        with AnalysisStore(os.path.join(tmp_dir, "analysis.db")) as store:
+            records = store.namespace('video_records')
+            poses = store.namespace('poses')
+            records['clip.mp4'] = {'duration': 5.0}
+            poses['clip.mp4'] = {'keypoints': [1, 2, 3]}
+            poses['other.mp4'] = {'keypoints': []}
+
+            assert records['clip.mp4'] == {'duration': 5.0}
+            assert poses['clip.mp4'] == {'keypoints': [1, 2, 3]}
+            assert len(records) == 1 and len(poses) == 2
+            assert sorted(poses) == ['clip.mp4', 'other.mp4']
+            assert 'other.mp4' not in records
+
+            del poses['clip.mp4']
+            assert 'clip.mp4' in records, "Deleting from one namespace must not touch another"
+            try:
+                del records['other.mp4']
+                raise AssertionError("Deleting a key of another namespace must raise KeyError")
+            except KeyError:
+                pass
+    logging.info("Analysis store namespace test passed")
+    return True
+
+
+def test_wal_reopen():
+    """The store runs in WAL mode and committed records survive closing and reopening it."""
+    logging.info("Starting analysis store reopen test...")
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        db_path = os.path.join(tmp_dir, "analysis.db")
+        store = AnalysisStore(db_path)
+        mode = store._conn.execute("PRAGMA journal_mode").fetchone()[0]
+        assert mode.lower() == "wal", f"Expected WAL journal mode, got {mode}"
+        for i in range(120):
+            store.upsert('video_records', f"clip_{i:03d}.mp4", {'index': i}, fingerprint=f"stat:{i}")
+        # Closing commits the writes still pending after the last full batch
+        store.close()
+
+        reopened = AnalysisStore(db_path)
+        try:
+            assert reopened.count('video_records') == 120, f"Reopened store holds {reopened.count('video_records')}"
+            assert reopened.get('video_records', 'clip_119.mp4') == {'index': 119}
+            assert reopened.find_by_fingerprint('video_records', "stat:57") == {'index': 57}
+        finally:
+            reopened.close()
+    logging.info("Analysis store reopen test passed")
+    return True
+
+
+def test_per_record_commit():
+    """Batched writes stay pending until flushed; VideoAnalyzer commits every record as it is stored."""
+    logging.info("Starting analysis store commit test...")
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        db_path = os.path.join(tmp_dir, "analysis.db")
+        with AnalysisStore(db_path, batch_size=3) as store:
+            store.upsert('video_records', 'a.mp4', {'duration': 1.0})
+            store.upsert('video_records', 'b.mp4', {'duration': 2.0})
+            assert committed_keys(db_path, 'video_records') == [], "Writes below the batch size must be pending"
+            store.upsert('video_records', 'c.mp4', {'duration': 3.0})
+            assert committed_keys(db_path, 'video_records') == ['a.mp4', 'b.mp4', 'c.mp4'], \
+                "A full batch must be committed"
+            store.upsert('video_records', 'd.mp4', {'duration': 4.0})
+            store.flush()
+            assert 'd.mp4' in committed_keys(db_path, 'video_records'), "flush() must commit pending writes"
+
+        # The analyzer's streaming path: each record is visible to other processes once stored
+        training_dir = os.path.join(tmp_dir, "training_videos")
+        analyzer = VideoAnalyzer(training_videos_dir=training_dir,
+                                 cache_file=os.path.join(tmp_dir, "style_patterns.json"))
+        assert not analyzer.store_file.exists(), "The store must not be created before it is used"
+        record = {'duration': 1.0, 'brightness': [100.0], 'contrast': [50.0], 'transitions': {'cut': 1},
+                  'text_positions': [(0.5, 0.8)], 'audio_levels': [0.5]}
+        for i in range(3):
+            analyzer._store_video_record(f"clip_{i}.mp4", record, fingerprint=f"stat:{i}")
+            assert committed_keys(str(analyzer.store_file), 'video_records') == [f"clip_{j}.mp4" for j in range(i + 1)], \
+                f"Record {i} must be committed as soon as it is stored"
+        analyzer.store.close()
+    logging.info("Analysis store commit test passed")
+    return True
+
+
+def test_legacy_video_cache():
+    """A legacy video_analysis_cache.json is not imported and is removed once the store is opened."""
+    logging.info("Starting legacy video cache test...")
+    from video_generation.generate_video import VideoGenerator
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        cache_dir = os.path.join(tmp_dir, "video_cache")
+        os.makedirs(cache_dir)
+        legacy_file = os.path.join(cache_dir, "video_analysis_cache.json")
+        with open(legacy_file, "w") as f:
+            json.dump({"old.mp4": {"duration": 9.0}}, f)
+
+        with working_directory(tmp_dir):
+            generator = VideoGenerator(output_dir=os.path.join(tmp_dir, "videos"),
+                                       training_videos_dir=os.path.join(tmp_dir, "training_videos"),
+                                       cache_dir=cache_dir)
+            cache = generator.video_cache
+            assert "old.mp4" not in cache, "Legacy entries must not be imported"
+            assert not os.path.exists(legacy_file), "The legacy cache file must be removed"
+            generator.video_analyzer.store.close()
+    logging.info("Legacy video cache test passed")
+    return True
+
+
+def test_shared_analyzer():
+    """A VideoGenerator and a VideoEditor over the same training videos share one analyzer and store."""
+    logging.info("Starting shared analyzer test...")
+    from video_generation.generate_video import VideoGenerator
+    from video_editing.edit_video import VideoEditor
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        # Both default to data/style_patterns.json (and its .db store) relative to the working directory
+        with working_directory(tmp_dir):
+            training_dir = os.path.join(tmp_dir, "training_videos")
+            generator = VideoGenerator(output_dir=os.path.join(tmp_dir, "videos"),
+                                       training_videos_dir=training_dir,
+                                       cache_dir=os.path.join(tmp_dir, "video_cache"))
+            editor = VideoEditor(workspace_dir=os.path.join(tmp_dir, "workspace"),
+                                 music_dir=os.path.join(tmp_dir, "music"),
+                                 training_videos_dir=training_dir)
+            analyzer = generator.video_analyzer
+            assert analyzer is editor.analyzer, "VideoGenerator and VideoEditor must share one analyzer"
+            assert analyzer.store_file.resolve() == (Path(tmp_dir) / "data" / "style_patterns.db").resolve(), \
+                f"Unexpected analysis store {analyzer.store_file}"
+            logging.info(f"Shared analyzer store: {analyzer.store_file}")
+    logging.info("Shared analyzer test passed")
+    return True
+
+
+if __name__ == "__main__":
+    test_insert_and_lookup()
+    test_namespace_isolation()
+    test_wal_reopen()
+    test_per_record_commit()
+    test_legacy_video_cache()
+    test_shared_analyzer()
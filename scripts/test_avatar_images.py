@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+import os
+import sys
+import logging
+import tempfile
+from pathlib import Path
+from types import SimpleNamespace
+
+from PIL import Image
+
+# Add parent directory to path for imports
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(PROJECT_ROOT)
+
+from video_generation.avatar_config import AVATAR_CONFIGS
+from video_generation.generate_avatar import AvatarGenerator
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='[%(asctime)s] %(levelname)s: %(message)s'
+)
+
+
+class FakePipeline:
+    """Stand-in for the Stable Diffusion pipeline: runs out of memory above max_images per call."""
+
+    def __init__(self, max_images):
+        self.max_images = max_images
+        self.calls = []
+
+    def __call__(self, prompt, negative_prompt, num_images_per_prompt=1, generator=None, **kwargs):
+        images = [p for p in prompt for _ in range(num_images_per_prompt)]
+        self.calls.append({"prompts": len(prompt), "images": len(images),
+                           "generators": None if generator is None else [g.seed for g in generator]})
+        if len(images) > self.max_images:
+            raise RuntimeError("CUDA out of memory. Tried to allocate 2.00 GiB")
+        return SimpleNamespace(images=[Image.new("RGB", (8, 8), (len(p) % 256, 0, 0)) for p in images])
+
+
+def make_generator(output_dir, max_images, max_batch=8):
+    """AvatarGenerator around a fake pipeline, without loading a model."""
+    generator = AvatarGenerator.__new__(AvatarGenerator)
+    generator.output_dir = Path(output_dir)
+    generator.max_batch = max_batch
+    generator.batch_item_memory_gb = 2.0
+    generator.model_path = "fake-model"
+    generator.embedding_cache = None
+    generator.pipe = FakePipeline(max_images)
+    # Seeded generators that record their seed, so the test runs without torch
+    generator._seed_generators = lambda batch: (
+        [SimpleNamespace(seed=r["seed"]) for r in batch] if any(r["seed"] is not None for r in batch) else None)
+    return generator
+
+
+def test_batched_images():
+    """Prompts are batched together, an out-of-memory batch is halved, every image is kept in order."""
+    logging.info("Starting batched avatar image test...")
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        generator = make_generator(tmp_dir, max_images=3)
+        prompts = ["professional woman", "woman cooking", "woman eating salad"]
+        results = generator.generate_images(prompts, "blurry", num_images_per_prompt=2,
+                                            seeds=[1, 2, 3, 4, 5, 6], max_batch_size=6)
+        calls = generator.pipe.calls
+        logging.info(f"Pipeline calls: {calls}")
+        assert [call["images"] for call in calls] == [6, 3, 3], \
+            "Expected one batch of 6 images, halved once after running out of memory"
+        assert [call["generators"] for call in calls] == [[1, 2, 3, 4, 5, 6], [1, 2, 3], [4, 5, 6]], \
+            "Expected one seeded generator per image, in image order"
+        assert [r["prompt"] for r in results] == [p for p in prompts for _ in range(2)], "Results must be in prompt order"
+        assert [r["seed"] for r in results] == [1, 2, 3, 4, 5, 6] and all(r["image"] is not None for r in results), \
+            "Every image must be generated with its own seed"
+
+        # A single prompt is encoded once for all of its images
+        generator.pipe.calls = []
+        generator.generate_images(["professional woman"], "blurry", num_images_per_prompt=3, max_batch_size=3)
+        assert generator.pipe.calls == [{"prompts": 1, "images": 3, "generators": None}], \
+            f"Expected one prompt with 3 images per prompt, got {generator.pipe.calls}"
+
+        # A full avatar set is one batched run, saved under the usual file names
+        generator = make_generator(tmp_dir, max_images=4, max_batch=4)
+        generator.max_batch_size = lambda: 4  # as if four images fit in free GPU memory
+        generator.generate_avatar_set("emma", num_variations=2)
+        saved = sorted(os.listdir(os.path.join(tmp_dir, "emma")))
+        expected = sorted(f"{prefix}_{i}.png" for prefix in ["base", *AVATAR_CONFIGS["emma"]["variations"]]
+                          for i in (1, 2))
+        logging.info(f"Saved {len(saved)} images in {len(generator.pipe.calls)} pipeline calls")
+        assert saved == expected, f"Expected {expected}, saved {saved}"
+        assert [call["images"] for call in generator.pipe.calls] == [4, 4], \
+            "Expected the base and variation prompts to share batches of max_batch images"
+
+    logging.info("Batched avatar image test passed")
+    return True
+
+
+def test_seed_generators():
+    """Seeded batches get one torch generator per image; unseeded batches need no torch at all."""
+    logging.info("Starting avatar seed generator test...")
+    generator = AvatarGenerator.__new__(AvatarGenerator)
+    assert generator._seed_generators([{"seed": None}, {"seed": None}]) is None, "Unseeded batches need no generators"
+    try:
+        import torch
+    except ImportError:
+        logging.warning("torch not installed, skipping the seeded torch.Generator check")
+        return True
+    generators = generator._seed_generators([{"seed": 7}, {"seed": None}, {"seed": 7}])
+    assert len(generators) == 3 and all(isinstance(g, torch.Generator) for g in generators)
+    assert generators[0].initial_seed() == generators[2].initial_seed() == 7
+    logging.info("Avatar seed generator test passed")
+    return True
+
+
+if __name__ == "__main__":
+    test_batched_images()
+    test_seed_generators()
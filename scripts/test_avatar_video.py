@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+import os
+import sys
+import shutil
+import logging
+import tempfile
+
+import cv2
+import numpy as np
+from PIL import Image, ImageDraw
+
+# Add parent directory to path for imports
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(PROJECT_ROOT)
+
+from video_generation.generate_avatar import create_avatar_video, ken_burns_matrices, vertical_gradient
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='[%(asctime)s] %(levelname)s: %(message)s'
+)
+
+
+def read_frame(video_path, index):
+    cap = cv2.VideoCapture(video_path)
+    cap.set(cv2.CAP_PROP_POS_FRAMES, index)
+    ret, frame = cap.read()
+    frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    fourcc = int(cap.get(cv2.CAP_PROP_FOURCC)).to_bytes(4, "little").decode(errors="replace")
+    cap.release()
+    return (frame if ret else None), frames, fourcc
+
+
+def test_vertical_gradient():
+    """The broadcast gradient is pixel-identical to drawing it line by line."""
+    logging.info("Starting vertical gradient test...")
+    size = 256
+    drawn = Image.new('RGB', (size, size))
+    draw = ImageDraw.Draw(drawn)
+    for y in range(size):
+        draw.line([(0, y), (size, y)], fill=(int(200 + 55 * (y / size)), int(200 + 55 * (1 - y / size)),
+                                             int(200 + 55 * (0.5 - abs(0.5 - y / size)))))
+    gradient = vertical_gradient(size, size, lambda t: 200 + 55 * t, lambda t: 200 + 55 * (1 - t),
+                                 lambda t: 200 + 55 * (0.5 - abs(0.5 - t)))
+    if not np.array_equal(np.array(drawn), np.array(gradient)):
+        logging.error("Vertical gradient test failed: gradient differs from the line-drawn one")
+        return False
+    logging.info("Vertical gradient test passed")
+    return True
+
+
+def test_avatar_video():
+    """The ffmpeg zoompan clip is H.264 and follows the same motion as the affine-warp path."""
+    logging.info("Starting avatar video test...")
+    if shutil.which("ffmpeg") is None:
+        logging.warning("ffmpeg not found, skipping the avatar video test")
+        return True
+    ok = True
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        image = vertical_gradient(1024, 1024, lambda t: 180 + 70 * t, lambda t: 180 + 70 * (1 - t), 220)
+        ImageDraw.Draw(image).ellipse((300, 200, 700, 700), fill=(120, 60, 40))
+        image_path = os.path.join(tmp_dir, "avatar.png")
+        image.save(image_path)
+
+        video_path = create_avatar_video(image_path, "test_avatar_video", duration=2.0)
+        if not video_path:
+            logging.error("Avatar video test failed: no video")
+            return False
+        try:
+            frame, frames, fourcc = read_frame(video_path, 30)
+        finally:
+            os.remove(video_path)
+
+    logging.info(f"{frames} frames, codec {fourcc}")
+    if frames != 60 or fourcc.lower() not in ("avc1", "h264"):
+        logging.error("Expected 60 H.264 frames")
+        ok = False
+
+    # Same frame rendered with the affine-warp path
+    still = cv2.cvtColor(np.array(image.resize((1080, 1920), Image.LANCZOS)), cv2.COLOR_RGB2BGR)
+    expected = cv2.warpAffine(still, ken_burns_matrices(1080, 1920, 60)[30], (1080, 1920),
+                              flags=cv2.INTER_LINEAR | cv2.WARP_INVERSE_MAP, borderMode=cv2.BORDER_REPLICATE)
+    difference = np.abs(frame.astype(np.int16) - expected.astype(np.int16)).mean() if frame is not None else 255
+    logging.info(f"Mean difference to the affine-warp frame: {difference:.2f}")
+    if difference > 4:
+        logging.error("The ffmpeg and affine-warp paths must produce the same motion")
+        ok = False
+
+    if ok:
+        logging.info("Avatar video test passed")
+    else:
+        logging.error("Avatar video test failed")
+    return ok
+
+
+if __name__ == "__main__":
+    ok = test_vertical_gradient()
+    ok &= test_avatar_video()
+    sys.exit(0 if ok else 1)
@@ -0,0 +1,219 @@
+#!/usr/bin/env python3
+import os
+import sys
+import logging
+import tempfile
+import threading
+
+import numpy as np
+
+# Add parent directory to path for imports
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(PROJECT_ROOT)
+
+from video_generation import clip_index
+from video_generation.clip_index import ClipIndex, clip_energy
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='[%(asctime)s] %(levelname)s: %(message)s'
+)
+
+
+def make_records(count, brightness, version):
+    """Per-video records as VideoAnalyzer keeps them; each clip's boundaries end at its duration."""
+    return {
+        f"clip_{i:03d}.mp4": {
+            'duration': 10.0 + i,
+            'brightness': [brightness],
+            'contrast': [brightness],
+            'transitions': {'cut': i % 3},
+            'segment_boundaries': [0.0, 5.0, 10.0 + i],
+            'fingerprint': f"{i}:{version}",
+            'settings': "grab"
+        }
+        for i in range(count)
+    }
+
+
+def test_concurrent_sync_and_query():
+    """Queries running while another thread re-syncs the index always see one consistent version of it."""
+    logging.info("Starting clip index concurrency test...")
+    index = ClipIndex()
+    # Two training sets of different sizes and energies, swapped back and forth
+    versions = [make_records(300, 100.0, "a"), make_records(120, 140.0, "b")]
+    index.sync(versions[0])
+    errors = []
+    stop = threading.Event()
+
+    def sync_loop():
+        i = 0
+        while not stop.is_set():
+            i += 1
+            index.sync(versions[i % 2])
+
+    def query_loop():
+        try:
+            for _ in range(300):
+                for energy in (100.0 / 255, 140.0 / 255):
+                    for clip in index.find_clips(energy, tolerance=0.05):
+                        # A clip's boundaries must belong to that clip
+                        if clip['segment_boundaries'][-1] != clip['duration']:
+                            errors.append(f"{clip['path']}: boundaries {clip['segment_boundaries']} "
+                                          f"for duration {clip['duration']}")
+                            return
+        except Exception as e:
+            errors.append(repr(e))
+
+    syncer = threading.Thread(target=sync_loop)
+    queries = [threading.Thread(target=query_loop) for _ in range(3)]
+    syncer.start()
+    for thread in queries:
+        thread.start()
+    for thread in queries:
+        thread.join()
+    stop.set()
+    syncer.join()
+
+    assert not errors, f"Clip index concurrency test failed: {errors[0] if errors else ''}"
+    logging.info("Clip index concurrency test passed")
+    return True
+
+
+def random_records(rng, count, version="v1"):
+    """Per-video records with random stats, durations and segment boundaries."""
+    records = {}
+    for i in range(count):
+        duration = float(rng.uniform(2.0, 30.0))
+        cuts = np.sort(rng.uniform(0.0, duration, size=int(rng.integers(0, 5)))).tolist()
+        records[f"creator_{i % 7}/clip_{i:04d}.mp4"] = {
+            'duration': duration,
+            'brightness': rng.uniform(0, 255, size=10).tolist(),
+            'contrast': rng.uniform(0, 120, size=10).tolist(),
+            'transitions': {'cut': int(rng.integers(0, 6)), 'fade': int(rng.integers(0, 3))},
+            'segment_boundaries': [0.0] + cuts + [duration],
+            'fingerprint': f"stat:{i}:{version}",
+            'settings': "grab:None:seg4.0"
+        }
+    return records
+
+
+def brute_force(records, target_energy, tolerance, min_duration):
+    """find_clips by a plain scan over the records: paths and boundaries of the matches."""
+    matches = {}
+    for path, record in records.items():
+        energy = clip_energy(float(np.mean(record['brightness'])), float(np.mean(record['contrast'])))
+        if abs(energy - target_energy) < tolerance and record['duration'] >= min_duration:
+            matches[path] = record['segment_boundaries']
+    return matches
+
+
+def indexed(index, target_energy, tolerance, min_duration):
+    return {clip['path']: clip['segment_boundaries']
+            for clip in index.find_clips(target_energy, tolerance=tolerance, min_duration=min_duration)}
+
+
+def check_queries(index, records, rng, queries=200):
+    """Compare find_clips with the brute-force scan for random targets, tolerances and durations."""
+    matched = 0
+    for _ in range(queries):
+        target, tolerance, min_duration = rng.uniform(0, 1), rng.uniform(0.0, 0.3), rng.uniform(0, 25)
+        expected = brute_force(records, target, tolerance, min_duration)
+        got = indexed(index, target, tolerance, min_duration)
+        assert got.keys() == expected.keys(), \
+            f"find_clips({target:.3f}, {tolerance:.3f}, {min_duration:.1f}) differs from the scan: " \
+            f"{sorted(got.keys() ^ expected.keys())[:5]}"
+        for path, boundaries in expected.items():
+            assert np.allclose(got[path], boundaries), f"Boundaries of {path} differ from its record"
+        matched += len(expected)
+    return matched
+
+
+def test_range_queries():
+    """Range queries return exactly the clips a brute-force filter over the records finds."""
+    logging.info("Starting clip index range query test...")
+    rng = np.random.default_rng(7)
+    records = random_records(rng, 500)
+    index = ClipIndex()
+    index.sync(records)
+    matched = check_queries(index, records, rng)
+    logging.info(f"200 queries matched {matched} clips in total, all equal to the brute-force scan")
+    assert matched > 0, "The random queries must match some clips"
+    assert index.find_clips(2.0, tolerance=0.1) == [], "An out-of-range energy must match nothing"
+    assert ClipIndex().find_clips(0.5) == [], "An empty index must match nothing"
+    logging.info("Clip index range query test passed")
+    return True
+
+
+def test_persistence():
+    """An index saved to .npz and reloaded answers every query like the original."""
+    logging.info("Starting clip index persistence test...")
+    rng = np.random.default_rng(11)
+    records = random_records(rng, 300)
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        index_file = os.path.join(tmp_dir, "clip_index.npz")
+        index = ClipIndex(index_file)
+        index.sync(records)
+        index.save()
+        assert os.path.exists(index_file), "save() must write the .npz file"
+        assert not [name for name in os.listdir(tmp_dir) if name != "clip_index.npz"], \
+            "save() must not leave temporary files behind"
+
+        reloaded = ClipIndex(index_file)
+        assert reloaded.paths == index.paths and reloaded.fingerprints == index.fingerprints, \
+            "The reloaded index must keep its rows"
+        assert np.array_equal(reloaded.features, index.features), "The reloaded features differ"
+        check_queries(reloaded, records, rng, queries=100)
+
+        # Reloaded rows are current: syncing the same records changes nothing
+        assert not reloaded.sync(records), "Syncing unchanged records into a reloaded index must be a no-op"
+    logging.info("Clip index persistence test passed")
+    return True
+
+
+def test_incremental_sync():
+    """sync rebuilds only new and changed rows, drops removed clips and leaves unchanged indexes alone."""
+    logging.info("Starting clip index incremental sync test...")
+    rng = np.random.default_rng(3)
+    records = random_records(rng, 200)
+    index = ClipIndex()
+
+    built = []
+    record_features = clip_index._record_features
+
+    def counted(record):
+        built.append(record['fingerprint'])
+        return record_features(record)
+    clip_index._record_features = counted
+    try:
+        assert index.sync(records) and len(built) == 200, f"First sync built {len(built)} rows"
+        built.clear()
+        assert not index.sync(records) and not built, "An unchanged sync must not rebuild rows"
+
+        paths = sorted(records)
+        changed, removed = paths[10], paths[20]
+        records[changed] = dict(random_records(rng, 1, version="v2")["creator_0/clip_0000.mp4"],
+                                fingerprint="stat:changed:v2")
+        del records[removed]
+        records["creator_new/clip_new.mp4"] = dict(records[paths[30]], fingerprint="stat:new")
+        # Re-analysis with other settings makes a record stale as well
+        records[paths[40]] = dict(records[paths[40]], settings="grab:320:seg4.0")
+
+        assert index.sync(records), "A changed record set must change the index"
+        assert sorted(built) == sorted(["stat:changed:v2", "stat:new", records[paths[40]]['fingerprint']]), \
+            f"Expected only the changed, new and re-analyzed rows to be built, got {built}"
+    finally:
+        clip_index._record_features = record_features
+
+    assert removed not in index.paths and len(index) == 200, "The removed clip must be dropped"
+    check_queries(index, records, rng, queries=100)
+    logging.info("Clip index incremental sync test passed")
+    return True
+
+
+if __name__ == "__main__":
+    test_range_queries()
+    test_persistence()
+    test_incremental_sync()
+    test_concurrent_sync_and_query()
@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+import os
+import sys
+import logging
+import tempfile
+import threading
+
+import cv2
+import numpy as np
+
+# Add parent directory to path for imports
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(PROJECT_ROOT)
+
+from video_editing import frame_source
+from video_editing.frame_source import FrameSource
+from video_editing.video_analyzer import VideoAnalyzer
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='[%(asctime)s] %(levelname)s: %(message)s'
+)
+
+
+def write_clip(path, frame_count=40, width=160, height=120, fps=20):
+    """Synthetic clip whose frames differ from each other: a bar that moves one step per frame."""
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*'mp4v'), fps, (width, height))
+    for i in range(frame_count):
+        frame = np.full((height, width, 3), 30, dtype=np.uint8)
+        frame[:, 4 * i:4 * i + 4] = (255, 255, 255)
+        writer.write(frame)
+    writer.release()
+
+
+def read_all(path):
+    """Reference decode: every frame, in order, with plain read()."""
+    cap = cv2.VideoCapture(path)
+    frames = []
+    while True:
+        ret, frame = cap.read()
+        if not ret:
+            break
+        frames.append(frame)
+    cap.release()
+    return frames
+
+
+def assert_frames(items, reference, expected_indices, label):
+    """items are (index, frame) pairs; they must be exactly the reference frames at expected_indices."""
+    indices = [i for i, _ in items]
+    assert indices == list(expected_indices), f"[{label}] expected indices {list(expected_indices)}, got {indices}"
+    for i, frame in items:
+        assert np.array_equal(frame, reference[i]), f"[{label}] frame {i} differs from the sequential decode"
+
+
+class CountingCapture:
+    """cv2.VideoCapture that counts the captures opened and frames grabbed (patched over cv2.VideoCapture)."""
+
+    opened = 0
+    grabbed = 0
+    _capture = cv2.VideoCapture
+
+    def __init__(self, *args):
+        CountingCapture.opened += 1
+        self._cap = CountingCapture._capture(*args)
+
+    def grab(self):
+        CountingCapture.grabbed += 1
+        return self._cap.grab()
+
+    def __getattr__(self, name):
+        return getattr(self._cap, name)
+
+
+def test_stride_and_range():
+    """Stride, start time and duration select the same frames as a sequential decode."""
+    logging.info("Starting frame source stride test...")
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        clip = os.path.join(tmp_dir, "clip.mp4")
+        write_clip(clip)
+        reference = read_all(clip)
+        assert len(reference) == 40, f"Reference decode yielded {len(reference)} frames"
+
+        source = FrameSource(clip)
+        assert len(source) == 40
+        assert_frames(list(source.indexed()), reference, range(40), "all")
+
+        source = FrameSource(clip, stride=3)
+        assert len(source) == 14, f"stride=3 over 40 frames should yield 14, len() is {len(source)}"
+        assert_frames(list(source.indexed()), reference, range(0, 40, 3), "stride")
+
+        # 0.5s at 20 fps starts at frame 10; 0.6s covers 12 frames
+        source = FrameSource(clip, start_time=0.5, duration=0.6, stride=2)
+        assert len(source) == 6
+        assert_frames(list(source.indexed()), reference, range(10, 22, 2), "range")
+
+        # Plain iteration yields the frames without indices
+        frames = list(FrameSource(clip, stride=5))
+        assert len(frames) == 8 and all(np.array_equal(f, reference[i]) for f, i in zip(frames, range(0, 40, 5)))
+    logging.info("Frame source stride test passed")
+
+
+def test_frame_indices():
+    """frame_indices selects exactly those frames (sorted, deduplicated, clipped to the range)."""
+    logging.info("Starting frame source index test...")
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        clip = os.path.join(tmp_dir, "clip.mp4")
+        write_clip(clip)
+        reference = read_all(clip)
+
+        source = FrameSource(clip, frame_indices=[17, 3, 3, 38, 0], stride=4)
+        assert len(source) == 4
+        assert_frames(list(source.indexed()), reference, [0, 3, 17, 38], "indices")
+
+        # Indices outside start_time/duration are dropped
+        source = FrameSource(clip, start_time=0.5, duration=0.5, frame_indices=[2, 12, 14, 30])
+        assert len(source) == 2
+        assert_frames(list(source.indexed()), reference, [12, 14], "indices in range")
+
+        # Decoding stops at the last wanted index
+        CountingCapture.opened = CountingCapture.grabbed = 0
+        original = frame_source.cv2.VideoCapture
+        frame_source.cv2.VideoCapture = CountingCapture
+        try:
+            items = list(FrameSource(clip, frame_indices=[2, 5]).indexed())
+        finally:
+            frame_source.cv2.VideoCapture = original
+        assert [i for i, _ in items] == [2, 5]
+        assert CountingCapture.grabbed == 6, f"Expected 6 grabs up to frame 5, got {CountingCapture.grabbed}"
+    logging.info("Frame source index test passed")
+
+
+def test_empty_frame_indices():
+    """An empty frame_indices yields nothing and never decodes the clip."""
+    logging.info("Starting frame source empty selection test...")
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        clip = os.path.join(tmp_dir, "clip.mp4")
+        write_clip(clip)
+
+        source = FrameSource(clip, frame_indices=[])
+        assert len(source) == 0
+        CountingCapture.opened = CountingCapture.grabbed = 0
+        original = frame_source.cv2.VideoCapture
+        frame_source.cv2.VideoCapture = CountingCapture
+        try:
+            assert list(source.indexed()) == []
+            assert list(FrameSource(clip, frame_indices=[], prefetch=2)) == []
+        finally:
+            frame_source.cv2.VideoCapture = original
+        logging.info(f"Empty selection: {CountingCapture.opened} captures opened (after the probes), "
+                     f"{CountingCapture.grabbed} frames grabbed")
+        assert CountingCapture.grabbed == 0, f"An empty selection grabbed {CountingCapture.grabbed} frames"
+        # Only the prefetched source's constructor probes the clip
+        assert CountingCapture.opened == 1, f"An empty selection opened {CountingCapture.opened} captures"
+    logging.info("Frame source empty selection test passed")
+
+
+def test_prefetch_order():
+    """A prefetched source yields the same frames in the same order, and stops cleanly when abandoned."""
+    logging.info("Starting frame source prefetch test...")
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        clip = os.path.join(tmp_dir, "clip.mp4")
+        write_clip(clip)
+        reference = read_all(clip)
+
+        for prefetch in (1, 4, 64):
+            items = list(FrameSource(clip, stride=2, prefetch=prefetch).indexed())
+            assert_frames(items, reference, range(0, 40, 2), f"prefetch={prefetch}")
+        items = list(FrameSource(clip, frame_indices=[1, 9, 33], prefetch=2).indexed())
+        assert_frames(items, reference, [1, 9, 33], "prefetch indices")
+
+        # Abandoning the iterator stops the producer thread
+        iterator = FrameSource(clip, prefetch=2).indexed()
+        first = [next(iterator) for _ in range(3)]
+        assert_frames(first, reference, [0, 1, 2], "prefetch partial")
+        iterator.close()
+        assert not any(t.name == "frame-source" and t.is_alive() for t in threading.enumerate()), \
+            "The prefetch thread must exit when the consumer stops"
+
+        # The analyzer helper keeps its list contract
+        analyzer = VideoAnalyzer(training_videos_dir=tmp_dir, cache_file=os.path.join(tmp_dir, "patterns.json"))
+        frames = analyzer._extract_frames(clip, 0.5, 0.5, stride=5)
+        assert isinstance(frames, list) and len(frames) == 2
+        assert np.array_equal(frames[1], reference[15])
+    logging.info("Frame source prefetch test passed")
+
+
+if __name__ == "__main__":
+    test_stride_and_range()
+    test_frame_indices()
+    test_empty_frame_indices()
+    test_prefetch_order()
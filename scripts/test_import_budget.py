@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+import os
+import re
+import sys
+import json
+import logging
+import subprocess
+
+# Add parent directory to path for imports
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(PROJECT_ROOT)
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='[%(asctime)s] %(levelname)s: %(message)s'
+)
+
+# Import-time (seconds, from python -X importtime) and peak RSS (MB) budgets per entry point.
+# Posting and UI processes must not load any ML stack.
+ENTRY_POINTS = {
+    "scheduling.post_scheduler": (0.5, 150),
+    "scheduling.post_manager": (0.5, 150),
+    "video_generation.app_ui_manager": (0.8, 200),
+    "video_generation.ui_pattern_learner": (0.8, 200),
+    "video_editing.video_analyzer": (0.8, 200),
+    "video_generation.generate_video": (1.0, 250),
+}
+
+# Modules that must only be imported at first use
+HEAVY_MODULES = ("torch", "tensorflow", "tensorflow_hub", "transformers", "diffusers", "sklearn", "pytesseract", "scipy")
+
+# Heavy modules are replaced by sentinels before the entry point is imported: a sentinel
+# records that it was imported, so the check does not depend on which ML packages are installed
+_PROBE = """
+import sys, json, types, resource, importlib.abc, importlib.machinery
+
+HEAVY = {heavy!r}
+imported = []
+
+class _Sentinel(types.ModuleType):
+    def __getattr__(self, name):
+        if name.startswith("__"):
+            raise AttributeError(name)
+        return _Sentinel(self.__name__ + "." + name)
+
+    def __call__(self, *args, **kwargs):
+        return self
+
+class _HeavyFinder(importlib.abc.MetaPathFinder, importlib.abc.Loader):
+    def find_spec(self, fullname, path=None, target=None):
+        if fullname.split(".")[0] in HEAVY:
+            return importlib.machinery.ModuleSpec(fullname, self, is_package=True)
+        return None
+
+    def create_module(self, spec):
+        imported.append(spec.name)
+        module = _Sentinel(spec.name)
+        module.__path__ = []
+        return module
+
+    def exec_module(self, module):
+        pass
+
+sys.meta_path.insert(0, _HeavyFinder())
+import {module}
+rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+# ru_maxrss is in bytes on macOS and kilobytes on Linux
+rss_mb = rss / (1024 * 1024) if sys.platform == "darwin" else rss / 1024
+print(json.dumps({{"rss_mb": rss_mb, "heavy": sorted(set(m.split(".")[0] for m in imported))}}))
+"""
+
+
+def measure(module):
+    """Import a module in a fresh interpreter and return (import seconds, peak RSS MB, heavy modules loaded)."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", _PROBE.format(module=module, heavy=HEAVY_MODULES)],
+        capture_output=True, text=True, cwd=PROJECT_ROOT
+    )
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1] if result.stderr.strip() else "import failed")
+
+    # importtime lines: "import time: self [us] | cumulative | imported package"
+    cumulative_us = None
+    for line in result.stderr.splitlines():
+        match = re.match(r"import time:\s+\d+\s+\|\s+(\d+)\s+\|\s*(\S+)\s*$", line)
+        if match and match.group(2) == module:
+            cumulative_us = int(match.group(1))
+    probe = json.loads(result.stdout.strip().splitlines()[-1])
+    return (cumulative_us or 0) / 1e6, probe["rss_mb"], probe["heavy"]
+
+
+def test_import_budget():
+    """Check every entry point against its import-time and RSS budget."""
+    logging.info("Starting import budget test...")
+    failures = []
+
+    for module, (max_seconds, max_rss_mb) in ENTRY_POINTS.items():
+        try:
+            seconds, rss_mb, heavy = measure(module)
+        except Exception as e:
+            # Heavy modules are stubbed, so any import error is a real failure of the entry point
+            logging.error(f"{module}: could not be imported: {e}")
+            failures.append(f"{module}: import failed ({e})")
+            continue
+
+        within = seconds <= max_seconds and rss_mb <= max_rss_mb and not heavy
+        log = logging.info if within else logging.error
+        log(f"{module}: {seconds:.2f}s (budget {max_seconds}s), {rss_mb:.0f} MB RSS (budget {max_rss_mb} MB)"
+            + (f", heavy modules imported at import time: {', '.join(heavy)}" if heavy else ""))
+        if not within:
+            failures.append(f"{module}: {seconds:.2f}s, {rss_mb:.0f} MB" + (f", imports {', '.join(heavy)}" if heavy else ""))
+
+    assert not failures, "Import budget exceeded:\n" + "\n".join(failures)
+    logging.info("Import budget test passed")
+
+
+if __name__ == "__main__":
+    test_import_budget()
@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+import os
+import gc
+import sys
+import time
+import logging
+import threading
+
+# Add parent directory to path for imports
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(PROJECT_ROOT)
+
+from e2e_cloud.model_registry import ModelRegistry
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='[%(asctime)s] %(levelname)s: %(message)s'
+)
+
+MB = 1024 ** 2
+
+
+class FakeModel:
+    """Stand-in for loaded weights; records when it is unloaded."""
+
+    def __init__(self, name):
+        self.name = name
+        self.unloaded = False
+
+
+class Holder:
+    """A component that keeps a model for its lifetime, like an extractor or analyzer."""
+
+    def __init__(self, registry, model_id, loader):
+        self.model = registry.acquire(model_id, loader, device="cpu", size_bytes=300 * MB, owner=self)
+
+
+def test_model_registry():
+    """Models are shared by id, reference counted and evicted least recently used first within the budget."""
+    logging.info("Starting model registry test...")
+    ok = True
+
+    events = []
+    loads = []
+    registry = ModelRegistry(ram_budget_gb=1.0)
+    registry.add_listener(events.append)
+
+    def loader(name, seconds=0.0):
+        def load():
+            time.sleep(seconds)
+            loads.append(name)
+            return FakeModel(name)
+        return load
+
+    def acquire(name):
+        return registry.acquire(name, loader(name), device="cpu", size_bytes=400 * MB,
+                                unload=lambda model: setattr(model, "unloaded", True))
+
+    # Concurrent first use loads the weights once
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(
+        registry.acquire("sd", loader("sd", 0.2), device="cpu", size_bytes=400 * MB,
+                         unload=lambda model: setattr(model, "unloaded", True))))
+        for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    sd = results[0]
+    if loads != ["sd"] or any(model is not sd for model in results):
+        logging.error(f"Expected one shared load for concurrent callers, got {loads}")
+        ok = False
+    for _ in range(4):
+        registry.release("sd")
+
+    # sd (400 MB) and detr (400 MB) fit the 1 GB budget; wan (400 MB) does not
+    detr = acquire("detr")
+    wan = acquire("wan")
+    logging.info(f"Registry after loading wan: {registry.stats()}")
+    if not sd.unloaded or detr.unloaded or registry.get("sd") is not None:
+        logging.error("Expected the unreferenced, least recently used sd model to be evicted for wan")
+        ok = False
+
+    # Referenced models are never evicted, even over budget
+    acquire("movenet")
+    if detr.unloaded or wan.unloaded or registry.resident_bytes("ram") != 1200 * MB:
+        logging.error("Referenced models must stay loaded")
+        ok = False
+
+    # Releasing brings the registry back within budget, evicting the least recently used
+    registry.release("detr")
+    if not detr.unloaded or registry.resident_bytes("ram") != 800 * MB:
+        logging.error("Released detr should have been evicted to get back within budget")
+        ok = False
+
+    # A released model inside the budget stays warm and is handed out again without a load
+    registry.release("wan")
+    loads.clear()
+    if acquire("wan") is not wan or loads:
+        logging.error("A warm model must be reused without loading it again")
+        ok = False
+    registry.release("wan")
+    registry.release("movenet")
+
+    # A holder's reference is dropped when the holder is garbage collected
+    registry.configure(ram_budget_gb=None)
+    holder = Holder(registry, "ocr", loader("ocr"))
+    refs = {m["model_id"]: m["refs"] for m in registry.stats()["models"]}
+    del holder
+    gc.collect()
+    refs_after = {m["model_id"]: m["refs"] for m in registry.stats()["models"]}
+    if refs.get("ocr") != 1 or refs_after.get("ocr") != 0:
+        logging.error(f"Expected the holder's reference to be released: {refs} -> {refs_after}")
+        ok = False
+
+    stats = registry.stats()
+    evicted = [event["model_id"] for event in events if event["type"] == "evict"]
+    logging.info(f"Loads {stats['loads']}, evictions {evicted}")
+    if evicted != ["sd", "detr"] or stats["loads"] != 5 or stats["evictions"] != 2:
+        logging.error("Unexpected load/evict events")
+        ok = False
+
+    registry.clear()
+    if registry.stats()["models"] or not wan.unloaded:
+        logging.error("clear() must unload every model")
+        ok = False
+
+    if ok:
+        logging.info("Model registry test passed")
+    else:
+        logging.error("Model registry test failed")
+    return ok
+
+
+if __name__ == "__main__":
+    sys.exit(0 if test_model_registry() else 1)
@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+import os
+import sys
+import logging
+import tempfile
+import threading
+from pathlib import Path
+
+import numpy as np
+
+# Add parent directory to path for imports
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(PROJECT_ROOT)
+
+from video_editing.pose_runtime import TFLitePoseRuntime, find_local_movenet
+from scripts.download_pose_model import provision_pose_model, MOVENET_TFLITE_URLS
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='[%(asctime)s] %(levelname)s: %(message)s'
+)
+
+
+class FixedBatchInterpreter:
+    """Stand-in for a TFLite interpreter whose model only runs a batch of one: resizing works, allocating fails."""
+
+    def __init__(self):
+        self.shape = [1, 192, 192, 3]
+        self.allocated = True
+        self.resizes = []
+        self.invokes = 0
+
+    def get_input_details(self):
+        return [{'index': 0, 'shape': np.array(self.shape), 'dtype': np.uint8}]
+
+    def get_output_details(self):
+        return [{'index': 1}]
+
+    def resize_tensor_input(self, index, shape):
+        self.resizes.append(shape[0])
+        self.shape = list(shape)
+        self.allocated = False
+
+    def allocate_tensors(self):
+        if self.shape[0] != 1:
+            raise RuntimeError(f"Cannot allocate tensors for batch {self.shape[0]}")
+        self.allocated = True
+
+    def set_tensor(self, index, value):
+        if not self.allocated or len(value) != self.shape[0]:
+            raise ValueError(f"Input of {len(value)} frames does not match the tensor shape {self.shape}")
+        self.value = value
+
+    def invoke(self):
+        self.invokes += 1
+
+    def get_tensor(self, index):
+        return np.full((len(self.value), 1, 17, 3), self.value.mean(axis=(1, 2, 3))[:, None, None, None] / 255.0)
+
+
+def make_runtime(interpreter):
+    """TFLitePoseRuntime around a fake interpreter, without loading a model."""
+    runtime = TFLitePoseRuntime.__new__(TFLitePoseRuntime)
+    runtime._lock = threading.Lock()
+    runtime.interpreter = interpreter
+    runtime._input = interpreter.get_input_details()[0]
+    runtime._output = interpreter.get_output_details()[0]
+    runtime.input_size = 192
+    runtime._batch = 1
+    runtime._fixed_batch = False
+    return runtime
+
+
+def test_fixed_batch_fallback():
+    """A model with a fixed batch of one falls back to per-frame inference once, and stays there."""
+    logging.info("Starting pose runtime fixed-batch test...")
+    ok = True
+
+    interpreter = FixedBatchInterpreter()
+    runtime = make_runtime(interpreter)
+    batch = np.stack([np.full((192, 192, 3), value, dtype=np.uint8) for value in (0, 51, 102, 153)])
+
+    keypoints = runtime.infer(batch)
+    if keypoints.shape != (4, 17, 3) or not np.allclose(keypoints[:, 0, 0], [0.0, 0.2, 0.4, 0.6]):
+        logging.error(f"Expected per-frame keypoints for all 4 frames, got {keypoints[:, 0, 0]}")
+        ok = False
+    if interpreter.shape[0] != 1 or not interpreter.allocated:
+        logging.error(f"The interpreter must be back at an allocated batch of one, got {interpreter.shape}")
+        ok = False
+
+    # The failed resize is not retried on later calls
+    resizes = len(interpreter.resizes)
+    runtime.infer(batch)
+    runtime.infer(batch[:1])
+    logging.info(f"Resizes {interpreter.resizes}, invokes {interpreter.invokes}")
+    if len(interpreter.resizes) != resizes or interpreter.invokes != 9:
+        logging.error("Later calls must go straight to per-frame invokes")
+        ok = False
+
+    if ok:
+        logging.info("Pose runtime fixed-batch test passed")
+    else:
+        logging.error("Pose runtime fixed-batch test failed")
+    return ok
+
+
+def test_provision_pose_model():
+    """Provisioning puts the model where find_local_movenet looks (POSE_MODEL_DIR) and skips an existing one."""
+    logging.info("Starting pose model provisioning test...")
+    downloads, conversions = [], []
+
+    def fake_download(url, path):
+        downloads.append(url)
+        Path(path).write_bytes(b"tflite")
+
+    def fake_convert(tflite_path, onnx_path):
+        conversions.append(Path(tflite_path).name)
+        Path(onnx_path).write_bytes(Path(tflite_path).read_bytes() + b"->onnx")
+
+    previous = os.environ.get("POSE_MODEL_DIR")
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        model_dir = os.path.join(tmp_dir, "pose")
+        os.environ["POSE_MODEL_DIR"] = model_dir
+        try:
+            assert find_local_movenet() is None, "An empty model store must not yield a model"
+
+            path = provision_pose_model(download=fake_download, convert=fake_convert)
+            assert path == Path(model_dir) / "movenet_singlepose_lightning.onnx", f"Unexpected model path {path}"
+            assert path.read_bytes() == b"tflite->onnx"
+            assert downloads == [MOVENET_TFLITE_URLS["lightning"]]
+            assert conversions == ["movenet_singlepose_lightning.tflite"]
+            assert find_local_movenet() == path, "The runtime must find the provisioned model"
+            assert os.listdir(model_dir) == [path.name], f"Temporary files left behind: {os.listdir(model_dir)}"
+
+            # An existing model is kept unless forced
+            provision_pose_model(download=fake_download, convert=fake_convert)
+            assert len(downloads) == 1, "An existing model must not be downloaded again"
+            provision_pose_model(download=fake_download, convert=fake_convert, force=True)
+            assert len(downloads) == 2, "force must download the model again"
+
+            # The TFLite format is stored as downloaded, without conversion
+            path = provision_pose_model("thunder", "tflite", download=fake_download, convert=fake_convert)
+            assert path.name == "movenet_singlepose_thunder.tflite" and path.read_bytes() == b"tflite"
+            assert len(conversions) == 2, "The tflite format must not be converted"
+        finally:
+            if previous is None:
+                os.environ.pop("POSE_MODEL_DIR", None)
+            else:
+                os.environ["POSE_MODEL_DIR"] = previous
+    logging.info("Pose model provisioning test passed")
+
+
+if __name__ == "__main__":
+    ok = test_fixed_batch_fallback()
+    test_provision_pose_model()
+    sys.exit(0 if ok else 1)
@@ -0,0 +1,210 @@
+#!/usr/bin/env python3
+import os
+import sys
+import logging
+import tempfile
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+# Add parent directory to path for imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from video_editing.video_analyzer import VideoAnalyzer
+from video_editing.pose_tracker import PoseTracker
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='[%(asctime)s] %(levelname)s: %(message)s'
+)
+
+
+def read_frames(video_path, max_frames=150):
+    """Decode up to max_frames frames of a clip."""
+    cap = cv2.VideoCapture(str(video_path))
+    frames = []
+    while len(frames) < max_frames:
+        ret, frame = cap.read()
+        if not ret:
+            break
+        frames.append(frame)
+    cap.release()
+    return frames
+
+
+def make_synthetic_clip(path, num_frames=120, width=320, height=240):
+    """Write a clip with two bright markers moving smoothly, standing in for two joints."""
+    writer = cv2.VideoWriter(str(path), cv2.VideoWriter_fourcc(*'mp4v'), 30, (width, height))
+    for i in range(num_frames):
+        frame = np.zeros((height, width, 3), dtype=np.uint8)
+        t = i / num_frames
+        cv2.circle(frame, (int(40 + 240 * t), int(120 + 60 * np.sin(2 * np.pi * t))), 8, (255, 255, 255), -1)
+        cv2.circle(frame, (int(160 + 80 * np.cos(2 * np.pi * t)), int(60 + 20 * t)), 8, (0, 255, 0), -1)
+        writer.write(frame)
+    writer.release()
+
+
+def detect_markers(frames):
+    """Marker 'pose detector' for the synthetic clip: centroid of each colored marker."""
+    poses = []
+    for frame in frames:
+        height, width = frame.shape[:2]
+        keypoints = []
+        masks = [
+            np.all(frame > 200, axis=2),
+            (frame[:, :, 1] > 200) & (frame[:, :, 2] < 100)
+        ]
+        for kp_id, mask in enumerate(masks):
+            ys, xs = np.nonzero(mask)
+            if len(xs):
+                keypoints.append({"id": kp_id, "x": xs.mean() / width, "y": ys.mean() / height, "score": 1.0})
+        poses.append({"keypoints": keypoints})
+    return poses
+
+
+def keypoint_error(reference, tracked):
+    """Mean normalized distance between keypoints present in both pose lists, and the fraction missing."""
+    distances, missing, total = [], 0, 0
+    for ref, trk in zip(reference, tracked):
+        trk_kps = {kp["id"]: kp for kp in trk["keypoints"]}
+        for kp in ref["keypoints"]:
+            total += 1
+            if kp["id"] not in trk_kps:
+                missing += 1
+                continue
+            other = trk_kps[kp["id"]]
+            distances.append(np.hypot(kp["x"] - other["x"], kp["y"] - other["y"]))
+    mean_error = float(np.mean(distances)) if distances else 0.0
+    return mean_error, (missing / total if total else 0.0)
+
+
+def compare(frames, detect_batch, label, max_error=None):
+    """Compare every tracker setting against per-frame inference on the same frames."""
+    reference = detect_batch(frames)
+    for mode in ("interpolate", "flow"):
+        for interval in (1, 2, 4, 8):
+            tracker = PoseTracker(detect_batch, keyframe_interval=interval, mode=mode)
+            tracked = []
+            # Feed in chunks the way replace_humans_in_video does
+            chunk = 8 * interval
+            for start in range(0, len(frames), chunk):
+                tracked.extend(tracker.process(frames[start:start + chunk]))
+            error, missing = keypoint_error(reference, tracked)
+            logging.info(f"[{label}] {mode:<11} interval={interval}: "
+                         f"inference on {tracker.inference_ratio * 100:.0f}% of frames, "
+                         f"mean keypoint error {error:.4f}, missing {missing * 100:.1f}%")
+            if interval == 1:
+                assert error <= 1e-9 and missing == 0, \
+                    f"[{label}] {mode} interval=1 must match per-frame inference exactly (error {error}, missing {missing})"
+            if max_error is not None:
+                assert error <= max_error, f"[{label}] {mode} interval={interval}: error {error:.4f} above {max_error}"
+
+
+def counting_model(calls):
+    """detect_markers that records the size of every batch it is called with."""
+    def detect(frames):
+        calls.append(len(frames))
+        return detect_markers(frames)
+    return detect
+
+
+def half_rate_loop(analyzer, video_path, output_path):
+    """The loop replace_humans_in_video replaced: one pose call for every 2nd frame, the other repeated."""
+    cap = cv2.VideoCapture(str(video_path))
+    out = cv2.VideoWriter(str(output_path), cv2.VideoWriter_fourcc(*'mp4v'), cap.get(cv2.CAP_PROP_FPS),
+                          (int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)), int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))))
+    frame_count, processed_frame = 0, None
+    while True:
+        ret, frame = cap.read()
+        if not ret:
+            break
+        if frame_count % 2 == 0:
+            processed_frame = analyzer.replace_human_in_frame(frame, "sarah", {})
+        out.write(processed_frame)
+        frame_count += 1
+    cap.release()
+    out.release()
+
+
+def test_pipeline_throughput():
+    """The pipelined replace_humans_in_video batches pose calls that the old half-rate loop made one frame at a time."""
+    logging.info("Starting pose pipeline batching test...")
+    num_frames, batch_size = 240, 8
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        clip = Path(tmp_dir) / "markers.mp4"
+        make_synthetic_clip(clip, num_frames=num_frames, width=640, height=480)
+        analyzer = VideoAnalyzer(training_videos_dir=tmp_dir, cache_file=str(Path(tmp_dir) / "patterns.json"))
+        analyzer.has_pose_model = True
+
+        calls = []
+        analyzer._detect_pose_batch = counting_model(calls)
+        half_rate_loop(analyzer, clip, Path(tmp_dir) / "half_rate.mp4")
+        logging.info(f"half-rate loop: {len(calls)} pose calls, batch sizes {sorted(set(calls))}")
+        assert calls == [1] * (num_frames // 2), \
+            f"The half-rate loop should make {num_frames // 2} single-frame calls, made {len(calls)}"
+        half_rate_calls = len(calls)
+
+        inferred = {}
+        for interval in (1, 4):
+            calls = []
+            analyzer._detect_pose_batch = counting_model(calls)
+            analyzer.replace_humans_in_video(str(clip), "sarah", {}, output_path=str(Path(tmp_dir) / f"pipeline_{interval}.mp4"),
+                                             batch_size=batch_size, keyframe_interval=interval)
+            metrics = analyzer.last_pipeline_metrics
+            logging.info(f"pipeline, keyframe_interval={interval}: {len(calls)} pose calls, batch sizes {calls}, "
+                         f"{metrics['inference_frames']} frames inferred")
+            assert metrics['frames'] == num_frames, f"Pipeline processed {metrics['frames']} of {num_frames} frames"
+            assert sum(calls) == metrics['inference_frames'], "Every inferred frame must go through the pose model"
+            # A chunk holds batch_size keyframe intervals; the clip's first frame adds one more keyframe
+            assert max(calls) <= batch_size + 1, f"Pose batches must hold at most {batch_size + 1} frames, got {max(calls)}"
+            assert len(calls) < half_rate_calls, \
+                f"The pipeline should make fewer pose calls than the half-rate loop ({len(calls)} vs {half_rate_calls})"
+            inferred[interval] = metrics['inference_frames']
+
+        assert inferred[1] == num_frames, f"keyframe_interval=1 must infer every frame, inferred {inferred[1]}"
+        assert inferred[4] < inferred[1], \
+            f"keyframe_interval=4 must infer fewer frames than interval=1 ({inferred[4]} vs {inferred[1]})"
+    logging.info("Pose pipeline batching test passed")
+
+
+def test_pose_tracker():
+    """Compare keyframe tracking against per-frame pose inference."""
+    logging.info("Starting pose tracker test...")
+
+    # Synthetic clip with a known smooth trajectory; runs without a pose model
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        clip = Path(tmp_dir) / "markers.mp4"
+        make_synthetic_clip(clip)
+        compare(read_frames(clip), detect_markers, "synthetic", max_error=0.02)
+
+        # Flow mode infers each chunk's keyframes in one detector call, like interpolate mode
+        calls = []
+        tracker = PoseTracker(counting_model(calls), keyframe_interval=4, mode="flow")
+        frames = read_frames(clip)
+        for start in range(0, len(frames), 32):
+            tracker.process(frames[start:start + 32])
+        logging.info(f"[synthetic] flow keyframe batches: {calls}")
+        assert len(calls) == -(-len(frames) // 32), \
+            f"Expected one batched detector call per chunk in flow mode, got {len(calls)} calls for {len(frames)} frames"
+        assert sum(calls) == tracker.inference_frames, "Every inferred frame must go through the detector"
+
+    # Real clip with the real pose model, when both are available
+    analyzer = VideoAnalyzer(
+        training_videos_dir="data/training_videos",
+        cache_file="data/test_style_patterns.json"
+    )
+    sample = next(iter(sorted(Path("data/training_videos").glob("*/*.mp4"))), None)
+    frames = read_frames(sample) if sample else []
+    if analyzer.has_pose_model and frames:
+        compare(frames, analyzer._detect_pose_batch, sample.name)
+    else:
+        logging.warning("Pose model or sample clip not available, skipping the real-clip comparison")
+
+    logging.info("Pose tracker test passed")
+
+
+if __name__ == "__main__":
+    test_pose_tracker()
+    test_pipeline_throughput()
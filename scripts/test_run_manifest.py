@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+import os
+import sys
+import json
+import logging
+import tempfile
+
+# Add parent directory to path for imports
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(PROJECT_ROOT)
+
+from e2e_cloud.run_manifest import MANIFEST_NAME, latest_run_dir, open_run_manifest
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='[%(asctime)s] %(levelname)s: %(message)s'
+)
+
+
+def run_batch(manifest, scripts, output_dir, calls, fail_after=None):
+    """Two-stage stand-in for a generation run; stops like a killed process after fail_after videos."""
+    for i, script in enumerate(scripts):
+        item_id = f"script_{i+1}"
+        manifest.record_script(item_id, script)
+        if manifest.completed_stage(item_id, "video"):
+            continue
+
+        avatar = manifest.completed_stage(item_id, "avatar")
+        if avatar is None:
+            calls.append(("avatar", item_id))
+            avatar_path = os.path.join(output_dir, f"{item_id}_avatar.mp4")
+            with open(avatar_path, "wb") as f:
+                f.write(f"avatar {script['food_item']}".encode())
+            manifest.complete_stage(item_id, "avatar", {"avatar_video": avatar_path})
+            avatar = {"avatar_video": avatar_path}
+
+        if fail_after is not None and i >= fail_after:
+            # Interrupted between generating the avatar and composing the video
+            return
+        calls.append(("video", item_id))
+        video_path = os.path.join(output_dir, f"{item_id}.mp4")
+        with open(avatar["avatar_video"], "rb") as src, open(video_path, "wb") as dst:
+            dst.write(src.read() + b" + demo")
+        manifest.complete_stage(item_id, "video", {"video": video_path})
+
+
+def test_run_manifest():
+    """A resumed run skips completed stages, re-runs stages whose artifacts changed and scripts that changed;
+    a complete run is not resumed."""
+    logging.info("Starting run manifest test...")
+    ok = True
+
+    scripts = [{"avatar": "emma", "food_item": f"salad {i}"} for i in range(4)]
+    with tempfile.TemporaryDirectory() as runs_root:
+        run_dir = os.path.join(runs_root, "run_1")
+        manifest_path = os.path.join(run_dir, MANIFEST_NAME)
+        os.makedirs(run_dir)
+
+        # First attempt dies after composing two videos and generating the third avatar
+        calls = []
+        run_batch(open_run_manifest(manifest_path), scripts, run_dir, calls, fail_after=2)
+        logging.info(f"First attempt: {calls}")
+
+        if latest_run_dir(runs_root) != run_dir:
+            logging.error("latest_run_dir must find the interrupted run")
+            ok = False
+        if any(name.endswith(".tmp") for name in os.listdir(run_dir)):
+            logging.error("Manifest writes must not leave temporary files behind")
+            ok = False
+
+        # Resume: only the third video and the fourth clip and video are left
+        calls = []
+        manifest = open_run_manifest(manifest_path, resume=True)
+        run_batch(manifest, scripts, run_dir, calls)
+        logging.info(f"Resumed attempt: {calls}, stats {manifest.stats()}")
+        if calls != [("video", "script_3"), ("avatar", "script_4"), ("video", "script_4")]:
+            logging.error("Resume must skip completed stages and run everything else")
+            ok = False
+        if manifest.data["resumed"] != 1 or manifest.stats()["done"] != {"avatar": 4, "video": 4}:
+            logging.error(f"Unexpected manifest after resuming: {manifest.stats()}")
+            ok = False
+
+        # A damaged artifact and a changed script are both redone
+        with open(os.path.join(run_dir, "script_1.mp4"), "ab") as f:
+            f.write(b" truncated")
+        scripts[1]["food_item"] = "pasta"
+        calls = []
+        manifest = open_run_manifest(manifest_path, resume=True)
+        run_batch(manifest, scripts, run_dir, calls)
+        logging.info(f"After damaging script_1's video and changing script_2: {calls}")
+        if calls != [("video", "script_1"), ("avatar", "script_2"), ("video", "script_2")]:
+            logging.error("Expected the damaged video and the changed script to be regenerated")
+            ok = False
+
+        with open(manifest_path) as f:
+            saved = json.load(f)
+        if saved["items"]["script_2"]["script"]["food_item"] != "pasta":
+            logging.error("The manifest on disk must hold the current scripts")
+            ok = False
+
+        # A finished run is not resumed
+        manifest.finish()
+        if open_run_manifest(manifest_path, resume=True).stats()["items"] != 0:
+            logging.error("Resuming a complete run must start a new manifest")
+            ok = False
+        with open(manifest_path) as f:
+            if json.load(f)["status"] != "running":
+                logging.error("A new run must be recorded as running")
+                ok = False
+
+        # Without resume a new run starts from scratch
+        if open_run_manifest(manifest_path).stats()["items"] != 0:
+            logging.error("A run without resume must start a new manifest")
+            ok = False
+
+    if ok:
+        logging.info("Run manifest test passed")
+    else:
+        logging.error("Run manifest test failed")
+    return ok
+
+
+if __name__ == "__main__":
+    sys.exit(0 if test_run_manifest() else 1)
@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+import os
+import sys
+import logging
+import tempfile
+
+import cv2
+import numpy as np
+
+# Add parent directory to path for imports
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(PROJECT_ROOT)
+
+from video_editing import segment_index
+from video_editing.segment_index import (SegmentIndexBuilder, build_segment_index, probe_keyframes,
+                                         segment_boundaries, select_segments)
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='[%(asctime)s] %(levelname)s: %(message)s'
+)
+
+# Three shots of two seconds at 10 fps: static red, a white square moving over blue, static green
+SHOT_SECONDS = 2
+FPS = 10
+SHOT_COLORS = [(0, 0, 200), (200, 60, 0), (0, 180, 0)]
+
+
+def shot_frame(i, width=320, height=240):
+    """Frame i of the synthetic three-shot clip."""
+    shot = min(i // (SHOT_SECONDS * FPS), len(SHOT_COLORS) - 1)
+    frame = np.zeros((height, width, 3), dtype=np.uint8)
+    frame[:] = SHOT_COLORS[shot]
+    if shot == 1:
+        x = 10 + 12 * (i % (SHOT_SECONDS * FPS))
+        frame[90:150, x:x + 60] = 255
+    return frame
+
+
+def write_shot_clip(path, width=320, height=240):
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*'mp4v'), FPS, (width, height))
+    for i in range(SHOT_SECONDS * FPS * len(SHOT_COLORS)):
+        writer.write(shot_frame(i, width, height))
+    writer.release()
+
+
+class FakeCascade:
+    """Face 'detector' that finds a 'face' wherever the white square is, i.e. in the second shot."""
+
+    def __init__(self):
+        self.calls = 0
+
+    def detectMultiScale(self, gray, *args, **kwargs):
+        self.calls += 1
+        return [(0, 0, 24, 24)] if gray.max() > 240 else []
+
+
+def with_face_cascade(cascade, fn):
+    """Run fn with segment_index's cached face cascade replaced (None: no cascade available)."""
+    saved = segment_index._FACE_CASCADE, segment_index._FACE_CASCADE_LOADED
+    segment_index._FACE_CASCADE, segment_index._FACE_CASCADE_LOADED = cascade, True
+    try:
+        return fn()
+    finally:
+        segment_index._FACE_CASCADE, segment_index._FACE_CASCADE_LOADED = saved
+
+
+def test_cut_detection():
+    """A one-pass index of a three-shot clip finds both cuts and measures motion per shot."""
+    logging.info("Starting segment index cut detection test...")
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        clip = os.path.join(tmp_dir, "shots.mp4")
+        write_shot_clip(clip)
+        index = with_face_cascade(None, lambda: build_segment_index(clip, analysis_fps=5))
+
+    segments = index['segments']
+    logging.info(f"Segments: {segments}")
+    assert index['duration'] == 6.0, f"Unexpected duration {index['duration']}"
+    assert len(segments) == 3, f"Expected 3 shots, got {len(segments)}"
+    # Cuts land on the first sample of the new shot (samples every 0.2s)
+    for segment, expected in zip(segments[1:], (2.0, 4.0)):
+        assert abs(segment['start'] - expected) < 0.2 + 1e-6, f"Cut at {segment['start']}, expected {expected}"
+    assert segment_boundaries(index) == [s['start'] for s in segments] + [6.0]
+
+    # Only the middle shot moves; motion across a cut is not counted
+    assert segments[1]['motion'] > 0.01, f"Moving shot has motion {segments[1]['motion']}"
+    assert segments[0]['motion'] < 0.005 and segments[2]['motion'] < 0.005, "Static shots must have ~0 motion"
+    assert segments[0]['brightness'] != segments[2]['brightness']
+
+    # Without a face cascade every shot reports no faces
+    assert all(s['faces'] == 0.0 for s in segments), "Face presence must fall back to 0 without a cascade"
+    logging.info("Segment index cut detection test passed")
+
+
+def test_fallbacks():
+    """Face presence averages the sampled detections; keyframes fall back to [] without ffprobe."""
+    logging.info("Starting segment index fallback test...")
+    frames = [shot_frame(i) for i in range(0, 60, 2)]
+
+    cascade = FakeCascade()
+
+    def build():
+        builder = SegmentIndexBuilder(fps=FPS, duration=6.0, face_every=3)
+        for n, frame in enumerate(frames):
+            builder.add(2 * n, frame)
+        return builder.finish()
+
+    index = with_face_cascade(cascade, build)
+    faces = [s['faces'] for s in index['segments']]
+    logging.info(f"Face presence per shot: {faces}, {cascade.calls} detector calls")
+    assert cascade.calls == len(range(0, len(frames), 3)), "Faces must only be detected on every face_every-th sample"
+    assert faces == [0.0, 1.0, 0.0], f"Expected faces only in the second shot, got {faces}"
+    assert index['keyframes'] == [], "finish() without keyframes must store an empty list"
+
+    # ffprobe missing: [] once, and not run again for the rest of the process
+    calls = []
+
+    def missing_ffprobe(*args, **kwargs):
+        calls.append(args)
+        raise FileNotFoundError("ffprobe")
+
+    saved_run, saved_missing = segment_index.subprocess.run, segment_index._FFPROBE_MISSING
+    segment_index.subprocess.run, segment_index._FFPROBE_MISSING = missing_ffprobe, False
+    try:
+        assert probe_keyframes("clip.mp4") == []
+        assert probe_keyframes("other.mp4") == []
+        assert len(calls) == 1, f"ffprobe must only be tried once when missing, tried {len(calls)} times"
+    finally:
+        segment_index.subprocess.run, segment_index._FFPROBE_MISSING = saved_run, saved_missing
+    logging.info("Segment index fallback test passed")
+
+
+def test_select_segments():
+    """Windows are ranked by motion and faces minus cut penalties, start on keyframes and never overlap."""
+    logging.info("Starting segment selection test...")
+    index = {
+        'duration': 10.0,
+        'keyframes': [],
+        'segments': [
+            {'start': 0.0, 'end': 4.0, 'motion': 0.1, 'brightness': 100.0, 'faces': 0.0},
+            {'start': 4.0, 'end': 7.0, 'motion': 0.4, 'brightness': 100.0, 'faces': 1.0},
+            {'start': 7.0, 'end': 10.0, 'motion': 0.2, 'brightness': 100.0, 'faces': 0.0},
+        ]
+    }
+    # Shot scores (0.5 * normalized motion + 0.5 * faces): 0.125, 1.0, 0.25
+
+    # No keyframes: candidates are shot starts
+    windows = select_segments(index, 3.0)
+    logging.info(f"Shot-start windows: {windows}")
+    assert [w['start'] for w in windows] == [4.0, 7.0, 0.0]
+    assert np.allclose([w['score'] for w in windows], [1.0, 0.25, 0.125])
+    assert not any(w['keyframe_aligned'] for w in windows)
+    assert all(w['duration'] == 3.0 for w in windows)
+
+    # Keyframes: candidates are keyframes that leave room for the window (8.0 does not)
+    index['keyframes'] = [0.0, 2.0, 3.0, 5.0, 8.0]
+    windows = select_segments(index, 3.0)
+    logging.info(f"Keyframe windows: {windows}")
+    # 5.0 scores 0.75 - 0.25 (one cut); 3.0 (0.458) overlaps it; 2.0 scores 0.417 - 0.25; 0.0 overlaps 2.0
+    assert [w['start'] for w in windows] == [5.0, 2.0]
+    assert np.allclose([w['score'] for w in windows], [0.5, 1.25 / 3 - 0.25])
+    assert all(w['keyframe_aligned'] for w in windows)
+    for a in windows:
+        for b in windows:
+            assert a is b or abs(a['start'] - b['start']) >= 3.0, "Selected windows must not overlap"
+
+    # Without a cut penalty the windows across cuts keep their full score
+    windows = select_segments(index, 3.0, cut_penalty=0.0)
+    assert np.allclose([w['score'] for w in windows], [0.75, 1.25 / 3])
+
+    assert len(select_segments(index, 3.0, max_results=1)) == 1
+    assert select_segments(index, 11.0) == [], "A window longer than the clip selects nothing"
+    assert select_segments({'duration': 10.0, 'segments': []}, 3.0) == []
+    logging.info("Segment selection test passed")
+
+
+if __name__ == "__main__":
+    test_cut_detection()
+    test_fallbacks()
+    test_select_segments()
@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+import os
+import sys
+import time
+import logging
+
+# Add parent directory to path for imports
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(PROJECT_ROOT)
+
+from e2e_cloud.sharded_launcher import ShardedLauncher, assign_shards, parse_devices
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='[%(asctime)s] %(levelname)s: %(message)s'
+)
+
+
+class FakeGenerator:
+    """Stand-in for the warm Wan generator: loads once per process, fixed latency per clip."""
+
+    def __init__(self, latency):
+        self.latency = latency
+        self.load_count = 1
+
+    def generate(self, prompt):
+        time.sleep(self.latency)
+        if "broken" in prompt:
+            raise RuntimeError(f"generation failed for {prompt}")
+        return f"{prompt}.mp4"
+
+
+def fake_worker(shard_index, device, items, emit):
+    """Worker process: one fake generator for the whole shard, one event per item."""
+    if any(item["avatar"] == "crash" for item in items):
+        # Like a worker killed by the OOM killer: no exception, no done event
+        os._exit(3)
+
+    generator = FakeGenerator(latency=0.05)
+    for item in items:
+        try:
+            video = generator.generate(item["prompt"])
+            emit({"type": "result", "item": item["id"], "avatar": item["avatar"], "video": video,
+                  "pid": os.getpid(), "device": os.environ.get("CUDA_VISIBLE_DEVICES")})
+        except Exception as e:
+            emit({"type": "failure", "item": item["id"], "error": str(e)})
+    emit({"type": "loads", "count": generator.load_count})
+
+
+def make_groups(avatars, per_avatar):
+    return {avatar: [{"id": f"{avatar}_{i}", "avatar": avatar, "prompt": f"{avatar} clip {i}"}
+                     for i in range(per_avatar[avatar])]
+            for avatar in avatars}
+
+
+def test_sharded_launcher():
+    """Avatars stay on one worker, results and failures are collected centrally, a dead worker is reported."""
+    logging.info("Starting sharded launcher test...")
+    ok = True
+
+    groups = make_groups(["emma", "sophia", "olivia", "ava"], {"emma": 4, "sophia": 3, "olivia": 2, "ava": 1})
+    groups["olivia"][1]["prompt"] = "olivia broken clip"
+    shards = assign_shards(groups, 2)
+    logging.info(f"Shard sizes: {[len(shard) for shard in shards]}")
+    if sorted(len(shard) for shard in shards) != [5, 5]:
+        logging.error("Expected the 4/3/2/1 avatar groups to be balanced 5/5")
+        ok = False
+    for avatar in groups:
+        if sum(any(item["avatar"] == avatar for item in shard) for shard in shards) != 1:
+            logging.error(f"{avatar} must be assigned to exactly one worker")
+            ok = False
+
+    collected = []
+    devices = parse_devices("0,1", 1)
+    report = ShardedLauncher(fake_worker, devices, name="test").run(
+        shards, on_event=lambda index, event: collected.append((index, event)))
+
+    results = [event for _, event in collected if event["type"] == "result"]
+    failures = [event for _, event in collected if event["type"] == "failure"]
+    loads = [event["count"] for _, event in collected if event["type"] == "loads"]
+    logging.info(f"{len(results)} results, failures {failures}, loads per worker {loads}")
+    if len(results) != 9 or [f["item"] for f in failures] != ["olivia_1"]:
+        logging.error("Expected every item to be reported, with the broken clip as the only failure")
+        ok = False
+    if len(set(event["pid"] for event in results)) != 2 or loads != [1, 1]:
+        logging.error("Expected two worker processes, each loading its generator once")
+        ok = False
+    for avatar in groups:
+        if len({event["pid"] for event in results if event["avatar"] == avatar}) > 1:
+            logging.error(f"{avatar} was generated by more than one worker")
+            ok = False
+    if sorted({event["device"] for event in results}) != ["0", "1"]:
+        logging.error("Each worker must only see its own device")
+        ok = False
+    if any(shard["error"] or shard["exitcode"] != 0 for shard in report["shards"].values()):
+        logging.error(f"Unexpected worker errors: {report['shards']}")
+        ok = False
+
+    # A worker that dies is reported instead of hanging the launcher
+    crash_groups = make_groups(["emma", "crash"], {"emma": 2, "crash": 1})
+    report = ShardedLauncher(fake_worker, parse_devices(None, 2), name="test-crash").run(
+        assign_shards(crash_groups, 2))
+    crashed = [shard for shard in report["shards"].values() if shard["error"]]
+    results = [event for _, event in report["events"] if event["type"] == "result"]
+    logging.info(f"Crash run: {report['shards']}, {len(results)} results")
+    if len(crashed) != 1 or crashed[0]["exitcode"] != 3 or len(results) != 2:
+        logging.error("Expected the crashed worker to be reported and the other worker's results kept")
+        ok = False
+
+    if ok:
+        logging.info("Sharded launcher test passed")
+    else:
+        logging.error("Sharded launcher test failed")
+    return ok
+
+
+if __name__ == "__main__":
+    sys.exit(0 if test_sharded_launcher() else 1)
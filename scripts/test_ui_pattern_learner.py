@@ -0,0 +1,388 @@
+#!/usr/bin/env python3
+import os
+import sys
+import json
+import time
+import shutil
+import logging
+import tempfile
+
+import cv2
+import numpy as np
+
+# Add parent directory to path for imports
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(PROJECT_ROOT)
+
+from video_generation import ui_pattern_learner
+from video_generation.ui_pattern_learner import UIComponentExtractor, UIElement, UIPatternLearner
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='[%(asctime)s] %(levelname)s: %(message)s'
+)
+
+
+def make_screenshot(path, seed):
+    """Synthetic app screen: header bar, cards, buttons and a tab bar, varied by seed."""
+    rng = np.random.default_rng(seed)
+    image = np.full((1280, 720, 3), 245, dtype=np.uint8)
+    cv2.rectangle(image, (0, 0), (720, 120), (60, 120, 200), -1)
+    for row in range(int(rng.integers(2, 5))):
+        top = 160 + row * 230
+        cv2.rectangle(image, (40, top), (680, top + 200), (255, 255, 255), -1)
+        cv2.rectangle(image, (40, top), (680, top + 200), (200, 200, 200), 2)
+        cv2.rectangle(image, (60, top + 130), (60 + int(rng.integers(150, 300)), top + 180), (40, 160, 90), -1)
+    for tab in range(4):
+        cv2.circle(image, (90 + tab * 180, 1220), 24, (120, 120, 120), -1)
+    cv2.imwrite(path, image)
+
+
+def summary(extraction):
+    # Through JSON, like the cache: tuples in the structure come back as lists
+    return json.dumps(([(e.type, e.x, e.y, e.width, e.height) for e in extraction['elements']],
+                       extraction['structure']), sort_keys=True)
+
+
+def test_batch_extraction():
+    """Parallel extraction matches serial extraction screenshot by screenshot, in input order, and is cached."""
+    logging.info("Starting batched UI extraction test...")
+    ok = True
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        paths = []
+        for i in range(12):
+            path = os.path.join(tmp_dir, f"screen_{i:02d}.png")
+            make_screenshot(path, i)
+            paths.append(path)
+        paths.append(os.path.join(tmp_dir, "missing.png"))
+
+        # Reference: one screenshot at a time
+        serial_extractor = UIComponentExtractor(cache_dir=os.path.join(tmp_dir, "serial_cache"))
+        os.makedirs(serial_extractor.cache_dir)
+        start = time.time()
+        serial = [serial_extractor.extract_components(path) for path in paths]
+        serial_time = time.time() - start
+
+        extractor = UIComponentExtractor(cache_dir=os.path.join(tmp_dir, "batch_cache"))
+        os.makedirs(extractor.cache_dir)
+        start = time.time()
+        batched = extractor.extract_components_batch(paths, workers=3)
+        batch_time = time.time() - start
+        logging.info(f"Serial {serial_time:.2f}s, 3 workers {batch_time:.2f}s on {os.cpu_count()} core(s)")
+
+        if [b['screenshot'] for b in batched] != paths:
+            logging.error("Results must be in input order")
+            ok = False
+        if [summary(b) for b in batched] != [summary(s) for s in serial]:
+            logging.error("Parallel extraction must match serial extraction")
+            ok = False
+        if not all(b['elements'] for b in batched[:-1]) or batched[-1]['elements']:
+            logging.error("Expected elements for every screenshot and none for the missing file")
+            ok = False
+
+        cached = sorted(os.listdir(extractor.cache_dir))
+        if len(cached) != 12:
+            logging.error(f"Expected 12 cached extractions (the missing file is not cached), got {len(cached)}")
+            ok = False
+
+        # A second run is served from the cache without starting workers
+        start = time.time()
+        again = extractor.extract_components_batch(paths, workers=3)
+        logging.info(f"Cached run {time.time() - start:.2f}s")
+        if [summary(a) for a in again[:-1]] != [summary(b) for b in batched[:-1]]:
+            logging.error("Cached results must match the extraction")
+            ok = False
+
+    if ok:
+        logging.info("Batched UI extraction test passed")
+    else:
+        logging.error("Batched UI extraction test failed")
+    return ok
+
+
+def counting_extractor(cache_dir):
+    """Extractor that counts how many screenshots it actually runs detection on."""
+    extractor = UIComponentExtractor(cache_dir=cache_dir)
+    extractor.detections = 0
+    detect = extractor._detect_ui_elements_cv
+
+    def counted(image):
+        extractor.detections += 1
+        return detect(image)
+    extractor._detect_ui_elements_cv = counted
+    return extractor
+
+
+def test_content_hash_cache():
+    """Only new or changed screenshots are extracted again; a config change invalidates every entry."""
+    logging.info("Starting content hash cache test...")
+    ok = True
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        cache_dir = os.path.join(tmp_dir, "cache")
+        os.makedirs(cache_dir)
+        a, b, c = (os.path.join(tmp_dir, f"{name}.png") for name in ("a", "b", "c"))
+        make_screenshot(a, 1)
+        make_screenshot(b, 2)
+        # A filename-keyed entry from an older version must not be used for a.png
+        with open(os.path.join(cache_dir, "a.png.json"), "w") as f:
+            json.dump({"elements": [], "structure": {}, "screenshot": a}, f)
+
+        def run(paths):
+            extractor = counting_extractor(cache_dir)
+            results = extractor.extract_components_batch(paths, workers=1)
+            return extractor.detections, results
+
+        detections, first = run([a, b])
+        logging.info(f"First run: {detections} detections")
+        if detections != 2 or not first[0]['elements']:
+            logging.error("Expected both screenshots to be extracted, ignoring the legacy entry")
+            ok = False
+
+        detections, _ = run([a, b])
+        if detections != 0:
+            logging.error(f"Unchanged screenshots must come from the cache ({detections} detections)")
+            ok = False
+
+        # Same name, new content: only that screenshot is extracted again, with its new elements
+        make_screenshot(a, 3)
+        shutil.copy(b, c)
+        detections, replaced = run([a, b, c])
+        logging.info(f"After replacing a.png and copying b.png to c.png: {detections} detection(s)")
+        if detections != 1 or summary(replaced[0]) == summary(first[0]):
+            logging.error("Expected only the replaced screenshot to be extracted again")
+            ok = False
+        if summary(replaced[2]) != summary(replaced[1]):
+            logging.error("A copy of a cached screenshot must share its entry")
+            ok = False
+
+        # New extraction code invalidates every entry
+        version = ui_pattern_learner.EXTRACTION_VERSION
+        ui_pattern_learner.EXTRACTION_VERSION = version + 1
+        try:
+            detections, _ = run([a, b])
+        finally:
+            ui_pattern_learner.EXTRACTION_VERSION = version
+        if detections != 2:
+            logging.error(f"A new extraction version must re-extract everything ({detections} detections)")
+            ok = False
+
+    if ok:
+        logging.info("Content hash cache test passed")
+    else:
+        logging.error("Content hash cache test failed")
+    return ok
+
+
+def failing_detr_extractor(cache_dir, failing_path):
+    """Extractor with a stand-in DETR (CV detection underneath) that fails on one screenshot."""
+    extractor = counting_extractor(cache_dir)
+    extractor.element_detector = "detr"
+    extractor._extraction_config = dict(extractor.extraction_config(), detector="detr:test")
+    failing = cv2.imread(failing_path)
+    extractor.detr_images = 0
+
+    def detect_batch(images):
+        extractor.detr_images += len(images)
+        if any(image.shape == failing.shape and np.array_equal(image, failing) for image in images):
+            raise RuntimeError("DETR failure")
+        return [extractor._detect_ui_elements_cv(image) for image in images]
+    extractor._detect_elements_detr_batch = detect_batch
+    return extractor
+
+
+def test_detr_failure_cache_key():
+    """A screenshot DETR fails on is cached under the CV config's key, not as a DETR extraction."""
+    logging.info("Starting DETR failure cache key test...")
+    ok = True
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        cache_dir = os.path.join(tmp_dir, "cache")
+        os.makedirs(cache_dir)
+        good, bad = (os.path.join(tmp_dir, f"{name}.png") for name in ("good", "bad"))
+        make_screenshot(good, 1)
+        make_screenshot(bad, 2)
+
+        extractor = failing_detr_extractor(cache_dir, bad)
+        results = extractor.extract_components_batch([good, bad], workers=1)
+        detr_keys = [extractor.cache_key(path) for path in (good, bad)]
+        cv_key = extractor.cache_key(bad, extractor._cv_extraction_config())
+        cached = {name[:-len(".json")] for name in os.listdir(cache_dir)}
+        logging.info(f"Cache entries: {sorted(cached)}")
+        if not all(r['elements'] for r in results):
+            logging.error("Both screenshots must be extracted")
+            ok = False
+        if cached != {detr_keys[0], cv_key}:
+            logging.error("Expected the DETR extraction under the DETR key and the CV fallback under the CV key")
+            ok = False
+        else:
+            with open(os.path.join(cache_dir, f"{cv_key}.json")) as f:
+                if json.load(f)['config']['detector'] != "cv":
+                    logging.error("The CV fallback entry must record the CV config")
+                    ok = False
+
+        # The next run retries DETR on the failed screenshot and serves its CV extraction from the cache
+        extractor = failing_detr_extractor(cache_dir, bad)
+        again = extractor.extract_components_batch([good, bad], workers=1)
+        logging.info(f"Second run: {extractor.detr_images} DETR image(s), {extractor.detections} detection(s)")
+        if extractor.detr_images != 1 or summary(again[1]) != summary(results[1]):
+            logging.error("Expected only a DETR retry of the failed screenshot, then its cached CV extraction")
+            ok = False
+
+    if ok:
+        logging.info("DETR failure cache key test passed")
+    else:
+        logging.error("DETR failure cache key test failed")
+    return ok
+
+
+def random_screens(seed, screens, elements, canvas=(1080, 1920)):
+    """Screens of random elements: half recur around shared anchors, half are new on every screen."""
+    rng = np.random.default_rng(seed)
+    types = ["button", "text", "image", "icon", "card"]
+    texts = [None, "", "Calories", "calories", "Protein", "Save"]
+    anchors = [(str(rng.choice(types)), int(rng.integers(0, canvas[0])), int(rng.integers(0, canvas[1])),
+                int(rng.integers(10, 300)), int(rng.integers(10, 300))) for _ in range(elements)]
+    components_list = []
+    for _ in range(screens):
+        screen = []
+        for i, (elem_type, x, y, w, h) in enumerate(anchors):
+            if i % 2:
+                x, y = int(rng.integers(0, canvas[0])), int(rng.integers(0, canvas[1]))
+            jitter = int(rng.integers(0, 4)) * 40
+            text = texts[int(rng.integers(0, len(texts)))]
+            screen.append(UIElement(elem_type, x + jitter, y + jitter, w + jitter // 2, h, text=text))
+        components_list.append({'elements': screen, 'structure': {'screen_size': canvas}})
+    return components_list
+
+
+def pairwise_constant_elements(learner, components_list):
+    """The original all-pairs scan, as the reference."""
+    constant = []
+    for ref_elem in components_list[0]['elements']:
+        if ref_elem.width < 20 or ref_elem.height < 20:
+            continue
+        if all(any(learner._element_similarity(ref_elem, elem) > 0.7 for elem in components['elements'])
+               for components in components_list[1:]):
+            constant.append(ref_elem.to_dict())
+    return constant
+
+
+def per_region_variable_elements(components_list):
+    """The original per-region scan of every element on every screen, as the reference."""
+    if len(components_list) < 2:
+        return []
+    variable_elements = []
+    regions = {
+        'food_image': {'y_range': (0.2, 0.5), 'x_range': (0.1, 0.9), 'min_size': 100},
+        'calorie_value': {'y_range': (0.4, 0.7), 'x_range': (0.1, 0.9), 'min_size': 40},
+        'macro_values': {'y_range': (0.5, 0.8), 'x_range': (0.1, 0.9), 'min_size': 30},
+        'food_name': {'y_range': (0.3, 0.6), 'x_range': (0.1, 0.9), 'min_size': 30}
+    }
+    width, height = components_list[0]['structure'].get('screen_size', (1080, 1920))
+    for region_name, region in regions.items():
+        y_min, y_max = int(region['y_range'][0] * height), int(region['y_range'][1] * height)
+        x_min, x_max = int(region['x_range'][0] * width), int(region['x_range'][1] * width)
+        region_elements = []
+        for components in components_list:
+            matching_elements = []
+            for elem in components['elements']:
+                elem_center_x, elem_center_y = elem.get_center()
+                if (x_min <= elem_center_x <= x_max and
+                    y_min <= elem_center_y <= y_max and
+                    elem.width >= region['min_size'] and
+                    elem.height >= region['min_size']):
+                    matching_elements.append(elem)
+            if matching_elements:
+                matching_elements.sort(key=lambda e: e.get_area(), reverse=True)
+                region_elements.append(matching_elements[0])
+        if len(region_elements) > 1:
+            differs = False
+            if region_elements[0].type in ['text', 'label', 'button'] and region_elements[0].text:
+                differs = len(set(e.text for e in region_elements if e.text)) > 1
+            elif region_elements[0].type in ['image', 'icon']:
+                differs = True
+            else:
+                positions = [(e.x, e.y) for e in region_elements]
+                sizes = [(e.width, e.height) for e in region_elements]
+                pos_variance = np.var([p[0] for p in positions]) + np.var([p[1] for p in positions])
+                size_variance = np.var([s[0] for s in sizes]) + np.var([s[1] for s in sizes])
+                differs = pos_variance > 100 or size_variance > 100
+            if differs:
+                variable_elements.append({
+                    'name': region_name,
+                    'type': region_elements[0].type,
+                    'position': (
+                        sum(e.x for e in region_elements) / len(region_elements),
+                        sum(e.y for e in region_elements) / len(region_elements)
+                    ),
+                    'size': (
+                        sum(e.width for e in region_elements) / len(region_elements),
+                        sum(e.height for e in region_elements) / len(region_elements)
+                    ),
+                    'observed_values': [
+                        {'text': e.text} if e.text else {} for e in region_elements
+                    ]
+                })
+    return variable_elements
+
+
+def test_element_matching():
+    """Indexed element matching finds the same constant and variable elements as the pairwise scan, faster."""
+    logging.info("Starting element matching test...")
+    learner = UIPatternLearner.__new__(UIPatternLearner)
+
+    # Region picks: the largest element centered in the region, the first one on ties
+    tied = [UIElement("image", 400, 700, 200, 200), UIElement("image", 300, 650, 200, 200),
+            UIElement("image", 500, 800, 150, 150)]
+    for seed in range(20):
+        components_list = random_screens(seed, screens=4, elements=60)
+        components_list[0]['elements'].extend(tied)
+        assert learner._find_constant_elements(components_list) == pairwise_constant_elements(learner, components_list), \
+            f"Constant elements differ from the pairwise scan (seed {seed})"
+    variable = learner._find_variable_elements(components_list)
+    assert variable and variable[0]['name'] == 'food_image', f"Expected the food image region to vary, got {variable}"
+
+    # Variable elements: the full output matches the per-region scan, across element counts,
+    # screen counts and canvases so every region and element-type branch is exercised
+    branches = set()
+    for seed in range(40):
+        canvas = ((1080, 1920), (720, 1280), (1440, 2560))[seed % 3]
+        components_list = random_screens(seed, screens=2 + seed % 3, elements=5 + 3 * seed, canvas=canvas)
+        if seed % 4 == 0:
+            components_list[0]['elements'].extend(tied)
+        indexed = learner._find_variable_elements(components_list)
+        reference = per_region_variable_elements(components_list)
+        assert indexed == reference, f"Variable elements differ from the per-region scan (seed {seed}):\n" \
+                                     f"indexed   {indexed}\nreference {reference}"
+        branches.update((v['name'], v['type']) for v in reference)
+    logging.info(f"Variable regions/types covered: {sorted(branches)}")
+    assert {name for name, _ in branches} == {'food_image', 'calorie_value', 'macro_values', 'food_name'}, \
+        "Every region should be found variable for some seed"
+
+    # Benchmark: thousands of elements spread over a large canvas, and crowded on one phone screen
+    for elements, canvas in ((250, (20000, 20000)), (1000, (20000, 20000)), (4000, (20000, 20000)),
+                             (4000, (1080, 1920))):
+        components_list = random_screens(elements, screens=3, elements=elements, canvas=canvas)
+        start = time.time()
+        indexed = learner._find_constant_elements(components_list)
+        indexed_time = time.time() - start
+        start = time.time()
+        pairwise = pairwise_constant_elements(learner, components_list)
+        pairwise_time = time.time() - start
+        logging.info(f"{elements} elements x 3 screens of {canvas}: indexed {indexed_time:.3f}s, "
+                     f"pairwise {pairwise_time:.3f}s, {len(indexed)} constant")
+        assert indexed == pairwise, f"Constant elements differ from the pairwise scan ({elements} elements, {canvas})"
+
+    logging.info("Element matching test passed")
+    return True
+
+
+if __name__ == "__main__":
+    ok = test_batch_extraction()
+    ok &= test_content_hash_cache()
+    ok &= test_detr_failure_cache_key()
+    ok &= test_element_matching()
+    sys.exit(0 if ok else 1)
@@ -2,12 +2,17 @@
 import os
 import sys
 import logging
+import tempfile
 from pathlib import Path
 
+import cv2
+import numpy as np
+
 # Add parent directory to path for imports
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from video_editing.video_analyzer import VideoAnalyzer
+from video_editing.video_analyzer import (VideoAnalyzer, _sample_frames_ffmpeg, _sample_frames_grab,
+                                          _sample_frames_seek, analyze_video_file)
 
 # Configure logging
 logging.basicConfig(
@@ -59,5 +64,164 @@ def test_video_analyzer():
     except Exception as e:
         logging.error(f"Error in full analysis: {e}")
 
+def write_indexed_clip(path, frame_count=48, width=640, height=360, fps=24):
+    """Synthetic clip whose left quarter encodes the frame index as a gray level, over a checkerboard (up to 49 frames)."""
+    yy, xx = np.mgrid[0:height, 0:width]
+    checker = np.where(((yy // 24) + (xx // 24)) % 2 == 0, 40, 200).astype(np.uint8)
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*'mp4v'), fps, (width, height))
+    for i in range(frame_count):
+        frame = np.repeat(checker[:, :, None], 3, axis=2)
+        frame[:, :width // 4] = index_level(i)
+        writer.write(frame)
+    writer.release()
+
+
+def index_level(i):
+    return 10 + 5 * i
+
+
+def left_level(frame):
+    return float(np.mean(frame[:, :frame.shape[1] // 4]))
+
+
+def decoded_levels(path):
+    """Index gray level of every frame as a plain sequential read decodes it (codec rounding included)."""
+    cap = cv2.VideoCapture(path)
+    levels = []
+    while True:
+        ret, frame = cap.read()
+        if not ret:
+            break
+        levels.append(left_level(frame))
+    cap.release()
+    return np.array(levels)
+
+
+def frame_index(frame, levels):
+    """Frame index encoded by write_indexed_clip: the frame with the nearest decoded level."""
+    return int(np.argmin(np.abs(levels - left_level(frame))))
+
+
+def test_sampling_modes():
+    """grab, seek and ffmpeg sampling return the same frames and near-equal stats, at full resolution by default."""
+    logging.info("Starting sampling mode test...")
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, "indexed.mp4")
+        write_indexed_clip(path)
+        sample_points = np.linspace(0, 47, num=10, dtype=int)
+        levels = decoded_levels(path)
+
+        frames = {
+            'grab': _sample_frames_grab(path, sample_points, None),
+            'seek': _sample_frames_seek(path, sample_points, None),
+            'ffmpeg': _sample_frames_ffmpeg(path, sample_points, 640, 360, None)
+        }
+        for mode, mode_frames in frames.items():
+            indices = [frame_index(frame, levels) for frame in mode_frames]
+            logging.info(f"{mode}: frame indices {indices}, shape {mode_frames[0].shape}")
+            assert indices == sample_points.tolist(), f"{mode} sampled frames {indices}, expected {sample_points.tolist()}"
+            assert mode_frames[0].shape == (360, 640, 3), f"{mode} must keep full resolution by default"
+
+        # Downscaled sampling selects the same frames
+        for mode, mode_frames in (('grab', _sample_frames_grab(path, sample_points, 160)),
+                                  ('ffmpeg', _sample_frames_ffmpeg(path, sample_points, 640, 360, 160))):
+            assert [frame_index(frame, levels) for frame in mode_frames] == sample_points.tolist(), \
+                f"Downscaled {mode} sampling selected different frames"
+            assert mode_frames[0].shape == (90, 160, 3), f"Downscaled {mode} frames are {mode_frames[0].shape}"
+
+        records = {mode: analyze_video_file(path, sampling_mode=mode, segment_fps=None) for mode in frames}
+        for mode, record in records.items():
+            for stat in ('brightness', 'contrast'):
+                difference = np.max(np.abs(np.array(record[stat]) - np.array(records['grab'][stat])))
+                logging.info(f"{mode} {stat} max difference to grab: {difference:.3f}")
+                assert difference < 1.5, f"{mode} {stat} differs from grab by {difference:.3f}"
+            assert record['transitions'] == records['grab']['transitions'], \
+                f"{mode} transitions {record['transitions']} != grab {records['grab']['transitions']}"
+
+        # The default contrast is that of the full-resolution frames, as before sampling modes existed
+        full_contrast = [float(np.std(frame)) for frame in frames['seek']]
+        assert np.allclose(records['grab']['contrast'], full_contrast, atol=0.5), \
+            "Default contrast must be measured at full resolution"
+        downscaled = analyze_video_file(path, max_width=160, segment_fps=None)
+        logging.info(f"Contrast at full resolution {np.mean(full_contrast):.2f}, "
+                     f"at 160px {np.mean(downscaled['contrast']):.2f}")
+    logging.info("Sampling mode test passed")
+    return True
+
+
+def counting_analyzer(training_dir, cache_file):
+    """VideoAnalyzer that records which videos each training-set run analyzes."""
+    analyzer = VideoAnalyzer(training_videos_dir=training_dir, cache_file=cache_file,
+                             max_workers=1, segment_fps=None)
+    analyzer.analyzed = []
+    analyze = analyzer._analyze_video_files
+
+    def counted(video_files, on_record=None):
+        analyzer.analyzed.append(sorted(os.path.basename(path) for path in video_files))
+        return analyze(video_files, on_record=on_record)
+    analyzer._analyze_video_files = counted
+    return analyzer
+
+
+def test_incremental_analysis():
+    """Only new or changed videos are analyzed, deleted ones are dropped, and durations are counted once."""
+    logging.info("Starting incremental training-set analysis test...")
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        training_dir = os.path.join(tmp_dir, "training_videos")
+        influencer_dir = os.path.join(training_dir, "creator")
+        os.makedirs(influencer_dir)
+        cache_file = os.path.join(tmp_dir, "style_patterns.json")
+        clips = {name: os.path.join(influencer_dir, name) for name in ("a.mp4", "b.mp4", "c.mp4")}
+        write_indexed_clip(clips["a.mp4"], frame_count=24, width=160, height=96)
+        write_indexed_clip(clips["b.mp4"], frame_count=36, width=160, height=96)
+
+        def durations(analyzer):
+            return sorted(round(d, 2) for d in analyzer.style_patterns['duration'])
+
+        analyzer = counting_analyzer(training_dir, cache_file)
+        analyzer.analyze_training_set()
+        assert analyzer.analyzed == [["a.mp4", "b.mp4"]], f"First run analyzed {analyzer.analyzed}"
+        assert durations(analyzer) == [1.0, 1.5], f"Durations {durations(analyzer)}"
+
+        # Unchanged: nothing analyzed, in this analyzer or in a new one reading the store
+        analyzer.analyze_training_set()
+        assert analyzer.analyzed == [["a.mp4", "b.mp4"]], f"Second run re-analyzed {analyzer.analyzed[1:]}"
+        analyzer = counting_analyzer(training_dir, cache_file)
+        analyzer.analyze_training_set()
+        assert analyzer.analyzed == [], f"A new analyzer re-analyzed {analyzer.analyzed}"
+        assert durations(analyzer) == [1.0, 1.5], f"Durations from the store {durations(analyzer)}"
+
+        # A new file is analyzed alone
+        write_indexed_clip(clips["c.mp4"], frame_count=48, width=160, height=96)
+        analyzer.analyze_training_set()
+        assert analyzer.analyzed == [["c.mp4"]], f"After adding c.mp4 analyzed {analyzer.analyzed}"
+        assert durations(analyzer) == [1.0, 1.5, 2.0], f"Durations {durations(analyzer)}"
+
+        # A deleted file is dropped without analyzing anything
+        os.remove(clips["a.mp4"])
+        analyzer.analyze_training_set()
+        assert analyzer.analyzed == [["c.mp4"], []], f"After deleting a.mp4 analyzed {analyzer.analyzed}"
+        assert durations(analyzer) == [1.5, 2.0], f"Durations {durations(analyzer)}"
+        assert clips["a.mp4"] not in analyzer.store.keys('video_records'), "The deleted video's record must be removed"
+
+        # A modified file is analyzed again and replaces its old record
+        write_indexed_clip(clips["b.mp4"], frame_count=42, width=160, height=96)
+        stat = os.stat(clips["b.mp4"])
+        os.utime(clips["b.mp4"], ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+        analyzer.analyze_training_set()
+        assert analyzer.analyzed[-1] == ["b.mp4"], f"After modifying b.mp4 analyzed {analyzer.analyzed[-1]}"
+        assert durations(analyzer) == [1.75, 2.0], f"Durations {durations(analyzer)}"
+
+        # force_reanalyze redoes everything, without duplicating any record in the aggregate
+        analyzer.analyze_training_set(force_reanalyze=True)
+        assert analyzer.analyzed[-1] == ["b.mp4", "c.mp4"], f"Forced run analyzed {analyzer.analyzed[-1]}"
+        assert durations(analyzer) == [1.75, 2.0], f"Durations after a forced run {durations(analyzer)}"
+        assert len(analyzer.style_patterns['brightness']) == 2 * 10, "Each video contributes its samples once"
+    logging.info("Incremental training-set analysis test passed")
+    return True
+
+
 if __name__ == "__main__":
+    test_sampling_modes()
+    test_incremental_analysis()
     test_video_analyzer() 
\ No newline at end of file
@@ -0,0 +1,411 @@
+#!/usr/bin/env python3
+import os
+import sys
+import logging
+import time
+import tempfile
+import threading
+
+import shutil
+
+import cv2
+import numpy as np
+
+# Add parent directory to path for imports
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(PROJECT_ROOT)
+sys.path.append(os.path.join(PROJECT_ROOT, "e2e_cloud"))
+
+# Same import path as run_generation, so both see the same shared generators
+from wan_t2v_generator import (PlaceholderVideoGenerator, encode_rgb_frames, frames_to_rgb24,
+                               get_wan_generator, shutdown_wan_generators)
+from prompt_embedding_cache import PromptEmbeddingCache
+from clip_library import ClipLibrary
+from staged_executor import StagedExecutor
+from run_generation import generate_avatar_video_with_wan
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='[%(asctime)s] %(levelname)s: %(message)s'
+)
+
+
+def test_wan_session():
+    """Run several scripts through one warm generator, using the placeholder stand-in (no GPU needed)."""
+    logging.info("Starting Wan session test...")
+    ok = True
+
+    generator = get_wan_generator(None, resolution="480p", gpu_type="T4", placeholder=True)
+    if not isinstance(generator, PlaceholderVideoGenerator):
+        logging.error("Expected the placeholder generator")
+        return False
+    if get_wan_generator(None, resolution="480p", gpu_type="T4", placeholder=True) is not generator:
+        logging.error("Same settings must return the same warm generator")
+        ok = False
+
+    scripts = [
+        {"avatar": "emma", "food_item": "avocado toast", "feature": "food scanning"},
+        {"avatar": "emma", "food_item": "salad", "feature": "tracking"},
+        {"avatar": "sophia", "food_item": "pasta", "feature": "food scanning"},
+    ]
+
+    with tempfile.TemporaryDirectory() as output_dir:
+        for script in scripts:
+            result = generate_avatar_video_with_wan(script, output_dir, generator)
+            if not result or not os.path.exists(result["avatar_video"]):
+                logging.error(f"No avatar video for {script['avatar']}")
+                ok = False
+                continue
+
+            cap = cv2.VideoCapture(result["avatar_video"])
+            size = (int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)), int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT)))
+            frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+            cap.release()
+            logging.info(f"{script['avatar']}: {result['avatar_video']} {size[0]}x{size[1]}, {frames} frames")
+            if size != (generator.width, generator.height) or frames != 5 * 24:
+                logging.error(f"Unexpected placeholder video for {script['avatar']}")
+                ok = False
+
+    # Forced release clears caches but keeps the generator warm
+    generator.release_memory(force=True)
+    if not generator.initialized or generator.load_count != 1:
+        logging.error(f"Generator was reloaded or torn down (load_count={generator.load_count})")
+        ok = False
+    else:
+        logging.info(f"Weights loaded once for {len(scripts)} scripts")
+
+    shutdown_wan_generators()
+    if get_wan_generator(None, resolution="480p", gpu_type="T4", placeholder=True) is generator:
+        logging.error("shutdown_wan_generators must drop the shared generators")
+        ok = False
+    shutdown_wan_generators()
+
+    if ok:
+        logging.info("Wan session test passed")
+    else:
+        logging.error("Wan session test failed")
+    return ok
+
+
+class BatchLimitedGenerator(PlaceholderVideoGenerator):
+    """Placeholder that runs out of memory above a batch size and fails one prompt outright."""
+
+    def __init__(self, memory_limit, failing_prompt, **kwargs):
+        super().__init__(**kwargs)
+        self.memory_limit = memory_limit
+        self.failing_prompt = failing_prompt
+        self.batch_sizes = []
+
+    def _generate_batch(self, batch, negative_prompt, duration, fps):
+        self.batch_sizes.append(len(batch))
+        if len(batch) > self.memory_limit:
+            return "oom"
+        if any(r["prompt"] == self.failing_prompt for r in batch):
+            return "pipeline error"
+        return super()._generate_batch(batch, negative_prompt, duration, fps)
+
+
+def test_batched_generation():
+    """Batches split on out-of-memory, results stay in prompt order, failures are per item."""
+    logging.info("Starting batched generation test...")
+    ok = True
+
+    prompts = [f"avatar variation {i}" for i in range(5)]
+    generator = BatchLimitedGenerator(memory_limit=2, failing_prompt="avatar variation 4",
+                                      model_dir=None, resolution="480p", gpu_type="T4")
+    with tempfile.TemporaryDirectory() as output_dir:
+        paths = [os.path.join(output_dir, f"video_{i}.mp4") for i in range(len(prompts))]
+        results = generator.generate_videos(prompts, paths, seeds=[0, 1, 2, 3, 4], duration=1, max_batch_size=4)
+
+        logging.info(f"Pipeline calls by batch size: {generator.batch_sizes}")
+        if [r["prompt"] for r in results] != prompts or [r["seed"] for r in results] != [0, 1, 2, 3, 4]:
+            logging.error("Results must be one per prompt, in prompt order")
+            ok = False
+        if any(r["video_path"] is None or not os.path.exists(r["video_path"]) for r in results[:4]):
+            logging.error(f"Expected videos for the first four prompts: {results[:4]}")
+            ok = False
+        if results[4]["video_path"] is not None or results[4]["error"] != "pipeline error":
+            logging.error(f"Expected a per-item failure for the last prompt: {results[4]}")
+            ok = False
+        if generator.batch_sizes != [4, 2, 2, 1]:
+            logging.error("Expected the batch of 4 to be split into 2 + 2 after running out of memory")
+            ok = False
+    generator.cleanup()
+
+    if ok:
+        logging.info("Batched generation test passed")
+    else:
+        logging.error("Batched generation test failed")
+    return ok
+
+
+def test_prompt_embedding_cache():
+    """Repeated prompts are encoded once; keys separate models and dtypes; the disk tier survives a new cache."""
+    logging.info("Starting prompt embedding cache test...")
+    ok = True
+    encoded = []
+
+    def encode(text):
+        encoded.append(text)
+        return [len(text)]
+
+    cache = PromptEmbeddingCache()
+    negative = "blurry, low quality"
+    for prompt in ["emma casual", "emma gym", "emma casual", "emma gym"]:
+        cache.get_or_encode("wan", prompt, "float16", encode)
+        cache.get_or_encode("wan", negative, "float16", encode)
+    cache.get_or_encode("sd", "emma casual", "float16", encode)
+    cache.get_or_encode("wan", "emma casual", "float32", encode)
+
+    logging.info(f"Encoder calls: {len(encoded)}, cache stats: {cache.stats()}")
+    if len(encoded) != 5 or cache.stats()["hits"] != 5:
+        logging.error("Expected 3 encodes for 3 distinct texts plus one per other model and dtype")
+        ok = False
+
+    try:
+        import torch
+    except ImportError:
+        logging.warning("torch not installed, skipping the disk tier check")
+        torch = None
+    if torch is not None:
+        with tempfile.TemporaryDirectory() as cache_dir:
+            PromptEmbeddingCache(cache_dir).get_or_encode("wan", "emma casual", "float16", lambda t: torch.ones(1, 4))
+            warm = PromptEmbeddingCache(cache_dir)
+            embedding = warm.get_or_encode("wan", "emma casual", "float16", encode)
+            if warm.stats()["disk_hits"] != 1 or not torch.equal(embedding, torch.ones(1, 4)):
+                logging.error("Expected the embedding to be loaded from disk")
+                ok = False
+
+    if ok:
+        logging.info("Prompt embedding cache test passed")
+    else:
+        logging.error("Prompt embedding cache test failed")
+    return ok
+
+
+def test_clip_library():
+    """Repeat prompts are copied from the library in reuse mode and regenerated in vary mode."""
+    logging.info("Starting clip library test...")
+    ok = True
+
+    generator = BatchLimitedGenerator(memory_limit=8, failing_prompt=None,
+                                      model_dir=None, resolution="480p", gpu_type="T4")
+    prompts = ["emma casual", "emma gym"]
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        library = ClipLibrary(os.path.join(tmp_dir, "library"), seed_mode="reuse")
+        paths = [os.path.join(tmp_dir, f"first_{i}.mp4") for i in range(2)]
+        first = library.generate(generator, prompts, paths, duration=1)
+        paths = [os.path.join(tmp_dir, f"second_{i}.mp4") for i in range(2)]
+        second = library.generate(generator, prompts + ["emma office"], paths + [os.path.join(tmp_dir, "new.mp4")], duration=1)
+
+        logging.info(f"Reuse mode: pipeline batches {generator.batch_sizes}, stats {library.stats()}")
+        if [r["cached"] for r in second] != [True, True, False] or sum(generator.batch_sizes) != 3:
+            logging.error("Expected the two repeat prompts to be library hits and only the new one generated")
+            ok = False
+        if [r["seed"] for r in first] != [r["seed"] for r in second[:2]]:
+            logging.error("Reuse mode must derive the same seed for the same prompt")
+            ok = False
+        if not all(os.path.exists(r["video_path"]) for r in second):
+            logging.error("Library hits must be copied to the requested output paths")
+            ok = False
+
+        library.seed_mode = "vary"
+        vary = library.generate(generator, prompts, [os.path.join(tmp_dir, f"vary_{i}.mp4") for i in range(2)], duration=1)
+        if any(r["cached"] for r in vary):
+            logging.error("Vary mode must generate new clips")
+            ok = False
+    generator.cleanup()
+
+    if ok:
+        logging.info("Clip library test passed")
+    else:
+        logging.error("Clip library test failed")
+    return ok
+
+
+class MezzanineGenerator(BatchLimitedGenerator):
+    """Placeholder that also writes a stand-in mezzanine next to every video."""
+
+    def _generate_batch(self, batch, negative_prompt, duration, fps):
+        error = super()._generate_batch(batch, negative_prompt, duration, fps)
+        for result in batch:
+            if result["video_path"]:
+                result["mezzanine_path"] = self.mezzanine_path_for(result["output_path"])
+                with open(result["mezzanine_path"], "w") as f:
+                    f.write(result["prompt"])
+        return error
+
+
+def test_clip_library_mezzanine():
+    """Library hits come with the stored mezzanine; clips stored without one are regenerated."""
+    logging.info("Starting clip library mezzanine test...")
+    ok = True
+
+    plain = BatchLimitedGenerator(memory_limit=8, failing_prompt=None,
+                                  model_dir=None, resolution="480p", gpu_type="T4")
+    generator = MezzanineGenerator(memory_limit=8, failing_prompt=None, mezzanine_format="ffv1",
+                                   model_dir=None, resolution="480p", gpu_type="T4")
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        library = ClipLibrary(os.path.join(tmp_dir, "library"), seed_mode="reuse")
+        # Stored without a mezzanine first: a mezzanine request must not be served from it
+        library.generate(plain, ["emma casual"], [os.path.join(tmp_dir, "plain.mp4")], duration=1)
+        first = library.generate(generator, ["emma casual"], [os.path.join(tmp_dir, "first.mp4")], duration=1)
+        second = library.generate(generator, ["emma casual"], [os.path.join(tmp_dir, "second.mp4")], duration=1)
+
+        logging.info(f"Mezzanine results: {[(r['cached'], r['mezzanine_path']) for r in first + second]}")
+        if first[0]["cached"] or not second[0]["cached"]:
+            logging.error("Expected a regeneration for the missing mezzanine, then a library hit")
+            ok = False
+        expected = os.path.join(tmp_dir, "second.mezzanine.mkv")
+        if second[0]["mezzanine_path"] != expected or not os.path.exists(expected):
+            logging.error("A library hit must copy the stored mezzanine next to the output")
+            ok = False
+        elif open(expected).read() != "emma casual":
+            logging.error("The copied mezzanine does not match the stored one")
+            ok = False
+    plain.cleanup()
+    generator.cleanup()
+
+    if ok:
+        logging.info("Clip library mezzanine test passed")
+    else:
+        logging.error("Clip library mezzanine test failed")
+    return ok
+
+
+def test_frame_encoding():
+    """Generated frames are converted in one pass and streamed to ffmpeg; the ffv1 mezzanine is lossless."""
+    logging.info("Starting frame encoding test...")
+    ok = True
+
+    rng = np.random.default_rng(0)
+    frames = rng.integers(0, 256, size=(24, 64, 96, 3), dtype=np.uint8)
+    # Pipeline-style float output, channels-first
+    float_frames = frames.transpose(0, 3, 1, 2).astype(np.float32) / 255.0
+    if not np.array_equal(frames_to_rgb24(float_frames), frames):
+        logging.error("Float channels-first frames must convert back to the same uint8 RGB")
+        ok = False
+
+    if shutil.which("ffmpeg") is None:
+        logging.warning("ffmpeg not found, skipping the encode check")
+    else:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            output_path = os.path.join(tmp_dir, "clip.mp4")
+            mezzanine_path = os.path.join(tmp_dir, "clip.mezzanine.mkv")
+            if not encode_rgb_frames(frames_to_rgb24(float_frames), output_path, 24, mezzanine_path=mezzanine_path):
+                logging.error("Encoding failed")
+                return False
+
+            cap = cv2.VideoCapture(mezzanine_path)
+            decoded = []
+            while True:
+                ret, frame = cap.read()
+                if not ret:
+                    break
+                decoded.append(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB))
+            cap.release()
+            cap = cv2.VideoCapture(output_path)
+            mp4_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+            cap.release()
+
+            logging.info(f"MP4 frames: {mp4_frames}, mezzanine frames: {len(decoded)}, no intermediate files: "
+                         f"{sorted(os.listdir(tmp_dir))}")
+            if mp4_frames != len(frames) or len(decoded) != len(frames):
+                logging.error("Every frame must be encoded")
+                ok = False
+            elif not np.array_equal(np.stack(decoded), frames):
+                logging.error("The ffv1 mezzanine must be lossless")
+                ok = False
+
+    if ok:
+        logging.info("Frame encoding test passed")
+    else:
+        logging.error("Frame encoding test failed")
+    return ok
+
+
+def test_staged_executor():
+    """Generation overlaps composition, results stay in order, the queue bound holds and failures are per item."""
+    logging.info("Starting staged executor test...")
+    queue_size, workers = 2, 2
+    lock = threading.Lock()
+    events = []
+    consume_started = {}
+
+    def produce(item):
+        # Stand-in for the GPU generator. From the second item on, wait until the previous
+        # item's composition has started: a serial executor never gets there and times out
+        with lock:
+            events.append(("produce", item))
+        if item > 0 and not consume_started.setdefault(item - 1, threading.Event()).wait(timeout=10):
+            raise AssertionError(f"Composition of item {item - 1} did not start while item {item} was generated")
+        if item == 3:
+            return None
+        return f"clip_{item}"
+
+    def consume(item, clip):
+        # Stand-in for UI demo rendering and ffmpeg composition
+        with lock:
+            events.append(("consume", item))
+        consume_started.setdefault(item, threading.Event()).set()
+        time.sleep(0.02)
+        if item == 5:
+            raise RuntimeError("composition failed")
+        return f"{clip}_final"
+
+    # Item 3 fails in produce, so nothing waits on its composition
+    consume_started[3] = threading.Event()
+    consume_started[3].set()
+
+    items = list(range(8))
+    executor = StagedExecutor(produce, consume, queue_size=queue_size, workers=workers, name="test")
+    results = executor.run(items)
+    logging.info(f"Results: {results}, metrics: {executor.last_metrics}, order: {events}")
+
+    expected = [None if i in (3, 5) else f"clip_{i}_final" for i in items]
+    assert results == expected, f"Expected results in input order with per-item failures: {expected}"
+    assert sorted(executor.errors) == [5], f"Expected only the consume exception to be recorded: {executor.errors}"
+    # Interleaving: composition of item 0 starts before generation of the last item
+    assert events.index(("consume", 0)) < events.index(("produce", items[-1])), \
+        "Generation and composition did not overlap"
+
+    # A slow single worker: the producer must block at the queue bound instead of running ahead.
+    # Items produced but not yet composed are either queued or in a worker when produce() starts
+    counts = {"produced": 0, "consumed": 0, "max_in_flight": 0}
+
+    def counting_produce(item):
+        with lock:
+            in_flight = counts["produced"] - counts["consumed"]
+            counts["max_in_flight"] = max(counts["max_in_flight"], in_flight)
+            counts["produced"] += 1
+        return item
+
+    def slow_consume(item, clip):
+        time.sleep(0.05)
+        with lock:
+            counts["consumed"] += 1
+        return clip
+
+    slow = StagedExecutor(counting_produce, slow_consume, queue_size=queue_size, workers=1, name="test-backpressure")
+    assert slow.run(range(10)) == list(range(10))
+    bound = slow.queue_size + slow.workers
+    logging.info(f"Backpressure: at most {counts['max_in_flight']} items in flight (bound {bound}), "
+                 f"metrics: {slow.last_metrics}")
+    assert counts["max_in_flight"] <= bound, \
+        f"The producer ran {counts['max_in_flight']} items ahead, more than the queue allows ({bound})"
+    assert counts["max_in_flight"] >= slow.queue_size, "The producer should run ahead until the queue is full"
+
+    logging.info("Staged executor test passed")
+    return True
+
+
+if __name__ == "__main__":
+    ok = test_wan_session()
+    ok &= test_batched_generation()
+    ok &= test_prompt_embedding_cache()
+    ok &= test_clip_library()
+    ok &= test_clip_library_mezzanine()
+    ok &= test_frame_encoding()
+    ok &= test_staged_executor()
+    sys.exit(0 if ok else 1)
@@ -0,0 +1,200 @@
+#!/usr/bin/env python3
+# /Users/vanshshah/Desktop/OWLmarketing/video_editing/analysis_store.py
+
+import json
+import logging
+import sqlite3
+import threading
+import time
+from collections.abc import MutableMapping
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, Optional
+
+logger = logging.getLogger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS analysis (
+    namespace   TEXT NOT NULL,
+    key         TEXT NOT NULL,
+    fingerprint TEXT,
+    settings    TEXT,
+    data        TEXT NOT NULL,
+    updated_at  REAL NOT NULL,
+    PRIMARY KEY (namespace, key)
+);
+CREATE INDEX IF NOT EXISTS idx_analysis_fingerprint ON analysis (namespace, fingerprint);
+"""
+
+
+class AnalysisStore:
+    """
+    Embedded SQLite store for per-video analysis records.
+
+    Records are upserted individually and committed in batches, so adding one
+    video costs one row write instead of rewriting a whole JSON file. The
+    database runs in WAL mode with a busy timeout, so several processes (parallel
+    workers or concurrent runs) can read and write the same file safely.
+
+    Pending writes hold the database's write lock until they are committed, so
+    callers that write between slow steps should flush() after each write.
+    """
+
+    def __init__(self, db_path: str, batch_size: int = 50, timeout: float = 30.0):
+        """
+        Open (or create) an analysis store.
+
+        Args:
+            db_path (str): Path to the SQLite database file
+            batch_size (int): Number of pending writes that triggers a commit
+            timeout (float): Seconds to wait on a lock held by another writer
+        """
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.batch_size = batch_size
+        self._pending = 0
+        self._lock = threading.RLock()
+
+        self._conn = sqlite3.connect(str(self.db_path), timeout=timeout, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(f"PRAGMA busy_timeout={int(timeout * 1000)}")
+        self._conn.executescript(_SCHEMA)
+        self._conn.commit()
+        logger.debug(f"Opened analysis store at {self.db_path}")
+
+    def get(self, namespace: str, key: str) -> Optional[Dict]:
+        """Return one record, or None if it is not stored."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT data FROM analysis WHERE namespace = ? AND key = ?",
+                (namespace, key)
+            ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def get_all(self, namespace: str) -> Dict[str, Dict]:
+        """Return every record in a namespace keyed by record key."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT key, data FROM analysis WHERE namespace = ?",
+                (namespace,)
+            ).fetchall()
+        return {key: json.loads(data) for key, data in rows}
+
+    def find_by_fingerprint(self, namespace: str, fingerprint: str) -> Optional[Dict]:
+        """Return a record with the given fingerprint (e.g. a renamed but unchanged file)."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT data FROM analysis WHERE namespace = ? AND fingerprint = ? LIMIT 1",
+                (namespace, fingerprint)
+            ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def keys(self, namespace: str) -> list:
+        """Return all record keys in a namespace."""
+        with self._lock:
+            rows = self._conn.execute("SELECT key FROM analysis WHERE namespace = ?", (namespace,)).fetchall()
+        return [row[0] for row in rows]
+
+    def count(self, namespace: str) -> int:
+        """Return the number of records in a namespace."""
+        with self._lock:
+            return self._conn.execute(
+                "SELECT COUNT(*) FROM analysis WHERE namespace = ?", (namespace,)
+            ).fetchone()[0]
+
+    def upsert(self, namespace: str, key: str, data: Dict,
+               fingerprint: Optional[str] = None, settings: Optional[str] = None) -> None:
+        """
+        Insert or replace one record. The write is committed with the current batch.
+
+        Args:
+            namespace (str): Record namespace
+            key (str): Record key (usually the video path)
+            data (Dict): JSON-serializable record
+            fingerprint (str, optional): File fingerprint, indexed for lookups
+            settings (str, optional): Analysis settings the record was computed with
+        """
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO analysis (namespace, key, fingerprint, settings, data, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT (namespace, key) DO UPDATE SET "
+                "fingerprint = excluded.fingerprint, settings = excluded.settings, "
+                "data = excluded.data, updated_at = excluded.updated_at",
+                (namespace, key, fingerprint, settings, json.dumps(data), time.time())
+            )
+            self._note_write()
+
+    def delete(self, namespace: str, keys: Iterable[str]) -> None:
+        """Delete records by key. The deletes are committed with the current batch."""
+        with self._lock:
+            for key in keys:
+                self._conn.execute("DELETE FROM analysis WHERE namespace = ? AND key = ?", (namespace, key))
+                self._note_write()
+
+    def _note_write(self) -> None:
+        """Count a pending write and commit once the batch is full."""
+        self._pending += 1
+        if self._pending >= self.batch_size:
+            self.flush()
+
+    def flush(self) -> None:
+        """Commit pending writes."""
+        with self._lock:
+            if self._pending:
+                self._conn.commit()
+                logger.debug(f"Committed {self._pending} analysis store writes to {self.db_path}")
+                self._pending = 0
+
+    def close(self) -> None:
+        """Commit pending writes and close the connection."""
+        with self._lock:
+            try:
+                self.flush()
+            finally:
+                self._conn.close()
+
+    def namespace(self, name: str) -> "StoreNamespace":
+        """Return a dict-like view over one namespace."""
+        return StoreNamespace(self, name)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+class StoreNamespace(MutableMapping):
+    """Dict-like view over one namespace of an AnalysisStore."""
+
+    def __init__(self, store: AnalysisStore, name: str):
+        self.store = store
+        self.name = name
+
+    def __getitem__(self, key: str) -> Dict:
+        record = self.store.get(self.name, key)
+        if record is None:
+            raise KeyError(key)
+        return record
+
+    def __setitem__(self, key: str, value: Dict) -> None:
+        self.store.upsert(self.name, key, value)
+
+    def __delitem__(self, key: str) -> None:
+        if key not in self:
+            raise KeyError(key)
+        self.store.delete(self.name, [key])
+
+    def __contains__(self, key) -> bool:
+        return self.store.get(self.name, key) is not None
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.store.keys(self.name))
+
+    def __len__(self) -> int:
+        return self.store.count(self.name)
+
+    def flush(self) -> None:
+        """Commit pending writes of the underlying store."""
+        self.store.flush()
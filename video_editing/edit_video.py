@@ -11,7 +11,8 @@ import numpy as np
 from pathlib import Path
 from typing import List, Dict, Optional
 from PIL import Image, ImageDraw, ImageFont
-from .video_analyzer import VideoAnalyzer
+from .video_analyzer import VideoAnalyzer, get_shared_analyzer
+from .frame_source import FrameSource
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='[%(asctime)s] %(levelname)s: %(message)s')
@@ -39,36 +40,60 @@ class VideoEditor:
         self.workspace_dir.mkdir(parents=True, exist_ok=True)
         self.music_dir.mkdir(parents=True, exist_ok=True)
         
-        # Initialize video analyzer and get style patterns
-        self.analyzer = VideoAnalyzer(training_videos_dir)
-        self.style_patterns = self.analyzer.analyze_training_set()
+        self.training_videos_dir = training_videos_dir
         
-        # Update style configurations based on analysis
-        self.style_config = {
-            'text': {
-                'title_size': 48,
-                'body_size': 32,
-                'color': 'white',
-                'stroke_color': 'black',
-                'stroke_width': 2,
-                'font': font_path,
-                'positions': self.style_patterns.get('common_text_positions', [])
-            },
-            'transitions': {
-                'duration': 0.5,
-                'types': list(self.style_patterns.get('popular_transitions', {}).keys())
-            },
-            'aspect_ratio': (1080, 1920),  # 9:16 for vertical video
-            'fps': 30,
-            'video_effects': {
-                'brightness': self.style_patterns.get('avg_brightness', 128),
-                'contrast': self.style_patterns.get('avg_contrast', 50)
-            },
-            'audio': {
-                'mean_level': self.style_patterns.get('audio_profile', {}).get('mean_level', 0.5),
-                'peak_level': self.style_patterns.get('audio_profile', {}).get('peak_level', 0.8)
+        # Initialize video analyzer and get style patterns on first use: the analyzer is
+        # shared by every VideoEditor in the process, and editing that never needs style
+        # data (e.g. plain overlays) does not pay for a training-set analysis
+        self._analyzer = None
+        self._style_patterns = None
+        self._style_config = None
+    
+    @property
+    def analyzer(self) -> VideoAnalyzer:
+        """Shared video analyzer over the training videos, created on first use."""
+        if self._analyzer is None:
+            self._analyzer = get_shared_analyzer(self.training_videos_dir)
+        return self._analyzer
+    
+    @property
+    def style_patterns(self) -> Dict:
+        """Style patterns learned from the training videos, analyzed once per process."""
+        if self._style_patterns is None:
+            self._style_patterns = self.analyzer.training_set_patterns()
+        return self._style_patterns
+    
+    @property
+    def style_config(self) -> Dict:
+        """Style configuration derived from the training-set style patterns."""
+        if self._style_config is None:
+            # Update style configurations based on analysis
+            self._style_config = {
+                'text': {
+                    'title_size': 48,
+                    'body_size': 32,
+                    'color': 'white',
+                    'stroke_color': 'black',
+                    'stroke_width': 2,
+                    'font': self.font_path,
+                    'positions': self.style_patterns.get('common_text_positions', [])
+                },
+                'transitions': {
+                    'duration': 0.5,
+                    'types': list(self.style_patterns.get('popular_transitions', {}).keys())
+                },
+                'aspect_ratio': (1080, 1920),  # 9:16 for vertical video
+                'fps': 30,
+                'video_effects': {
+                    'brightness': self.style_patterns.get('avg_brightness', 128),
+                    'contrast': self.style_patterns.get('avg_contrast', 50)
+                },
+                'audio': {
+                    'mean_level': self.style_patterns.get('audio_profile', {}).get('mean_level', 0.5),
+                    'peak_level': self.style_patterns.get('audio_profile', {}).get('peak_level', 0.8)
+                }
             }
-        }
+        return self._style_config
 
     def create_animated_text(self, 
                            text: str,
@@ -275,16 +300,18 @@ class VideoEditor:
         temp_dir = Path(tempfile.mkdtemp())
         temp_video = str(temp_dir / "temp_video.mp4")
         
-        # Open the input video
-        cap = cv2.VideoCapture(input_video_path)
-        if not cap.isOpened():
+        # Open the input video as a streaming source; decoding runs a few frames ahead
+        # of the effects below, so memory stays bounded whatever the clip length
+        try:
+            source = FrameSource(input_video_path, prefetch=8)
+        except ValueError:
             raise ValueError(f"Could not open video file: {input_video_path}")
         
         # Get video properties
-        width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
-        height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
-        fps = int(cap.get(cv2.CAP_PROP_FPS))
-        total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+        width = source.width
+        height = source.height
+        fps = int(source.fps)
+        total_frames = source.frame_count
         
         # Resize to vertical format (9:16 aspect ratio)
         target_height = self.style_config['aspect_ratio'][1]
@@ -296,11 +323,7 @@ class VideoEditor:
         
         # Process each frame
         frame_idx = 0
-        while True:
-            ret, frame = cap.read()
-            if not ret:
-                break
-            
+        for frame in source:
             # Calculate current time in seconds
             current_time = frame_idx / fps
             
@@ -466,8 +489,7 @@ class VideoEditor:
                 progress = (frame_idx / total_frames) * 100
                 logging.info(f"Processing frames: {progress:.1f}% complete")
         
-        # Release video capture and writer
-        cap.release()
+        # Release video writer (the frame source releases its capture when exhausted)
         out.release()
         
         # Add audio/music if specified
@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+# /Users/vanshshah/Desktop/OWLmarketing/video_editing/frame_source.py
+
+import logging
+import queue
+import threading
+from typing import Iterable, Iterator, Optional, Tuple
+
+import cv2
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+def resize_to_width(frame: np.ndarray, max_width: Optional[int]) -> np.ndarray:
+    """Downscale a frame to at most max_width pixels wide, keeping aspect ratio."""
+    if not max_width or frame.shape[1] <= max_width:
+        return frame
+    scale = max_width / frame.shape[1]
+    new_size = (max_width, max(2, int(round(frame.shape[0] * scale))))
+    return cv2.resize(frame, new_size, interpolation=cv2.INTER_AREA)
+
+
+class FrameSource:
+    """
+    Streaming iterator over the decoded frames of a video.
+
+    Frames are decoded one at a time, so peak memory is bounded by the prefetch
+    window instead of the clip length. Skipped frames (stride, frame_indices,
+    start_time) are only grabbed, never colour-converted or copied.
+
+    Iterating yields frames; indexed() yields (frame_index, frame) pairs, where
+    frame_index is the index in the source video.
+    """
+
+    def __init__(self,
+                 video_path: str,
+                 start_time: float = 0.0,
+                 duration: Optional[float] = None,
+                 stride: int = 1,
+                 max_width: Optional[int] = None,
+                 roi: Optional[Tuple[int, int, int, int]] = None,
+                 prefetch: int = 0,
+                 frame_indices: Optional[Iterable[int]] = None):
+        """
+        Open a frame source.
+
+        Args:
+            video_path (str): Path to the video file
+            start_time (float): First second to decode
+            duration (float, optional): Seconds to decode, None for the rest of the clip
+            stride (int): Yield every stride-th frame
+            max_width (int, optional): Downscale frames to at most this width on decode
+            roi (Tuple[int, int, int, int], optional): Crop (x, y, width, height) in source pixels, applied before resizing
+            prefetch (int): Frames decoded ahead on a background thread; 0 decodes on the caller's thread
+            frame_indices (Iterable[int], optional): Only yield these source frame indices (overrides stride)
+        """
+        if stride < 1:
+            raise ValueError("stride must be at least 1")
+
+        self.video_path = str(video_path)
+        self.stride = stride
+        self.max_width = max_width
+        self.roi = roi
+        self.prefetch = prefetch
+        self.frame_indices = sorted(set(int(i) for i in frame_indices)) if frame_indices is not None else None
+
+        # Read the stream properties once up front
+        cap = cv2.VideoCapture(self.video_path)
+        if not cap.isOpened():
+            raise ValueError(f"Could not open video: {self.video_path}")
+        self.fps = cap.get(cv2.CAP_PROP_FPS)
+        self.width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+        self.height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+        self.frame_count = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+        cap.release()
+
+        self.start_frame = int(start_time * self.fps) if self.fps > 0 else 0
+        self.end_frame = self.frame_count
+        if duration is not None and self.fps > 0:
+            self.end_frame = min(self.frame_count, self.start_frame + int(duration * self.fps))
+
+    @property
+    def output_size(self) -> Tuple[int, int]:
+        """(width, height) of the yielded frames."""
+        width, height = (self.roi[2], self.roi[3]) if self.roi else (self.width, self.height)
+        if self.max_width and width > self.max_width:
+            height = max(2, int(round(height * self.max_width / width)))
+            width = self.max_width
+        return width, height
+
+    def __len__(self) -> int:
+        """Number of frames the source will yield (based on the container's frame count)."""
+        if self.frame_indices is not None:
+            return sum(1 for i in self.frame_indices if self.start_frame <= i < self.end_frame)
+        return max(0, (self.end_frame - self.start_frame + self.stride - 1) // self.stride)
+
+    def _transform(self, frame: np.ndarray) -> np.ndarray:
+        """Apply region of interest and resize-on-decode."""
+        if self.roi:
+            x, y, w, h = self.roi
+            frame = frame[y:y + h, x:x + w]
+        return resize_to_width(frame, self.max_width)
+
+    def _decode(self) -> Iterator[Tuple[int, np.ndarray]]:
+        """Sequential decode on the current thread."""
+        if self.frame_indices is not None and not self.frame_indices:
+            # Nothing selected: don't open (let alone decode) the clip
+            return
+
+        cap = cv2.VideoCapture(self.video_path)
+        if not cap.isOpened():
+            raise ValueError(f"Could not open video: {self.video_path}")
+
+        wanted = set(self.frame_indices) if self.frame_indices is not None else None
+        last = min(self.end_frame, self.frame_indices[-1] + 1) if self.frame_indices is not None else self.end_frame
+
+        try:
+            frame_idx = 0
+            if self.start_frame > 0:
+                # One seek to the start, then decode sequentially
+                cap.set(cv2.CAP_PROP_POS_FRAMES, self.start_frame)
+                frame_idx = self.start_frame
+            while frame_idx < last:
+                # grab() demuxes/decodes without the colour conversion and copy of read()
+                if not cap.grab():
+                    break
+                if wanted is not None:
+                    keep = frame_idx in wanted
+                else:
+                    keep = (frame_idx - self.start_frame) % self.stride == 0
+                if keep:
+                    ret, frame = cap.retrieve()
+                    if ret:
+                        yield frame_idx, self._transform(frame)
+                frame_idx += 1
+        finally:
+            cap.release()
+
+    def _decode_prefetched(self) -> Iterator[Tuple[int, np.ndarray]]:
+        """Decode on a background thread into a bounded queue."""
+        frames = queue.Queue(maxsize=self.prefetch)
+        stop = threading.Event()
+        done = object()
+        errors = []
+
+        def producer():
+            try:
+                for item in self._decode():
+                    while not stop.is_set():
+                        try:
+                            frames.put(item, timeout=0.1)
+                            break
+                        except queue.Full:
+                            continue
+                    if stop.is_set():
+                        return
+            except Exception as e:
+                errors.append(e)
+            finally:
+                while not stop.is_set():
+                    try:
+                        frames.put(done, timeout=0.1)
+                        break
+                    except queue.Full:
+                        continue
+
+        thread = threading.Thread(target=producer, name="frame-source", daemon=True)
+        thread.start()
+        try:
+            while True:
+                item = frames.get()
+                if item is done:
+                    break
+                yield item
+            if errors:
+                raise errors[0]
+        finally:
+            # Consumer stopped early (or finished): let the producer exit
+            stop.set()
+            thread.join()
+
+    def indexed(self) -> Iterator[Tuple[int, np.ndarray]]:
+        """Yield (source frame index, frame) pairs."""
+        if self.prefetch > 0:
+            return self._decode_prefetched()
+        return self._decode()
+
+    def __iter__(self) -> Iterator[np.ndarray]:
+        for _, frame in self.indexed():
+            yield frame
@@ -0,0 +1,203 @@
+#!/usr/bin/env python3
+# /Users/vanshshah/Desktop/OWLmarketing/video_editing/pose_runtime.py
+
+import os
+import logging
+import threading
+from pathlib import Path
+from typing import Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Local model store. Override with POSE_MODEL_DIR on hosts that keep models elsewhere.
+DEFAULT_POSE_MODEL_DIR = "video_generation/models/pose"
+
+# File names looked up in the model store, in order of preference
+MOVENET_MODEL_FILES = (
+    "movenet_singlepose_lightning.tflite",
+    "movenet_singlepose_lightning.onnx",
+    "movenet_singlepose_thunder.tflite",
+    "movenet_singlepose_thunder.onnx",
+)
+
+# Warm runtimes shared by every VideoAnalyzer in the process, keyed by resolved model path;
+# they live in the model registry under ids with this prefix
+_RUNTIME_ID_PREFIX = "movenet-local:"
+
+
+def pose_model_dir() -> Path:
+    """Directory of the local pose model store."""
+    return Path(os.environ.get("POSE_MODEL_DIR", DEFAULT_POSE_MODEL_DIR))
+
+
+def find_local_movenet(model_path: Optional[str] = None) -> Optional[Path]:
+    """
+    Locate a local MoveNet model file.
+
+    Args:
+        model_path (str, optional): Explicit .tflite/.onnx file; searched in the model store if not given
+
+    Returns:
+        Path: Model file, or None if no local model is available
+    """
+    if model_path:
+        path = Path(model_path)
+        if path.exists():
+            return path
+        logger.warning(f"Pose model file {path} does not exist")
+        return None
+
+    model_dir = pose_model_dir()
+    for name in MOVENET_MODEL_FILES:
+        path = model_dir / name
+        if path.exists():
+            return path
+    return None
+
+
+class PoseRuntime:
+    """
+    Lightweight CPU runtime for a MoveNet single-pose model loaded from disk.
+
+    Subclasses implement infer(batch): it takes a batch of square RGB/BGR uint8
+    frames already resized to input_size and returns an [N, 17, 3] array of
+    (y, x, score) keypoints, the same layout as the TF Hub signature output.
+    """
+
+    input_size = 192
+
+    def __init__(self, model_path: Path, num_threads: Optional[int] = None):
+        self.model_path = Path(model_path)
+        self.num_threads = num_threads or max(1, (os.cpu_count() or 1) // 2)
+        self._lock = threading.Lock()
+
+
+class TFLitePoseRuntime(PoseRuntime):
+    """MoveNet on the TFLite interpreter (tflite_runtime, or tf.lite as a fallback)."""
+
+    def __init__(self, model_path: Path, num_threads: Optional[int] = None):
+        super().__init__(model_path, num_threads)
+        try:
+            from tflite_runtime.interpreter import Interpreter
+        except ImportError:
+            # Full TensorFlow ships the same interpreter
+            from tensorflow.lite import Interpreter
+
+        self.interpreter = Interpreter(model_path=str(self.model_path), num_threads=self.num_threads)
+        self.interpreter.allocate_tensors()
+        self._input = self.interpreter.get_input_details()[0]
+        self._output = self.interpreter.get_output_details()[0]
+        self.input_size = int(self._input['shape'][1])
+        self._batch = int(self._input['shape'][0])
+        # Set once a resize is rejected; every later call then runs frame by frame
+        self._fixed_batch = False
+
+    def _resize_batch(self, batch_size: int) -> bool:
+        """Resize the input tensor to a batch size; False if the model has a fixed batch."""
+        if batch_size == self._batch:
+            return True
+        if self._fixed_batch:
+            return False
+        try:
+            self._allocate(batch_size)
+            return True
+        except Exception as e:
+            logger.info(f"TFLite pose model does not accept batch {batch_size}, using per-frame inference: {e}")
+            self._fixed_batch = True
+            # The failed resize may have left the input tensor resized but unallocated;
+            # put the interpreter back to a batch of one explicitly
+            self._allocate(1)
+            return False
+
+    def _allocate(self, batch_size: int) -> None:
+        """Resize the input tensor to a batch size and reallocate the interpreter's tensors."""
+        # Invalidate first: if allocation fails the tensor shape no longer matches the old batch
+        self._batch = None
+        shape = [batch_size, self.input_size, self.input_size, 3]
+        self.interpreter.resize_tensor_input(self._input['index'], shape)
+        self.interpreter.allocate_tensors()
+        self._input = self.interpreter.get_input_details()[0]
+        self._output = self.interpreter.get_output_details()[0]
+        self._batch = batch_size
+
+    def _invoke(self, batch: np.ndarray) -> np.ndarray:
+        self.interpreter.set_tensor(self._input['index'], batch.astype(self._input['dtype']))
+        self.interpreter.invoke()
+        return self.interpreter.get_tensor(self._output['index']).reshape(len(batch), 17, 3)
+
+    def infer(self, batch: np.ndarray) -> np.ndarray:
+        with self._lock:
+            if self._resize_batch(len(batch)):
+                return self._invoke(batch)
+            # Fixed batch of one (the interpreter is already back at batch 1):
+            # run frame by frame on the same warm interpreter
+            return np.concatenate([self._invoke(batch[i:i + 1]) for i in range(len(batch))])
+
+
+class OnnxPoseRuntime(PoseRuntime):
+    """MoveNet on ONNX Runtime's CPU execution provider."""
+
+    def __init__(self, model_path: Path, num_threads: Optional[int] = None):
+        super().__init__(model_path, num_threads)
+        import onnxruntime as ort
+
+        options = ort.SessionOptions()
+        options.intra_op_num_threads = self.num_threads
+        self.session = ort.InferenceSession(str(self.model_path), sess_options=options,
+                                            providers=["CPUExecutionProvider"])
+        model_input = self.session.get_inputs()[0]
+        self._input_name = model_input.name
+        self._input_dtype = np.int32 if 'int32' in model_input.type else (
+            np.uint8 if 'uint8' in model_input.type else np.float32)
+        if isinstance(model_input.shape[1], int):
+            self.input_size = model_input.shape[1]
+        self._fixed_batch = isinstance(model_input.shape[0], int) and model_input.shape[0] == 1
+
+    def infer(self, batch: np.ndarray) -> np.ndarray:
+        batch = batch.astype(self._input_dtype)
+        with self._lock:
+            if self._fixed_batch and len(batch) > 1:
+                outputs = [self.session.run(None, {self._input_name: batch[i:i + 1]})[0] for i in range(len(batch))]
+                return np.concatenate([o.reshape(1, 17, 3) for o in outputs])
+            return self.session.run(None, {self._input_name: batch})[0].reshape(len(batch), 17, 3)
+
+
+def load_pose_runtime(model_path: Optional[str] = None, num_threads: Optional[int] = None,
+                      owner: Optional[object] = None) -> Optional[PoseRuntime]:
+    """
+    Return a warm local MoveNet runtime, creating it once per process.
+
+    Args:
+        model_path (str, optional): Explicit .tflite/.onnx file; searched in the model store if not given
+        num_threads (int, optional): CPU threads for the interpreter
+        owner (object, optional): Holder of the runtime; it becomes evictable once the owner is
+            collected. Without an owner the runtime stays loaded for the life of the process.
+
+    Returns:
+        PoseRuntime: Shared runtime, or None if no local model or runtime is available
+    """
+    path = find_local_movenet(model_path)
+    if path is None:
+        return None
+
+    from e2e_cloud.model_registry import get_model_registry
+
+    def load():
+        if path.suffix == ".onnx":
+            runtime = OnnxPoseRuntime(path, num_threads)
+        else:
+            runtime = TFLitePoseRuntime(path, num_threads)
+        logger.info(f"Loaded local pose model {path} ({type(runtime).__name__})")
+        return runtime
+
+    try:
+        return get_model_registry().acquire(_RUNTIME_ID_PREFIX + str(path.resolve()), load,
+                                            device="cpu", size_bytes=path.stat().st_size, owner=owner)
+    except ImportError as e:
+        logger.warning(f"No runtime available for local pose model {path}: {e}")
+        return None
+    except Exception as e:
+        logger.warning(f"Could not load local pose model {path}: {e}")
+        return None
@@ -0,0 +1,284 @@
+#!/usr/bin/env python3
+# /Users/vanshshah/Desktop/OWLmarketing/video_editing/pose_tracker.py
+
+import logging
+from typing import Callable, Dict, List, Optional
+
+import cv2
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+TRACKING_MODES = ("interpolate", "flow")
+
+# Side of the grayscale thumbnail used to measure frame-to-frame motion
+_MOTION_THUMB = 64
+
+
+def _motion_thumbnail(frame: np.ndarray) -> np.ndarray:
+    """Small grayscale thumbnail used for cheap motion estimates."""
+    gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY) if frame.ndim == 3 else frame
+    return cv2.resize(gray, (_MOTION_THUMB, _MOTION_THUMB), interpolation=cv2.INTER_AREA).astype(np.float32)
+
+
+def interpolate_poses(start: Dict, end: Dict, t: float) -> Dict:
+    """
+    Linearly interpolate two poses.
+
+    Keypoints present in both poses are blended by id. A keypoint present in only
+    one pose is taken from the nearer one.
+
+    Args:
+        start (Dict): Pose at t = 0
+        end (Dict): Pose at t = 1
+        t (float): Position between the two poses (0-1)
+
+    Returns:
+        Dict: Interpolated pose
+    """
+    start_kps = {kp["id"]: kp for kp in start.get("keypoints", [])}
+    end_kps = {kp["id"]: kp for kp in end.get("keypoints", [])}
+    nearer = start_kps if t < 0.5 else end_kps
+
+    keypoints = []
+    for kp_id in sorted(set(start_kps) | set(end_kps)):
+        a, b = start_kps.get(kp_id), end_kps.get(kp_id)
+        if a is not None and b is not None:
+            keypoints.append({
+                "id": kp_id,
+                "x": float(a["x"] + (b["x"] - a["x"]) * t),
+                "y": float(a["y"] + (b["y"] - a["y"]) * t),
+                "score": float(a["score"] + (b["score"] - a["score"]) * t)
+            })
+        elif kp_id in nearer:
+            keypoints.append(dict(nearer[kp_id]))
+    return {"keypoints": keypoints}
+
+
+class PoseTracker:
+    """
+    Run full pose inference only on keyframes and fill in the frames between them.
+
+    A frame becomes a keyframe every keyframe_interval frames, or earlier when the
+    accumulated frame-to-frame motion since the last keyframe exceeds
+    motion_threshold. In "interpolate" mode in-between keypoints are blended
+    linearly between the surrounding keyframes; in "flow" mode they are propagated
+    from the last keyframe with sparse Lucas-Kanade optical flow, and a keyframe is
+    forced when tracking is lost.
+
+    keyframe_interval is the accuracy/speed knob: 1 runs inference on every frame
+    and gives exactly the per-frame result.
+    """
+
+    def __init__(self,
+                 detect_batch: Callable[[List[np.ndarray]], List[Dict]],
+                 keyframe_interval: int = 4,
+                 motion_threshold: float = 0.08,
+                 mode: str = "interpolate"):
+        """
+        Initialize the tracker.
+
+        Args:
+            detect_batch (Callable): Pose detector taking a list of frames and returning one pose per frame
+            keyframe_interval (int): Maximum number of frames between inference runs
+            motion_threshold (float): Accumulated mean absolute thumbnail difference (0-1) that forces a keyframe
+            mode (str): "interpolate" or "flow"
+        """
+        if mode not in TRACKING_MODES:
+            raise ValueError(f"Unknown tracking mode '{mode}'. Expected one of {TRACKING_MODES}")
+        if keyframe_interval < 1:
+            raise ValueError("keyframe_interval must be at least 1")
+
+        self.detect_batch = detect_batch
+        self.keyframe_interval = keyframe_interval
+        self.motion_threshold = motion_threshold
+        self.mode = mode
+        self.reset()
+
+    def reset(self) -> None:
+        """Forget all state so the next frame starts a new clip."""
+        self._last_key_pose: Optional[Dict] = None
+        self._last_key_frame: Optional[np.ndarray] = None
+        self._last_thumb: Optional[np.ndarray] = None
+        self._since_key = 0
+        self._motion_since_key = 0.0
+        self.frames_seen = 0
+        self.inference_frames = 0
+
+    def _frame_motion(self, frame: np.ndarray) -> float:
+        """Mean absolute difference (0-1) between this frame and the previous one."""
+        thumb = _motion_thumbnail(frame)
+        motion = 0.0 if self._last_thumb is None else float(np.mean(np.abs(thumb - self._last_thumb))) / 255.0
+        self._last_thumb = thumb
+        return motion
+
+    def _needs_keyframe(self, motion: float) -> bool:
+        """Decide whether the next frame must be a keyframe given its motion."""
+        return (self._since_key + 1 >= self.keyframe_interval or
+                self._motion_since_key + motion > self.motion_threshold)
+
+    def _mark_keyframe(self, frame: np.ndarray, pose: Dict) -> None:
+        """Record a freshly inferred keyframe."""
+        self._last_key_pose = pose
+        self._last_key_frame = frame
+        self._since_key = 0
+        self._motion_since_key = 0.0
+
+    def process(self, frames: List[np.ndarray]) -> List[Dict]:
+        """
+        Estimate poses for a chunk of consecutive frames.
+
+        State carries over between calls, so a clip can be fed chunk by chunk.
+
+        Args:
+            frames (List[np.ndarray]): Consecutive frames
+
+        Returns:
+            List[Dict]: One pose per frame
+        """
+        if not frames:
+            return []
+        self.frames_seen += len(frames)
+        if self.mode == "flow":
+            return self._process_flow(frames)
+        return self._process_interpolate(frames)
+
+    def _process_interpolate(self, frames: List[np.ndarray]) -> List[Dict]:
+        """Keyframes are inferred in one batch and the frames between them interpolated."""
+        previous_pose = self._last_key_pose
+        key_indices = []
+        for i, frame in enumerate(frames):
+            motion = self._frame_motion(frame)
+            first = previous_pose is None and not key_indices
+            # The last frame of a chunk is always a keyframe so nothing has to wait for the next chunk
+            if first or i == len(frames) - 1 or self._needs_keyframe(motion):
+                key_indices.append(i)
+                self._since_key = 0
+                self._motion_since_key = 0.0
+            else:
+                self._since_key += 1
+                self._motion_since_key += motion
+
+        key_poses = self.detect_batch([frames[i] for i in key_indices])
+        self.inference_frames += len(key_indices)
+
+        poses: List[Optional[Dict]] = [None] * len(frames)
+        for i, pose in zip(key_indices, key_poses):
+            poses[i] = pose
+
+        # Fill gaps between keyframes (and from the previous chunk's last keyframe)
+        prev_idx, prev_pose = -1, previous_pose
+        for i, pose in zip(key_indices, key_poses):
+            gap = i - prev_idx
+            for j in range(prev_idx + 1, i):
+                if prev_pose is None:
+                    poses[j] = pose
+                else:
+                    poses[j] = interpolate_poses(prev_pose, pose, (j - prev_idx) / gap)
+            prev_idx, prev_pose = i, pose
+
+        self._last_key_pose = key_poses[-1]
+        self._last_key_frame = frames[-1]
+        return poses
+
+    def _process_flow(self, frames: List[np.ndarray]) -> List[Dict]:
+        """
+        Keypoints are propagated from the last keyframe with Lucas-Kanade optical flow.
+
+        Where the keyframes fall depends only on frame motion, so the chunk's keyframes
+        are planned up front and inferred in one batch. Losing tracking makes that frame
+        a keyframe too; the rest of the chunk is then planned again from it and only
+        keyframes not inferred yet go to the detector, in one more batch.
+        """
+        motions = [self._frame_motion(frame) for frame in frames]
+        detected: Dict[int, Dict] = {}
+        keyframes = self._plan_flow_keyframes(motions, 0, forced=False)
+        self._detect_keyframes(frames, keyframes, detected)
+
+        poses = []
+        for i, frame in enumerate(frames):
+            pose = None
+            if i not in keyframes:
+                pose = self._propagate(frame)
+                if pose is None:
+                    # Tracking lost: force a keyframe here and plan the rest of the chunk again
+                    keyframes = self._plan_flow_keyframes(motions, i, forced=True)
+                    self._detect_keyframes(frames, keyframes, detected)
+            if i in keyframes:
+                pose = detected[i]
+                self._mark_keyframe(frame, pose)
+            else:
+                self._since_key += 1
+                self._motion_since_key += motions[i]
+                # Track frame to frame so flow displacements stay small
+                self._last_key_pose = pose
+                self._last_key_frame = frame
+            poses.append(pose)
+        return poses
+
+    def _plan_flow_keyframes(self, motions: List[float], start: int, forced: bool) -> set:
+        """
+        Indices of the keyframes from start to the end of the chunk, assuming tracking holds.
+
+        Uses the same rule as _needs_keyframe, from the tracker's current state.
+        """
+        has_key = self._last_key_pose is not None
+        since_key, motion_since_key = self._since_key, self._motion_since_key
+        keyframes = set()
+        for i in range(start, len(motions)):
+            if ((i == start and forced) or not has_key or since_key + 1 >= self.keyframe_interval or
+                    motion_since_key + motions[i] > self.motion_threshold):
+                keyframes.add(i)
+                has_key = True
+                since_key, motion_since_key = 0, 0.0
+            else:
+                since_key += 1
+                motion_since_key += motions[i]
+        return keyframes
+
+    def _detect_keyframes(self, frames: List[np.ndarray], keyframes: set, detected: Dict[int, Dict]) -> None:
+        """Infer the keyframes without a pose yet in one detector call."""
+        missing = sorted(i for i in keyframes if i not in detected)
+        if not missing:
+            return
+        for i, pose in zip(missing, self.detect_batch([frames[i] for i in missing])):
+            detected[i] = pose
+        self.inference_frames += len(missing)
+
+    def _propagate(self, frame: np.ndarray) -> Optional[Dict]:
+        """Move the last keypoints to this frame with optical flow; None if tracking is lost."""
+        keypoints = self._last_key_pose.get("keypoints", [])
+        if not keypoints:
+            return {"keypoints": []}
+
+        height, width = frame.shape[:2]
+        prev_gray = cv2.cvtColor(self._last_key_frame, cv2.COLOR_BGR2GRAY)
+        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        points = np.array([[kp["x"] * width, kp["y"] * height] for kp in keypoints], dtype=np.float32).reshape(-1, 1, 2)
+
+        try:
+            new_points, status, _ = cv2.calcOpticalFlowPyrLK(prev_gray, gray, points, None, winSize=(21, 21), maxLevel=3)
+        except cv2.error as e:
+            logger.debug(f"Optical flow failed, forcing a keyframe: {e}")
+            return None
+
+        if new_points is None or status is None or status.mean() < 0.5:
+            # Lost more than half of the keypoints
+            return None
+
+        tracked = []
+        for kp, point, ok in zip(keypoints, new_points.reshape(-1, 2), status.reshape(-1)):
+            if not ok:
+                continue
+            tracked.append({
+                "id": kp["id"],
+                "x": float(np.clip(point[0] / width, 0.0, 1.0)),
+                "y": float(np.clip(point[1] / height, 0.0, 1.0)),
+                "score": kp["score"]
+            })
+        return {"keypoints": tracked}
+
+    @property
+    def inference_ratio(self) -> float:
+        """Fraction of frames that ran full pose inference."""
+        return self.inference_frames / self.frames_seen if self.frames_seen else 0.0
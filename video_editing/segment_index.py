@@ -0,0 +1,289 @@
+#!/usr/bin/env python3
+# /Users/vanshshah/Desktop/OWLmarketing/video_editing/segment_index.py
+
+import json
+import logging
+import subprocess
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import cv2
+import numpy as np
+
+from video_editing.frame_source import FrameSource, resize_to_width
+
+logger = logging.getLogger(__name__)
+
+SEGMENT_INDEX_VERSION = 1
+
+# Width frames are decoded at for a segment index pass (face detection runs at this size)
+SEGMENT_ANALYSIS_WIDTH = 320
+
+# Width frames are reduced to for histogram and motion measurements
+_MEASURE_WIDTH = 96
+
+# Haar cascade used for face presence; optional (not every OpenCV build ships the data files)
+_FACE_CASCADE = None
+_FACE_CASCADE_LOADED = False
+
+# Set once ffprobe turns out to be missing, so the warning is logged once per process
+_FFPROBE_MISSING = False
+
+
+def _face_cascade():
+    """Load the frontal-face Haar cascade once per process, or None if unavailable."""
+    global _FACE_CASCADE, _FACE_CASCADE_LOADED
+    if not _FACE_CASCADE_LOADED:
+        _FACE_CASCADE_LOADED = True
+        try:
+            cascade_path = Path(cv2.data.haarcascades) / "haarcascade_frontalface_default.xml"
+            if cascade_path.exists():
+                cascade = cv2.CascadeClassifier(str(cascade_path))
+                if not cascade.empty():
+                    _FACE_CASCADE = cascade
+            if _FACE_CASCADE is None:
+                logger.warning("Face cascade not available, segment face presence will be 0")
+        except Exception as e:
+            logger.warning(f"Could not load face cascade: {e}")
+    return _FACE_CASCADE
+
+
+def analysis_frame_indices(fps: float, frame_count: int, analysis_fps: float) -> np.ndarray:
+    """Source frame indices visited by a segment-index pass at analysis_fps."""
+    stride = max(1, int(round(fps / analysis_fps))) if fps > 0 and analysis_fps > 0 else 1
+    return np.arange(0, frame_count, stride)
+
+
+def probe_keyframes(video_path: str) -> List[float]:
+    """
+    Keyframe timestamps of a video, read from packet flags (demux only, no decode).
+
+    Args:
+        video_path (str): Path to the video file
+
+    Returns:
+        List[float]: Sorted keyframe times in seconds, empty if ffprobe is unavailable
+    """
+    global _FFPROBE_MISSING
+    if _FFPROBE_MISSING:
+        return []
+    cmd = [
+        'ffprobe', '-v', 'error',
+        '-select_streams', 'v:0',
+        '-show_entries', 'packet=pts_time,flags',
+        '-of', 'json',
+        str(video_path)
+    ]
+    try:
+        result = subprocess.run(cmd, capture_output=True, text=True, timeout=60)
+        if result.returncode != 0:
+            logger.warning(f"ffprobe could not read keyframes of {video_path}: {result.stderr.strip()}")
+            return []
+        packets = json.loads(result.stdout).get('packets', [])
+        return sorted(
+            float(p['pts_time']) for p in packets
+            if 'K' in p.get('flags', '') and p.get('pts_time') not in (None, 'N/A')
+        )
+    except FileNotFoundError:
+        _FFPROBE_MISSING = True
+        logger.warning("ffprobe not found, segment starts will not be keyframe-aligned")
+        return []
+    except Exception as e:
+        logger.warning(f"Could not probe keyframes of {video_path}: {e}")
+        return []
+
+
+class SegmentIndexBuilder:
+    """
+    Accumulates per-sample measurements during one decode pass and turns them into
+    a segment index: shot cuts, plus motion energy, face presence and brightness
+    per shot.
+    """
+
+    def __init__(self, fps: float, duration: float, cut_threshold: float = 0.5, face_every: int = 4):
+        """
+        Args:
+            fps (float): Source frame rate
+            duration (float): Clip duration in seconds
+            cut_threshold (float): Bhattacharyya histogram distance (0-1) that marks a shot cut
+            face_every (int): Run face detection on every face_every-th sample
+        """
+        self.fps = fps
+        self.duration = duration
+        self.cut_threshold = cut_threshold
+        self.face_every = face_every
+        self.times = []
+        self.motion = []
+        self.brightness = []
+        self.faces = []
+        self.cuts = []
+        self._prev_hist = None
+        self._prev_gray = None
+
+    def add(self, frame_idx: int, frame: np.ndarray) -> None:
+        """Measure one sampled frame."""
+        t = frame_idx / self.fps if self.fps > 0 else 0.0
+        small = resize_to_width(frame, _MEASURE_WIDTH)
+        gray = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+
+        hsv = cv2.cvtColor(small, cv2.COLOR_BGR2HSV)
+        hist = cv2.calcHist([hsv], [0, 1], None, [16, 8], [0, 180, 0, 256])
+        cv2.normalize(hist, hist)
+
+        motion = 0.0
+        if self._prev_gray is not None:
+            motion = float(np.mean(cv2.absdiff(gray, self._prev_gray))) / 255.0
+            if cv2.compareHist(self._prev_hist, hist, cv2.HISTCMP_BHATTACHARYYA) > self.cut_threshold:
+                self.cuts.append(t)
+                # Motion across a cut is the cut itself, not movement within the shot
+                motion = 0.0
+
+        face = None
+        if len(self.times) % self.face_every == 0:
+            cascade = _face_cascade()
+            if cascade is not None:
+                full_gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+                face = 1.0 if len(cascade.detectMultiScale(full_gray, 1.2, 4, minSize=(24, 24))) else 0.0
+
+        self.times.append(t)
+        self.motion.append(motion)
+        self.brightness.append(float(np.mean(gray)))
+        self.faces.append(face)
+        self._prev_hist = hist
+        self._prev_gray = gray
+
+    def finish(self, keyframes: Optional[List[float]] = None) -> Dict:
+        """
+        Build the segment index.
+
+        Args:
+            keyframes (List[float], optional): Keyframe times of the clip
+
+        Returns:
+            Dict: JSON-serializable segment index
+        """
+        times = np.asarray(self.times)
+        motion = np.asarray(self.motion)
+        brightness = np.asarray(self.brightness)
+        faces = np.asarray([np.nan if f is None else f for f in self.faces], dtype=np.float64)
+
+        boundaries = [0.0] + [c for c in self.cuts if 0.0 < c < self.duration] + [self.duration]
+        segments = []
+        for start, end in zip(boundaries[:-1], boundaries[1:]):
+            mask = (times >= start) & (times < end)
+            face_values = faces[mask]
+            face_values = face_values[~np.isnan(face_values)]
+            segments.append({
+                'start': float(start),
+                'end': float(end),
+                'motion': float(np.mean(motion[mask])) if mask.any() else 0.0,
+                'brightness': float(np.mean(brightness[mask])) if mask.any() else 0.0,
+                'faces': float(np.mean(face_values)) if len(face_values) else 0.0
+            })
+
+        return {
+            'version': SEGMENT_INDEX_VERSION,
+            'duration': float(self.duration),
+            'keyframes': [float(k) for k in (keyframes or [])],
+            'segments': segments
+        }
+
+
+def build_segment_index(video_path: str,
+                        analysis_fps: float = 4.0,
+                        max_width: Optional[int] = SEGMENT_ANALYSIS_WIDTH) -> Dict:
+    """
+    Build the segment index of a clip with a single low-resolution decode pass.
+
+    Args:
+        video_path (str): Path to the video file
+        analysis_fps (float): Samples per second measured
+        max_width (int, optional): Decode width
+
+    Returns:
+        Dict: Segment index (see SegmentIndexBuilder.finish)
+    """
+    source = FrameSource(video_path, max_width=max_width)
+    duration = source.frame_count / source.fps if source.fps > 0 else 0.0
+    builder = SegmentIndexBuilder(source.fps, duration)
+
+    indices = analysis_frame_indices(source.fps, source.frame_count, analysis_fps)
+    for frame_idx, frame in FrameSource(video_path, max_width=max_width, frame_indices=indices).indexed():
+        builder.add(frame_idx, frame)
+
+    return builder.finish(probe_keyframes(video_path))
+
+
+def segment_boundaries(index: Dict) -> List[float]:
+    """Segment start times plus the clip end, the layout ClipIndex stores."""
+    segments = index.get('segments', [])
+    if not segments:
+        return [0.0, float(index.get('duration', 0.0))]
+    return [s['start'] for s in segments] + [segments[-1]['end']]
+
+
+def select_segments(index: Dict,
+                    target_duration: float,
+                    max_results: int = 3,
+                    cut_penalty: float = 0.25) -> List[Dict]:
+    """
+    Pick the best windows of target_duration from a segment index, in memory.
+
+    Candidate starts are the clip's keyframes (so the window can be cut without
+    decoding from the start of the clip), or shot starts when no keyframes are
+    known. Each window is scored by the overlap-weighted motion energy and face
+    presence of the shots it covers, minus a penalty for every shot cut inside it.
+    Returned windows do not overlap.
+
+    Args:
+        index (Dict): Segment index
+        target_duration (float): Window length in seconds
+        max_results (int): Maximum windows returned
+        cut_penalty (float): Score removed per shot cut inside a window
+
+    Returns:
+        List[Dict]: Windows with start, duration, score and keyframe_aligned, best first
+    """
+    duration = float(index.get('duration', 0.0))
+    segments = index.get('segments', [])
+    if duration < target_duration or not segments:
+        return []
+
+    starts = np.array([s['start'] for s in segments])
+    ends = np.array([s['end'] for s in segments])
+    motion = np.array([s['motion'] for s in segments])
+    faces = np.array([s['faces'] for s in segments])
+    # Motion normalized within the clip so it is comparable to face presence (0-1)
+    motion = motion / motion.max() if motion.max() > 0 else motion
+    shot_score = 0.5 * motion + 0.5 * faces
+
+    keyframes = index.get('keyframes') or []
+    keyframe_aligned = bool(keyframes)
+    candidates = np.array(keyframes if keyframes else starts.tolist(), dtype=np.float64)
+    # Small tolerance: the last keyframe may sit a frame short of duration - target
+    candidates = candidates[candidates + target_duration <= duration + 1e-3]
+    if len(candidates) == 0:
+        return []
+
+    # Overlap of every candidate window with every shot: [candidates, shots]
+    window_end = candidates[:, np.newaxis] + target_duration
+    overlap = np.clip(np.minimum(window_end, ends) - np.maximum(candidates[:, np.newaxis], starts), 0.0, None)
+    scores = overlap @ shot_score / target_duration
+    inner_cuts = ((starts[np.newaxis, 1:] > candidates[:, np.newaxis]) &
+                  (starts[np.newaxis, 1:] < window_end)).sum(axis=1)
+    scores = scores - cut_penalty * inner_cuts
+
+    selected = []
+    for i in np.argsort(-scores, kind='stable'):
+        start = float(candidates[i])
+        if any(abs(start - s['start']) < target_duration for s in selected):
+            continue
+        selected.append({
+            'start': start,
+            'duration': float(min(target_duration, duration - start)),
+            'score': float(scores[i]),
+            'keyframe_aligned': keyframe_aligned
+        })
+        if len(selected) >= max_results:
+            break
+    return selected
@@ -4,22 +4,249 @@
 import logging
 import os
 import json
+import hashlib
 from pathlib import Path
 import numpy as np
 import tempfile
 import time
 import subprocess
+import queue
+import threading
 from typing import List, Dict, Tuple, Optional
 import cv2
 from collections import defaultdict
-from scipy import stats
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from video_editing.analysis_store import AnalysisStore
+from video_editing.pose_tracker import PoseTracker
+from video_editing.pose_runtime import load_pose_runtime
+from video_editing.frame_source import FrameSource, resize_to_width
+from video_editing.segment_index import (
+    SEGMENT_ANALYSIS_WIDTH, SegmentIndexBuilder, analysis_frame_indices, build_segment_index, probe_keyframes,
+    segment_boundaries
+)
 from PIL import Image, ImageDraw, ImageFont
 
 logging.basicConfig(level=logging.INFO, format='[%(asctime)s] %(levelname)s: %(message)s')
 logger = logging.getLogger(__name__)
 
+# Sampling modes for analyze_video:
+#   'grab'   - single sequential decode, grab() every frame and retrieve() only the samples
+#   'ffmpeg' - single ffmpeg decode with a select filter, samples piped as raw BGR frames
+#   'seek'   - legacy CAP_PROP_POS_FRAMES seek per sample (re-decodes from the previous keyframe)
+SAMPLING_MODES = ("grab", "ffmpeg", "seek")
+
+
+def _sample_frames_grab(video_path: str, sample_points: np.ndarray, max_width: Optional[int]) -> List[np.ndarray]:
+    """Sample frames with one sequential decode pass using grab/retrieve."""
+    return list(FrameSource(video_path, max_width=max_width, frame_indices=sample_points))
+
+
+def _sample_frames_ffmpeg(video_path: str, sample_points: np.ndarray, width: int, height: int,
+                          max_width: Optional[int]) -> List[np.ndarray]:
+    """Sample frames with one ffmpeg decode pass, piping the selected frames as raw BGR."""
+    # No shell is involved, so the commas inside the expression are escaped for the filtergraph parser only
+    select_expr = "+".join(f"eq(n\\,{int(i)})" for i in sorted(set(int(i) for i in sample_points)))
+    video_filter = f"select={select_expr}"
+    out_w, out_h = width, height
+    if max_width and width > max_width:
+        out_w = max_width
+        out_h = max(2, int(round(height * max_width / width)))
+        # Keep dimensions even so every pixel format ffmpeg might pick is happy
+        out_w -= out_w % 2
+        out_h -= out_h % 2
+        video_filter += f",scale={out_w}:{out_h}:flags=area"
+    cmd = [
+        'ffmpeg', '-v', 'error',
+        '-i', video_path,
+        '-vf', video_filter,
+        # Only the selected frames, without duplicating them to a constant rate
+        '-fps_mode', 'vfr',
+        '-f', 'rawvideo',
+        '-pix_fmt', 'bgr24',
+        'pipe:1'
+    ]
+    result = subprocess.run(cmd, capture_output=True)
+    if result.returncode != 0:
+        raise RuntimeError(f"ffmpeg sampling failed for {video_path}: {result.stderr.decode(errors='ignore')}")
+    
+    frame_size = out_w * out_h * 3
+    raw = np.frombuffer(result.stdout, dtype=np.uint8)
+    num_frames = len(raw) // frame_size
+    return [raw[i * frame_size:(i + 1) * frame_size].reshape(out_h, out_w, 3) for i in range(num_frames)]
+
+
+def _sample_frames_seek(video_path: str, sample_points: np.ndarray, max_width: Optional[int]) -> List[np.ndarray]:
+    """Sample frames by seeking to each sample point (legacy behaviour)."""
+    cap = cv2.VideoCapture(video_path)
+    if not cap.isOpened():
+        raise ValueError(f"Could not open video: {video_path}")
+    
+    frames = []
+    try:
+        for frame_idx in sample_points:
+            cap.set(cv2.CAP_PROP_POS_FRAMES, frame_idx)
+            ret, frame = cap.read()
+            if ret:
+                frames.append(resize_to_width(frame, max_width))
+    finally:
+        cap.release()
+    
+    return frames
+
+
+def _detect_transitions(frames: List[np.ndarray]) -> Dict[str, int]:
+    """
+    Detect transition types between consecutive frames.
+    
+    Args:
+        frames (List[np.ndarray]): List of video frames
+        
+    Returns:
+        Dict[str, int]: Count of each transition type
+    """
+    if len(frames) < 2:
+        return {"unknown": 1}
+        
+    transitions = defaultdict(int)
+    
+    for i in range(len(frames) - 1):
+        frame1 = cv2.cvtColor(frames[i], cv2.COLOR_BGR2GRAY)
+        frame2 = cv2.cvtColor(frames[i + 1], cv2.COLOR_BGR2GRAY)
+        
+        # Calculate frame difference
+        diff = cv2.absdiff(frame1, frame2)
+        mean_diff = np.mean(diff)
+        
+        # Classify transition type
+        if mean_diff < 10:
+            transitions['cut'] += 1
+        elif mean_diff < 30:
+            transitions['fade'] += 1
+        else:
+            transitions['dissolve'] += 1
+    
+    return dict(transitions)
+
+
+def analyze_video_file(video_path: str,
+                       sampling_mode: str = "grab",
+                       num_samples: int = 10,
+                       max_width: Optional[int] = None,
+                       segment_fps: Optional[float] = 4.0,
+                       segment_width: Optional[int] = SEGMENT_ANALYSIS_WIDTH) -> Dict:
+    """
+    Analyze a single video file and return its per-video record.
+    
+    This is a module-level function (no model or analyzer state) so it can run
+    inside ProcessPoolExecutor workers.
+    
+    Args:
+        video_path (str): Path to the video file
+        sampling_mode (str): One of SAMPLING_MODES
+        num_samples (int): Number of frames to sample across the clip
+        max_width (int, optional): Width style samples are downscaled to; None keeps full resolution.
+            Downscaling lowers the contrast (std) of a frame, so it shifts clip energies and the
+            transition thresholds; records are only comparable with the same max_width
+        segment_fps (float, optional): Sample rate of the segment index pass; None skips the segment index
+        segment_width (int, optional): Width frames are downscaled to for the segment index
+        
+    Returns:
+        Dict: Per-video analysis record
+    """
+    if sampling_mode not in SAMPLING_MODES:
+        raise ValueError(f"Unknown sampling mode: {sampling_mode}. Expected one of {SAMPLING_MODES}")
+    
+    cap = cv2.VideoCapture(video_path)
+    if not cap.isOpened():
+        raise ValueError(f"Could not open video: {video_path}")
+    
+    # Get video properties
+    fps = cap.get(cv2.CAP_PROP_FPS)
+    frame_count = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+    height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+    cap.release()
+    
+    duration = frame_count / fps if fps > 0 else 0
+    sample_points = np.linspace(0, max(frame_count - 1, 0), num=num_samples, dtype=int)
+    
+    segment_index = None
+    if segment_fps and sampling_mode == "grab":
+        # One sequential pass serves both the style samples and the segment index
+        segment_points = analysis_frame_indices(fps, frame_count, segment_fps)
+        sample_set = set(int(i) for i in sample_points)
+        segment_set = set(int(i) for i in segment_points)
+        builder = SegmentIndexBuilder(fps, duration)
+        frames = []
+        source = FrameSource(video_path, max_width=max_width, frame_indices=np.union1d(sample_points, segment_points))
+        for frame_idx, frame in source.indexed():
+            if frame_idx in sample_set:
+                frames.append(frame)
+            if frame_idx in segment_set:
+                builder.add(frame_idx, resize_to_width(frame, segment_width))
+        segment_index = builder.finish(probe_keyframes(video_path))
+    else:
+        if sampling_mode == "ffmpeg":
+            frames = _sample_frames_ffmpeg(video_path, sample_points, width, height, max_width)
+        elif sampling_mode == "seek":
+            frames = _sample_frames_seek(video_path, sample_points, max_width)
+        else:
+            frames = _sample_frames_grab(video_path, sample_points, max_width)
+        if segment_fps:
+            segment_index = build_segment_index(video_path, analysis_fps=segment_fps, max_width=segment_width)
+    
+    record = {
+        'path': str(video_path),
+        'duration': duration,
+        'brightness': [float(np.mean(frame)) for frame in frames],
+        'contrast': [float(np.std(frame)) for frame in frames],
+        'transitions': _detect_transitions(frames),
+        # For text positions, we need more sophisticated analysis
+        # We'll add placeholder positions for now
+        'text_positions': [(0.5, 0.8)],  # Bottom center
+        # Audio levels analysis would require additional processing
+        # We'll add placeholder values for now
+        'audio_levels': [0.5]
+    }
+    if segment_index is not None:
+        # Shot cuts, motion, faces and brightness per segment, queried by VideoGenerator at selection time
+        record['segment_index'] = segment_index
+        record['segment_boundaries'] = segment_boundaries(segment_index)
+    return record
+
+
+def file_fingerprint(video_path: str, content_hash: bool = False) -> str:
+    """
+    Fingerprint a video file so unchanged files can skip re-analysis.
+    
+    Args:
+        video_path (str): Path to the video file
+        content_hash (bool): Hash the file contents instead of using size+mtime
+        
+    Returns:
+        str: Fingerprint string
+    """
+    if content_hash:
+        digest = hashlib.sha1()
+        with open(video_path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b''):
+                digest.update(chunk)
+        return f"sha1:{digest.hexdigest()}"
+    
+    stat = os.stat(video_path)
+    return f"stat:{stat.st_size}:{stat.st_mtime_ns}"
+
+
+def _init_analysis_worker():
+    """Keep each pool worker to one OpenCV thread so workers don't oversubscribe cores."""
+    cv2.setNumThreads(1)
+
+
 class VideoAnalyzer:
-    def __init__(self, training_videos_dir: str = "data/training_videos", cache_file: str = "data/style_patterns.json", pose_model: str = "movenet"):
+    def __init__(self, training_videos_dir: str = "data/training_videos", cache_file: str = "data/style_patterns.json", pose_model: str = "movenet",
+                 sampling_mode: str = "grab", sample_width: Optional[int] = None, max_workers: Optional[int] = None,
+                 content_hash: bool = False, store_file: Optional[str] = None,
+                 pose_model_path: Optional[str] = None, segment_fps: Optional[float] = 4.0):
         """
         Initialize the video analyzer.
         
@@ -27,10 +254,48 @@ class VideoAnalyzer:
             training_videos_dir (str): Directory containing training videos
             cache_file (str): Path to cache analyzed style patterns
             pose_model (str): Model to use for pose detection ('movenet' or 'openpose')
+            sampling_mode (str): Frame sampling mode ('grab', 'ffmpeg' or 'seek')
+            sample_width (int, optional): Width style samples are downscaled to, None for full resolution.
+                Downscaling changes the contrast statistics clip matching and transition detection use
+            max_workers (int, optional): Worker processes for training-set analysis (defaults to CPU count)
+            content_hash (bool): Fingerprint videos by content hash instead of size+mtime
+            store_file (str, optional): SQLite store for per-video records (defaults to cache_file with .db suffix)
+            pose_model_path (str, optional): Local MoveNet .tflite/.onnx file (defaults to the local model store)
+            segment_fps (float, optional): Sample rate of the per-clip segment index pass, None to skip it
         """
         self.training_dir = Path(training_videos_dir)
         self.cache_file = Path(cache_file)
         self.pose_model = pose_model
+        self.pose_model_path = pose_model_path
+        self.pose_runtime = None
+        # None until the pose model is first needed (see has_pose_model)
+        self._has_pose_model = None
+        # Cleared if the TF Hub MoveNet signature rejects a batch; later calls go per frame
+        self._pose_batching_supported = True
+        
+        # Training-set patterns analyzed once and reused (see training_set_patterns).
+        # The lock also guards video_records and style_patterns, which analysis rebinds
+        # and mutates while other threads (e.g. clip searches) read them
+        self._training_set_patterns = None
+        self._training_set_lock = threading.RLock()
+        
+        if sampling_mode not in SAMPLING_MODES:
+            logger.warning(f"Unknown sampling mode {sampling_mode}, falling back to 'grab'")
+            sampling_mode = "grab"
+        self.sampling_mode = sampling_mode
+        self.sample_width = sample_width
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.content_hash = content_hash
+        self.segment_fps = segment_fps
+        
+        # Per-video analysis records keyed by path, each carrying the file fingerprint
+        # and analysis settings it was computed with. style_patterns is rebuilt from these.
+        # Records live in an SQLite store (per-record upserts); this dict mirrors it in memory.
+        self.video_records = {}
+        self.store_file = Path(store_file) if store_file else self.cache_file.with_suffix('.db')
+        # Opened on first use (see the store property), so analyzers that never read or
+        # write records do not create a database file
+        self._store = None
         
         # Create training directory if it doesn't exist
         if not self.training_dir.exists():
@@ -53,20 +318,72 @@ class VideoAnalyzer:
         if self.cache_file.exists():
             self.load_patterns()
         
-        # Initialize pose detection model
-        self._init_pose_model()
+        # Load per-video records from the store, migrating any records from a JSON-era cache
+        if self.store_file.exists() or self.video_records:
+            self._load_video_records()
+        
+        # Pose detection model is initialized on first use, so analysis-only users
+        # never import TensorFlow or load model weights
+    
+    @property
+    def store(self) -> AnalysisStore:
+        """SQLite store of the per-video records, opened (and created if needed) on first use."""
+        if self._store is None:
+            self._store = AnalysisStore(str(self.store_file))
+        return self._store
+    
+    @property
+    def has_pose_model(self) -> bool:
+        """Whether a pose model is available; loads the model on first access."""
+        if self._has_pose_model is None:
+            self._init_pose_model()
+        return bool(self._has_pose_model)
+    
+    @has_pose_model.setter
+    def has_pose_model(self, value: bool) -> None:
+        self._has_pose_model = value
+    
+    def training_set_patterns(self) -> Dict:
+        """
+        Style patterns of the training set, analyzed on the first call and reused afterwards.
+        
+        Use analyze_training_set() to pick up training videos added since.
+        
+        Returns:
+            Dict: Style patterns
+        """
+        with self._training_set_lock:
+            if self._training_set_patterns is None:
+                self._training_set_patterns = self.analyze_training_set()
+            return self._training_set_patterns
+    
+    def records_snapshot(self) -> Dict[str, Dict]:
+        """Copy of the per-video records, consistent even while another thread analyzes."""
+        with self._training_set_lock:
+            return dict(self.video_records)
     
     def _init_pose_model(self):
         """Initialize the pose estimation model."""
         try:
             if self.pose_model == "movenet":
-                # Use TensorFlow Lite for MoveNet
+                # Prefer a local model on a lightweight CPU runtime: no TensorFlow import,
+                # no network fetch, and the interpreter is shared across the process
+                self.pose_runtime = load_pose_runtime(self.pose_model_path, owner=self)
+                if self.pose_runtime is not None:
+                    self.has_pose_model = True
+                    logger.info("MoveNet pose estimation model loaded from the local model store")
+                    return
+                
+                # Use TensorFlow Hub for MoveNet
                 try:
                     import tensorflow as tf
                     import tensorflow_hub as hub
+                    from e2e_cloud.model_registry import get_model_registry
                     
-                    # Load MoveNet model
-                    self.pose_detector = hub.load("https://tfhub.dev/google/movenet/singlepose/lightning/4")
+                    # Load MoveNet model, once per process (released with this analyzer)
+                    movenet_url = "https://tfhub.dev/google/movenet/singlepose/lightning/4"
+                    self.pose_detector = get_model_registry().acquire(
+                        f"movenet:{movenet_url}", lambda: hub.load(movenet_url), device="cpu", owner=self)
                     self.has_pose_model = True
                     logger.info("MoveNet pose estimation model loaded successfully")
                 except ImportError as e:
@@ -119,9 +436,15 @@ class VideoAnalyzer:
         # Create directory if it doesn't exist
         self.cache_file.parent.mkdir(parents=True, exist_ok=True)
         
-        # Save to file
-        with open(self.cache_file, 'w') as f:
+        # Save to a temp file and swap it in so concurrent readers never see a partial file
+        tmp_file = self.cache_file.with_suffix(f".{os.getpid()}.tmp")
+        with open(tmp_file, 'w') as f:
             json.dump(serializable_patterns, f)
+        os.replace(tmp_file, self.cache_file)
+        
+        # Commit any per-video record writes still pending in the store
+        if self._store is not None:
+            self._store.flush()
         
         logging.info(f"Saved style patterns to {self.cache_file}")
     
@@ -146,6 +469,14 @@ class VideoAnalyzer:
                 'audio_levels': patterns['audio_levels']
             }
             
+            # Records in the JSON file predate the SQLite store; _load_video_records migrates them.
+            # Caches written before per-video records existed simply have none,
+            # so every video is treated as new on the next analysis run
+            self.video_records = {
+                path: dict(record, text_positions=[tuple(pos) for pos in record['text_positions']])
+                for path, record in patterns.get('video_records', {}).items()
+            }
+            
             logging.info(f"Loaded style patterns from {self.cache_file}")
             return True
             
@@ -153,6 +484,26 @@ class VideoAnalyzer:
             logging.warning(f"Could not load cached patterns: {str(e)}")
             return False
     
+    def _load_video_records(self) -> None:
+        """Load per-video records from the store, migrating JSON-era records on first use."""
+        try:
+            stored = self.store.get_all('video_records')
+            if not stored and self.video_records:
+                logging.info(f"Migrating {len(self.video_records)} video records from {self.cache_file} to {self.store_file}")
+                for path, record in self.video_records.items():
+                    self.store.upsert('video_records', path, record,
+                                      fingerprint=record.get('fingerprint'), settings=record.get('settings'))
+                self.store.flush()
+                return
+            
+            self.video_records = {
+                path: dict(record, text_positions=[tuple(pos) for pos in record['text_positions']])
+                for path, record in stored.items()
+            }
+            logging.info(f"Loaded {len(self.video_records)} video records from {self.store_file}")
+        except Exception as e:
+            logging.warning(f"Could not load video records from store: {str(e)}")
+    
     def analyze_video(self, video_path: str) -> Dict:
         """
         Analyze a single video for style patterns.
@@ -165,69 +516,80 @@ class VideoAnalyzer:
         """
         logging.info(f"Analyzing video: {video_path}")
         
-        cap = cv2.VideoCapture(video_path)
-        if not cap.isOpened():
-            raise ValueError(f"Could not open video: {video_path}")
-        
-        # Get video properties
-        fps = cap.get(cv2.CAP_PROP_FPS)
-        frame_count = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
-        duration = frame_count / fps if fps > 0 else 0
-        
-        # Add duration to patterns
-        self.style_patterns['duration'].append(duration)
-        
-        # Sample frames for analysis
-        frames = []
-        sample_points = np.linspace(0, frame_count-1, num=10, dtype=int)
-        
-        for frame_idx in sample_points:
-            cap.set(cv2.CAP_PROP_POS_FRAMES, frame_idx)
-            ret, frame = cap.read()
-            if ret:
-                frames.append(frame)
-                
-                # Calculate brightness
-                brightness = np.mean(frame)
-                self.style_patterns['brightness'].append(brightness)
-                
-                # Calculate contrast
-                contrast = np.std(frame)
-                self.style_patterns['contrast'].append(contrast)
-        
-        # Analyze scene transitions
-        transitions = self._detect_transitions(frames)
-        for t_type in transitions:
+        record = analyze_video_file(
+            video_path,
+            sampling_mode=self.sampling_mode,
+            max_width=self.sample_width,
+            segment_fps=self.segment_fps
+        )
+        with self._training_set_lock:
+            self._store_video_record(str(video_path), record)
+            self._rebuild_patterns()
+            
+            return dict(self.style_patterns)
+    
+    def _analysis_settings(self) -> str:
+        """Settings that change analysis output; records computed with other settings are stale."""
+        return f"{self.sampling_mode}:{self.sample_width}:seg{self.segment_fps}"
+    
+    def _store_video_record(self, video_path: str, record: Dict, fingerprint: Optional[str] = None) -> None:
+        """Store a per-video record together with its fingerprint and analysis settings."""
+        if fingerprint is None:
+            fingerprint = file_fingerprint(video_path, self.content_hash)
+        self.video_records[video_path] = dict(
+            record,
+            fingerprint=fingerprint,
+            settings=self._analysis_settings()
+        )
+        # Per-record upsert, committed right away: records arrive between slow analyses, and
+        # an open write transaction would block other processes sharing the store until the
+        # next commit (and a crash would lose the uncommitted records)
+        self.store.upsert('video_records', video_path, self.video_records[video_path],
+                          fingerprint=fingerprint, settings=self._analysis_settings())
+        self.store.flush()
+    
+    def _rebuild_patterns(self) -> None:
+        """Recompute the aggregated style patterns from the per-video records."""
+        self.style_patterns = {
+            'duration': [],
+            'transitions': defaultdict(int),
+            'brightness': [],
+            'contrast': [],
+            'text_positions': [],
+            'audio_levels': []
+        }
+        for video_path in sorted(self.video_records):
+            self._merge_video_record(self.video_records[video_path])
+    
+    def _merge_video_record(self, record: Dict) -> None:
+        """Merge a per-video analysis record into the aggregated style patterns."""
+        self.style_patterns['duration'].append(record['duration'])
+        self.style_patterns['brightness'].extend(record['brightness'])
+        self.style_patterns['contrast'].extend(record['contrast'])
+        for t_type in record['transitions']:
             self.style_patterns['transitions'][t_type] += 1
-        
-        # For text positions, we need more sophisticated analysis
-        # We'll add placeholder positions for now
-        self.style_patterns['text_positions'].append((0.5, 0.8))  # Bottom center
-        
-        # Audio levels analysis would require additional processing
-        # We'll add placeholder values for now
-        self.style_patterns['audio_levels'].append(0.5)
-        
-        cap.release()
-        return dict(self.style_patterns)
+        self.style_patterns['text_positions'].extend(tuple(pos) for pos in record['text_positions'])
+        self.style_patterns['audio_levels'].extend(record['audio_levels'])
     
     def analyze_training_set(self, force_reanalyze: bool = False) -> Dict:
         """
         Analyze all videos in the training set.
         
+        Only new or changed videos (by fingerprint) are analyzed; records for videos
+        that no longer exist are dropped, and the aggregate is rebuilt from the records.
+        
         Args:
-            force_reanalyze (bool): Whether to reanalyze videos even if patterns are cached
+            force_reanalyze (bool): Whether to reanalyze every video even if its record is current
         
         Returns:
             Dict: Aggregated style patterns
         """
-        # If patterns already cached and not forcing reanalysis, return cached patterns
-        if self.cache_file.exists() and not force_reanalyze and self.style_patterns:
-            logging.info("Using cached style patterns")
-            return self.style_patterns
-        
-        analyzed_videos = 0
-        
+        # One analysis at a time per analyzer; readers of video_records take the same lock
+        with self._training_set_lock:
+            return self._analyze_training_set(force_reanalyze)
+    
+    def _analyze_training_set(self, force_reanalyze: bool) -> Dict:
+        """analyze_training_set with the training-set lock held."""
         # Check if training directory has video files
         has_video_files = False
         for root, _, files in os.walk(self.training_dir):
@@ -249,45 +611,113 @@ class VideoAnalyzer:
                 'text_positions': [(0.5, 0.8), (0.5, 0.2), (0.1, 0.5)],  # Bottom center, top center, left middle
                 'audio_levels': [-18.0, -15.0, -12.0]  # Standard audio levels in dB
             }
+            if self.video_records:
+                self.store.delete('video_records', list(self.video_records))
+            self.video_records = {}
             # Save default patterns
             self.save_patterns()
             return self.style_patterns
         
-        # Clear existing patterns if reanalyzing
-        if force_reanalyze:
-            self.style_patterns = {
-                'duration': [],
-                'transitions': defaultdict(int),
-                'brightness': [],
-                'contrast': [],
-                'text_positions': [],
-                'audio_levels': []
-            }
-        
-        # Analyze each video in training directory
-        for influencer_dir in self.training_dir.iterdir():
+        # Collect every video in the training directory up front so the work can be fanned out
+        video_files = []
+        for influencer_dir in sorted(self.training_dir.iterdir()):
             if not influencer_dir.is_dir():
                 continue
-                
-            for video_file in influencer_dir.glob("*.mp4"):
-                try:
-                    self.analyze_video(str(video_file))
-                    analyzed_videos += 1
-                    if analyzed_videos % 10 == 0:
-                        # Save intermediate results to avoid losing work
-                        self.save_patterns()
-                except Exception as e:
-                    logging.error(f"Error analyzing {video_file}: {str(e)}")
+            video_files.extend(str(video_file) for video_file in sorted(influencer_dir.glob("*.mp4")))
+        
+        # Work out which videos are new or changed since their record was written
+        settings = self._analysis_settings()
+        fingerprints = {}
+        to_analyze = []
+        for video_file in video_files:
+            try:
+                fingerprints[video_file] = file_fingerprint(video_file, self.content_hash)
+            except OSError as e:
+                logging.error(f"Could not fingerprint {video_file}: {e}")
+                continue
+            record = self.video_records.get(video_file)
+            if (force_reanalyze or record is None
+                    or record.get('fingerprint') != fingerprints[video_file]
+                    or record.get('settings') != settings):
+                to_analyze.append(video_file)
+        
+        removed = [path for path in self.video_records if path not in fingerprints]
+        for path in removed:
+            del self.video_records[path]
+        if removed:
+            # Committed before the analysis starts, for the same reason as the record writes
+            self.store.delete('video_records', removed)
+            self.store.flush()
+        
+        if not to_analyze and not removed and self.style_patterns['duration']:
+            logging.info(f"Using cached style patterns ({len(self.video_records)} videos up to date)")
+            return self.style_patterns
         
-        # Save patterns to cache file
-        if analyzed_videos > 0:
-            self.save_patterns()
+        logging.info(f"Training set: {len(to_analyze)} new/changed, {len(removed)} removed, "
+                     f"{len(video_files) - len(to_analyze)} unchanged")
+        
+        # Records are upserted as workers finish, so an interrupted run keeps its progress
+        self._analyze_video_files(
+            to_analyze,
+            on_record=lambda video_file, record: self._store_video_record(video_file, record, fingerprints[video_file])
+        )
+        
+        # Rebuild the aggregate from the records so nothing is counted twice across runs
+        self._rebuild_patterns()
+        self.save_patterns()
         
         # Perform additional analysis on aggregated data
         self._aggregate_results()
         
         return self.style_patterns
     
+    def _analyze_video_files(self, video_files: List[str], on_record=None) -> Dict[str, Dict]:
+        """
+        Analyze a list of video files, across a process pool when there is more than one.
+        
+        Args:
+            video_files (List[str]): Paths of the videos to analyze
+            on_record (callable, optional): Called with (path, record) as each video finishes
+            
+        Returns:
+            Dict[str, Dict]: Per-video records keyed by path (failed videos are omitted)
+        """
+        records = {}
+        if not video_files:
+            return records
+        
+        workers = min(self.max_workers, len(video_files))
+        start = time.time()
+        
+        if workers <= 1:
+            for video_file in video_files:
+                try:
+                    records[video_file] = analyze_video_file(video_file, sampling_mode=self.sampling_mode, max_width=self.sample_width,
+                                                                 segment_fps=self.segment_fps)
+                    if on_record:
+                        on_record(video_file, records[video_file])
+                except Exception as e:
+                    logging.error(f"Error analyzing {video_file}: {str(e)}")
+        else:
+            logging.info(f"Analyzing {len(video_files)} videos across {workers} worker processes")
+            with ProcessPoolExecutor(max_workers=workers, initializer=_init_analysis_worker) as executor:
+                futures = {
+                    executor.submit(analyze_video_file, video_file, sampling_mode=self.sampling_mode,
+                                    max_width=self.sample_width, segment_fps=self.segment_fps): video_file
+                    for video_file in video_files
+                }
+                for future in as_completed(futures):
+                    video_file = futures[future]
+                    try:
+                        records[video_file] = future.result()
+                        if on_record:
+                            on_record(video_file, records[video_file])
+                    except Exception as e:
+                        logging.error(f"Error analyzing {video_file}: {str(e)}")
+        
+        logging.info(f"Analyzed {len(records)}/{len(video_files)} videos in {time.time() - start:.2f}s")
+        return records
+    
     def _aggregate_results(self) -> Dict:
         """Aggregate analyzed patterns into results."""
         # Handle empty patterns gracefully
@@ -334,28 +764,7 @@ class VideoAnalyzer:
         Returns:
             Dict[str, int]: Count of each transition type
         """
-        if len(frames) < 2:
-            return {"unknown": 1}
-            
-        transitions = defaultdict(int)
-        
-        for i in range(len(frames) - 1):
-            frame1 = cv2.cvtColor(frames[i], cv2.COLOR_BGR2GRAY)
-            frame2 = cv2.cvtColor(frames[i + 1], cv2.COLOR_BGR2GRAY)
-            
-            # Calculate frame difference
-            diff = cv2.absdiff(frame1, frame2)
-            mean_diff = np.mean(diff)
-            
-            # Classify transition type
-            if mean_diff < 10:
-                transitions['cut'] += 1
-            elif mean_diff < 30:
-                transitions['fade'] += 1
-            else:
-                transitions['dissolve'] += 1
-        
-        return dict(transitions)
+        return _detect_transitions(frames)
     
     def _find_common_positions(self, positions: List[Tuple]) -> List[Tuple]:
         """
@@ -377,6 +786,9 @@ class VideoAnalyzer:
         pos_array = np.array(positions)
         
         try:
+            # scipy is only needed here, so it is imported on first use
+            from scipy import stats
+            
             # Use kernel density estimation to find hotspots
             kde_x = stats.gaussian_kde(pos_array[:, 0])
             kde_y = stats.gaussian_kde(pos_array[:, 1])
@@ -423,32 +835,15 @@ class VideoAnalyzer:
             
         return peaks
     
-    def _extract_frames(self, video_path: str, start_time: float, duration: float) -> List[np.ndarray]:
-        """Extract frames from a video file for the specified duration."""
-        cap = cv2.VideoCapture(video_path)
-        if not cap.isOpened():
-            raise ValueError(f"Could not open video: {video_path}")
-        
-        # Get video properties
-        fps = cap.get(cv2.CAP_PROP_FPS)
-        
-        # Calculate frame range
-        start_frame = int(start_time * fps)
-        num_frames = int(duration * fps)
-        
-        # Set frame position
-        cap.set(cv2.CAP_PROP_POS_FRAMES, start_frame)
-        
-        # Read frames
-        frames = []
-        for _ in range(num_frames):
-            ret, frame = cap.read()
-            if not ret:
-                break
-            frames.append(frame)
+    def _extract_frames(self, video_path: str, start_time: float, duration: float, **kwargs) -> List[np.ndarray]:
+        """
+        Extract frames from a video file for the specified duration.
         
-        cap.release()
-        return frames
+        Returns a list; iterate a FrameSource directly to stream frames instead of
+        holding them in memory. Extra keyword arguments (stride, max_width, roi,
+        prefetch) are passed through to FrameSource.
+        """
+        return list(FrameSource(video_path, start_time=start_time, duration=duration, **kwargs))
     
     def _add_text_overlay(self, frame: np.ndarray, text: str) -> np.ndarray:
         """Add text overlay to a frame."""
@@ -493,76 +888,109 @@ class VideoAnalyzer:
         Returns:
             Dict: Detected pose keypoints
         """
+        return self._detect_pose_batch([frame])[0]
+    
+    def _movenet_keypoints_to_pose(self, keypoints: np.ndarray) -> Dict:
+        """Convert one MoveNet [17, 3] (y, x, score) keypoint array to pose data."""
+        pose_data = {"keypoints": []}
+        for i in range(17):  # MoveNet uses 17 keypoints
+            y, x, score = keypoints[i]
+            if score > 0.3:  # Confidence threshold
+                pose_data["keypoints"].append({
+                    "id": i,
+                    "x": float(x),
+                    "y": float(y),
+                    "score": float(score)
+                })
+        return pose_data
+    
+    def _openpose_output_to_pose(self, output: np.ndarray, width: int, height: int) -> Dict:
+        """Convert one OpenPose [C, H, W] heatmap stack to pose data."""
+        pose_data = {"keypoints": []}
+        for i in range(output.shape[0]):  # OpenPose uses 18 keypoints
+            # Extract heatmap for current keypoint
+            heatmap = output[i, :, :]
+            _, conf, _, point = cv2.minMaxLoc(heatmap)
+            
+            if conf > 0.1:  # Confidence threshold
+                x = int((point[0] * width) / output.shape[2])
+                y = int((point[1] * height) / output.shape[1])
+                
+                pose_data["keypoints"].append({
+                    "id": i,
+                    "x": x / width,  # Normalize to 0-1
+                    "y": y / height,  # Normalize to 0-1
+                    "score": float(conf)
+                })
+        return pose_data
+    
+    def _detect_pose_batch(self, frames: List[np.ndarray]) -> List[Dict]:
+        """
+        Detect human pose in a batch of frames with one model call where the model allows it.
+        
+        Args:
+            frames (List[np.ndarray]): Input frames
+            
+        Returns:
+            List[Dict]: Detected pose keypoints, one entry per frame
+        """
+        if not frames:
+            return []
+        
         if not self.has_pose_model:
             logger.warning("Pose model not available. Returning empty pose.")
-            return {"keypoints": []}
+            return [{"keypoints": []} for _ in frames]
         
         try:
+            if self.pose_model == "movenet" and self.pose_runtime is not None:
+                size = self.pose_runtime.input_size
+                batch = np.stack([cv2.resize(frame, (size, size)) for frame in frames])
+                keypoints = self.pose_runtime.infer(batch)
+                return [self._movenet_keypoints_to_pose(kp) for kp in keypoints]
+            
             if self.pose_model == "movenet":
-                # Preprocess the image
+                # Preprocess the images
                 import tensorflow as tf
-                img = tf.convert_to_tensor(cv2.resize(frame, (192, 192)))
-                img = tf.expand_dims(img, axis=0)
-                img = tf.cast(img, dtype=tf.int32)
+                batch = np.stack([cv2.resize(frame, (192, 192)) for frame in frames])
+                model_fn = self.pose_detector.signatures['serving_default']
                 
-                # Detect pose - Fix: Access the signatures correctly
-                # MoveNet expects input to be passed to its serving_default signature
-                if hasattr(self.pose_detector, 'signatures'):
-                    # The correct way to call the model
-                    results = self.pose_detector.signatures['serving_default'](tf.cast(img, tf.int32))
-                    keypoints = results['output_0'].numpy().squeeze()
-                else:
-                    # Fallback for older TF Hub versions
-                    model_fn = self.pose_detector.signatures['serving_default']
-                    results = model_fn(tf.cast(img, tf.int32))
-                    keypoints = results['output_0'].numpy().squeeze()
+                # MoveNet singlepose signatures may be fixed to a batch of one; fall back to
+                # per-frame calls (and remember that) if the batched call is rejected
+                keypoints = None
+                if len(frames) > 1 and self._pose_batching_supported:
+                    try:
+                        results = model_fn(tf.cast(tf.convert_to_tensor(batch), tf.int32))
+                        keypoints = results['output_0'].numpy().reshape(len(frames), 17, 3)
+                    except Exception as e:
+                        logger.info(f"MoveNet rejected a batch of {len(frames)}, using per-frame inference: {e}")
+                        self._pose_batching_supported = False
                 
-                # Convert to usable format
-                pose_data = {"keypoints": []}
-                for i in range(17):  # MoveNet uses 17 keypoints
-                    y, x, score = keypoints[i]
-                    if score > 0.3:  # Confidence threshold
-                        pose_data["keypoints"].append({
-                            "id": i,
-                            "x": float(x),
-                            "y": float(y),
-                            "score": float(score)
-                        })
+                if keypoints is None:
+                    keypoints = np.stack([
+                        model_fn(tf.cast(tf.expand_dims(tf.convert_to_tensor(img), axis=0), tf.int32))['output_0'].numpy().reshape(17, 3)
+                        for img in batch
+                    ])
                 
-                return pose_data
+                return [self._movenet_keypoints_to_pose(kp) for kp in keypoints]
                 
             elif self.pose_model == "openpose":
-                # Preprocess image for OpenPose
-                height, width = frame.shape[:2]
-                blob = cv2.dnn.blobFromImage(frame, 1.0 / 255, (368, 368), (127.5, 127.5, 127.5), swapRB=True, crop=False)
+                # Preprocess images for OpenPose as one blob
+                blob = cv2.dnn.blobFromImages(frames, 1.0 / 255, (368, 368), (127.5, 127.5, 127.5), swapRB=True, crop=False)
                 self.pose_net.setInput(blob)
                 
                 # Forward pass
                 output = self.pose_net.forward()
                 
-                # Process output
-                pose_data = {"keypoints": []}
-                for i in range(output.shape[1]):  # OpenPose uses 18 keypoints
-                    # Extract heatmap for current keypoint
-                    heatmap = output[0, i, :, :]
-                    _, conf, _, point = cv2.minMaxLoc(heatmap)
-                    
-                    if conf > 0.1:  # Confidence threshold
-                        x = int((point[0] * width) / output.shape[3])
-                        y = int((point[1] * height) / output.shape[2])
-                        
-                        pose_data["keypoints"].append({
-                            "id": i,
-                            "x": x / width,  # Normalize to 0-1
-                            "y": y / height,  # Normalize to 0-1
-                            "score": float(conf)
-                        })
-                
-                return pose_data
+                return [
+                    self._openpose_output_to_pose(output[i], frame.shape[1], frame.shape[0])
+                    for i, frame in enumerate(frames)
+                ]
+            
+            return [{"keypoints": []} for _ in frames]
         
         except Exception as e:
             logger.error(f"Error in pose detection: {e}")
-            return {"keypoints": []}
+            return [{"keypoints": []} for _ in frames]
     
     def _create_pose_control_image(self, pose_data: Dict, width: int, height: int) -> np.ndarray:
         """
@@ -636,8 +1064,9 @@ class VideoAnalyzer:
             color_mask = np.array([128, 128, 128], dtype=np.uint8)  # Gray for unknown
         
         # Apply color mask to non-zero pixels - Fix array shape mismatch
-        # Create a 3D mask for RGB channels
-        mask = np.any(pose_control > 0, axis=2) if len(pose_control.shape) > 2 else (pose_control > 0)
+        # Create a 3D mask for RGB channels (OR of the channels: same as any() > 0, without the reduction)
+        mask = ((pose_control[:, :, 0] | pose_control[:, :, 1] | pose_control[:, :, 2]) > 0
+                if len(pose_control.shape) > 2 else (pose_control > 0))
         
         # Apply to each channel separately
         for c in range(3):
@@ -660,6 +1089,21 @@ class VideoAnalyzer:
         # 1. Detect human pose
         pose_data = self._detect_pose(frame)
         
+        return self._composite_avatar(frame, pose_data, avatar_key, avatar_config)
+    
+    def _composite_avatar(self, frame: np.ndarray, pose_data: Dict, avatar_key: str, avatar_config: Dict) -> np.ndarray:
+        """
+        Replace the human described by pose_data with an AI avatar.
+        
+        Args:
+            frame (np.ndarray): Input frame
+            pose_data (Dict): Detected pose keypoints for the frame
+            avatar_key (str): Avatar to use for replacement
+            avatar_config (Dict): Avatar configuration dictionary
+            
+        Returns:
+            np.ndarray: Frame with human replaced by avatar
+        """
         # If no pose detected, return original frame
         if not pose_data["keypoints"]:
             return frame
@@ -673,15 +1117,12 @@ class VideoAnalyzer:
         
         # 4. Blend avatar with original background
         # Create a mask for the avatar (non-zero pixels)
-        mask = np.any(avatar_frame > 0, axis=2).astype(np.uint8) * 255
-        mask_inv = cv2.bitwise_not(mask)
-        
-        # Convert to 3-channel masks
-        mask_3ch = cv2.merge([mask, mask, mask]) / 255.0
-        mask_inv_3ch = cv2.merge([mask_inv, mask_inv, mask_inv]) / 255.0
+        mask = (avatar_frame[:, :, 0] | avatar_frame[:, :, 1] | avatar_frame[:, :, 2]) > 0
         
-        # Blend avatar with original background
-        result = (avatar_frame * mask_3ch + frame * mask_inv_3ch).astype(np.uint8)
+        # Blend avatar with original background: the mask is binary, so the blend is a
+        # per-pixel select (identical to the float blend, without the float frames)
+        result = frame.copy()
+        result[mask] = avatar_frame[mask]
         
         return result
     
@@ -690,30 +1131,45 @@ class VideoAnalyzer:
                               avatar_key: str, 
                               avatar_config: Dict,
                               output_path: Optional[str] = None,
-                              output_dir: str = "data/generated_videos") -> str:
+                              output_dir: str = "data/generated_videos",
+                              batch_size: int = 8,
+                              queue_size: int = 32,
+                              keyframe_interval: int = 4,
+                              tracking_mode: str = "interpolate",
+                              motion_threshold: float = 0.08) -> str:
         """
         Replace humans in a video with an AI avatar.
         
+        Runs as a three-stage pipeline: a decode thread, batched pose inference on the
+        calling thread, and a composite/encode thread, connected by bounded queues.
+        Every frame is processed. Full pose inference only runs on keyframes (see
+        PoseTracker); the frames between them are interpolated or flow-tracked.
+        Throughput and queue-depth metrics for the run are logged and kept in
+        self.last_pipeline_metrics.
+        
         Args:
             video_path (str): Path to input video
             avatar_key (str): Avatar to use for replacement
             avatar_config (Dict): Avatar configuration dictionary
             output_path (str, optional): Path to save output video
             output_dir (str): Directory to save output video if output_path is not provided
+            batch_size (int): Keyframes per pose inference call
+            queue_size (int): Maximum frames buffered between stages
+            keyframe_interval (int): Maximum frames between pose inference runs (1 = every frame)
+            tracking_mode (str): "interpolate" or "flow" for frames between keyframes
+            motion_threshold (float): Accumulated frame motion (0-1) that forces an early keyframe
             
         Returns:
             str: Path to output video
         """
-        # Open video
-        cap = cv2.VideoCapture(video_path)
-        if not cap.isOpened():
-            raise ValueError(f"Could not open video: {video_path}")
+        # Open video (frames are streamed, the decode stage owns the capture)
+        source = FrameSource(video_path)
         
         # Get video properties
-        fps = cap.get(cv2.CAP_PROP_FPS)
-        width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
-        height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
-        total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+        fps = source.fps
+        width = source.width
+        height = source.height
+        total_frames = source.frame_count
         
         # Create output path if not provided
         if output_path is None:
@@ -724,44 +1180,201 @@ class VideoAnalyzer:
             timestamp = time.strftime("%Y%m%d_%H%M%S")
             output_path = str(output_dir_path / f"avatar_{avatar_key}_{timestamp}.mp4")
         
+        tracker = PoseTracker(self._detect_pose_batch,
+                              keyframe_interval=keyframe_interval,
+                              motion_threshold=motion_threshold,
+                              mode=tracking_mode)
+        # Each chunk holds about batch_size keyframes
+        chunk_size = batch_size * keyframe_interval
+        
         # Create video writer
         fourcc = cv2.VideoWriter_fourcc(*'mp4v')
         out = cv2.VideoWriter(output_path, fourcc, fps, (width, height))
         
-        # Process each frame
-        frame_count = 0
-        processed_frame = None
+        decode_queue = queue.Queue(maxsize=queue_size)
+        encode_queue = queue.Queue(maxsize=queue_size)
+        stop_event = threading.Event()
+        errors = []
+        stage_time = {'decode': 0.0, 'inference': 0.0, 'encode': 0.0}
+        depth_samples = {'decode_queue': [], 'encode_queue': []}
         
-        while cap.isOpened():
-            ret, frame = cap.read()
-            if not ret:
-                break
-            
-            # Process frame every 2nd frame to save time (can be adjusted)
-            if frame_count % 2 == 0:
-                # Replace human with avatar
-                processed_frame = self.replace_human_in_frame(frame, avatar_key, avatar_config)
+        def put(q, item):
+            # Bounded put that gives up if another stage has failed
+            while not stop_event.is_set():
+                try:
+                    q.put(item, timeout=0.1)
+                    return True
+                except queue.Full:
+                    continue
+            return False
+        
+        def get(q):
+            # Blocking get that returns the end sentinel if another stage has failed
+            while not stop_event.is_set():
+                try:
+                    return q.get(timeout=0.1)
+                except queue.Empty:
+                    continue
+            return None
+        
+        def decode_stage():
+            frames = source.indexed()
+            try:
+                while not stop_event.is_set():
+                    t0 = time.perf_counter()
+                    item = next(frames, None)
+                    stage_time['decode'] += time.perf_counter() - t0
+                    if item is None:
+                        break
+                    if not put(decode_queue, item):
+                        return
+            except Exception as e:
+                errors.append(e)
+                stop_event.set()
+            finally:
+                # Closing the generator releases the capture
+                frames.close()
+                put(decode_queue, None)
+        
+        def encode_stage():
+            try:
+                while True:
+                    item = encode_queue.get()
+                    if item is None:
+                        break
+                    frame_idx, frame, pose_data = item
+                    t0 = time.perf_counter()
+                    out.write(self._composite_avatar(frame, pose_data, avatar_key, avatar_config))
+                    stage_time['encode'] += time.perf_counter() - t0
+                    
+                    # Log progress
+                    if frame_idx % 30 == 0:
+                        logger.info(f"Processing frame {frame_idx}/{total_frames} ({frame_idx/max(total_frames, 1)*100:.1f}%)")
+            except Exception as e:
+                errors.append(e)
+                stop_event.set()
+                # Drain so the inference stage never blocks on a dead consumer
+                while encode_queue.get() is not None:
+                    pass
+        
+        decoder = threading.Thread(target=decode_stage, name="pose-decode", daemon=True)
+        encoder = threading.Thread(target=encode_stage, name="pose-encode", daemon=True)
+        
+        start = time.perf_counter()
+        frames_processed = 0
+        decoder.start()
+        encoder.start()
+        
+        try:
+            # Inference stage: pull a chunk of frames, infer keyframes in one call, hand on to the encoder
+            done = False
+            while not done and not stop_event.is_set():
+                batch = []
+                item = get(decode_queue)
+                while item is not None:
+                    batch.append(item)
+                    if len(batch) >= chunk_size:
+                        break
+                    # Block for the rest of the batch; the decoder always ends with a sentinel
+                    item = get(decode_queue)
+                if item is None:
+                    done = True
+                if not batch:
+                    continue
                 
-                # Write processed frame
-                out.write(processed_frame)
+                depth_samples['decode_queue'].append(decode_queue.qsize())
+                depth_samples['encode_queue'].append(encode_queue.qsize())
                 
-                # Log progress
-                if frame_count % 30 == 0:
-                    logger.info(f"Processing frame {frame_count}/{total_frames} ({frame_count/total_frames*100:.1f}%)")
-            else:
-                # Skip processing and use previous frame
-                if processed_frame is not None:
-                    out.write(processed_frame)  # Use the last processed frame
+                t0 = time.perf_counter()
+                poses = tracker.process([frame for _, frame in batch])
+                stage_time['inference'] += time.perf_counter() - t0
+                
+                for (frame_idx, frame), pose_data in zip(batch, poses):
+                    if not put(encode_queue, (frame_idx, frame, pose_data)):
+                        break
+                frames_processed += len(batch)
+        except Exception as e:
+            errors.append(e)
+            stop_event.set()
+        finally:
+            if errors:
+                stop_event.set()
+            encode_queue.put(None)
+            encoder.join()
+            # Unblock and wait for the decoder if it is still producing
+            stop_event.set()
+            while decoder.is_alive():
+                try:
+                    decode_queue.get(timeout=0.1)
+                except queue.Empty:
+                    pass
+            decoder.join()
             
-            frame_count += 1
-        
-        # Clean up
-        cap.release()
-        out.release()
+            # Clean up
+            out.release()
+        
+        if errors:
+            raise errors[0]
+        
+        elapsed = time.perf_counter() - start
+        self.last_pipeline_metrics = {
+            'frames': frames_processed,
+            'elapsed_s': elapsed,
+            'fps': frames_processed / elapsed if elapsed > 0 else 0.0,
+            'batch_size': batch_size,
+            'inference_frames': tracker.inference_frames,
+            'keyframe_interval': keyframe_interval,
+            'tracking_mode': tracking_mode,
+            'stage_time_s': dict(stage_time),
+            'queue_depth': {
+                name: {
+                    'mean': float(np.mean(samples)) if samples else 0.0,
+                    'max': int(max(samples)) if samples else 0,
+                    'capacity': queue_size
+                }
+                for name, samples in depth_samples.items()
+            }
+        }
+        logger.info(f"Pose pipeline: {frames_processed} frames in {elapsed:.2f}s "
+                    f"({self.last_pipeline_metrics['fps']:.1f} fps), "
+                    f"pose inference on {tracker.inference_frames} frames ({tracking_mode}), "
+                    f"stage time decode/inference/encode = "
+                    f"{stage_time['decode']:.2f}/{stage_time['inference']:.2f}/{stage_time['encode']:.2f}s, "
+                    f"mean queue depth decode/encode = "
+                    f"{self.last_pipeline_metrics['queue_depth']['decode_queue']['mean']:.1f}/"
+                    f"{self.last_pipeline_metrics['queue_depth']['encode_queue']['mean']:.1f}")
         
         logger.info(f"Video processing complete. Output saved to {output_path}")
         return output_path
 
+# Analyzers shared by every VideoGenerator/VideoEditor in the process, keyed by their data files
+_shared_analyzers = {}
+_shared_analyzers_lock = threading.Lock()
+
+def get_shared_analyzer(training_videos_dir: str = "data/training_videos",
+                        cache_file: str = "data/style_patterns.json",
+                        pose_model: str = "movenet",
+                        store_file: Optional[str] = None) -> VideoAnalyzer:
+    """
+    Get or create the VideoAnalyzer for these data files, shared across the process.
+    
+    store_file defaults to cache_file with a .db suffix (as in VideoAnalyzer), resolved
+    here so callers that omit it and callers that pass the default share one analyzer.
+    """
+    store_file = store_file or str(Path(cache_file).with_suffix('.db'))
+    key = (str(Path(training_videos_dir).resolve()), str(Path(cache_file).resolve()),
+           pose_model, str(Path(store_file).resolve()))
+    with _shared_analyzers_lock:
+        if key not in _shared_analyzers:
+            _shared_analyzers[key] = VideoAnalyzer(
+                training_videos_dir=training_videos_dir,
+                cache_file=cache_file,
+                pose_model=pose_model,
+                store_file=store_file
+            )
+        return _shared_analyzers[key]
+
+
 if __name__ == "__main__":
     analyzer = VideoAnalyzer()
     results = analyzer.analyze_training_set(force_reanalyze=True)
@@ -0,0 +1,297 @@
+#!/usr/bin/env python3
+"""
+Clip Index: a persisted feature matrix over the training clips so style-matched
+clip search is a vectorized range query instead of a directory walk.
+
+Each row holds one clip's features (duration, brightness, contrast, energy and
+transition counts). Segment boundaries are ragged, so they are kept in a flat
+array with per-clip offsets. Rows are synced incrementally from the per-video
+analysis records kept by VideoAnalyzer.
+"""
+
+import os
+import json
+import logging
+import threading
+import numpy as np
+from pathlib import Path
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Column layout of the feature matrix
+FEATURE_COLUMNS = ('duration', 'brightness', 'contrast', 'energy', 'cuts', 'fades', 'dissolves')
+COL = {name: i for i, name in enumerate(FEATURE_COLUMNS)}
+
+
+def clip_energy(brightness: float, contrast: float) -> float:
+    """Energy level of a clip from its mean brightness and contrast (0-1)."""
+    return (brightness / 255.0 + contrast / 255.0) / 2
+
+
+def _record_features(record: Dict) -> np.ndarray:
+    """Build a feature row from a per-video analysis record."""
+    brightness = float(np.mean(record['brightness'])) if record.get('brightness') else 0.0
+    contrast = float(np.mean(record['contrast'])) if record.get('contrast') else 0.0
+    transitions = record.get('transitions', {})
+    return np.array([
+        float(record.get('duration', 0.0)),
+        brightness,
+        contrast,
+        clip_energy(brightness, contrast),
+        transitions.get('cut', 0),
+        transitions.get('fade', 0),
+        transitions.get('dissolve', 0)
+    ], dtype=np.float64)
+
+
+def _record_key(record: Dict) -> str:
+    """Version key of a record: changes whenever the file or the analysis settings change."""
+    return f"{record.get('fingerprint', '')}|{record.get('settings', '')}"
+
+
+def _record_boundaries(record: Dict) -> List[float]:
+    """Segment boundaries of a clip (start of each segment plus the clip end)."""
+    boundaries = record.get('segment_boundaries')
+    if boundaries:
+        return [float(b) for b in boundaries]
+    return [0.0, float(record.get('duration', 0.0))]
+
+
+class ClipIndex:
+    """
+    Feature-matrix index over analyzed training clips.
+
+    Shared across threads (see get_clip_index): sync, load, save and the queries
+    take the index lock, so a query never sees the arrays of two different syncs.
+    """
+
+    def __init__(self, index_file: Optional[str] = None):
+        """
+        Initialize the clip index.
+
+        Args:
+            index_file (str, optional): .npz file the index is persisted to
+        """
+        self.index_file = Path(index_file) if index_file else None
+        self._lock = threading.RLock()
+        self._reset()
+
+        if self.index_file and self.index_file.exists():
+            self.load()
+
+    def _reset(self):
+        """Empty the index."""
+        self.paths = []
+        self.fingerprints = []
+        self.features = np.zeros((0, len(FEATURE_COLUMNS)), dtype=np.float64)
+        self.boundaries = np.zeros(0, dtype=np.float64)
+        self.boundary_offsets = np.zeros(1, dtype=np.int64)
+        self._row_by_path = {}
+        self._energy_order = np.zeros(0, dtype=np.int64)
+        self._sorted_energy = np.zeros(0, dtype=np.float64)
+
+    def __len__(self) -> int:
+        return len(self.paths)
+
+    def _rebuild_lookups(self):
+        """Recompute the path lookup and the energy sort order used by range queries."""
+        self._row_by_path = {path: i for i, path in enumerate(self.paths)}
+        self._energy_order = np.argsort(self.features[:, COL['energy']], kind='stable')
+        self._sorted_energy = self.features[self._energy_order, COL['energy']]
+
+    def sync(self, records: Dict[str, Dict]) -> bool:
+        """
+        Bring the index in line with a set of per-video analysis records.
+
+        Unchanged rows (same fingerprint and analysis settings) are kept as-is, changed and new records are
+        (re)built and rows whose clip is no longer in the records are dropped.
+
+        Args:
+            records (Dict[str, Dict]): Per-video records keyed by path (VideoAnalyzer.video_records)
+
+        Returns:
+            bool: True if the index changed
+        """
+        with self._lock:
+            return self._sync(records)
+
+    def _sync(self, records: Dict[str, Dict]) -> bool:
+        """sync with the index lock held."""
+        keep = [i for i, path in enumerate(self.paths)
+                if path in records and _record_key(records[path]) == self.fingerprints[i]]
+        kept_paths = {self.paths[i] for i in keep}
+        new_paths = sorted(path for path in records if path not in kept_paths)
+
+        if len(keep) == len(self.paths) and not new_paths:
+            return False
+
+        # Carry over kept rows and their boundary slices
+        paths = [self.paths[i] for i in keep]
+        fingerprints = [self.fingerprints[i] for i in keep]
+        feature_rows = [self.features[keep]] if keep else []
+        boundary_lists = [self.boundaries[self.boundary_offsets[i]:self.boundary_offsets[i + 1]] for i in keep]
+
+        for path in new_paths:
+            record = records[path]
+            try:
+                feature_rows.append(_record_features(record)[np.newaxis, :])
+                boundary_lists.append(np.asarray(_record_boundaries(record), dtype=np.float64))
+            except Exception as e:
+                logger.error(f"Could not index {path}: {e}")
+                continue
+            paths.append(path)
+            fingerprints.append(_record_key(record))
+
+        self.paths = paths
+        self.fingerprints = fingerprints
+        self.features = np.vstack(feature_rows) if feature_rows else np.zeros((0, len(FEATURE_COLUMNS)))
+        lengths = [len(b) for b in boundary_lists]
+        self.boundary_offsets = np.concatenate([[0], np.cumsum(lengths)]).astype(np.int64)
+        self.boundaries = np.concatenate(boundary_lists) if boundary_lists else np.zeros(0, dtype=np.float64)
+        self._rebuild_lookups()
+
+        logger.info(f"Clip index synced: {len(self.paths)} clips "
+                    f"({len(self.paths) - len(keep)} added/updated)")
+        return True
+
+    def query(self, target_energy: float, tolerance: float = 0.2, min_duration: float = 0.0) -> np.ndarray:
+        """
+        Find clips whose energy is within tolerance of the target and that are long enough.
+
+        Args:
+            target_energy (float): Target energy level (0-1)
+            tolerance (float): Allowed absolute energy difference (exclusive)
+            min_duration (float): Minimum clip duration in seconds
+
+        Returns:
+            np.ndarray: Row indices of matching clips, in index order
+        """
+        with self._lock:
+            return self._query(target_energy, tolerance, min_duration)
+
+    def _query(self, target_energy: float, tolerance: float, min_duration: float) -> np.ndarray:
+        """query with the index lock held."""
+        if not self.paths:
+            return np.zeros(0, dtype=np.int64)
+
+        # Energy range from the sorted column, then the duration filter on that slice only
+        lo = np.searchsorted(self._sorted_energy, target_energy - tolerance, side='right')
+        hi = np.searchsorted(self._sorted_energy, target_energy + tolerance, side='left')
+        candidates = self._energy_order[lo:hi]
+        candidates = candidates[self.features[candidates, COL['duration']] >= min_duration]
+        return np.sort(candidates)
+
+    def clip_analysis(self, row: int) -> Dict:
+        """
+        Analysis view of one indexed clip, in the shape _find_suitable_segments expects.
+
+        Args:
+            row (int): Row index
+
+        Returns:
+            Dict: Clip path, duration, transitions and segment boundaries
+        """
+        with self._lock:
+            return self._clip_analysis(row)
+
+    def _clip_analysis(self, row: int) -> Dict:
+        """clip_analysis with the index lock held."""
+        features = self.features[row]
+        transitions = {
+            t_type: int(features[COL[column]])
+            for t_type, column in (('cut', 'cuts'), ('fade', 'fades'), ('dissolve', 'dissolves'))
+            if features[COL[column]] > 0
+        }
+        return {
+            'path': self.paths[row],
+            'duration': float(features[COL['duration']]),
+            'energy': float(features[COL['energy']]),
+            'transitions': transitions,
+            'segment_boundaries': self.boundaries[self.boundary_offsets[row]:self.boundary_offsets[row + 1]].tolist()
+        }
+
+    def find_clips(self, target_energy: float, tolerance: float = 0.2, min_duration: float = 0.0) -> List[Dict]:
+        """
+        query() and clip_analysis() of every match in one step, so a concurrent sync
+        cannot renumber the rows in between.
+
+        Returns:
+            List[Dict]: Analysis views of the matching clips, in index order
+        """
+        with self._lock:
+            return [self._clip_analysis(row) for row in self._query(target_energy, tolerance, min_duration)]
+
+    def save(self) -> None:
+        """Persist the index to its .npz file."""
+        if not self.index_file:
+            return
+        with self._lock:
+            self._save()
+
+    def _save(self) -> None:
+        """save with the index lock held."""
+        try:
+            self.index_file.parent.mkdir(parents=True, exist_ok=True)
+            tmp_file = self.index_file.with_suffix('.tmp.npz')
+            np.savez(
+                tmp_file,
+                features=self.features,
+                boundaries=self.boundaries,
+                boundary_offsets=self.boundary_offsets,
+                meta=np.array(json.dumps({
+                    'columns': FEATURE_COLUMNS,
+                    'paths': self.paths,
+                    'fingerprints': self.fingerprints
+                }))
+            )
+            # Atomic replace so a concurrent reader never sees a half-written index
+            os.replace(tmp_file, self.index_file)
+            logger.debug(f"Saved clip index with {len(self.paths)} clips to {self.index_file}")
+        except Exception as e:
+            logger.error(f"Error saving clip index: {e}")
+
+    def load(self) -> bool:
+        """
+        Load the index from its .npz file.
+
+        Returns:
+            bool: True if the index was loaded
+        """
+        with self._lock:
+            return self._load()
+
+    def _load(self) -> bool:
+        """load with the index lock held."""
+        try:
+            with np.load(self.index_file) as data:
+                meta = json.loads(str(data['meta']))
+                if tuple(meta['columns']) != FEATURE_COLUMNS:
+                    logger.warning("Clip index was built with different columns, rebuilding")
+                    return False
+                self.features = data['features']
+                self.boundaries = data['boundaries']
+                self.boundary_offsets = data['boundary_offsets']
+            self.paths = meta['paths']
+            self.fingerprints = meta['fingerprints']
+            self._rebuild_lookups()
+            logger.info(f"Loaded clip index with {len(self.paths)} clips from {self.index_file}")
+            return True
+        except Exception as e:
+            logger.warning(f"Could not load clip index: {e}")
+            self._reset()
+            return False
+
+
+# Indexes shared by every VideoGenerator in the process, keyed by index file
+_shared_indexes = {}
+_shared_indexes_lock = threading.Lock()
+
+
+def get_clip_index(index_file: str) -> ClipIndex:
+    """Get or create the ClipIndex persisted at index_file, shared across the process."""
+    key = str(Path(index_file).resolve())
+    with _shared_indexes_lock:
+        if key not in _shared_indexes:
+            _shared_indexes[key] = ClipIndex(index_file)
+        return _shared_indexes[key]
@@ -5,32 +5,55 @@
 # Saves images in organized directories
 
 import os
+import gc
 import logging
-import torch
 from pathlib import Path
-from diffusers import StableDiffusionPipeline
 from video_generation.avatar_config import AVATAR_CONFIGS
+from e2e_cloud.prompt_embedding_cache import get_prompt_embedding_cache, pipeline_text_encoder
+from e2e_cloud.model_registry import get_model_registry
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='[%(asctime)s] %(levelname)s: %(message)s')
 
 class AvatarGenerator:
-    def __init__(self, model_path=None, output_dir="data/generated_avatars"):
+    def __init__(self, model_path=None, output_dir="data/generated_avatars", max_batch=8, batch_item_memory_gb=2.0):
         """
         Initialize the avatar generator with a Stable Diffusion model.
         
         Args:
             model_path (str): Path to fine-tuned model or model ID from HuggingFace
             output_dir (str): Directory to save generated images
+            max_batch (int): Most images to generate in one pipeline call
+            batch_item_memory_gb (float): GPU memory one 1024x1024 image needs during denoising
         """
         self.output_dir = Path(output_dir)
         self.output_dir.mkdir(parents=True, exist_ok=True)
+        self.max_batch = max_batch
+        self.batch_item_memory_gb = batch_item_memory_gb
         
         # Use default model if no specific model path provided
         if model_path is None:
             model_path = "stabilityai/stable-diffusion-xl-base-1.0"
-        
-        # Initialize Stable Diffusion pipeline
+        self.model_path = model_path
+        
+        # Prompt embeddings shared by every avatar and variation (the negative prompt is common to all)
+        self.embedding_cache = get_prompt_embedding_cache()
+        
+        # Initialize Stable Diffusion pipeline. The pipeline is shared with every other
+        # component using the same weights on the same device, and released when this
+        # generator is garbage collected (see e2e_cloud/model_registry.py)
+        # torch and diffusers are imported here, not at module level, so the video helpers
+        # below (create_avatar_video, ken_burns_matrices, ...) work without them
+        import torch
+        device = "cuda" if torch.cuda.is_available() else "cpu"
+        self.pipeline_id = f"stable-diffusion:{model_path}:{device}"
+        self.pipe = get_model_registry().acquire(self.pipeline_id, self._load_pipeline, device=device, owner=self)
+    
+    def _load_pipeline(self):
+        """Load the Stable Diffusion pipeline with the best settings for the available device."""
+        import torch
+        from diffusers import StableDiffusionPipeline
+        model_path = self.model_path
         logging.info(f"Loading Stable Diffusion XL model from {model_path}")
         
         # Check for GPU availability and optimize accordingly
@@ -41,7 +64,7 @@ class AvatarGenerator:
             logging.info(f"GPU detected: {gpu_name} with {gpu_memory:.2f}GB memory")
             
             # Load with optimizations for powerful GPUs like RTX 4090
-            self.pipe = StableDiffusionPipeline.from_pretrained(
+            pipe = StableDiffusionPipeline.from_pretrained(
                 model_path,
                 torch_dtype=torch.float16,  # Use half precision for better performance
                 use_safetensors=True,
@@ -49,26 +72,26 @@ class AvatarGenerator:
             )
             
             # Move to GPU
-            self.pipe = self.pipe.to("cuda")
+            pipe = pipe.to("cuda")
             
             # Apply memory optimizations
-            self.pipe.enable_vae_slicing()  # Reduces VRAM usage during generation
+            pipe.enable_vae_slicing()  # Reduces VRAM usage during generation
             
             # Enable attention slicing for memory efficiency
-            self.pipe.enable_attention_slicing(slice_size="auto")
+            pipe.enable_attention_slicing(slice_size="auto")
             
             # For RTX 4090 and similar high-end GPUs, enable xformers for even better performance
             try:
                 import xformers
-                self.pipe.enable_xformers_memory_efficient_attention()
+                pipe.enable_xformers_memory_efficient_attention()
                 logging.info("Using xformers memory efficient attention for maximum performance")
             except ImportError:
                 logging.info("xformers package not found, using standard attention mechanism")
                 
             # For newer versions of diffusers that support torch compile
-            if hasattr(torch, 'compile') and hasattr(self.pipe, 'unet'):
+            if hasattr(torch, 'compile') and hasattr(pipe, 'unet'):
                 try:
-                    self.pipe.unet = torch.compile(self.pipe.unet, mode="reduce-overhead", fullgraph=True)
+                    pipe.unet = torch.compile(pipe.unet, mode="reduce-overhead", fullgraph=True)
                     logging.info("Using torch.compile for even faster inference")
                 except Exception as e:
                     logging.warning(f"Could not use torch.compile: {e}")
@@ -76,12 +99,14 @@ class AvatarGenerator:
             logging.info("Using CUDA with optimized settings for high-end GPU")
         else:
             # CPU fallback with basic settings
-            self.pipe = StableDiffusionPipeline.from_pretrained(
+            pipe = StableDiffusionPipeline.from_pretrained(
                 model_path,
                 torch_dtype=torch.float32,
                 use_safetensors=True
             )
             logging.info("Using CPU for generation (this will be slow)")
+        
+        return pipe
     
     def generate_avatar_set(self, avatar_key, num_variations=3):
         """
@@ -91,33 +116,226 @@ class AvatarGenerator:
             avatar_key (str): Key of the avatar in AVATAR_CONFIGS
             num_variations (int): Number of variations to generate per prompt
         """
-        if avatar_key not in AVATAR_CONFIGS:
-            raise ValueError(f"Avatar key '{avatar_key}' not found in config")
-        
-        avatar_config = AVATAR_CONFIGS[avatar_key]
-        avatar_dir = self.output_dir / avatar_key
-        avatar_dir.mkdir(exist_ok=True)
-        
-        # Generate base avatar images
-        logging.info(f"Generating base images for {avatar_config['name']}")
-        self._generate_images(
-            prompt=f"{avatar_config['base_prompt']}, {avatar_config['style_prompt']}",
-            negative_prompt=avatar_config['negative_prompt'],
-            output_dir=avatar_dir,
-            prefix="base",
-            num_images=num_variations
-        )
+        self.generate_avatar_sets([avatar_key], num_variations)
+    
+    def generate_avatar_sets(self, avatar_keys, num_variations=3):
+        """
+        Generate the image sets of several avatar personas, all prompts batched together.
         
-        # Generate variations for different content types
-        for variation_type, variation_prompt in avatar_config['variations'].items():
-            logging.info(f"Generating {variation_type} variations for {avatar_config['name']}")
-            self._generate_images(
-                prompt=f"{variation_prompt}, {avatar_config['style_prompt']}",
-                negative_prompt=avatar_config['negative_prompt'],
-                output_dir=avatar_dir,
-                prefix=variation_type,
-                num_images=num_variations
+        Args:
+            avatar_keys (list): Keys of the avatars in AVATAR_CONFIGS
+            num_variations (int): Number of variations to generate per prompt
+        """
+        jobs = []
+        for avatar_key in avatar_keys:
+            if avatar_key not in AVATAR_CONFIGS:
+                raise ValueError(f"Avatar key '{avatar_key}' not found in config")
+            
+            avatar_config = AVATAR_CONFIGS[avatar_key]
+            avatar_dir = self.output_dir / avatar_key
+            avatar_dir.mkdir(exist_ok=True)
+            
+            # Generate base avatar images
+            logging.info(f"Generating base images for {avatar_config['name']}")
+            jobs.append({
+                "prompt": f"{avatar_config['base_prompt']}, {avatar_config['style_prompt']}",
+                "negative_prompt": avatar_config['negative_prompt'],
+                "output_dir": avatar_dir,
+                "prefix": "base"
+            })
+            
+            # Generate variations for different content types
+            for variation_type, variation_prompt in avatar_config['variations'].items():
+                logging.info(f"Generating {variation_type} variations for {avatar_config['name']}")
+                jobs.append({
+                    "prompt": f"{variation_prompt}, {avatar_config['style_prompt']}",
+                    "negative_prompt": avatar_config['negative_prompt'],
+                    "output_dir": avatar_dir,
+                    "prefix": variation_type
+                })
+        
+        self._generate_jobs(jobs, num_variations)
+    
+    def _text_inputs(self, prompts, negative_prompts):
+        """
+        Pipeline text arguments for a batch: cached prompt embeddings when the pipeline
+        accepts them, otherwise the raw prompts for the pipeline to encode.
+        
+        Args:
+            prompts (list): The positive prompts, one per image
+            negative_prompts (list): The negative prompts, one per image
+        """
+        encode = pipeline_text_encoder(self.pipe)
+        if encode is not None:
+            try:
+                # Only pipelines that expose a text encoder need torch here
+                import torch
+                dtype = getattr(self.pipe, "dtype", None)
+                return {
+                    "prompt_embeds": torch.cat([
+                        self.embedding_cache.get_or_encode(self.model_path, prompt, dtype, encode)
+                        for prompt in prompts
+                    ]),
+                    "negative_prompt_embeds": torch.cat([
+                        self.embedding_cache.get_or_encode(self.model_path, negative_prompt, dtype, encode)
+                        for negative_prompt in negative_prompts
+                    ])
+                }
+            except Exception as e:
+                logging.warning(f"Could not use cached prompt embeddings: {e}")
+        return {"prompt": list(prompts), "negative_prompt": list(negative_prompts)}
+    
+    def max_batch_size(self):
+        """
+        Largest number of images to denoise in one pipeline call, from free GPU memory.
+        
+        Returns:
+            int: Batch size between 1 and max_batch
+        """
+        if self.max_batch <= 1:
+            return 1
+        try:
+            import torch
+            if not torch.cuda.is_available():
+                return 1
+            free_bytes, _ = torch.cuda.mem_get_info()
+        except Exception as e:
+            logging.debug(f"Could not read free GPU memory: {e}")
+            return 1
+        # Keep 10% headroom for the VAE decode and allocator fragmentation
+        fits = int((free_bytes / (1024 ** 3)) * 0.9 // self.batch_item_memory_gb)
+        return max(1, min(self.max_batch, fits))
+    
+    def generate_images(self, prompts, negative_prompt="", num_images_per_prompt=1, seeds=None, max_batch_size=None):
+        """
+        Generate images for several prompts in batched pipeline calls.
+        
+        Every image is one batch item, so one call can mix prompts. Batches are split to
+        max_batch_size (derived from free GPU memory if not given) and halved again if a
+        batch runs out of memory.
+        
+        Args:
+            prompts (list): The positive prompts
+            negative_prompt (str or list): Negative prompt for every prompt, or one per prompt
+            num_images_per_prompt (int): Images to generate for each prompt
+            seeds (list, optional): Seed per image, in prompt order; None entries are random
+            max_batch_size (int, optional): Maximum images per pipeline call
+            
+        Returns:
+            list: One dict per image, in prompt order: prompt, seed, image (PIL image or None), error
+        """
+        negative_prompts = [negative_prompt] * len(prompts) if isinstance(negative_prompt, str) else list(negative_prompt)
+        
+        # Ensure prompts don't exceed token limits (CLIP has 77 token limit)
+        max_prompt_length = 77
+        results = []
+        for prompt, item_negative_prompt in zip(prompts, negative_prompts):
+            prompt_words = prompt.split()
+            shortened_prompt = " ".join(prompt_words[:min(len(prompt_words), max_prompt_length - 5)])
+            for _ in range(num_images_per_prompt):
+                results.append({"prompt": shortened_prompt, "negative_prompt": item_negative_prompt,
+                                "seed": None, "image": None, "error": None})
+        if seeds is not None:
+            for result, seed in zip(results, seeds):
+                result["seed"] = seed
+        
+        batch_size = max_batch_size or self.max_batch_size()
+        logging.info(f"Generating {len(results)} image(s) for {len(prompts)} prompt(s) in batches of up to {batch_size}")
+        
+        pending = [results[i:i + batch_size] for i in range(0, len(results), batch_size)]
+        while pending:
+            batch = pending.pop(0)
+            error = self._generate_batch(batch)
+            if error == "oom" and len(batch) > 1:
+                # Split the batch and retry both halves before moving on
+                half = len(batch) // 2
+                logging.warning(f"Out of GPU memory with a batch of {len(batch)} images, retrying in batches of {half}")
+                gc.collect()
+                # Release torch's cached GPU blocks; torch is only imported on this path
+                try:
+                    import torch
+                    if torch.cuda.is_available():
+                        torch.cuda.empty_cache()
+                except ImportError:
+                    pass
+                pending[:0] = [batch[:half], batch[half:]]
+            elif error:
+                for result in batch:
+                    result["error"] = result["error"] or error
+        
+        failed = sum(1 for r in results if r["image"] is None)
+        if failed:
+            logging.error(f"{failed}/{len(results)} image(s) failed")
+        return results
+    
+    def _seed_generators(self, batch):
+        """
+        One torch generator per image so each image is reproducible regardless of its batch.
+        
+        Returns:
+            list: Generators in batch order, or None if no image in the batch is seeded
+        """
+        if not any(r["seed"] is not None for r in batch):
+            return None
+        # torch is only needed for seeded generators
+        import torch
+        generators = []
+        for result in batch:
+            item_generator = torch.Generator(device="cpu")
+            if result["seed"] is not None:
+                item_generator.manual_seed(result["seed"])
+            else:
+                item_generator.seed()
+            generators.append(item_generator)
+        return generators
+    
+    def _generate_batch(self, batch):
+        """
+        Run one batched pipeline call and store its images in the batch results.
+        
+        Returns:
+            None on success, "oom" if the batch ran out of GPU memory, otherwise an error message
+        """
+        try:
+            generator = self._seed_generators(batch)
+            
+            # Images of a single prompt share one text encoding
+            texts = {(r["prompt"], r["negative_prompt"]) for r in batch}
+            if len(texts) == 1:
+                prompt, negative_prompt = texts.pop()
+                text_inputs = self._text_inputs([prompt], [negative_prompt])
+                num_images_per_prompt = len(batch)
+            else:
+                text_inputs = self._text_inputs([r["prompt"] for r in batch], [r["negative_prompt"] for r in batch])
+                num_images_per_prompt = 1
+            
+            # Generate images with optimized parameters for avatars
+            result = self.pipe(
+                **text_inputs,
+                num_images_per_prompt=num_images_per_prompt,
+                generator=generator,
+                num_inference_steps=40,  # Reduced from 50 for better speed/quality balance
+                guidance_scale=8.0,      # Slightly increased for better prompt adherence
+                width=1024,             # SDXL supports higher resolution
+                height=1024
             )
+            
+            # Check if the model returned valid images
+            images = []
+            if result is not None and hasattr(result, 'images') and result.images is not None:
+                images = result.images
+            for index, item in enumerate(batch):
+                if index < len(images) and images[index] is not None:
+                    item["image"] = images[index]
+                else:
+                    item["error"] = "Model did not return an image"
+            return None
+        
+        except Exception as e:
+            if "out of memory" in str(e).lower():
+                return "oom"
+            logging.error(f"Error from model: {str(e)}")
+            return str(e)
     
     def _generate_images(self, prompt, negative_prompt, output_dir, prefix, num_images=1):
         """
@@ -130,32 +348,34 @@ class AvatarGenerator:
             prefix (str): Prefix for the image filenames
             num_images (int): Number of images to generate
         """
-        # Ensure prompts don't exceed token limits (CLIP has 77 token limit)
-        max_prompt_length = 77
-        prompt_words = prompt.split()
-        shortened_prompt = " ".join(prompt_words[:min(len(prompt_words), max_prompt_length - 5)])
+        self._generate_jobs([{
+            "prompt": prompt,
+            "negative_prompt": negative_prompt,
+            "output_dir": output_dir,
+            "prefix": prefix
+        }], num_images)
+    
+    def _generate_jobs(self, jobs, num_images):
+        """
+        Generate num_images images for each job (prompt, negative_prompt, output_dir, prefix)
+        in batched pipeline calls and save them as {prefix}_{n}.png.
+        """
+        try:
+            results = self.generate_images(
+                [job["prompt"] for job in jobs],
+                [job["negative_prompt"] for job in jobs],
+                num_images_per_prompt=num_images
+            )
+        except Exception as e:
+            logging.error(f"Error generating images: {str(e)}")
+            results = [{"image": None, "error": str(e)} for _ in range(len(jobs) * num_images)]
         
-        for i in range(num_images):
+        for index, result in enumerate(results):
+            job = jobs[index // num_images]
+            output_dir, prefix, i = job["output_dir"], job["prefix"], index % num_images
             try:
-                # Safely generate the image, handling potential errors
-                try:
-                    # Generate image with optimized parameters for avatars
-                    result = self.pipe(
-                        prompt=shortened_prompt,
-                        negative_prompt=negative_prompt,
-                        num_inference_steps=40,  # Reduced from 50 for better speed/quality balance
-                        guidance_scale=8.0,      # Slightly increased for better prompt adherence
-                        width=1024,             # SDXL supports higher resolution
-                        height=1024
-                    )
-                    
-                    # Check if the model returned valid images
-                    if result is None or not hasattr(result, 'images') or result.images is None or len(result.images) == 0:
-                        raise ValueError("Model did not return any images")
-                        
-                    image = result.images[0]
-                except Exception as model_error:
-                    logging.error(f"Error from model: {str(model_error)}")
+                image = result["image"]
+                if image is None:
                     # Create a fallback image
                     image = self._create_fallback_image(prefix)
                     logging.info(f"Created fallback image for {prefix}")
@@ -176,15 +396,14 @@ class AvatarGenerator:
         import random
         
         # Create a gradient background
-        img = Image.new('RGB', (1024, 1024), color=(255, 255, 255))
-        draw = ImageDraw.Draw(img)
-        
         # Add color gradient
-        for y in range(1024):
-            r = int(200 + 55 * (y / 1024))
-            g = int(200 + 55 * (1 - y / 1024))
-            b = int(200 + 55 * (0.5 - abs(0.5 - y / 1024)))
-            draw.line([(0, y), (1024, y)], fill=(r, g, b))
+        img = vertical_gradient(
+            1024, 1024,
+            lambda t: 200 + 55 * t,
+            lambda t: 200 + 55 * (1 - t),
+            lambda t: 200 + 55 * (0.5 - abs(0.5 - t))
+        )
+        draw = ImageDraw.Draw(img)
         
         # Try to load a font
         try:
@@ -298,6 +517,96 @@ def generate_avatar_set(avatar_key, style=None, output_dir=None, num_variations=
             "error": str(e)
         }
 
+# Avatar video motion: zoom peaks at 1 + KEN_BURNS_ZOOM mid-clip while the view circles
+# KEN_BURNS_PAN pixels around the center
+KEN_BURNS_ZOOM = 0.05
+KEN_BURNS_PAN = 20
+
+def vertical_gradient(width, height, red, green, blue):
+    """
+    Create an RGB image whose colors change from top to bottom, using array broadcasting.
+    
+    Args:
+        width (int): Image width
+        height (int): Image height
+        red, green, blue: Channel value as a function of t = y / height (applied to an array), or a constant
+        
+    Returns:
+        PIL.Image: The gradient image
+    """
+    import numpy as np
+    from PIL import Image
+    
+    t = np.arange(height, dtype=np.float64)[:, None] / height
+    channels = [np.broadcast_to(np.asarray(c(t) if callable(c) else c, dtype=np.float64), (height, 1))
+                for c in (red, green, blue)]
+    # astype truncates like int(), matching the per-line drawing this replaces
+    column = np.stack(channels, axis=-1).astype(np.uint8)
+    return Image.fromarray(np.ascontiguousarray(np.broadcast_to(column, (height, width, 3))))
+
+def ken_burns_filter(width, height, fps, frame_count, zoom=KEN_BURNS_ZOOM, pan=KEN_BURNS_PAN):
+    """ffmpeg filter graph turning one still image into the avatar video's zoom/pan clip."""
+    n = max(frame_count, 1)
+    return (f"scale={width}:{height}:flags=lanczos,"
+            f"zoompan=z='1+{zoom}*sin(PI*on/{n})'"
+            f":x='(iw-iw/zoom)/2+{pan}*sin(2*PI*on/{n})/zoom'"
+            f":y='(ih-ih/zoom)/2+{pan}*cos(2*PI*on/{n})/zoom'"
+            f":d={n}:s={width}x{height}:fps={fps}")
+
+def ken_burns_matrices(width, height, frame_count, zoom=KEN_BURNS_ZOOM, pan=KEN_BURNS_PAN):
+    """
+    Inverse affine maps (output pixel -> image pixel) for every frame of the zoom/pan,
+    the same motion as ken_burns_filter, for cv2.warpAffine with WARP_INVERSE_MAP.
+    
+    Returns:
+        numpy.ndarray: [frame_count, 2, 3] matrices
+    """
+    import numpy as np
+    
+    phase = np.arange(frame_count, dtype=np.float64) / max(frame_count, 1)
+    scale = 1.0 / (1.0 + zoom * np.sin(phase * np.pi))
+    pan_x = pan * np.sin(phase * np.pi * 2)
+    pan_y = pan * np.cos(phase * np.pi * 2)
+    
+    matrices = np.zeros((frame_count, 2, 3), dtype=np.float64)
+    matrices[:, 0, 0] = scale
+    matrices[:, 1, 1] = scale
+    # Window of the zoomed image centered, offset by the pan, mapped back to image coordinates
+    matrices[:, 0, 2] = (width - width * scale) / 2 + pan_x * scale
+    matrices[:, 1, 2] = (height - height * scale) / 2 + pan_y * scale
+    return matrices
+
+def render_ken_burns_ffmpeg(image_path, video_path, width, height, fps, frame_count):
+    """
+    Render the zoom/pan clip of a still image with a single ffmpeg call (H.264).
+    
+    Returns:
+        bool: True if the video was written
+    """
+    import subprocess
+    
+    ffmpeg_cmd = [
+        "ffmpeg", "-y", "-loglevel", "error",
+        "-i", image_path,
+        "-vf", ken_burns_filter(width, height, fps, frame_count),
+        "-frames:v", str(frame_count),
+        "-c:v", "libx264",
+        # Placeholder motion over a still: veryfast is still several times smaller than mp4v
+        "-preset", "veryfast",
+        "-crf", "20",
+        "-pix_fmt", "yuv420p",
+        "-movflags", "+faststart",
+        video_path
+    ]
+    try:
+        result = subprocess.run(ffmpeg_cmd, capture_output=True, text=True)
+    except FileNotFoundError:
+        return False
+    if result.returncode != 0 or not os.path.exists(video_path):
+        logging.warning(f"ffmpeg zoompan failed for {image_path}: {result.stderr.strip()}")
+        return False
+    return True
+
 def create_avatar_video(image_path, name, duration=5.0):
     """
     Create a simple video from a static avatar image.
@@ -329,15 +638,9 @@ def create_avatar_video(image_path, name, duration=5.0):
             style = parts[1] if len(parts) > 1 else "default"
             
             # Create a fallback image
-            img = Image.new('RGB', (1024, 1024), color=(200, 200, 230))
-            draw = ImageDraw.Draw(img)
-            
             # Add gradient background
-            for y in range(1024):
-                r = int(180 + 70 * (y / 1024))
-                g = int(180 + 70 * (1 - y / 1024))
-                b = int(220)
-                draw.line([(0, y), (1024, y)], fill=(r, g, b))
+            img = vertical_gradient(1024, 1024, lambda t: 180 + 70 * t, lambda t: 180 + 70 * (1 - t), 220)
+            draw = ImageDraw.Draw(img)
             
             # Try to load a font
             try:
@@ -365,6 +668,16 @@ def create_avatar_video(image_path, name, duration=5.0):
         # Output video path
         video_path = os.path.join(video_dir, f"{name}.mp4")
         
+        # Create small animation effect
+        fps = 30
+        frame_count = int(duration * fps)
+        
+        # Fast path: resize, zoom and pan in one ffmpeg filter graph, encoded as H.264
+        if render_ken_burns_ffmpeg(image_path, video_path, 1080, 1920, fps, frame_count):
+            logging.info(f"Created avatar video: {video_path}")
+            return video_path
+        logging.warning("ffmpeg zoompan not available, rendering the avatar video with OpenCV")
+        
         # Load image and convert to RGB
         img = Image.open(image_path)
         img = img.convert("RGB")
@@ -372,52 +685,22 @@ def create_avatar_video(image_path, name, duration=5.0):
         # Resize to 1080x1920 (portrait mode for short-form video)
         img = img.resize((1080, 1920), Image.LANCZOS)
         
-        # Convert to numpy array for OpenCV
-        img_np = np.array(img)
-        
-        # Create small animation effect
-        fps = 30
-        frame_count = int(duration * fps)
-        
-        # Initialize video writer
-        fourcc = cv2.VideoWriter_fourcc(*'mp4v')
-        video = cv2.VideoWriter(video_path, fourcc, fps, (1080, 1920))
-        
-        # Generate frames with small animation (slight zoom and pan)
-        for i in range(frame_count):
-            # Calculate zoom and pan parameters based on frame number
-            zoom_factor = 1.0 + 0.05 * np.sin(i / frame_count * np.pi)
-            pan_x = int(20 * np.sin(i / frame_count * np.pi * 2))
-            pan_y = int(20 * np.cos(i / frame_count * np.pi * 2))
-            
-            # Create a slightly larger frame to accommodate zoom and pan
-            h, w = img_np.shape[:2]
-            zoomed_h, zoomed_w = int(h * zoom_factor), int(w * zoom_factor)
-            
-            # Resize image with zoom
-            zoomed_img = cv2.resize(img_np, (zoomed_w, zoomed_h))
-            
-            # Calculate crop region with pan
-            x1 = max(0, (zoomed_w - w) // 2 + pan_x)
-            y1 = max(0, (zoomed_h - h) // 2 + pan_y)
-            x2 = min(zoomed_w, x1 + w)
-            y2 = min(zoomed_h, y1 + h)
-            
-            # Ensure we have enough image to crop
-            if x2 - x1 < w or y2 - y1 < h:
-                # Adjust crop region if needed
-                cropped = zoomed_img[
-                    max(0, min(zoomed_h - h, y1)):max(h, min(zoomed_h, y1 + h)),
-                    max(0, min(zoomed_w - w, x1)):max(w, min(zoomed_w, x1 + w))
-                ]
-                # Resize to ensure correct dimensions
-                cropped = cv2.resize(cropped, (w, h))
-            else:
-                # Crop the zoomed image to original size with pan effect
-                cropped = zoomed_img[y1:y1+h, x1:x1+w]
-            
-            # Convert BGR to RGB (OpenCV uses BGR)
-            frame = cv2.cvtColor(cropped, cv2.COLOR_RGB2BGR)
+        # Convert to numpy array for OpenCV (OpenCV uses BGR)
+        img_np = cv2.cvtColor(np.array(img), cv2.COLOR_RGB2BGR)
+        h, w = img_np.shape[:2]
+        
+        # Initialize video writer; H.264 where OpenCV's build has it
+        video = cv2.VideoWriter(video_path, cv2.VideoWriter_fourcc(*'avc1'), fps, (w, h))
+        if not video.isOpened():
+            logging.warning("OpenCV has no H.264 encoder, writing the avatar video as MPEG-4")
+            video = cv2.VideoWriter(video_path, cv2.VideoWriter_fourcc(*'mp4v'), fps, (w, h))
+        
+        # Generate frames with small animation (slight zoom and pan): one affine warp per frame,
+        # all warps precomputed
+        for matrix in ken_burns_matrices(w, h, frame_count):
+            frame = cv2.warpAffine(img_np, matrix, (w, h),
+                                   flags=cv2.INTER_LINEAR | cv2.WARP_INVERSE_MAP,
+                                   borderMode=cv2.BORDER_REPLICATE)
             
             # Write frame to video
             video.write(frame)
@@ -436,12 +719,11 @@ def main():
     # Initialize generator
     generator = AvatarGenerator()
     
-    # Generate avatar sets for each persona
-    for avatar_key in AVATAR_CONFIGS.keys():
-        try:
-            generator.generate_avatar_set(avatar_key)
-        except Exception as e:
-            logging.error(f"Error generating avatar set for {avatar_key}: {str(e)}")
+    # Generate avatar sets for each persona, batched across personas
+    try:
+        generator.generate_avatar_sets(list(AVATAR_CONFIGS.keys()))
+    except Exception as e:
+        logging.error(f"Error generating avatar sets: {str(e)}")
 
 if __name__ == "__main__":
     main() 
\ No newline at end of file
@@ -15,11 +15,13 @@ from pathlib import Path
 from PIL import Image, ImageDraw, ImageFont
 from video_generation.avatar_config import AVATAR_CONFIGS, VIDEO_SETTINGS
 from video_editing.hooks_templates import HOOK_TEMPLATES
-from video_editing.video_analyzer import VideoAnalyzer
-from video_generation.context_ui_integrator import get_context_ui_integrator
+from video_editing.video_analyzer import VideoAnalyzer, get_shared_analyzer
+from video_generation.clip_index import ClipIndex, get_clip_index
+from e2e_cloud.model_registry import get_model_registry
+from video_editing.segment_index import select_segments
 import json
-import torch
-from diffusers import StableDiffusionPipeline
+# torch and diffusers are imported where the Stable Diffusion pipeline is used, so
+# importing this module (or anything that imports it) does not pull in the ML stack
 from typing import List, Dict, Optional, Tuple
 import textwrap
 from datetime import datetime
@@ -71,24 +73,21 @@ class VideoGenerator:
         self.pose_model = pose_model
         self.model_path = model_path
         
-        # Load video analysis cache
-        self.video_analyzer = VideoAnalyzer(
-            training_videos_dir=str(self.training_dir), 
-                pose_model=pose_model
-            )
         self.logger.info(f"Initializing VideoGenerator with model path: {model_path}")
         
-        # Analyze training videos to learn patterns
-        self.style_patterns = self.video_analyzer.analyze_training_set()
-        self.logger.info(f"Analyzed training set, found {len(self.style_patterns.get('duration', []))} style patterns")
+        # The video analyzer (and its training-set analysis), video analysis cache, clip
+        # index and context-aware UI integrator are resolved on first use and shared by
+        # every VideoGenerator in the process (see the properties below), so ffmpeg-only
+        # operations like extract_segment construct instantly
+        self._video_analyzer = None
+        self._style_patterns = None
+        self._video_cache = None
+        self._clip_index = None
+        self._context_ui_integrator = None
         
-        # Load video analysis cache
-        self.video_cache = self._load_video_cache()
-        self.logger.info(f"Loaded {len(self.video_cache)} entries from video analysis cache")
-            
-        # Initialize SDK and context-aware UI integrator
-        self.context_ui_integrator = get_context_ui_integrator()
-        self.logger.info("Initialized Context-Aware UI Integrator")
+        # Clip searches re-check the training set for new or changed videos at most this often
+        self.clip_index_refresh_seconds = 300.0
+        self._clip_index_refreshed_at = None
             
         # Set quality settings based on VIDEO_SETTINGS
         self.quality_settings = {
@@ -108,6 +107,53 @@ class VideoGenerator:
         
         self.logger.info("VideoGenerator initialization complete")
     
+    @property
+    def video_analyzer(self) -> VideoAnalyzer:
+        """Shared video analyzer over the training videos, created on first use."""
+        if self._video_analyzer is None:
+            # The default analysis store, so VideoEditor and VideoGenerator share one analyzer
+            self._video_analyzer = get_shared_analyzer(
+                training_videos_dir=str(self.training_dir),
+                pose_model=self.pose_model
+            )
+        return self._video_analyzer
+    
+    @property
+    def style_patterns(self) -> Dict:
+        """Style patterns learned from the training videos, analyzed once per process."""
+        if self._style_patterns is None:
+            # Analyze training videos to learn patterns
+            self._style_patterns = self.video_analyzer.training_set_patterns()
+            self.logger.info(f"Analyzed training set, found {len(self._style_patterns.get('duration', []))} style patterns")
+        return self._style_patterns
+    
+    @property
+    def video_cache(self):
+        """Video analysis cache, opened on first use."""
+        if self._video_cache is None:
+            # Load video analysis cache
+            self._video_cache = self._load_video_cache()
+            self.logger.info(f"Loaded {len(self._video_cache)} entries from video analysis cache")
+        return self._video_cache
+    
+    @property
+    def clip_index(self) -> ClipIndex:
+        """Feature-matrix index over the training clips for style-matched clip search."""
+        if self._clip_index is None:
+            self._clip_index = get_clip_index(str(self.cache_dir / "clip_index.npz"))
+        return self._clip_index
+    
+    @property
+    def context_ui_integrator(self):
+        """Context-aware UI integrator singleton, created on first use."""
+        if self._context_ui_integrator is None:
+            # Initialize SDK and context-aware UI integrator
+            # (imported here: the UI stack is only needed when UI is actually integrated)
+            from video_generation.context_ui_integrator import get_context_ui_integrator
+            self._context_ui_integrator = get_context_ui_integrator()
+            self.logger.info("Initialized Context-Aware UI Integrator")
+        return self._context_ui_integrator
+    
     def _initialize_sd_pipeline(self):
         """Initialize Stable Diffusion pipeline with optimizations for high-end GPUs like RTX 4090."""
         try:
@@ -117,67 +163,16 @@ class VideoGenerator:
                 
             # Import necessary modules
             import torch
-            from diffusers import StableDiffusionPipeline
-            
-            self.logger.info(f"Initializing Stable Diffusion pipeline from {self.model_path}")
-            
-            if torch.cuda.is_available():
-                # Get GPU information for logging
-                gpu_name = torch.cuda.get_device_name(0)
-                gpu_memory = torch.cuda.get_device_properties(0).total_memory / (1024 ** 3)  # Convert to GB
-                self.logger.info(f"GPU detected: {gpu_name} with {gpu_memory:.2f}GB memory")
-                
-                # Load with optimizations for powerful GPUs like RTX 4090
-                self.sd_pipeline = StableDiffusionPipeline.from_pretrained(
-                    self.model_path,
-                    torch_dtype=torch.float16,  # Use half precision for better performance
-                    use_safetensors=True,
-                    variant="fp16"  # Use FP16 variant if available
-                )
-                
-                # Move to GPU
-                self.sd_pipeline = self.sd_pipeline.to("cuda")
-                
-                # Apply memory optimizations
-                self.sd_pipeline.enable_vae_slicing()  # Reduces VRAM usage during generation
-                
-                # Enable attention slicing for memory efficiency
-                self.sd_pipeline.enable_attention_slicing(slice_size="auto")
-                
-                # For RTX 4090 and similar high-end GPUs, enable xformers for even better performance
-                try:
-                    import xformers
-                    self.sd_pipeline.enable_xformers_memory_efficient_attention()
-                    self.logger.info("Using xformers memory efficient attention for maximum performance")
-                except ImportError:
-                    self.logger.info("xformers package not found, using standard attention mechanism")
-                    
-                # For newer versions of diffusers that support torch compile
-                if hasattr(torch, 'compile') and hasattr(self.sd_pipeline, 'unet'):
-                    try:
-                        self.sd_pipeline.unet = torch.compile(
-                            self.sd_pipeline.unet, 
-                            mode="reduce-overhead", 
-                            fullgraph=True
-                        )
-                        self.logger.info("Using torch.compile for even faster inference")
-                    except Exception as e:
-                        self.logger.warning(f"Could not use torch.compile: {e}")
-                
-                # Set up optimized VAE forward method if needed
-                if hasattr(self.sd_pipeline, 'vae'):
-                    original_forward = self.sd_pipeline.vae.forward
-                    self.sd_pipeline.vae.forward = self._accelerated_vae_forward(original_forward)
-                
-                self.logger.info("Stable Diffusion pipeline initialized with RTX 4090 optimizations")
-            else:
-                # CPU fallback with basic settings
-                self.sd_pipeline = StableDiffusionPipeline.from_pretrained(
-                    self.model_path,
-                    use_safetensors=True
-                )
-                self.logger.info("Using CPU for generation (this will be slow for video tasks)")
             
+            # The pipeline is shared with AvatarGenerator and any other component using the
+            # same weights on the same device (see e2e_cloud/model_registry.py)
+            device = "cuda" if torch.cuda.is_available() else "cpu"
+            self.sd_pipeline = get_model_registry().acquire(
+                f"stable-diffusion:{self.model_path}:{device}",
+                self._load_sd_pipeline,
+                device=device,
+                owner=self
+            )
             return self.sd_pipeline
             
         except Exception as e:
@@ -185,34 +180,116 @@ class VideoGenerator:
             self.logger.error(traceback.format_exc())
             return None
     
-    def _load_video_cache(self) -> Dict:
-        """Load the video analysis cache from disk."""
+    def _load_sd_pipeline(self):
+        """Load the Stable Diffusion pipeline for the available device."""
+        import torch
+        from diffusers import StableDiffusionPipeline
+        
+        self.logger.info(f"Initializing Stable Diffusion pipeline from {self.model_path}")
+        
+        if torch.cuda.is_available():
+            # Get GPU information for logging
+            gpu_name = torch.cuda.get_device_name(0)
+            gpu_memory = torch.cuda.get_device_properties(0).total_memory / (1024 ** 3)  # Convert to GB
+            self.logger.info(f"GPU detected: {gpu_name} with {gpu_memory:.2f}GB memory")
+            
+            # Load with optimizations for powerful GPUs like RTX 4090
+            pipe = StableDiffusionPipeline.from_pretrained(
+                self.model_path,
+                torch_dtype=torch.float16,  # Use half precision for better performance
+                use_safetensors=True,
+                variant="fp16"  # Use FP16 variant if available
+            )
+            
+            # Move to GPU
+            pipe = pipe.to("cuda")
+            
+            # Apply memory optimizations
+            pipe.enable_vae_slicing()  # Reduces VRAM usage during generation
+            
+            # Enable attention slicing for memory efficiency
+            pipe.enable_attention_slicing(slice_size="auto")
+            
+            # For RTX 4090 and similar high-end GPUs, enable xformers for even better performance
+            try:
+                import xformers
+                pipe.enable_xformers_memory_efficient_attention()
+                self.logger.info("Using xformers memory efficient attention for maximum performance")
+            except ImportError:
+                self.logger.info("xformers package not found, using standard attention mechanism")
+                
+            # For newer versions of diffusers that support torch compile
+            if hasattr(torch, 'compile') and hasattr(pipe, 'unet'):
+                try:
+                    pipe.unet = torch.compile(
+                        pipe.unet, 
+                        mode="reduce-overhead", 
+                        fullgraph=True
+                    )
+                    self.logger.info("Using torch.compile for even faster inference")
+                except Exception as e:
+                    self.logger.warning(f"Could not use torch.compile: {e}")
+            
+            # Set up optimized VAE forward method if needed
+            if hasattr(pipe, 'vae'):
+                original_forward = pipe.vae.forward
+                pipe.vae.forward = self._accelerated_vae_forward(original_forward)
+            
+            self.logger.info("Stable Diffusion pipeline initialized with RTX 4090 optimizations")
+        else:
+            # CPU fallback with basic settings
+            pipe = StableDiffusionPipeline.from_pretrained(
+                self.model_path,
+                use_safetensors=True
+            )
+            self.logger.info("Using CPU for generation (this will be slow for video tasks)")
+        
+        return pipe
+    
+    def _load_video_cache(self):
+        """
+        Open the video analysis cache.
+        
+        The cache is the analyzer's SQLite record store (per-record upserts, batched
+        commits), viewed as a dict keyed by video path. A legacy
+        video_analysis_cache.json is not imported: its entries carry no file
+        fingerprints, so they would be re-analyzed anyway. It is removed once
+        the store is in use, so it is not reported (or kept) on every start.
+        """
         try:
-            cache_file = self.cache_dir / "video_analysis_cache.json"
-            if cache_file.exists():
-                logger.debug(f"Loading video cache from: {cache_file}")
-                with open(cache_file, 'r') as f:
-                    cache_data = json.load(f)
-                logger.debug(f"Loaded {len(cache_data)} cache entries")
-                return cache_data
-            logger.debug("No cache file found, returning empty cache")
-            return {}
+            cache = self.video_analyzer.store.namespace("video_records")
+            logger.debug(f"Opened video cache with {len(cache)} entries")
+            
+            legacy_file = self.cache_dir / "video_analysis_cache.json"
+            if legacy_file.exists():
+                logger.info(f"Ignoring legacy video cache {legacy_file}; records now live in the analysis store")
+                try:
+                    legacy_file.unlink()
+                    logger.info(f"Removed legacy video cache {legacy_file}")
+                except OSError as e:
+                    logger.warning(f"Could not remove legacy video cache {legacy_file}: {e}")
+            return cache
         except Exception as e:
             logger.error(f"Error loading video cache: {e}")
             logger.debug(traceback.format_exc())
             return {}
     
-    def _save_video_cache(self):
-        """Save the video analysis cache to disk."""
-        try:
-            cache_file = self.cache_dir / "video_analysis_cache.json"
-            logger.debug(f"Saving video cache to: {cache_file} with {len(self.video_cache)} entries")
-            with open(cache_file, 'w') as f:
-                json.dump(self.video_cache, f)
-            logger.debug(f"Video cache saved successfully")
-        except Exception as e:
-            logger.error(f"Error saving video cache: {e}")
-            logger.debug(traceback.format_exc())
+    def _refresh_clip_index(self, force: bool = False) -> ClipIndex:
+        """
+        Analyze new/changed training videos and sync them into the clip index, at most
+        once every clip_index_refresh_seconds unless forced.
+        """
+        now = time.monotonic()
+        if (not force and self._clip_index_refreshed_at is not None
+                and now - self._clip_index_refreshed_at < self.clip_index_refresh_seconds):
+            return self.clip_index
+        
+        # Incremental: only new or changed videos are decoded, unchanged ones cost a stat()
+        self.video_analyzer.analyze_training_set()
+        self._clip_index_refreshed_at = now
+        if self.clip_index.sync(self.video_analyzer.records_snapshot()):
+            self.clip_index.save()
+        return self.clip_index
     
     def _find_matching_clips(self, style_patterns: Dict, duration: float) -> List[Dict]:
         """Find video clips that match the desired style patterns."""
@@ -224,49 +301,32 @@ class VideoGenerator:
             if not self.training_dir.exists():
                 logger.warning(f"Training videos directory {self.training_dir} does not exist")
                 return []
-        
-            # Search through all training video directories
-            for influencer_dir in self.training_dir.iterdir():
-                if not influencer_dir.is_dir():
-                    continue
-                    
-                logger.debug(f"Searching for videos in: {influencer_dir}")
-                video_count = 0
-                
-                for video_file in influencer_dir.glob("*.mp4"):
-                    video_path = str(video_file)
-                    video_count += 1
-                    
-                    try:
-                        # Check cache first
-                        if video_path in self.video_cache:
-                            logger.debug(f"Using cached analysis for: {video_path}")
-                            analysis = self.video_cache[video_path]
-                        else:
-                            # Analyze video if not in cache
-                            logger.info(f"Analyzing new video: {video_path}")
-                            analysis = self.video_analyzer.analyze_video(video_path)
-                            self.video_cache[video_path] = analysis
-                            self._save_video_cache()
-                        
-                        # Check if video matches style patterns
-                        if self._matches_style_patterns(analysis, style_patterns):
-                            logger.debug(f"Video matches style patterns: {video_path}")
-                            # Find suitable segments in the video
-                            segments = self._find_suitable_segments(analysis, duration)
-                            for segment in segments:
-                                matching_clips.append({
-                                    'path': video_path,
-                                    'start_time': segment['start'],
-                                    'duration': segment['duration']
-                                })
-                                logger.debug(f"Added matching segment: start={segment['start']:.2f}s, duration={segment['duration']:.2f}s")
-                    except Exception as e:
-                        logger.error(f"Error processing video {video_path}: {e}")
-                        logger.debug(traceback.format_exc())
-                        continue  # Skip this video but continue with others
-                
-                logger.debug(f"Processed {video_count} videos in {influencer_dir}")
+            
+            clip_index = self._refresh_clip_index()
+            
+            # Energy/duration range query over the feature matrix
+            target_energy = style_patterns.get('energy_level', 0.5)
+            clips = clip_index.find_clips(target_energy, tolerance=0.2, min_duration=duration)
+            logger.debug(f"Clip index returned {len(clips)}/{len(clip_index)} clips for energy={target_energy:.2f}")
+            
+            for analysis in clips:
+                video_path = analysis['path']
+                # Per-clip segment index, precomputed during training-set analysis
+                analysis['segment_index'] = self.video_analyzer.video_records.get(video_path, {}).get('segment_index')
+                try:
+                    # Find suitable segments in the video
+                    segments = self._find_suitable_segments(analysis, duration)
+                    for segment in segments:
+                        matching_clips.append({
+                            'path': video_path,
+                            'start_time': segment['start'],
+                            'duration': segment['duration']
+                        })
+                        logger.debug(f"Added matching segment: start={segment['start']:.2f}s, duration={segment['duration']:.2f}s")
+                except Exception as e:
+                    logger.error(f"Error processing video {video_path}: {e}")
+                    logger.debug(traceback.format_exc())
+                    continue  # Skip this video but continue with others
             
             logger.info(f"Found {len(matching_clips)} matching clips")
             return matching_clips
@@ -275,35 +335,6 @@ class VideoGenerator:
             logger.debug(traceback.format_exc())
             return []
     
-    def _matches_style_patterns(self, analysis: Dict, target_patterns: Dict) -> bool:
-        """Check if a video's analysis matches the target style patterns."""
-        try:
-            # Get video properties from analysis
-            video_brightness = np.mean(analysis.get('brightness', []))
-            video_contrast = np.mean(analysis.get('contrast', []))
-            
-            # Get target properties
-            target_energy = target_patterns.get('energy_level', 0.5)
-            target_emotion = target_patterns.get('emotion', 'neutral')
-            
-            # Calculate energy level based on brightness and contrast
-            energy_level = (video_brightness / 255.0 + video_contrast / 255.0) / 2
-            
-            # Match energy level within a threshold
-            energy_match = abs(energy_level - target_energy) < 0.2
-            
-            # For now, we'll consider all emotions as matching
-            # In a real implementation, you would use emotion detection
-            emotion_match = True
-            
-            logger.debug(f"Style match assessment: energy_level={energy_level:.2f} (target={target_energy:.2f}), match={energy_match}")
-        
-            return energy_match and emotion_match
-        except Exception as e:
-            logger.error(f"Error matching style patterns: {e}")
-            logger.debug(traceback.format_exc())
-            return False  # Default to not matching in case of error
-    
     def _find_suitable_segments(self, analysis: Dict, target_duration: float) -> List[Dict]:
         """Find segments in a video that match the target duration."""
         try:
@@ -315,6 +346,22 @@ class VideoGenerator:
             # Find segments with good transitions
             segments = []
             transitions = analysis.get('transitions', {})
+            segment_index = analysis.get('segment_index')
+            
+            # Prefer the precomputed segment index: keyframe-aligned windows ranked by
+            # motion and face presence, chosen in memory without decoding the clip
+            if segment_index:
+                windows = select_segments(segment_index, target_duration)
+                for window in windows:
+                    segments.append({
+                        'start': window['start'],
+                        'duration': window['duration']
+                    })
+                    logger.debug(f"Added segment: start={window['start']:.2f}s, duration={window['duration']:.2f}s, "
+                                 f"score={window['score']:.2f}, keyframe_aligned={window['keyframe_aligned']}")
+            
+            if segments:
+                return segments
             
             # If we have transition information, use it to find good cut points
             if transitions:
@@ -803,6 +850,10 @@ class VideoGenerator:
 
     def _accelerated_vae_forward(self, original_forward):
         """Create a wrapper for VAE forward that improves CPU performance."""
+        import torch
+        # Only the logger: the wrapper lives on the shared pipeline, which must not keep this generator alive
+        logger = self.logger
+        
         def optimized_forward(*args, **kwargs):
             try:
                 # Process smaller chunks for better memory usage
@@ -811,8 +862,8 @@ class VideoGenerator:
                     result = original_forward(*args, **kwargs)
                 return result
             except Exception as e:
-                self.logger.error(f"Error in accelerated VAE forward: {e}")
-                self.logger.debug(traceback.format_exc())
+                logger.error(f"Error in accelerated VAE forward: {e}")
+                logger.debug(traceback.format_exc())
                 # Re-raise to let caller handle
                 raise
         return optimized_forward
@@ -859,11 +910,13 @@ class VideoGenerator:
             # Create output directory if it doesn't exist
             os.makedirs(os.path.dirname(output_path), exist_ok=True)
             
-            # Use ffmpeg to extract segment
+            # Use ffmpeg to extract segment. -ss before -i seeks the input to the nearest
+            # keyframe instead of decoding everything before start_time; segment index
+            # starts are keyframe-aligned, so the cut lands exactly on them.
             cmd = [
                 'ffmpeg', '-y',
-                '-i', input_video_path,
                 '-ss', str(start_time),
+                '-i', input_video_path,
                 '-t', str(duration),
                 '-c:v', 'libx264',
                 '-preset', self.quality_settings['preset'],
@@ -7,12 +7,40 @@ import logging
 import traceback
 from PIL import Image, ImageFont, ImageDraw
 import time
+from e2e_cloud.model_registry import get_model_registry
 
 # Configure logging
 logging.basicConfig(level=logging.INFO,
                     format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+# Use a smaller model with fewer parameters
+LIGHTWEIGHT_MODEL_ID = "runwayml/stable-diffusion-v1-5"  # Smaller than SDXL
+
+def _load_lightweight_pipeline():
+    """Load the CPU Stable Diffusion pipeline used for keyframes."""
+    # Import diffusers only when needed to save memory
+    from diffusers import StableDiffusionPipeline
+    
+    logger.info(f"Initializing lightweight SD pipeline with model {LIGHTWEIGHT_MODEL_ID}")
+    
+    # Create pipeline with minimal components
+    pipe = StableDiffusionPipeline.from_pretrained(
+        LIGHTWEIGHT_MODEL_ID,
+        safety_checker=None,  # Disable safety checker to save memory
+        requires_safety_checker=False,
+        use_safetensors=True,  # More memory efficient
+    )
+    
+    # Move to CPU and optimize
+    pipe = pipe.to("cpu")
+    pipe.enable_attention_slicing()  # Reduces memory usage
+    
+    # Use a lower precision to save memory
+    if hasattr(pipe, "unet"):
+        pipe.unet.to(torch.float32)
+    return pipe
+
 def generate_keyframe(prompt, scene_num, keyframe_num):
     """
     Generates a keyframe image using a lightweight Stable Diffusion approach
@@ -26,30 +54,12 @@ def generate_keyframe(prompt, scene_num, keyframe_num):
     Returns:
         PIL.Image: The generated image or a fallback image if generation fails
     """
+    registry = get_model_registry()
+    pipeline_id = f"stable-diffusion-lightweight:{LIGHTWEIGHT_MODEL_ID}:cpu"
+    pipe = None
     try:
-        # Import diffusers only when needed to save memory
-        from diffusers import StableDiffusionPipeline
-
-        # Use a smaller model with fewer parameters
-        model_id = "runwayml/stable-diffusion-v1-5"  # Smaller than SDXL
-        
-        logger.info(f"Initializing lightweight SD pipeline with model {model_id}")
-        
-        # Create pipeline with minimal components
-        pipe = StableDiffusionPipeline.from_pretrained(
-            model_id,
-            safety_checker=None,  # Disable safety checker to save memory
-            requires_safety_checker=False,
-            use_safetensors=True,  # More memory efficient
-        )
-        
-        # Move to CPU and optimize
-        pipe = pipe.to("cpu")
-        pipe.enable_attention_slicing()  # Reduces memory usage
-        
-        # Use a lower precision to save memory
-        if hasattr(pipe, "unet"):
-            pipe.unet.to(torch.float32)
+        # Loaded once and kept warm across keyframes (until the registry needs the memory)
+        pipe = registry.acquire(pipeline_id, _load_lightweight_pipeline, device="cpu")
         
         logger.info(f"Successfully initialized lightweight pipeline for scene {scene_num}, keyframe {keyframe_num}")
         
@@ -84,6 +94,9 @@ def generate_keyframe(prompt, scene_num, keyframe_num):
         logger.error(f"Error in lightweight image generation for scene {scene_num}, keyframe {keyframe_num}: {e}")
         logger.debug(traceback.format_exc())
         return _create_fallback_image(scene_num, keyframe_num, prompt)
+    finally:
+        if pipe is not None:
+            registry.release(pipeline_id)
 
 def _create_fallback_image(scene_num, keyframe_num, prompt):
     """
@@ -8,6 +8,7 @@ for dynamic UI generation.
 import os
 import sys
 import json
+import hashlib
 import logging
 import cv2
 import numpy as np
@@ -15,9 +16,8 @@ from pathlib import Path
 from PIL import Image, ImageDraw, ImageFont
 from typing import Dict, List, Tuple, Optional, Union
 import tempfile
-import torch
-from transformers import DetrImageProcessor, DetrForObjectDetection
-import pytesseract
+# torch, transformers and pytesseract are imported at first use (DETR detection and OCR),
+# so UI generation and get_ui_manager() users do not pay for the ML stack at import time
 from collections import defaultdict
 import random
 
@@ -31,6 +31,18 @@ logger = logging.getLogger('ui_pattern_learner')
 # Get project root directory
 project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
 
+# Element detection settings; part of every extraction cache key
+DETR_MODEL_NAME = "facebook/detr-resnet-50"
+DETR_THRESHOLD = 0.5
+
+# Bump when detection, OCR or structure analysis changes, so older cached extractions are redone
+EXTRACTION_VERSION = 2
+
+# Element matching across screenshots: similarity above the threshold counts as the same element,
+# and position offsets are normalized by the scale
+ELEMENT_MATCH_THRESHOLD = 0.7
+ELEMENT_POSITION_SCALE = 500
+
 class UIElement:
     """Represents a UI element with its properties."""
     def __init__(self, element_type, x, y, width, height, text=None, confidence=0.0):
@@ -92,6 +104,170 @@ class UIElement:
         return f"{self.type}({self.x},{self.y},{self.width},{self.height})"
 
 
+class ElementIndex:
+    """
+    One screenshot's elements as NumPy box arrays, with a spatial index for matching.
+
+    The position term of UIPatternLearner._element_similarity multiplies the x and y
+    offsets, so a match can lie anywhere in the same row or column band rather than in a
+    box around the element. The index keeps each type's elements sorted by x and by y and
+    finds the two bands with a binary search; similarities are then computed for the band
+    elements only, vectorized, with the same arithmetic as _element_similarity.
+    """
+
+    def __init__(self, elements):
+        self.elements = list(elements)
+        # Columns: x, y, width, height
+        self.boxes = np.array([[e.x, e.y, e.width, e.height] for e in self.elements],
+                              dtype=np.float64).reshape(-1, 4)
+        
+        # Lowercased texts as integer codes, -1 for no text
+        self.text_codes = {}
+        texts = [self.text_codes.setdefault(e.text.lower(), len(self.text_codes)) if e.text else -1
+                 for e in self.elements]
+        self.texts = np.array(texts, dtype=np.int64)
+        
+        # Per type: element indices sorted by x and by y, with the sorted coordinates
+        self.types = {}
+        by_type = defaultdict(list)
+        for i, elem in enumerate(self.elements):
+            by_type[elem.type].append(i)
+        for elem_type, indices in by_type.items():
+            indices = np.array(indices, dtype=np.int64)
+            by_x = indices[np.argsort(self.boxes[indices, 0], kind="stable")]
+            by_y = indices[np.argsort(self.boxes[indices, 1], kind="stable")]
+            self.types[elem_type] = (by_x, self.boxes[by_x, 0], by_y, self.boxes[by_y, 1])
+            
+    def __len__(self):
+        return len(self.elements)
+        
+    def has_matches(self, elements, threshold=ELEMENT_MATCH_THRESHOLD, max_pairs=1000000):
+        """
+        For each of elements, whether any indexed element is more similar to it than threshold
+        (_element_similarity(element, indexed) > threshold).
+
+        Elements are queried in batches, per type, vectorized over (element, band element)
+        pairs, at most max_pairs at a time. Each element's band is scanned outward from its
+        position in doubling steps and an element stops as soon as it has a match, so on
+        dense screens, where the bands cover most of the screen, the nearby elements that
+        usually match are compared first and the rest are mostly skipped.
+        """
+        found = np.zeros(len(elements), dtype=bool)
+        rows_by_type = defaultdict(list)
+        for i, elem in enumerate(elements):
+            rows_by_type[elem.type].append(i)
+            
+        for elem_type, rows in rows_by_type.items():
+            # Must be same type
+            if elem_type not in self.types:
+                continue
+            rows = np.array(rows, dtype=np.int64)
+            query = np.array([[elements[i].x, elements[i].y, elements[i].width, elements[i].height] for i in rows],
+                             dtype=np.float64)
+            # Query texts in this index's codes: -1 for no text, -2 for a text no indexed element has
+            query_texts = np.array([self.text_codes.get(elements[i].text.lower(), -2) if elements[i].text else -1
+                                    for i in rows], dtype=np.int64)
+            by_x, xs, by_y, ys = self.types[elem_type]
+            
+            # Within ELEMENT_POSITION_SCALE in x, or in y: further away in both, the position
+            # similarity is 0 and the total stays at or below 0.5 (requires a threshold >= 0.5)
+            for axis, order, coords in ((0, by_x, xs), (1, by_y, ys)):
+                pending = np.flatnonzero(~found[rows])
+                if not len(pending):
+                    break
+                coordinate = query[pending, axis]
+                low = np.searchsorted(coords, coordinate - ELEMENT_POSITION_SCALE, side="left")
+                high = np.searchsorted(coords, coordinate + ELEMENT_POSITION_SCALE, side="right")
+                center = np.clip(np.searchsorted(coords, coordinate), low, high)
+                
+                scanned, reach = 0, 8
+                while len(pending):
+                    # Band positions between scanned and reach away from the center, on both sides
+                    spans = [(np.clip(center + scanned, low, high), np.clip(center + reach, low, high)),
+                             (np.clip(center - reach, low, high), np.clip(center - scanned, low, high))]
+                    chunk = max(1, max_pairs // (2 * (reach - scanned)))
+                    for start in range(0, len(pending), chunk):
+                        pair_query, pair_elem = [], []
+                        for first, last in spans:
+                            queries, positions = self._band_pairs(first[start:start + chunk], last[start:start + chunk])
+                            pair_query.append(pending[start:start + chunk][queries])
+                            pair_elem.append(order[positions])
+                        pair_query = np.concatenate(pair_query)
+                        pair_elem = np.concatenate(pair_elem)
+                        if not len(pair_query):
+                            continue
+                        similar = self._similarities(query[pair_query], query_texts[pair_query], pair_elem) > threshold
+                        found[rows[pair_query[similar]]] = True
+                        
+                    # Keep the elements without a match whose band is not exhausted yet
+                    keep = ~found[rows[pending]] & ((center - reach > low) | (center + reach < high))
+                    pending, low, high, center = pending[keep], low[keep], high[keep], center[keep]
+                    scanned, reach = reach, reach * 2
+                    
+        return found
+        
+    @staticmethod
+    def _band_pairs(first, last):
+        """(query number, position) for every position in [first[i], last[i]) of every query i."""
+        counts = last - first
+        total = int(counts.sum())
+        if not total:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+        queries = np.repeat(np.arange(len(counts)), counts)
+        offsets = np.arange(total) - np.repeat(np.cumsum(counts) - counts, counts)
+        return queries, np.repeat(first, counts) + offsets
+        
+    def _similarities(self, query, query_texts, indices):
+        """_element_similarity(query[i], element indices[i]) for each pair, with the same arithmetic."""
+        qx, qy, qwidth, qheight = query.T
+        x, y, width, height = self.boxes[indices].T
+        
+        # Position similarity
+        pos_sim = 1.0 - np.minimum(
+            np.abs(qx - x) / ELEMENT_POSITION_SCALE,
+            1.0
+        ) * np.minimum(
+            np.abs(qy - y) / ELEMENT_POSITION_SCALE,
+            1.0
+        )
+        
+        # Size similarity, relative to the query's size
+        size_sim = 1.0 - np.minimum(
+            np.abs(qwidth - width) / np.maximum(qwidth, 1),
+            1.0
+        ) * np.minimum(
+            np.abs(qheight - height) / np.maximum(qheight, 1),
+            1.0
+        )
+        
+        # Text similarity where both have text
+        texts = self.texts[indices]
+        text_sim = np.where((query_texts == -1) | (texts == -1) | (query_texts == texts), 1.0, 0.0)
+        
+        return 0.5 * pos_sim + 0.3 * size_sim + 0.2 * text_sim
+        
+    def largest_in_region(self, x_min, x_max, y_min, y_max, min_size):
+        """
+        Largest element (the first one on ties) whose center lies in the region and whose
+        sides are at least min_size, or None.
+        """
+        if not self.elements:
+            return None
+        x, y, width, height = self.boxes.T
+        # Same center as UIElement.get_center
+        center_x = x + width // 2
+        center_y = y + height // 2
+        inside = np.flatnonzero(
+            (x_min <= center_x) & (center_x <= x_max) &
+            (y_min <= center_y) & (center_y <= y_max) &
+            (width >= min_size) & (height >= min_size)
+        )
+        if not len(inside):
+            return None
+        areas = width[inside] * height[inside]
+        return self.elements[inside[np.argmax(areas)]]
+
+
 class UIComponentExtractor:
     """Extract UI components from app screenshots."""
     
@@ -107,27 +283,43 @@ class UIComponentExtractor:
         # Components for detection and recognition
         self.element_detector = None
         self.text_recognizer = None
+        self.tesseract_version = None
+        self._extraction_config = None
+        self._legacy_cache_checked = False
         
     def _load_element_detector(self):
         """Lazy-load element detector model."""
         if self.element_detector is None:
             try:
                 logger.info("Loading DETR model for UI element detection")
-                model_name = "facebook/detr-resnet-50"
-                self.processor = DetrImageProcessor.from_pretrained(model_name)
-                self.element_detector = DetrForObjectDetection.from_pretrained(model_name)
+                import torch
+                from e2e_cloud.model_registry import get_model_registry
+                model_name = DETR_MODEL_NAME
+                device = "cuda" if torch.cuda.is_available() else "cpu"
                 
-                # Move to GPU if available
-                if torch.cuda.is_available():
-                    self.element_detector = self.element_detector.to("cuda")
-                    logger.info("DETR model loaded on GPU")
-                else:
-                    logger.info("DETR model loaded on CPU")
+                def load():
+                    from transformers import DetrImageProcessor, DetrForObjectDetection
+                    processor = DetrImageProcessor.from_pretrained(model_name)
+                    detector = DetrForObjectDetection.from_pretrained(model_name)
+                    
+                    # Move to GPU if available
+                    if device == "cuda":
+                        detector = detector.to("cuda")
+                        logger.info("DETR model loaded on GPU")
+                    else:
+                        logger.info("DETR model loaded on CPU")
+                    return processor, detector
+                
+                # One copy for every extractor in the process, released with this extractor
+                self.processor, self.element_detector = get_model_registry().acquire(
+                    f"detr:{model_name}:{device}", load, device=device, owner=self)
             except Exception as e:
                 logger.error(f"Error loading element detector: {e}")
                 # Fallback to simpler detection if needed
                 logger.info("Using fallback element detection methods")
                 self.element_detector = "fallback"
+                # Extractions are now made with CV detection, cache them as such
+                self._extraction_config = None
         
         return self.element_detector
         
@@ -196,17 +388,88 @@ class UIComponentExtractor:
         # Default to generic element
         return "element"
         
-    def extract_components(self, screenshot_path):
-        """Extract UI components from a screenshot."""
-        # Check cache first
-        cache_key = Path(screenshot_path).name
-        cache_file = self.cache_dir / f"{cache_key}.json"
+    def extraction_config(self):
+        """
+        Settings that decide what an extraction contains: detector (DETR model, version and
+        threshold, or CV detection), OCR engine and EXTRACTION_VERSION.
+        
+        Worked out without loading DETR, so cached screenshots never pay for the model.
+        """
+        if self._extraction_config is None:
+            import importlib.util
+            self._check_legacy_cache()
+            if self.element_detector == "fallback":
+                detector = "cv"
+            elif importlib.util.find_spec("torch") and importlib.util.find_spec("transformers"):
+                from importlib.metadata import version
+                try:
+                    detector = f"detr:{DETR_MODEL_NAME}:transformers-{version('transformers')}:{DETR_THRESHOLD}"
+                except Exception:
+                    detector = f"detr:{DETR_MODEL_NAME}:{DETR_THRESHOLD}"
+            else:
+                detector = "cv"
+            self._extraction_config = {
+                'version': EXTRACTION_VERSION,
+                'detector': detector,
+                'ocr': self._init_text_recognizer()
+            }
+        return self._extraction_config
+    
+    def _cv_extraction_config(self):
+        """Extraction config of a screenshot DETR failed on, which was extracted with CV detection."""
+        return dict(self.extraction_config(), detector="cv")
+    
+    def _check_legacy_cache(self):
+        """Log filename-keyed entries left by older versions; they are never read."""
+        if self._legacy_cache_checked:
+            return
+        self._legacy_cache_checked = True
+        try:
+            legacy_entries = [name for name in os.listdir(self.cache_dir)
+                              if name.lower().endswith((".png.json", ".jpg.json", ".jpeg.json"))]
+        except OSError:
+            return
+        if legacy_entries:
+            logger.info(f"Ignoring {len(legacy_entries)} filename-keyed cache entries in {self.cache_dir}; "
+                        f"extractions are now keyed by screenshot content")
+    
+    def cache_key(self, screenshot_path, config=None):
+        """
+        Cache key of a screenshot: sha256 of its content and the extraction config, so a
+        replaced screenshot (same name, new content) or a detector change is re-extracted
+        and identical screenshots share one entry. None if the file cannot be read.
+        
+        Args:
+            screenshot_path (str): Screenshot file
+            config (dict, optional): Extraction config; extraction_config() if None
+        """
+        try:
+            digest = hashlib.sha256()
+            with open(screenshot_path, 'rb') as f:
+                for chunk in iter(lambda: f.read(1 << 20), b""):
+                    digest.update(chunk)
+        except OSError as e:
+            logger.warning(f"Could not read {screenshot_path} for its cache key: {e}")
+            return None
+        config = json.dumps(config or self.extraction_config(), sort_keys=True)
+        return hashlib.sha256(f"{digest.hexdigest()}\0{config}".encode("utf-8")).hexdigest()[:32]
+    
+    def _cache_file(self, cache_key):
+        """Cache file of an extraction."""
+        return self.cache_dir / f"{cache_key}.json"
+    
+    def _load_cached(self, screenshot_path, cache_key=None):
+        """Cached extraction of a screenshot, or None."""
+        cache_key = cache_key or self.cache_key(screenshot_path)
+        if cache_key is None:
+            return None
+        cache_file = self._cache_file(cache_key)
         
         if cache_file.exists():
             try:
                 with open(cache_file, 'r') as f:
                     cached_data = json.load(f)
-                    logger.info(f"Loaded cached extraction for {cache_key}")
+                    logger.info(f"Loaded cached extraction for {Path(screenshot_path).name} ({cache_key})")
                     
                     # Convert dictionaries to UIElement objects
                     elements = [UIElement.from_dict(elem) for elem in cached_data['elements']]
@@ -218,14 +481,53 @@ class UIComponentExtractor:
                     }
             except Exception as e:
                 logger.warning(f"Error loading cache: {e}, will re-extract")
+        return None
+    
+    def _save_cached(self, screenshot_path, elements, ui_structure, cache_key=None, config=None):
+        """Cache a screenshot's extraction (made with config, extraction_config() if None) in its own file, written atomically."""
+        config = config or self.extraction_config()
+        cache_key = cache_key or self.cache_key(screenshot_path, config)
+        if cache_key is None:
+            return
+        cache_file = self._cache_file(cache_key)
+        
+        # Cache the results
+        cache_data = {
+            'elements': [elem.to_dict() for elem in elements],
+            'structure': ui_structure,
+            'screenshot': screenshot_path,
+            'config': config
+        }
+        
+        try:
+            tmp_file = cache_file.with_name(f"{cache_file.name}.{os.getpid()}.tmp")
+            with open(tmp_file, 'w') as f:
+                json.dump(cache_data, f)
+            os.replace(tmp_file, cache_file)
+            logger.info(f"Cached extraction for {Path(screenshot_path).name} ({cache_key})")
+        except Exception as e:
+            logger.warning(f"Error caching extraction: {e}")
+    
+    def extract_components(self, screenshot_path):
+        """Extract UI components from a screenshot."""
+        # Check cache first
+        cache_key = self.cache_key(screenshot_path)
+        cached = self._load_cached(screenshot_path, cache_key)
+        if cached is not None:
+            return cached
+        config = self.extraction_config()
+        if self._load_element_detector() == "fallback" and self.extraction_config() != config:
+            # DETR could not be loaded: the screenshot may be cached as a CV extraction
+            cache_key = self.cache_key(screenshot_path)
+            cached = self._load_cached(screenshot_path, cache_key)
+            if cached is not None:
+                return cached
         
         # Load the screenshot
         image = cv2.imread(screenshot_path)
         if image is None:
             logger.error(f"Failed to load image: {screenshot_path}")
             return {'elements': [], 'structure': {}, 'screenshot': screenshot_path}
-            
-        height, width = image.shape[:2]
         
         # Detect UI elements
         detector = self._load_element_detector()
@@ -234,40 +536,176 @@ class UIComponentExtractor:
         else:
             # Use DETR model for better detection
             elements = self._detect_elements_detr(image)
-            
+        
+        components = self._finish_extraction(screenshot_path, image, elements)
+        self._save_cached(screenshot_path, components['elements'], components['structure'], cache_key)
+        return components
+    
+    def _finish_extraction(self, screenshot_path, image, elements):
+        """OCR and structure analysis of detected elements."""
+        height, width = image.shape[:2]
+        
         # Extract text from elements
         elements = self._extract_text_from_elements(image, elements)
         
         # Identify UI patterns and hierarchies
         ui_structure = self._identify_structure(elements, width, height)
         
-        # Cache the results
-        cache_data = {
-            'elements': [elem.to_dict() for elem in elements],
+        return {
+            'elements': elements,
             'structure': ui_structure,
             'screenshot': screenshot_path
         }
+    
+    def _extract_task(self, screenshot_path, detected=None):
+        """
+        Extraction of one screenshot after (optional) DETR detection, as plain dicts so it
+        can be returned from a worker process.
+        
+        Args:
+            screenshot_path (str): Screenshot file
+            detected (list, optional): Element dicts from DETR; CV detection is used if None
+        """
+        image = cv2.imread(screenshot_path)
+        if image is None:
+            logger.error(f"Failed to load image: {screenshot_path}")
+            return {'elements': [], 'structure': {}, 'screenshot': screenshot_path, 'failed': True}
         
+        if detected is None:
+            elements = self._detect_ui_elements_cv(image)
+        else:
+            elements = [UIElement.from_dict(elem) for elem in detected]
+        
+        components = self._finish_extraction(screenshot_path, image, elements)
+        components['elements'] = [elem.to_dict() for elem in components['elements']]
+        return components
+    
+    def extract_components_batch(self, screenshot_paths, workers=None, batch_size=8):
+        """
+        Extract UI components from many screenshots.
+        
+        Cached screenshots are returned as they are. For the rest, DETR runs on batches of
+        screenshots per forward pass in this process, and CV detection (the fallback), OCR
+        and structure analysis run in a process pool.
+        
+        Args:
+            screenshot_paths (list): Screenshot files
+            workers (int, optional): Worker processes for CV/OCR; os.cpu_count() if None, 1 runs in this process
+            batch_size (int): Screenshots per DETR forward pass
+            
+        Returns:
+            list: Extraction per screenshot, in the order of screenshot_paths
+        """
+        screenshot_paths = [str(path) for path in screenshot_paths]
+        cache_keys = [self.cache_key(path) for path in screenshot_paths]
+        results = [self._load_cached(path, key) for path, key in zip(screenshot_paths, cache_keys)]
+        pending = [i for i, result in enumerate(results) if result is None]
+        logger.info(f"Extracting components from {len(pending)} of {len(screenshot_paths)} screenshots "
+                    f"({len(screenshot_paths) - len(pending)} cached)")
+        if not pending:
+            return results
+        
+        # DETR in this process, a batch of screenshots per forward pass
+        detected = {}
+        configs = {}
+        config = self.extraction_config()
+        if self._load_element_detector() != "fallback":
+            detected = self._detect_elements_detr_paths([screenshot_paths[i] for i in pending], batch_size)
+            # Screenshots DETR failed on get CV detection, so they are cached (and looked up)
+            # under the CV config's key, never as DETR extractions
+            cv_config = self._cv_extraction_config()
+            for i in pending:
+                if screenshot_paths[i] not in detected:
+                    configs[i] = cv_config
+                    cache_keys[i] = self.cache_key(screenshot_paths[i], cv_config)
+                    results[i] = self._load_cached(screenshot_paths[i], cache_keys[i])
+            pending = [i for i in pending if results[i] is None]
+            if not pending:
+                return results
+        elif self.extraction_config() != config:
+            # DETR could not be loaded: look the screenshots up again as CV extractions
+            cache_keys = [self.cache_key(path) for path in screenshot_paths]
+            for i in pending:
+                results[i] = self._load_cached(screenshot_paths[i], cache_keys[i])
+            pending = [i for i in pending if results[i] is None]
+            if not pending:
+                return results
+        tasks = [(screenshot_paths[i], detected.get(screenshot_paths[i])) for i in pending]
+        
+        workers = workers or os.cpu_count() or 1
+        workers = min(workers, len(tasks))
+        if workers <= 1:
+            extractions = [self._extract_task(*task) for task in tasks]
+        else:
+            # spawn: the parent may hold CUDA (DETR), which must not be forked
+            import multiprocessing
+            from concurrent.futures import ProcessPoolExecutor
+            logger.info(f"Running CV/OCR extraction on {workers} worker processes")
+            with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"),
+                                     initializer=_init_extraction_worker, initargs=(str(self.cache_dir),)) as pool:
+                # map keeps the input order, so results merge deterministically
+                extractions = list(pool.map(_run_extraction_task, tasks, chunksize=max(1, len(tasks) // (workers * 4))))
+        
+        for i, components in zip(pending, extractions):
+            failed = components.pop('failed', False)
+            components['elements'] = [UIElement.from_dict(elem) for elem in components['elements']]
+            if not failed:
+                self._save_cached(screenshot_paths[i], components['elements'], components['structure'],
+                                  cache_keys[i], configs.get(i))
+            results[i] = components
+        return results
+    
+    def _detect_elements_detr_paths(self, screenshot_paths, batch_size):
+        """
+        DETR detections for screenshot files, batch_size screenshots per forward pass.
+        
+        Returns:
+            dict: Screenshot path -> element dicts; screenshots DETR failed on are left out
+        """
+        detected = {}
+        for start in range(0, len(screenshot_paths), batch_size):
+            paths, images = [], []
+            for path in screenshot_paths[start:start + batch_size]:
+                image = cv2.imread(path)
+                if image is not None:
+                    paths.append(path)
+                    images.append(image)
+            for path, elements in zip(paths, self._detect_elements_detr_split(images)):
+                if elements is not None:
+                    detected[path] = [elem.to_dict() for elem in elements]
+        logger.info(f"DETR detected elements in {len(detected)}/{len(screenshot_paths)} screenshots")
+        return detected
+    
+    def _detect_elements_detr_split(self, images):
+        """DETR on a batch, halving it if the forward pass fails; None for images that fail alone."""
+        if not images:
+            return []
         try:
-            with open(cache_file, 'w') as f:
-                json.dump(cache_data, f)
-                logger.info(f"Cached extraction for {cache_key}")
+            return self._detect_elements_detr_batch(images)
         except Exception as e:
-            logger.warning(f"Error caching extraction: {e}")
-            
-        return {
-            'elements': elements,
-            'structure': ui_structure,
-            'screenshot': screenshot_path
-        }
+            if len(images) == 1:
+                logger.warning(f"DETR failed on a screenshot, using CV detection for it: {e}")
+                return [None]
+            half = len(images) // 2
+            logger.warning(f"DETR failed on a batch of {len(images)} screenshots ({e}), retrying in batches of {half}")
+            if "out of memory" in str(e).lower():
+                import torch
+                torch.cuda.empty_cache()
+            return self._detect_elements_detr_split(images[:half]) + self._detect_elements_detr_split(images[half:])
         
     def _detect_elements_detr(self, image):
         """Detect elements using DETR model."""
+        return self._detect_elements_detr_batch([image])[0]
+    
+    def _detect_elements_detr_batch(self, images):
+        """Detect elements in several screenshots with one DETR forward pass."""
+        import torch
+        
         # Convert BGR to RGB
-        image_rgb = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
+        images_rgb = [cv2.cvtColor(image, cv2.COLOR_BGR2RGB) for image in images]
         
-        # Prepare image for model
-        inputs = self.processor(images=image_rgb, return_tensors="pt")
+        # Prepare images for model (padded to a common size, with a pixel mask)
+        inputs = self.processor(images=images_rgb, return_tensors="pt")
         
         # Move to GPU if available
         if torch.cuda.is_available():
@@ -278,11 +716,14 @@ class UIComponentExtractor:
             outputs = self.element_detector(**inputs)
             
         # Convert outputs to elements
-        target_sizes = torch.tensor([image.shape[:2]])
-        results = self.processor.post_process_object_detection(
-            outputs, threshold=0.5, target_sizes=target_sizes
-        )[0]
-        
+        target_sizes = torch.tensor([image.shape[:2] for image in images])
+        batch_results = self.processor.post_process_object_detection(
+            outputs, threshold=DETR_THRESHOLD, target_sizes=target_sizes
+        )
+        return [self._detr_elements(results) for results in batch_results]
+    
+    def _detr_elements(self, results):
+        """UI elements from one image's post-processed DETR detections."""
         elements = []
         for score, label, box in zip(results["scores"], results["labels"], results["boxes"]):
             box = [int(i) for i in box.tolist()]
@@ -309,21 +750,30 @@ class UIComponentExtractor:
             
         return elements
         
+    def _init_text_recognizer(self):
+        """Text recognition engine ("pytesseract" with its version, or "unavailable"), checked once."""
+        # Initialize text recognition if needed
+        if not self.text_recognizer:
+            # Check if pytesseract is available
+            try:
+                import pytesseract
+                self.tesseract_version = str(pytesseract.get_tesseract_version())
+                self.text_recognizer = "pytesseract"
+            except Exception:
+                logger.warning("Tesseract not available, skipping text extraction")
+                self.text_recognizer = "unavailable"
+        if self.text_recognizer == "pytesseract":
+            return f"pytesseract:{self.tesseract_version}"
+        return self.text_recognizer
+    
     def _extract_text_from_elements(self, image, elements):
         """Extract text from UI elements."""
         try:
-            # Initialize text recognition if needed
-            if not self.text_recognizer:
-                # Check if pytesseract is available
-                try:
-                    pytesseract.get_tesseract_version()
-                    self.text_recognizer = "pytesseract"
-                except Exception:
-                    logger.warning("Tesseract not available, skipping text extraction")
-                    self.text_recognizer = "unavailable"
+            self._init_text_recognizer()
             
             if self.text_recognizer == "unavailable":
                 return elements
+            import pytesseract
                 
             # Extract text from elements
             for element in elements:
@@ -443,6 +893,28 @@ class UIComponentExtractor:
         return "generic"
 
 
+# Extractor of a CV/OCR worker process; no detection model is loaded there
+_worker_extractor = None
+
+
+def _init_extraction_worker(cache_dir):
+    """Process pool initializer for extract_components_batch."""
+    global _worker_extractor
+    # One thread per process: the pool already uses every core
+    cv2.setNumThreads(1)
+    _worker_extractor = UIComponentExtractor(cache_dir=cache_dir)
+
+
+def _run_extraction_task(task):
+    """Process pool task: (screenshot_path, DETR element dicts or None) -> extraction as dicts."""
+    screenshot_path, detected = task
+    try:
+        return _worker_extractor._extract_task(screenshot_path, detected)
+    except Exception as e:
+        logger.error(f"Error extracting components from {screenshot_path}: {e}")
+        return {'elements': [], 'structure': {}, 'screenshot': screenshot_path, 'failed': True}
+
+
 class UIPatternLearner:
     """Learn UI patterns from app screenshots."""
     
@@ -504,8 +976,16 @@ class UIPatternLearner:
             logger.warning(f"Error saving pattern cache: {e}")
             return False
         
-    def learn_from_screenshots(self, screenshots_dir, force_relearn=False):
-        """Learn UI patterns from a directory of screenshots."""
+    def learn_from_screenshots(self, screenshots_dir, force_relearn=False, workers=None, batch_size=8):
+        """
+        Learn UI patterns from a directory of screenshots.
+        
+        Args:
+            screenshots_dir (str): Directory searched recursively for screenshots
+            force_relearn (bool): Ignore the pattern cache
+            workers (int, optional): Processes for CV/OCR extraction; os.cpu_count() if None
+            batch_size (int): Screenshots per DETR forward pass
+        """
         # Try to load from cache first, unless force_relearn is True
         if not force_relearn and self.load_pattern_cache():
             return self.patterns
@@ -514,7 +994,8 @@ class UIPatternLearner:
         screenshots_dir = Path(screenshots_dir)
         logger.info(f"Learning UI patterns from: {screenshots_dir}")
         
-        screenshot_files = list(screenshots_dir.glob("**/*.png")) + list(screenshots_dir.glob("**/*.jpg")) + list(screenshots_dir.glob("**/*.PNG"))
+        # Sorted, so patterns are learned in the same order on every host
+        screenshot_files = sorted(list(screenshots_dir.glob("**/*.png")) + list(screenshots_dir.glob("**/*.jpg")) + list(screenshots_dir.glob("**/*.PNG")))
         logger.info(f"Found {len(screenshot_files)} screenshots")
         
         if not screenshot_files:
@@ -528,10 +1009,11 @@ class UIPatternLearner:
         # Store the color scheme in the patterns
         self.color_scheme = app_colors
         
-        for screenshot in screenshot_files:
-            # Extract components from the screenshot
-            logger.info(f"Extracting components from: {screenshot.name}")
-            components = self.extractor.extract_components(str(screenshot))
+        # Extract components from all screenshots (batched DETR, parallel CV/OCR)
+        extractions = self.extractor.extract_components_batch(screenshot_files, workers=workers, batch_size=batch_size)
+        
+        for screenshot, components in zip(screenshot_files, extractions):
+            logger.info(f"Learning from components of: {screenshot.name}")
             
             # Add color scheme information to components
             components['color_scheme'] = self._extract_screenshot_colors(str(screenshot))
@@ -770,34 +1252,25 @@ class UIPatternLearner:
         # We need at least a reference set of elements
         reference = components_list[0]['elements']
         
-        constant_candidates = []
+        # Index the other screenshots once instead of scanning them for every reference element
+        indexes = [ElementIndex(components['elements']) for components in components_list[1:]]
         
         # For each element in the reference, check if similar elements exist in all others
-        for ref_elem in reference:
-            # Skip very small elements
-            if ref_elem.width < 20 or ref_elem.height < 20:
-                continue
-                
-            # Check if this element appears in all screenshots
-            is_constant = True
+        # Skip very small elements
+        remaining = [ref_elem for ref_elem in reference if not (ref_elem.width < 20 or ref_elem.height < 20)]
+        
+        # Check if these elements appear in all screenshots: a similar element in position,
+        # size, and type (same result as _element_similarity > threshold), one screenshot at a time
+        for index in indexes:
+            if not remaining:
+                break
+            found = index.has_matches(remaining, ELEMENT_MATCH_THRESHOLD)
+            remaining = [ref_elem for ref_elem, match in zip(remaining, found) if match]
             
-            for components in components_list[1:]:
-                # Try to find a matching element
-                found_match = False
-                
-                for comp_elem in components['elements']:
-                    # Check for similarity in position, size, and type
-                    if (self._element_similarity(ref_elem, comp_elem) > 0.7):
-                        found_match = True
-                        break
-                        
-                if not found_match:
-                    is_constant = False
-                    break
-                    
-            if is_constant:
-                constant_candidates.append(ref_elem.to_dict())
-                
+        constant_candidates = [ref_elem.to_dict() for ref_elem in remaining]
+        
+        logger.debug(f"Matched {len(reference)} reference elements against {sum(len(i) for i in indexes)} "
+                     f"elements in {len(indexes)} screenshots: {len(constant_candidates)} constant")
         return constant_candidates
         
     def _element_similarity(self, elem1, elem2):
@@ -808,10 +1281,10 @@ class UIPatternLearner:
             
         # Calculate position similarity (normalized to 0-1)
         pos_sim = 1.0 - min(
-            abs(elem1.x - elem2.x) / 500,  # Normalize by assuming 1080px width
+            abs(elem1.x - elem2.x) / ELEMENT_POSITION_SCALE,  # Normalize by assuming 1080px width
             1.0
         ) * min(
-            abs(elem1.y - elem2.y) / 500,  # Normalize by assuming 1920px height
+            abs(elem1.y - elem2.y) / ELEMENT_POSITION_SCALE,  # Normalize by assuming 1920px height
             1.0
         )
         
@@ -855,6 +1328,9 @@ class UIPatternLearner:
         # For each region, find elements that vary significantly
         width, height = ref_struct.get('screen_size', (1080, 1920))
         
+        # Box arrays of every screenshot, shared by the region queries
+        indexes = [ElementIndex(components['elements']) for components in components_list]
+        
         for region_name, region in regions.items():
             # Convert relative to absolute coordinates
             y_min, y_max = int(region['y_range'][0] * height), int(region['y_range'][1] * height)
@@ -863,24 +1339,12 @@ class UIPatternLearner:
             # Find elements in this region across all screenshots
             region_elements = []
             
-            for components in components_list:
-                matching_elements = []
-                
-                for elem in components['elements']:
-                    # Check if element is in the region
-                    elem_center_x, elem_center_y = elem.get_center()
-                    
-                    if (x_min <= elem_center_x <= x_max and
-                        y_min <= elem_center_y <= y_max and
-                        elem.width >= region['min_size'] and
-                        elem.height >= region['min_size']):
-                        matching_elements.append(elem)
-                        
-                # Choose best candidate (largest or most centered)
-                if matching_elements:
-                    # Sort by size
-                    matching_elements.sort(key=lambda e: e.get_area(), reverse=True)
-                    region_elements.append(matching_elements[0])
+            for index in indexes:
+                # Elements centered in the region, large enough; choose best candidate
+                # (largest or most centered): the largest, the first one on ties
+                best = index.largest_in_region(x_min, x_max, y_min, y_max, region['min_size'])
+                if best is not None:
+                    region_elements.append(best)
                     
             # Check if these elements differ sufficiently
             if len(region_elements) > 1:
@@ -1030,6 +1494,10 @@ if __name__ == "__main__":
                         help="Directory containing app screenshots")
     parser.add_argument("--force", action="store_true",
                         help="Force relearning patterns")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="Processes for CV/OCR extraction (default: one per core)")
+    parser.add_argument("--batch-size", type=int, default=8,
+                        help="Screenshots per DETR forward pass")
     
     args = parser.parse_args()
     
@@ -1037,7 +1505,8 @@ if __name__ == "__main__":
     learner = UIPatternLearner()
     
     # Learn patterns
-    patterns = learner.learn_from_screenshots(args.screenshots, args.force)
+    patterns = learner.learn_from_screenshots(args.screenshots, args.force, workers=args.workers,
+                                              batch_size=args.batch_size)
     
     # Print results
     for screen_type, components in patterns.items():
@@ -33,7 +33,8 @@ sys.path.append(project_root)
 
 # Import local modules
 from video_generation.avatar_config import AVATAR_CONFIGS, VIDEO_SETTINGS
-from e2e_cloud.wan_t2v_generator import WanVideoGenerator
+from e2e_cloud.wan_t2v_generator import MEZZANINE_FORMATS, WanVideoGenerator, get_wan_generator, write_placeholder_video
+from e2e_cloud.clip_library import get_clip_library
 
 class WanAvatarGenerator:
     """Generate avatar videos using the Wan 2.1 Text-to-Video model."""
@@ -41,7 +42,11 @@ class WanAvatarGenerator:
     def __init__(self, 
                 model_dir=None, 
                 output_dir=None,
-                resolution="720p"):
+                resolution="720p",
+                clip_library_dir=None,
+                seed_mode="reuse",
+                use_clip_library=True,
+                mezzanine_format=None):
         """
         Initialize the Wan Avatar Generator.
         
@@ -49,6 +54,10 @@ class WanAvatarGenerator:
             model_dir: Path to the Wan 2.1 T2V model directory
             output_dir: Directory to save generated avatar videos
             resolution: Video resolution (720p or 1080p)
+            clip_library_dir: Avatar clip library directory ($CLIP_LIBRARY_DIR or data/clip_library if None)
+            seed_mode: "reuse" to serve repeat prompts from the library, "vary" for a new seed every time
+            use_clip_library: Look clips up in the library before generating them
+            mezzanine_format: Also keep a lossless ("ffv1") or near-lossless ("prores") copy of every clip
         """
         self.model_dir = model_dir
         
@@ -74,10 +83,19 @@ class WanAvatarGenerator:
         
         # Set resolution
         self.resolution = resolution
+        self.mezzanine_format = mezzanine_format
         
         # Track whether generator is initialized
         self.generator = None
         
+        # Previously generated clips, keyed by their generation parameters
+        self.clip_library = None
+        if use_clip_library:
+            self.clip_library = get_clip_library(
+                clip_library_dir or os.environ.get("CLIP_LIBRARY_DIR") or os.path.join(project_root, "data", "clip_library"),
+                seed_mode=seed_mode
+            )
+        
         # GPU type (default to L4, will be detected in initialize_generator)
         self.gpu_type = "L4"
         
@@ -105,15 +123,19 @@ class WanAvatarGenerator:
             logger.warning(f"Could not detect GPU type: {e}. Using default L4 settings.")
             self.gpu_type = "L4"
         
-        # Initialize generator with optimal settings for L4 GPU
+        # Initialize generator with optimal settings for L4 GPU. The weights are loaded once
+        # per process and shared by every WanAvatarGenerator with the same settings.
         try:
-            self.generator = WanVideoGenerator(
+            self.generator = get_wan_generator(
                 model_dir=self.model_dir,
                 device="cuda",
                 use_fp16=True,
                 resolution=self.resolution,
-                gpu_type=self.gpu_type
+                gpu_type=self.gpu_type,
+                mezzanine_format=self.mezzanine_format
             )
+            if self.generator is None:
+                raise RuntimeError(f"could not load model from {self.model_dir}")
             logger.info(f"Successfully initialized Wan Video Generator. GPU type: {self.gpu_type}")
             return self.generator
         except Exception as e:
@@ -181,12 +203,17 @@ class WanAvatarGenerator:
                 fallback_video = self._create_fallback_video(avatar_name, style)
                 videos = [fallback_video]
             
+            # Mezzanine copies written (or copied from the clip library) next to the videos
+            mezzanines = [generator.mezzanine_path_for(video) for video in videos]
+            mezzanines = [path for path in mezzanines if path and os.path.exists(path)]
+            
             # Return result
             result = {
                 "avatar_name": avatar_name,
                 "style": style,
                 "avatar_video": videos[0],  # Select the first video as the primary one
                 "all_videos": videos,
+                "all_mezzanines": mezzanines,
                 "generation_time": time.time() - start_time
             }
             
@@ -212,36 +239,48 @@ class WanAvatarGenerator:
         """
         videos = []
         
-        for i, prompt in enumerate(prompts):
-            try:
-                # Prepare prompt for Wan 2.1 T2V
-                # Add avatar-specific details to the prompt
-                enhanced_prompt = f"{prompt}"
-                
-                # Add negative prompt
-                negative_prompt = "blurry, low quality, duplicate face, deformed face, text, words, letters, watermark, signature"
-                
-                # Generate video
-                logger.info(f"Generating video {i+1}/{len(prompts)} for {avatar_name}")
-                logger.info(f"Prompt: {enhanced_prompt}")
-                
-                video_path = os.path.join(output_dir, f"{avatar_name}_video_{i+1}.mp4")
-                
-                # Call Wan 2.1 T2V to generate video
-                result = self.generator.generate_video(
-                    prompt=enhanced_prompt,
-                    negative_prompt=negative_prompt,
-                    output_path=video_path
+        # Prepare prompts for Wan 2.1 T2V
+        # Add avatar-specific details to the prompt
+        enhanced_prompts = [f"{prompt}" for prompt in prompts]
+        output_paths = [os.path.join(output_dir, f"{avatar_name}_video_{i+1}.mp4") for i in range(len(prompts))]
+        
+        # Add negative prompt
+        negative_prompt = "blurry, low quality, duplicate face, deformed face, text, words, letters, watermark, signature"
+        
+        # Variations of one avatar share resolution, frame count and steps, so they are
+        # denoised together in batches sized to the available GPU memory
+        logger.info(f"Generating {len(prompts)} videos for {avatar_name}")
+        for i, prompt in enumerate(enhanced_prompts):
+            logger.info(f"Prompt {i+1}/{len(prompts)}: {prompt}")
+        
+        try:
+            # Call Wan 2.1 T2V to generate videos; clips already in the library are copied instead
+            if self.clip_library is not None:
+                results = self.clip_library.generate(
+                    self.generator,
+                    enhanced_prompts,
+                    output_paths,
+                    negative_prompt=negative_prompt
                 )
-                
-                if os.path.exists(video_path):
-                    logger.info(f"Successfully generated video: {video_path}")
-                    videos.append(video_path)
-                else:
-                    logger.error(f"Failed to generate video for prompt: {prompt}")
-            
-            except Exception as e:
-                logger.error(f"Error generating video for prompt '{prompt}': {e}")
+            else:
+                results = self.generator.generate_videos(
+                    enhanced_prompts,
+                    output_paths,
+                    negative_prompt=negative_prompt
+                )
+        except Exception as e:
+            logger.error(f"Error generating videos for {avatar_name}: {e}")
+            results = []
+        
+        for result in results:
+            if result["video_path"] and os.path.exists(result["video_path"]):
+                logger.info(f"Successfully generated video: {result['video_path']}")
+                videos.append(result["video_path"])
+            else:
+                logger.error(f"Failed to generate video for prompt '{result['prompt']}': {result['error']}")
+        
+        # Keep the model loaded; only clear allocator caches under memory pressure
+        self.generator.release_memory()
         
         return videos
     
@@ -285,18 +324,9 @@ class WanAvatarGenerator:
                 img = cv2.imread(image_path)
                 if img is not None:
                     height, width = img.shape[:2]
-                    fps = 24
-                    seconds = 5
-                    
-                    # Create video writer
-                    fourcc = cv2.VideoWriter_fourcc(*'mp4v')
-                    video = cv2.VideoWriter(fallback_output, fourcc, fps, (width, height))
                     
                     # Write frames (same image repeated)
-                    for _ in range(fps * seconds):
-                        video.write(img)
-                    
-                    video.release()
+                    write_placeholder_video(fallback_output, width, height, fps=24, duration=5, image=img)
                     logger.info(f"Created fallback video: {fallback_output}")
                     return fallback_output
         
@@ -308,26 +338,14 @@ class WanAvatarGenerator:
         if self.resolution == "1080p":
             width, height = 1080, 1920
             
-        fps = 24
-        seconds = 5
-        
-        # Create video writer
-        fourcc = cv2.VideoWriter_fourcc(*'mp4v')
-        video = cv2.VideoWriter(fallback_output, fourcc, fps, (width, height))
-        
-        # Create a blank frame
-        blank_frame = np.zeros((height, width, 3), dtype=np.uint8)
-        
-        # Write frames
-        for _ in range(fps * seconds):
-            video.write(blank_frame)
-        
-        video.release()
+        # Write blank (black) frames
+        write_placeholder_video(fallback_output, width, height, fps=24, duration=5)
         logger.warning(f"Created blank fallback video: {fallback_output}")
         return fallback_output
 
 
-def generate_avatar_set(avatar_name, style="default", output_dir=None, model_dir=None, resolution="720p", gpu_type="L4"):
+def generate_avatar_set(avatar_name, style="default", output_dir=None, model_dir=None, resolution="720p", gpu_type="L4",
+                        mezzanine_format=None):
     """
     Generate a set of avatar videos for a specific avatar.
     
@@ -338,6 +356,7 @@ def generate_avatar_set(avatar_name, style="default", output_dir=None, model_dir
         model_dir: Path to the Wan 2.1 T2V model
         resolution: Video resolution (720p or 1080p)
         gpu_type: Type of GPU to optimize for (L4 or T4)
+        mezzanine_format: Also keep a mezzanine copy of every clip ("ffv1" or "prores")
         
     Returns:
         Dictionary with paths to generated videos
@@ -347,7 +366,8 @@ def generate_avatar_set(avatar_name, style="default", output_dir=None, model_dir
         generator = WanAvatarGenerator(
             model_dir=model_dir,
             output_dir=output_dir,
-            resolution=resolution
+            resolution=resolution,
+            mezzanine_format=mezzanine_format
         )
         
         # Generate avatar videos
@@ -372,6 +392,8 @@ if __name__ == "__main__":
     parser.add_argument("--model-dir", help="Path to Wan 2.1 T2V model directory")
     parser.add_argument("--resolution", default="720p", choices=["720p", "1080p"], help="Video resolution")
     parser.add_argument("--gpu-type", default="L4", choices=["L4", "T4"], help="GPU type to optimize for")
+    parser.add_argument("--mezzanine", default=None, choices=list(MEZZANINE_FORMATS),
+                        help="Also keep a lossless (ffv1) or near-lossless (prores) copy of every clip")
     
     args = parser.parse_args()
     
@@ -382,7 +404,8 @@ if __name__ == "__main__":
         output_dir=args.output_dir,
         model_dir=args.model_dir,
         resolution=args.resolution,
-        gpu_type=args.gpu_type
+        gpu_type=args.gpu_type,
+        mezzanine_format=args.mezzanine
     )
     
     if "error" in result: